@@ -0,0 +1,391 @@
+"""
+Invoice documents.
+
+An invoice is a printable HTML page: the store header, the order's customer
+and meta, one table row per order_item, any exchanged metal, and the totals.
+Everything that depends on the store alone (the header markup, with the logo
+and the UPI payment QR inlined as data URIs) is built once and cached under a
+fingerprint of the store row, so a new logo or UPI id simply stops matching the
+cached entry. Line rows are filled from str.format templates prepared at import,
+and a document is streamed as it is rendered: header, line rows per batch, then
+totals, which are summed from the rows on the way.
+
+Bulk re-rendering writes the invoices of an order date range to INVOICE_DIR
+through a thread pool; each task renders a batch of orders with one line query,
+and at most RENDER_QUEUE_FACTOR batches per worker are read ahead.
+Orders moved to the cold archive are read from there when the lookup misses the
+hot tables or the date range reaches the store's archive cutoff.
+"""
+
+import base64
+import hashlib
+import html
+import ipaddress
+import logging
+import socket
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime
+from datetime import timezone as dt_timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import quote, urlsplit
+
+import requests
+import segno
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+
+from backend.api.v1.dashboard.rollups import as_datetime, day_bounds, store_time_zone
+from backend.api.v1.reports.gst import tee_to_file
+from backend.master_db_opration.cold_archive import archive_reached, archived_sources, hot_sources, table_sources
+from backend.shared.constants import CACHE_TIMEOUT_DAY, CACHE_TIMEOUT_SHORT
+from backend.shared.db import fetch_dicts, iter_row_batches, rows_to_dicts
+from backend.shared.exceptions import NotFoundException
+
+logger = logging.getLogger(__name__)
+
+LOGO_FETCH_TIMEOUT = 5
+LOGO_MAX_BYTES = 512 * 1024
+# Orders per bulk rendering task; each task reads their lines with one query.
+RENDER_BATCH_SIZE = 200
+DEFAULT_RENDER_WORKERS = 4
+# Order batches submitted per worker before waiting for one to finish.
+RENDER_QUEUE_FACTOR = 2
+
+STORE_ASSET_COLUMNS = [
+    "storeId", "name", "proprietor", "address", "phone", "email", "registrationNo", "gstinNo", "panNo",
+    "image", "upiId",
+]
+INVOICE_ORDER_COLUMNS = [
+    "orderId", "invoiceNo", "orderDate", "customerMobile", "customerName", "customerAddress",
+    "customerGstinPan", "totalAmount", "totalTax", "totalCharge", "discount", "note",
+]
+INVOICE_LINE_COLUMNS = [
+    "orderId", "itemAddName", "catName", "subCatName", "huid", "purity", "quantity", "gsWt", "ntWt", "fnWt",
+    "fnMetalPrice", "price", "charge", "cgst", "sgst", "igst", "tax",
+]
+INVOICE_EXCHANGE_COLUMNS = ["orderId", "metalType", "purity", "grossWeight", "fineWeight", "exchangeValue"]
+INVOICE_TABLES = ["order", "order_item", "exchange_item"]
+
+_ORDER_SELECT = """
+    SELECT o.orderId, o.invoiceNo, o.orderDate, o.customerMobile, c.name, c.address, c.gstin_pan,
+           o.totalAmount, o.totalTax, o.totalCharge, o.discount, o.note
+    FROM {order} o
+    LEFT JOIN customer c ON c.mobileNo = o.customerMobile
+"""
+
+_STYLE = (
+    "body{font-family:sans-serif;font-size:12px;margin:24px}"
+    "table{border-collapse:collapse;width:100%}th,td{border:1px solid #999;padding:4px}"
+    "td.n{text-align:right}.store{display:flex;gap:16px;align-items:center}"
+    ".store img.logo{max-height:72px}.upi{text-align:center;font-size:10px}.upi img{width:96px}"
+    ".meta{display:flex;justify-content:space-between;margin:12px 0}.totals{width:auto;margin-left:auto}"
+)
+_STORE_HEADER = (
+    '<div class="store">{logo}<div><h2>{name}</h2><div>{address}</div><div>{contact}</div>'
+    "<div>{registration}</div></div>{upi}</div>"
+)
+_DOCUMENT_HEAD = (
+    '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Invoice {invoiceNo}</title>'
+    "<style>{style}</style></head><body>{storeHeader}"
+    '<div class="meta"><div><b>Bill to</b><div>{customerName}</div><div>{customerMobile}</div>'
+    "<div>{customerAddress}</div><div>{customerGstinPan}</div></div>"
+    "<div><b>Tax invoice</b><div>Invoice no. {invoiceNo}</div><div>Date {orderDate}</div>"
+    "<div>Order {orderId}</div></div></div>"
+    "<table><thead><tr><th>#</th><th>Item</th><th>HUID</th><th>Purity</th><th>Qty</th><th>Gross wt</th>"
+    "<th>Net wt</th><th>Fine wt</th><th>Rate/g</th><th>Metal value</th><th>Making</th><th>GST</th>"
+    "<th>Amount</th></tr></thead><tbody>"
+)
+_LINE_ROW = (
+    "<tr><td>{index}</td><td>{itemAddName}<br><small>{catName} / {subCatName}</small></td><td>{huid}</td>"
+    '<td>{purity}</td><td class="n">{quantity}</td><td class="n">{gsWt:.3f}</td><td class="n">{ntWt:.3f}</td>'
+    '<td class="n">{fnWt:.3f}</td><td class="n">{fnMetalPrice:,.2f}</td><td class="n">{price:,.2f}</td>'
+    '<td class="n">{charge:,.2f}</td><td class="n">{tax:,.2f}</td><td class="n">{amount:,.2f}</td></tr>'
+)
+_EXCHANGE_HEAD = (
+    "</tbody></table><h4>Exchange</h4><table><thead><tr><th>Metal</th><th>Purity</th><th>Gross wt</th>"
+    "<th>Fine wt</th><th>Value</th></tr></thead><tbody>"
+)
+_EXCHANGE_ROW = (
+    '<tr><td>{metalType}</td><td>{purity}</td><td class="n">{grossWeight:.3f}</td>'
+    '<td class="n">{fineWeight:.3f}</td><td class="n">{exchangeValue:,.2f}</td></tr>'
+)
+_TOTAL_ROW = '<tr><td>{label}</td><td class="n">{amount:,.2f}</td></tr>'
+_DOCUMENT_FOOT = '</tbody></table><table class="totals"><tbody>{totals}</tbody></table>{note}</body></html>'
+
+_TEXT_LINE_FIELDS = ("itemAddName", "catName", "subCatName", "huid", "purity")
+
+
+def _escape(value) -> str:
+    return html.escape(str(value)) if value not in (None, "") else ""
+
+
+def _is_public_host(url: str) -> bool:
+    """True when every address the URL's host resolves to is a public (global) one."""
+    host = urlsplit(url).hostname
+    if not host:
+        return False
+    addresses = {info[4][0] for info in socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)}
+    try:
+        return bool(addresses) and all(ipaddress.ip_address(address).is_global for address in addresses)
+    except ValueError:
+        return False
+
+
+def _fetch_logo(image: str) -> Optional[str]:
+    """
+    The store image as a data URI; "" when there is none, None when it could not be fetched.
+
+    The URL is owner-supplied, so only http(s) URLs of public hosts are fetched
+    and redirects are not followed: the server must not be made to reach into
+    its own network.
+    """
+    image = (image or "").strip()
+    if not image:
+        return ""
+    if image.startswith("data:image/"):
+        return image
+    if not image.startswith(("http://", "https://")):
+        # A path on the owner's device: nothing the server can read.
+        return ""
+    try:
+        if not _is_public_host(image):
+            logger.warning("Not fetching store logo %s: the host is not a public address", image)
+            return ""
+        response = requests.get(image, timeout=LOGO_FETCH_TIMEOUT, stream=True, allow_redirects=False)
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+        if response.is_redirect or not content_type.startswith("image/"):
+            return ""
+        content = response.raw.read(LOGO_MAX_BYTES + 1, decode_content=True)
+    except (OSError, requests.RequestException) as exc:
+        logger.warning("Could not fetch store logo %s: %s", image, exc)
+        return None
+    if len(content) > LOGO_MAX_BYTES:
+        return ""
+    return f"data:{content_type};base64,{base64.b64encode(content).decode('ascii')}"
+
+
+def upi_payment_uri(upi_id: str, payee: str) -> str:
+    return f"upi://pay?pa={quote(upi_id, safe='@')}&pn={quote(payee)}&cu=INR"
+
+
+def _store_header(store: dict, logo: str) -> str:
+    upi = ""
+    if store["upiId"]:
+        qr = segno.make(upi_payment_uri(store["upiId"], store["name"]), error="m")
+        upi = (
+            f'<div class="upi"><img alt="UPI" src="{qr.svg_data_uri(scale=4, border=2)}">'
+            f"<div>Pay by UPI</div><div>{_escape(store['upiId'])}</div></div>"
+        )
+    contact = " | ".join(_escape(store[key]) for key in ("phone", "email") if store[key])
+    registration = " | ".join(
+        f"{label}: {_escape(store[key])}"
+        for label, key in (("GSTIN", "gstinNo"), ("PAN", "panNo"), ("Reg. no.", "registrationNo"))
+        if store[key]
+    )
+    return _STORE_HEADER.format(
+        logo=f'<img class="logo" alt="" src="{_escape(logo)}">' if logo else "",
+        name=_escape(store["name"]), address=_escape(store["address"]), contact=contact,
+        registration=registration, upi=upi,
+    )
+
+
+def store_assets(cursor, store_id: str) -> Dict[str, str]:
+    """The store's invoice header markup, built at most once per version of the store row."""
+    stores = fetch_dicts(
+        cursor, STORE_ASSET_COLUMNS,
+        f"SELECT {', '.join(STORE_ASSET_COLUMNS)} FROM store WHERE storeId = %s", [store_id],
+    )
+    if not stores:
+        raise NotFoundException(f"Store {store_id} not found")
+    store = stores[0]
+    fingerprint = hashlib.md5(repr([store[column] for column in STORE_ASSET_COLUMNS]).encode("utf-8")).hexdigest()
+    key = f"invoice_assets:{store_id}:{fingerprint}"
+    assets = cache.get(key)
+    if assets is None:
+        logo = _fetch_logo(store["image"])
+        assets = {"storeId": store_id, "storeHeader": _store_header(store, logo or "")}
+        # A logo that failed to download is retried soon instead of being left out all day.
+        cache.set(key, assets, CACHE_TIMEOUT_SHORT if logo is None else CACHE_TIMEOUT_DAY)
+    return assets
+
+
+def _order_heads(cursor, sources: Dict[str, str], where: str, params: Sequence) -> List[dict]:
+    sql = f"{_ORDER_SELECT.format(order=sources['order'])} WHERE {where}"
+    return fetch_dicts(cursor, INVOICE_ORDER_COLUMNS, sql, params)
+
+
+def load_order(cursor, store_id: str, order_id: str) -> Tuple[dict, Dict[str, str]]:
+    """The order head, and the INVOICE_TABLES sources (hot or archived) its lines are read from."""
+    where, params = "o.orderId = %s AND o.storeId = %s", [order_id, store_id]
+    sources = hot_sources(INVOICE_TABLES)
+    orders = _order_heads(cursor, sources, where, params)
+    if not orders and archive_reached(cursor, store_id):
+        sources = archived_sources(INVOICE_TABLES)
+        orders = _order_heads(cursor, sources, where, params)
+    if not orders:
+        raise NotFoundException(f"Order {order_id} not found in store")
+    return orders[0], sources
+
+
+def _local_time(value) -> datetime:
+    moment = as_datetime(value)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, dt_timezone.utc)
+    return timezone.localtime(moment, store_time_zone())
+
+
+def _line_sql(source: str, order_count: int) -> str:
+    return (
+        f"SELECT {', '.join(INVOICE_LINE_COLUMNS)} FROM {source} oi "
+        f"WHERE orderId IN ({', '.join(['%s'] * order_count)}) ORDER BY orderId, catName, itemAddName, orderItemId"
+    )
+
+
+def _exchanges(cursor, source: str, order_ids: Sequence[str]) -> Dict[str, List[dict]]:
+    rows = fetch_dicts(
+        cursor, INVOICE_EXCHANGE_COLUMNS,
+        f"SELECT {', '.join(INVOICE_EXCHANGE_COLUMNS)} FROM {source} e "
+        f"WHERE orderId IN ({', '.join(['%s'] * len(order_ids))}) ORDER BY orderId, exchangeItemId",
+        list(order_ids),
+    )
+    exchanges: Dict[str, List[dict]] = {}
+    for row in rows:
+        exchanges.setdefault(row["orderId"], []).append(row)
+    return exchanges
+
+
+def render_invoice(assets: Dict[str, str], order: dict, line_batches: Iterable[List[dict]],
+                   exchanges: Sequence[dict]) -> Iterator[bytes]:
+    """Stream one invoice document: the head, one chunk per batch of lines, then exchanges and totals."""
+    yield _DOCUMENT_HEAD.format(
+        style=_STYLE, storeHeader=assets["storeHeader"], orderId=_escape(order["orderId"]),
+        invoiceNo=_escape(order["invoiceNo"]), orderDate=_local_time(order["orderDate"]).strftime("%d-%m-%Y %H:%M"),
+        customerName=_escape(order["customerName"]), customerMobile=_escape(order["customerMobile"]),
+        customerAddress=_escape(order["customerAddress"]), customerGstinPan=_escape(order["customerGstinPan"]),
+    ).encode("utf-8")
+
+    taxes = {"cgst": 0.0, "sgst": 0.0, "igst": 0.0}
+    index = 0
+    for lines in line_batches:
+        rows = []
+        for line in lines:
+            index += 1
+            rate = line["cgst"] + line["sgst"] + line["igst"]
+            for kind in taxes:
+                taxes[kind] += line["tax"] * line[kind] / rate if rate else 0.0
+            rows.append(_LINE_ROW.format(
+                index=index, amount=line["price"] + line["charge"] + line["tax"],
+                **{**line, **{field: _escape(line[field]) for field in _TEXT_LINE_FIELDS}},
+            ))
+        yield "".join(rows).encode("utf-8")
+
+    exchange_value = 0.0
+    if exchanges:
+        rows = [_EXCHANGE_HEAD]
+        for exchange in exchanges:
+            exchange_value += exchange["exchangeValue"]
+            rows.append(_EXCHANGE_ROW.format(**{
+                **exchange, "metalType": _escape(exchange["metalType"]), "purity": _escape(exchange["purity"]),
+            }))
+        yield "".join(rows).encode("utf-8")
+
+    total = order["totalAmount"] + order["totalCharge"] + order["totalTax"]
+    # Same as the payable create_order returns and adds to the customer's totalAmount;
+    # exchanged metal settles part of it, leaving the balance due.
+    payable = round(total - order["discount"], 2)
+    totals = [("Metal value", order["totalAmount"]), ("Making and other charges", order["totalCharge"])]
+    totals += [(kind.upper(), round(amount, 2)) for kind, amount in taxes.items() if amount]
+    totals.append(("Total", total))
+    if order["discount"]:
+        totals.append(("Discount", -order["discount"]))
+    totals.append(("Payable", payable))
+    if exchange_value:
+        totals.append(("Less exchange", -exchange_value))
+        totals.append(("Balance due", round(payable - exchange_value, 2)))
+    yield _DOCUMENT_FOOT.format(
+        totals="".join(_TOTAL_ROW.format(label=label, amount=amount) for label, amount in totals),
+        note=f"<p>{_escape(order['note'])}</p>" if order["note"] else "",
+    ).encode("utf-8")
+
+
+def invoice_chunks(cursor, store_id: str, order_id: str, using: str = "default") -> Iterator[bytes]:
+    """Look up the store assets and the order now, then stream its invoice with lines read from `using`."""
+    assets = store_assets(cursor, store_id)
+    order, sources = load_order(cursor, store_id, order_id)
+    exchanges = _exchanges(cursor, sources["exchange_item"], [order_id]).get(order_id, [])
+    line_batches = (
+        rows_to_dicts(INVOICE_LINE_COLUMNS, rows)
+        for rows in iter_row_batches(_line_sql(sources["order_item"], 1), [order_id], using=using)
+    )
+    return render_invoice(assets, order, line_batches, exchanges)
+
+
+def invoice_file_name(order: dict) -> str:
+    return f"invoice-{order['invoiceNo']}-{order['orderId']}.html"
+
+
+def invoice_path(directory: Path, store_id: str, order: dict) -> Path:
+    month = _local_time(order["orderDate"]).strftime("%Y-%m")
+    return directory / store_id / month / invoice_file_name(order)
+
+
+def _render_batch(assets: Dict[str, str], sources: Dict[str, str], orders: List[dict], directory: Path,
+                  using: str) -> int:
+    try:
+        order_ids = [order["orderId"] for order in orders]
+        with connections[using].cursor() as cursor:
+            lines = fetch_dicts(
+                cursor, INVOICE_LINE_COLUMNS, _line_sql(sources["order_item"], len(order_ids)), order_ids
+            )
+            exchanges = _exchanges(cursor, sources["exchange_item"], order_ids)
+        by_order: Dict[str, List[dict]] = {}
+        for line in lines:
+            by_order.setdefault(line["orderId"], []).append(line)
+        for order in orders:
+            chunks = render_invoice(
+                assets, order, [by_order.get(order["orderId"], [])], exchanges.get(order["orderId"], [])
+            )
+            for _ in tee_to_file(chunks, invoice_path(directory, assets["storeId"], order)):
+                pass
+        return len(orders)
+    finally:
+        # Worker threads each opened their own connection.
+        connections[using].close()
+
+
+def rerender_invoices(store_id: str, start: date, end: date, workers: int = DEFAULT_RENDER_WORKERS,
+                      directory: Optional[Path] = None, using: str = "default") -> dict:
+    """
+    Render every invoice of a store's orders dated `start`..`end` (store time) to
+    `directory` (INVOICE_DIR), RENDER_BATCH_SIZE orders per task on `workers` threads.
+    Existing documents are replaced; returns the number of orders and files written.
+    """
+    directory = Path(directory or settings.INVOICE_DIR)
+    lower, upper = day_bounds(start, end)
+    with connections[using].cursor() as cursor:
+        assets = store_assets(cursor, store_id)
+        sources = table_sources(cursor, INVOICE_TABLES, store_id, lower)
+    sql = (
+        f"{_ORDER_SELECT.format(order=sources['order'])} "
+        "WHERE o.storeId = %s AND o.orderDate >= %s AND o.orderDate < %s ORDER BY o.orderDate"
+    )
+    batches = (
+        rows_to_dicts(INVOICE_ORDER_COLUMNS, rows)
+        for rows in iter_row_batches(sql, [store_id, lower, upper], using=using, batch_size=RENDER_BATCH_SIZE)
+    )
+    workers = max(workers, 1)
+    written, pending = 0, set()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Submit as batches are read, but never more than a few per worker ahead of the renders.
+        for orders in batches:
+            if len(pending) >= workers * RENDER_QUEUE_FACTOR:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                written += sum(future.result() for future in done)
+            pending.add(pool.submit(_render_batch, assets, sources, orders, directory, using))
+        written += sum(future.result() for future in wait(pending).done)
+    return {"storeId": store_id, "from": start.isoformat(), "to": end.isoformat(), "invoices": written,
+            "directory": str(directory / store_id)}
@@ -0,0 +1,215 @@
+"""
+Invoice number allocation without a per-order lock on the store row.
+
+Incrementing `store.invoiceNo` inside the order transaction would hold the row
+lock until checkout commits and serialize every order of a store. Instead numbers
+are taken from a short, separately committed operation:
+
+* "block": `store.invoiceNo` is the high-water mark of leased numbers. A worker
+  leases INVOICE_NUMBER_BLOCK_SIZE numbers with one autocommitted UPDATE and hands
+  them out from memory, so the row is touched once per block, not once per order.
+* "sequence" (PostgreSQL): one sequence per store, started (or moved forward on
+  a worker's first use) after the store's current invoiceNo. `nextval` never
+  blocks; CACHE bounds the numbers a session can strand. `store.invoiceNo` is
+  still raised to the highest number handed out, so switching strategies never
+  issues a number twice.
+
+Numbers are unique and increasing per worker but not globally ordered; a restart
+skips at most block size - 1 numbers per worker, and an order rolled back after
+taking a number leaves a gap as well. Allocate before opening the order
+transaction: on SQLite the lease would otherwise wait on the caller's own write lock.
+"""
+
+import abc
+import hashlib
+import threading
+from typing import Callable, Dict, List, TypeVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, InterfaceError, OperationalError, connections
+
+from backend.shared.exceptions import NotFoundException, ValidationException
+
+STRATEGIES = ("block", "sequence")
+
+T = TypeVar("T")
+
+
+class BaseInvoiceNumberAllocator(abc.ABC):
+    def __init__(self, block_size: int, using: str = DEFAULT_DB_ALIAS):
+        if block_size < 1:
+            raise ValueError("block_size must be at least 1")
+        self.block_size = block_size
+        self.using = using
+        self._local = threading.local()
+
+    def side_connection(self):
+        """
+        A per-thread autocommit connection to `using`, independent of the caller's.
+
+        Leases made through it commit immediately, so they neither wait for nor roll
+        back with the order transaction that asked for the number.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = connections.create_connection(self.using)
+            self._local.connection = connection
+        return connection
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            try:
+                connection.close()
+            except DatabaseError:
+                pass  # Already broken; it is dropped either way.
+            self._local.connection = None
+
+    def run(self, work: Callable[..., T]) -> T:
+        """
+        Call `work(cursor)` on the side connection and return its result.
+
+        The connection is kept for the life of the thread, so the server may have
+        dropped it since its last use (idle timeout, restart, failover); on
+        OperationalError / InterfaceError it is replaced and `work` retried once. A retried
+        statement that did commit only leaves a gap in the numbers.
+        """
+        try:
+            with self.side_connection().cursor() as cursor:
+                return work(cursor)
+        except (OperationalError, InterfaceError):
+            self.close()
+        with self.side_connection().cursor() as cursor:
+            return work(cursor)
+
+    @abc.abstractmethod
+    def allocate(self, store_id: str, count: int = 1) -> List[int]:
+        """Return `count` unused invoice numbers for the store, in increasing order."""
+
+
+class BlockInvoiceNumberAllocator(BaseInvoiceNumberAllocator):
+    """Hands out numbers from blocks leased off `store.invoiceNo`."""
+
+    def __init__(self, block_size: int, using: str = DEFAULT_DB_ALIAS):
+        super().__init__(block_size, using)
+        self._blocks: Dict[str, List[int]] = {}  # storeId -> [next, end)
+        self._store_locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _store_lock(self, store_id: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._store_locks.setdefault(store_id, threading.Lock())
+
+    def lease(self, store_id: str, size: int) -> int:
+        """Reserve `size` consecutive numbers for this worker and return the first."""
+
+        def reserve(cursor):
+            cursor.execute(
+                "UPDATE store SET invoiceNo = invoiceNo + %s WHERE storeId = %s RETURNING invoiceNo",
+                [size, store_id],
+            )
+            return cursor.fetchone()
+
+        row = self.run(reserve)
+        if row is None:
+            raise NotFoundException(f"Store {store_id} not found")
+        return row[0] - size + 1
+
+    def allocate(self, store_id: str, count: int = 1) -> List[int]:
+        if count < 1:
+            raise ValidationException("count must be at least 1")
+        with self._store_lock(store_id):
+            numbers: List[int] = []
+            block = self._blocks.get(store_id)
+            if block and block[0] < block[1]:
+                take = min(count, block[1] - block[0])
+                numbers.extend(range(block[0], block[0] + take))
+                block[0] += take
+            remaining = count - len(numbers)
+            if remaining:
+                size = max(self.block_size, remaining)
+                first = self.lease(store_id, size)
+                numbers.extend(range(first, first + remaining))
+                self._blocks[store_id] = [first + remaining, first + size]
+            return numbers
+
+
+class SequenceInvoiceNumberAllocator(BaseInvoiceNumberAllocator):
+    """Hands out numbers from a per-store PostgreSQL sequence."""
+
+    def __init__(self, block_size: int, using: str = DEFAULT_DB_ALIAS):
+        super().__init__(block_size, using)
+        self._ready = set()
+
+    @staticmethod
+    def sequence_name(store_id: str) -> str:
+        return f"invoice_no_{hashlib.md5(store_id.encode()).hexdigest()[:20]}"
+
+    def _ensure_sequence(self, cursor, store_id: str, name: str) -> None:
+        cursor.execute("SELECT invoiceNo FROM store WHERE storeId = %s", [store_id])
+        row = cursor.fetchone()
+        if row is None:
+            raise NotFoundException(f"Store {store_id} not found")
+        cursor.execute(
+            f"CREATE SEQUENCE IF NOT EXISTS {name} START WITH {int(row[0]) + 1} CACHE {self.block_size}"
+        )
+        # An existing sequence lags the store when numbers were leased by the block
+        # strategy since it was last used: continue after them.
+        cursor.execute(
+            f"SELECT setval(%s, s.invoiceNo) FROM store s, {name} q "
+            "WHERE s.storeId = %s AND q.last_value < s.invoiceNo",
+            [name, store_id],
+        )
+        self._ready.add(store_id)
+
+    def allocate(self, store_id: str, count: int = 1) -> List[int]:
+        if count < 1:
+            raise ValidationException("count must be at least 1")
+        name = self.sequence_name(store_id)
+
+        def draw(cursor):
+            if store_id not in self._ready:
+                self._ensure_sequence(cursor, store_id, name)
+            cursor.execute("SELECT nextval(%s) FROM generate_series(1, %s)", [name, count])
+            numbers = sorted(row[0] for row in cursor.fetchall())
+            # Keep invoiceNo the high-water mark; the WHERE leaves the row unlocked once it is ahead.
+            cursor.execute(
+                "UPDATE store SET invoiceNo = %s WHERE storeId = %s AND invoiceNo < %s",
+                [numbers[-1], store_id, numbers[-1]],
+            )
+            return numbers
+
+        return self.run(draw)
+
+    def drop(self, store_id: str) -> None:
+        self.run(lambda cursor: cursor.execute(f"DROP SEQUENCE IF EXISTS {self.sequence_name(store_id)}"))
+        self._ready.discard(store_id)
+
+
+def build_allocator(strategy: str, block_size: int, using: str = DEFAULT_DB_ALIAS) -> BaseInvoiceNumberAllocator:
+    if strategy == "block":
+        return BlockInvoiceNumberAllocator(block_size, using)
+    if strategy == "sequence":
+        if connections[using].vendor != "postgresql":
+            raise ValueError("The sequence invoice number strategy requires PostgreSQL")
+        return SequenceInvoiceNumberAllocator(block_size, using)
+    raise ValueError(f"Unknown invoice number strategy {strategy!r}; expected one of {', '.join(STRATEGIES)}")
+
+
+_allocator = None
+_allocator_guard = threading.Lock()
+
+
+def get_allocator() -> BaseInvoiceNumberAllocator:
+    """The process-wide allocator configured by INVOICE_NUMBER_STRATEGY / INVOICE_NUMBER_BLOCK_SIZE."""
+    global _allocator
+    if _allocator is None:
+        with _allocator_guard:
+            if _allocator is None:
+                _allocator = build_allocator(settings.INVOICE_NUMBER_STRATEGY, settings.INVOICE_NUMBER_BLOCK_SIZE)
+    return _allocator
+
+
+def allocate_invoice_numbers(store_id: str, count: int = 1) -> List[int]:
+    """Allocate `count` unique invoice numbers for a store."""
+    return get_allocator().allocate(store_id, count)
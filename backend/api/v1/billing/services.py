@@ -0,0 +1,312 @@
+"""Billing computations: batch price quotes and transactional order creation."""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from backend.api.v1.billing.numbering import allocate_invoice_numbers
+from backend.api.v1.customers.services import apply_order_to_customer
+from backend.api.v1.dashboard import rollups
+from backend.api.v1.export.views import ORDER_ITEM_COLUMNS
+from backend.api.v1.metal_rate.views import get_rate_snapshot
+from backend.core.db_router import mark_write
+from backend.shared.constants import MAX_ORDER_LINES
+from backend.shared.db import insert_rows, values_sql
+from backend.shared.exceptions import ConflictException, NotFoundException, ValidationException
+from backend.shared.pricing import fine_rates_per_gram, price_lines
+from backend.shared.utils import generate_unique_id
+from backend.shared.validators import parse_datetime_param, parse_number
+
+# Item columns a quote needs; a cart line may override any of the numeric/charge ones.
+ITEM_QUOTE_COLUMNS = [
+    "itemId", "catId", "catName", "subCatId", "subCatName", "itemAddName", "entryType", "purity",
+    "huid", "quantity", "gsWt", "ntWt", "fnWt", "crgType", "crg", "othCrg", "cgst", "sgst", "igst",
+]
+# Everything an order_item row copies from the sold item.
+ITEM_ORDER_COLUMNS = ITEM_QUOTE_COLUMNS + [
+    "othCrgDes", "addDesKey", "addDesValue", "sellerFirmId", "purchaseOrderId", "purchaseItemId",
+]
+NUMERIC_QUOTE_FIELDS = ["quantity", "gsWt", "ntWt", "fnWt", "crg", "othCrg", "cgst", "sgst", "igst"]
+OVERRIDABLE_QUOTE_FIELDS = NUMERIC_QUOTE_FIELDS + ["catName", "crgType"]
+STOCK_FIELDS = ["quantity", "gsWt", "ntWt", "fnWt"]
+
+ORDER_COLUMNS = [
+    "orderId", "customerMobile", "storeId", "userId", "orderDate", "totalAmount", "totalTax",
+    "totalCharge", "discount", "note", "invoiceNo",
+]
+EXCHANGE_ITEM_COLUMNS = [
+    "exchangeItemId", "orderId", "orderDate", "customerMobile", "metalType", "purity", "grossWeight",
+    "fineWeight", "price", "isExchangedByMetal", "exchangeValue",
+]
+EXCHANGE_NUMERIC_FIELDS = ["grossWeight", "fineWeight", "price", "exchangeValue"]
+
+# Per-gram rates derived from the last snapshot, keyed by its timestamp.
+_rate_factors = {"timestamp": None, "rates": None}
+
+
+def quote_rates(overrides: Optional[Dict[str, float]] = None) -> Tuple[Dict[str, float], Optional[str]]:
+    """
+    Return (per-gram rates, snapshot timestamp) for one quote.
+
+    The conversion from the metal-rate payload is cached until the snapshot changes.
+    """
+    if overrides and len(overrides) == 2:
+        return fine_rates_per_gram({}, overrides), None
+
+    snapshot = get_rate_snapshot()
+    timestamp = snapshot.get("timestamp")
+    if overrides:
+        return fine_rates_per_gram(snapshot, overrides), timestamp
+    if _rate_factors["timestamp"] != timestamp or _rate_factors["rates"] is None:
+        _rate_factors["rates"] = fine_rates_per_gram(snapshot)
+        _rate_factors["timestamp"] = timestamp
+    return _rate_factors["rates"], timestamp
+
+
+def load_items(cursor, store_id: str, item_ids: Sequence[str], columns: Sequence[str] = ITEM_QUOTE_COLUMNS,
+               for_update: bool = False) -> Dict[str, dict]:
+    """Fetch `columns` (itemId first) of many items of a store in one query."""
+    if not item_ids:
+        return {}
+    lock = " FOR UPDATE" if for_update and cursor.db.features.has_select_for_update else ""
+    cursor.execute(
+        f"SELECT {', '.join(columns)} FROM item "
+        f"WHERE storeId = %s AND itemId IN ({', '.join(['%s'] * len(item_ids))}){lock}",
+        [store_id, *item_ids],
+    )
+    return {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+
+
+def _coerce_line(line: dict, index: int) -> dict:
+    for field in NUMERIC_QUOTE_FIELDS:
+        value = line.get(field, 0)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValidationException(f"lines[{index}].{field} must be a number")
+        line[field] = value
+    for field in ("catName", "crgType"):
+        value = line.get(field)
+        if value is None:
+            line[field] = ""
+        elif not isinstance(value, str):
+            raise ValidationException(f"lines[{index}].{field} must be a string")
+    return line
+
+
+def _check_line_count(requested: Sequence) -> None:
+    if not requested:
+        raise ValidationException("itemIds or lines is required")
+    if len(requested) > MAX_ORDER_LINES:
+        raise ValidationException(f"A request can contain at most {MAX_ORDER_LINES} lines")
+    for index, line in enumerate(requested):
+        if not isinstance(line, dict):
+            raise ValidationException(f"lines[{index}] must be an object")
+        if line.get("itemId") is not None and not isinstance(line["itemId"], str):
+            raise ValidationException(f"lines[{index}].itemId must be a string")
+
+
+def _wanted_item_ids(requested: Sequence[dict]) -> List[str]:
+    return sorted({line["itemId"] for line in requested if line.get("itemId")})
+
+
+def resolve_lines(requested: Sequence[dict], items: Dict[str, dict]) -> List[dict]:
+    """
+    Merge each requested line over its stored item.
+
+    A line carrying an itemId starts from the stored item and applies any
+    overridden fields; a line without one must carry its own weights and charges.
+    """
+    missing = [item_id for item_id in _wanted_item_ids(requested) if item_id not in items]
+    if missing:
+        raise NotFoundException(f"Items not found in store: {', '.join(missing)}")
+
+    resolved = []
+    for index, line in enumerate(requested):
+        base = dict(items[line["itemId"]]) if line.get("itemId") else {}
+        base.update({field: line[field] for field in OVERRIDABLE_QUOTE_FIELDS if field in line})
+        resolved.append(_coerce_line(base, index))
+    return resolved
+
+
+def build_quote_lines(cursor, store_id: str, item_ids: Sequence[str], lines: Sequence[dict]) -> List[dict]:
+    """Resolve `itemIds` and cart `lines` into fully specified lines."""
+    requested = [{"itemId": item_id} for item_id in item_ids] + list(lines)
+    _check_line_count(requested)
+    return resolve_lines(requested, load_items(cursor, store_id, _wanted_item_ids(requested)))
+
+
+def _sum_totals(priced: Sequence[dict]) -> Dict[str, float]:
+    totals = {"price": 0.0, "charge": 0.0, "tax": 0.0, "total": 0.0}
+    for amounts in priced:
+        for field in totals:
+            totals[field] += amounts[field]
+    return {field: round(value, 2) for field, value in totals.items()}
+
+
+def _rates_payload(rates: Dict[str, float], timestamp: Optional[str]) -> dict:
+    return {
+        "timestamp": timestamp,
+        "goldPerGram": round(rates["gold"], 4),
+        "silverPerGram": round(rates["silver"], 4),
+    }
+
+
+def quote(cursor, store_id: str, item_ids: Sequence[str], lines: Sequence[dict],
+          overrides: Optional[Dict[str, float]] = None) -> dict:
+    """Price a whole cart against one consistent rate snapshot."""
+    resolved = build_quote_lines(cursor, store_id, item_ids, lines)
+    rates, timestamp = quote_rates(overrides)
+    priced = price_lines(resolved, rates)
+    return {
+        "rates": _rates_payload(rates, timestamp),
+        "lines": [{**line, **amounts} for line, amounts in zip(resolved, priced)],
+        "totals": _sum_totals(priced),
+    }
+
+
+def _validate_exchange_items(exchange_items) -> List[dict]:
+    if not isinstance(exchange_items, list):
+        raise ValidationException("exchangeItems must be a list")
+    if len(exchange_items) > MAX_ORDER_LINES:
+        raise ValidationException(f"A request can contain at most {MAX_ORDER_LINES} exchange items")
+    for index, exchange in enumerate(exchange_items):
+        if not isinstance(exchange, dict) or not exchange.get("metalType"):
+            raise ValidationException(f"exchangeItems[{index}].metalType is required")
+        for field in EXCHANGE_NUMERIC_FIELDS:
+            parse_number(exchange, field, label=f"exchangeItems[{index}].{field}")
+    return exchange_items
+
+
+def _check_stock(resolved: Sequence[dict], items: Dict[str, dict]) -> Dict[str, List[float]]:
+    """Sum what each line takes from stock and reject overselling."""
+    sold: Dict[str, List[float]] = {}
+    for line in resolved:
+        taken = sold.setdefault(line["itemId"], [0] * len(STOCK_FIELDS))
+        for position, field in enumerate(STOCK_FIELDS):
+            taken[position] += line[field]
+    for item_id, taken in sold.items():
+        if taken[0] <= 0:
+            raise ValidationException(f"Quantity sold of item {item_id} must be positive")
+        if taken[0] > items[item_id]["quantity"]:
+            raise ConflictException(f"Item {item_id} has {items[item_id]['quantity']} in stock")
+    return sold
+
+
+def _take_stock(cursor, sold: Dict[str, List[float]]) -> None:
+    """Subtract sold quantity/weights with one UPDATE and drop items that sold out."""
+    sold_sql, sold_params = values_sql(
+        [(item_id, *taken) for item_id, taken in sold.items()],
+        [None, "INTEGER", "DOUBLE PRECISION", "DOUBLE PRECISION", "DOUBLE PRECISION"],
+    )
+    cursor.execute(
+        f"""
+        UPDATE item SET
+            quantity = item.quantity - sold.column2,
+            gsWt = item.gsWt - sold.column3,
+            ntWt = item.ntWt - sold.column4,
+            fnWt = item.fnWt - sold.column5,
+            modifiedDate = %s
+        FROM {sold_sql} AS sold
+        WHERE item.itemId = sold.column1
+        """,
+        [timezone.now(), *sold_params],
+    )
+    cursor.execute(
+        f"DELETE FROM item WHERE itemId IN ({', '.join(['%s'] * len(sold))}) AND quantity <= 0",
+        list(sold),
+    )
+
+
+def create_order(body: dict, overrides: Optional[Dict[str, float]] = None) -> dict:
+    """
+    Write a whole sale in one transaction with a fixed number of statements.
+
+    Body: storeId, userId, customer {mobileNo, name, address?, gstin_pan?}, lines
+    [{itemId, <overrides>}], optional exchangeItems, discount, note, orderDate,
+    orderId; `overrides` are per-gram rate overrides. Lines are priced like quotes;
+    sold quantity and weights come off the item, which is removed once its
+    quantity reaches zero. Independent of the line count the transaction runs one
+    locking SELECT, the customer upsert, one INSERT each into "order", order_item
+    and exchange_item, one UPDATE plus one DELETE on item, and the two daily
+    rollup upserts. The same checks run once beforehand without locks, so a
+    rejected order does not use up an invoice number.
+    """
+    store_id, user_id = body["storeId"], body["userId"]
+    customer = body.get("customer")
+    if not isinstance(customer, dict) or not customer.get("mobileNo") or not customer.get("name"):
+        raise ValidationException("customer.mobileNo and customer.name are required")
+    lines = body.get("lines")
+    if not isinstance(lines, list):
+        raise ValidationException("lines must be a list")
+    _check_line_count(lines)
+    if any(not line.get("itemId") for line in lines):
+        raise ValidationException("Every order line needs an itemId")
+    exchange_items = _validate_exchange_items(body.get("exchangeItems") or [])
+    discount = parse_number(body, "discount")
+    order_date = parse_datetime_param(body.get("orderDate"), "orderDate") or timezone.now()
+    order_id = body.get("orderId") or generate_unique_id()
+    customer_mobile = customer["mobileNo"]
+
+    rates, timestamp = quote_rates(overrides)
+    item_ids = _wanted_item_ids(lines)
+    # The invoice number is committed on its own connection before the transaction, and an
+    # order rejected after taking one leaves a gap: check with a plain, non-locking read first.
+    with connection.cursor() as cursor:
+        items = load_items(cursor, store_id, item_ids, ITEM_ORDER_COLUMNS)
+        _check_stock(resolve_lines(lines, items), items)
+        cursor.execute('SELECT 1 FROM "order" WHERE orderId = %s', [order_id])
+        if cursor.fetchone():
+            raise ConflictException(f"Order {order_id} already exists")
+    invoice_no = allocate_invoice_numbers(store_id)[0]
+
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            items = load_items(cursor, store_id, item_ids, ITEM_ORDER_COLUMNS, for_update=True)
+            resolved = resolve_lines(lines, items)
+            sold = _check_stock(resolved, items)
+            priced = price_lines(resolved, rates)
+            totals = _sum_totals(priced)
+            payable = round(totals["total"] - discount, 2)
+
+            apply_order_to_customer(cursor, customer, store_id, user_id, order_date,
+                                    int(sum(line["quantity"] for line in resolved)), payable)
+            insert_rows(cursor, '"order"', ORDER_COLUMNS, [[
+                order_id, customer_mobile, store_id, user_id, order_date, totals["price"], totals["tax"],
+                totals["charge"], discount, body.get("note"), invoice_no,
+            ]])
+            order_items = []
+            for line, amounts in zip(resolved, priced):
+                row = {
+                    **items[line["itemId"]], **line, **amounts,
+                    "orderItemId": generate_unique_id(), "orderId": order_id,
+                    "orderDate": order_date, "customerMobile": customer_mobile,
+                }
+                order_items.append([row[column] for column in ORDER_ITEM_COLUMNS])
+            insert_rows(cursor, "order_item", ORDER_ITEM_COLUMNS, order_items)
+            insert_rows(cursor, "exchange_item", EXCHANGE_ITEM_COLUMNS, [[
+                generate_unique_id(), order_id, order_date, customer_mobile, exchange["metalType"],
+                exchange.get("purity", ""), exchange.get("grossWeight", 0), exchange.get("fineWeight", 0),
+                exchange.get("price", 0), bool(exchange.get("isExchangedByMetal", False)),
+                exchange.get("exchangeValue", 0),
+            ] for exchange in exchange_items])
+            _take_stock(cursor, sold)
+            rollups.add_order(
+                cursor, store_id, order_date, resolved, priced, totals, discount,
+                sum(exchange.get("exchangeValue", 0) for exchange in exchange_items),
+            )
+    except IntegrityError as exc:
+        raise ConflictException(f"Order {order_id} could not be saved: {exc}")
+    mark_write()
+
+    return {
+        "orderId": order_id,
+        "invoiceNo": invoice_no,
+        "orderDate": order_date,
+        "rates": _rates_payload(rates, timestamp),
+        "totals": {**totals, "discount": discount, "payable": payable},
+        "lines": [
+            {"itemId": line["itemId"], "quantity": line["quantity"], **amounts}
+            for line, amounts in zip(resolved, priced)
+        ],
+        "exchangeItems": len(exchange_items),
+    }
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('billing/quote/', views.quote, name='billing-quote'),
+    path('billing/orders/', views.create_order, name='billing-create-order'),
+    path('billing/invoice/', views.invoice, name='billing-invoice'),
+]
@@ -0,0 +1,72 @@
+from django.http import StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from backend.api.v1.billing import invoices, services
+from backend.core.db_router import read_alias, read_connection, replica_reads
+from backend.shared.exceptions import ValidationException
+from backend.shared.pricing import parse_rate_overrides
+from backend.shared.utils import handle_exceptions, parse_json_body, success_response
+from backend.shared.validators import validate_required_fields
+
+
+@csrf_exempt
+@require_POST
+@handle_exceptions
+@replica_reads
+def quote(request):
+    """
+    Price many order lines in one call.
+
+    Body: {"storeId", "itemIds": [...], "lines": [{"itemId"?, <field overrides>}],
+    "goldRate"?, "silverRate"?}. Every line is priced against the same rate snapshot.
+    """
+    body = parse_json_body(request)
+    validate_required_fields(body, ["storeId"])
+    item_ids = body.get("itemIds") or []
+    lines = body.get("lines") or []
+    if not isinstance(item_ids, list) or not all(isinstance(item_id, str) for item_id in item_ids):
+        raise ValidationException("itemIds must be a list of strings")
+    if not isinstance(lines, list):
+        raise ValidationException("lines must be a list")
+
+    overrides = parse_rate_overrides(body)
+    with read_connection().cursor() as cursor:
+        data = services.quote(cursor, body["storeId"], item_ids, lines, overrides)
+    return success_response(data)
+
+
+@csrf_exempt
+@require_POST
+@handle_exceptions
+def create_order(request):
+    """
+    Submit a sale: order, order items, exchange items, customer totals and stock in one transaction.
+
+    Body: {"storeId", "userId", "customer": {"mobileNo", "name", ...}, "lines": [{"itemId", <overrides>}],
+    "exchangeItems"?, "discount"?, "note"?, "orderDate"?, "orderId"?, "goldRate"?, "silverRate"?}.
+    """
+    body = parse_json_body(request)
+    validate_required_fields(body, ["storeId", "userId", "customer", "lines"])
+    data = services.create_order(body, parse_rate_overrides(body))
+    return success_response(data, message="Order created", status_code=201)
+
+
+@require_GET
+@handle_exceptions
+@replica_reads
+def invoice(request):
+    """
+    Stream the printable HTML invoice of an order.
+
+    Query params: storeId, orderId; download=1 sends it as an attachment. The
+    store header (logo, GSTIN, UPI payment QR) comes from a per-store cache.
+    """
+    validate_required_fields(request.GET, ["storeId", "orderId"])
+    with read_connection().cursor() as cursor:
+        # Resolved now: the lines are read after the view (and its replica scope) returns.
+        chunks = invoices.invoice_chunks(cursor, request.GET["storeId"], request.GET["orderId"], using=read_alias())
+    response = StreamingHttpResponse(chunks, content_type="text/html; charset=utf-8")
+    disposition = "attachment" if request.GET.get("download", "").lower() in ("1", "true", "yes") else "inline"
+    response["Content-Disposition"] = f'{disposition}; filename="invoice-{request.GET["orderId"]}.html"'
+    return response
@@ -0,0 +1,277 @@
+"""
+Due and overdue khata installments, and the daily reminder fan-out.
+
+Installment k (1-based) of a plan falls due k - 1 months after its start date
+(clamped to the month's last day) in the store time zone, and is open while the
+signed payments booked against that monthNumber fall short of monthlyAmount.
+All open installments of all stores come from one query: the active plans are
+joined to a small VALUES list holding, per month offset, the latest start that
+puts that installment on or before the as-of day, and to the per-month payment
+sums. Rows are streamed in batches and folded into one summary per store.
+
+Reminders go to the store owner's device as one FCM message per device token;
+the messages of all stores are sent through FirebaseService.send_each in
+batches of at most FCM_BATCH_LIMIT, a bounded number in flight at once. A
+store is reminded once per day: khata_reminder records every send, and stores
+already in it for the day are skipped unless forced.
+"""
+
+import calendar
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from typing import Dict, Iterable, List, Optional
+
+from django.db import connection
+from django.utils import timezone
+
+from backend.api.v1.customers.services import khata_paid_sql
+from backend.api.v1.dashboard.rollups import as_datetime, store_time_zone
+from backend.shared.db import iter_row_batches, values_sql
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_KHATA_STATUS = "active"
+# FCM accepts at most 500 messages per send_each call.
+FCM_BATCH_LIMIT = 500
+DEFAULT_CONCURRENCY = 4
+
+DUE_COLUMNS = [
+    "storeId", "khataBookId", "customerMobile", "customerName", "planName", "startDate", "monthlyAmount",
+    "monthNumber", "paid",
+]
+
+
+def shift_months(day: date, months: int) -> date:
+    """`day` moved by whole months, clamped to the last day of the target month."""
+    index = day.year * 12 + day.month - 1 + months
+    year, month = index // 12, index % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def start_cutoff(as_of: date, offset: int) -> date:
+    """
+    First start day whose installment offset + 1 falls due after `as_of`.
+
+    Shifting `as_of + 1 day` back would clamp at a shorter month's end and drop
+    plans started after that day (a 02-28 start is due 03-28, but 03-29 shifted
+    back is 02-28): shift `as_of` itself, and at a month end take the whole of
+    the shifted month.
+    """
+    shifted = shift_months(as_of, -offset)
+    if as_of.day == calendar.monthrange(as_of.year, as_of.month)[1]:
+        return shift_months(shifted.replace(day=1), 1)
+    return shifted + timedelta(days=1)
+
+
+def _start_cutoffs(as_of: date, months: int, vendor: str):
+    """
+    (offset, cutoff) rows: installment offset + 1 of a plan is due on or before
+    `as_of` exactly when the plan started before that offset's cutoff.
+    """
+    zone = store_time_zone()
+    rows = [
+        [
+            offset,
+            # In UTC, like the stored timestamps: SQLite compares them as text.
+            datetime.combine(start_cutoff(as_of, offset), time.min, tzinfo=zone).astimezone(dt_timezone.utc),
+        ]
+        for offset in range(months)
+    ]
+    # SQLite would give an unknown type name numeric affinity and mangle the timestamp.
+    return values_sql(rows, ["INTEGER", "TIMESTAMPTZ" if vendor == "postgresql" else None])
+
+
+def due_installment_batches(as_of: date, store_id: Optional[str] = None) -> Iterable[List[dict]]:
+    """Stream every open installment due on or before `as_of`, ordered by store and plan."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT MAX(totalMonths) FROM customer_khata_book WHERE status = %s", [ACTIVE_KHATA_STATUS]
+        )
+        months = cursor.fetchone()[0] or 0
+    if months <= 0:
+        return
+    cutoffs, cutoff_params = _start_cutoffs(as_of, months, connection.vendor)
+    paid_sql, paid_params = khata_paid_sql()
+    store_params = [store_id] if store_id else []
+    payment_scope, khata_scope = ("AND storeId = %s", "AND kb.storeId = %s") if store_id else ("", "")
+    sql = f"""
+        SELECT kb.storeId, kb.khataBookId, kb.customerMobile, c.name, kb.planName, kb.startDate,
+               kb.monthlyAmount, cut.column1 + 1, COALESCE(p.paid, 0)
+        FROM customer_khata_book kb
+        JOIN {cutoffs} AS cut ON cut.column1 < kb.totalMonths AND kb.startDate < cut.column2
+        LEFT JOIN customer c ON c.mobileNo = kb.customerMobile
+        LEFT JOIN (
+            SELECT khataBookId, monthNumber, SUM({paid_sql}) AS paid
+            FROM customer_transaction
+            WHERE khataBookId IS NOT NULL AND monthNumber IS NOT NULL {payment_scope}
+            GROUP BY khataBookId, monthNumber
+        ) p ON p.khataBookId = kb.khataBookId AND p.monthNumber = cut.column1 + 1
+        WHERE kb.status = %s {khata_scope}
+          AND COALESCE(p.paid, 0) < kb.monthlyAmount - 0.005
+        ORDER BY kb.storeId, kb.khataBookId, cut.column1
+    """
+    params = [*cutoff_params, *paid_params, *store_params, ACTIVE_KHATA_STATUS, *store_params]
+    zone = store_time_zone()
+    for batch in iter_row_batches(sql, params):
+        rows = []
+        for row in batch:
+            entry = dict(zip(DUE_COLUMNS, row))
+            started = as_datetime(entry["startDate"])
+            if timezone.is_naive(started):
+                started = timezone.make_aware(started, dt_timezone.utc)
+            start = timezone.localtime(started, zone).date()
+            entry["startDate"] = start.isoformat()
+            entry["dueDate"] = shift_months(start, entry["monthNumber"] - 1).isoformat()
+            entry["amountDue"] = round(entry["monthlyAmount"] - entry["paid"], 2)
+            rows.append(entry)
+        yield rows
+
+
+def summarize_by_store(batches: Iterable[List[dict]], as_of: date) -> Dict[str, dict]:
+    """Fold due installments into per-store counts and amounts, split into due today and overdue."""
+    today = as_of.isoformat()
+    stores: Dict[str, dict] = {}
+    for batch in batches:
+        for row in batch:
+            summary = stores.setdefault(row["storeId"], {
+                "storeId": row["storeId"], "dueToday": 0, "dueTodayAmount": 0.0, "overdue": 0,
+                "overdueAmount": 0.0, "customers": set(),
+            })
+            kind = "dueToday" if row["dueDate"] == today else "overdue"
+            summary[kind] += 1
+            summary[f"{kind}Amount"] = round(summary[f"{kind}Amount"] + row["amountDue"], 2)
+            summary["customers"].add(row["customerMobile"])
+    for summary in stores.values():
+        summary["customers"] = len(summary["customers"])
+    return stores
+
+
+def reminder_text(summary: dict) -> Dict[str, str]:
+    parts = []
+    if summary["dueToday"]:
+        parts.append(f"{summary['dueToday']} due today (Rs. {summary['dueTodayAmount']:,.2f})")
+    if summary["overdue"]:
+        parts.append(f"{summary['overdue']} overdue (Rs. {summary['overdueAmount']:,.2f})")
+    return {
+        "title": "Khata installments pending",
+        "body": f"{' and '.join(parts)} across {summary['customers']} customer(s).",
+    }
+
+
+def _reminded_stores(cursor, as_of: date) -> set:
+    cursor.execute("SELECT storeId FROM khata_reminder WHERE reminderDate = %s", [as_of])
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _owner_tokens(cursor, store_ids: List[str]) -> Dict[str, List[str]]:
+    tokens: Dict[str, List[str]] = {}
+    for start in range(0, len(store_ids), FCM_BATCH_LIMIT):
+        chunk = store_ids[start:start + FCM_BATCH_LIMIT]
+        cursor.execute(
+            f"SELECT s.storeId, u.token FROM store s JOIN users u ON u.userId = s.userId "
+            f"WHERE s.storeId IN ({', '.join(['%s'] * len(chunk))}) AND u.token IS NOT NULL AND u.token <> ''",
+            chunk,
+        )
+        for store_id, token in cursor.fetchall():
+            tokens.setdefault(store_id, []).append(token)
+    return tokens
+
+
+def _send(firebase, batch: List[tuple]) -> List[tuple]:
+    """
+    One send_each call over (storeId, token, message) entries; returns
+    (storeId, token, delivered, unregistered) per entry.
+    """
+    from firebase_admin import messaging
+
+    try:
+        response = firebase.send_each([message for _, _, message in batch])
+    except Exception as exc:
+        logger.warning("Khata reminder batch of %d messages failed: %s", len(batch), exc)
+        return [(store_id, token, False, False) for store_id, token, _ in batch]
+    return [
+        (store_id, token, result.success, isinstance(result.exception, messaging.UnregisteredError))
+        for (store_id, token, _), result in zip(batch, response.responses)
+    ]
+
+
+def send_reminders(summaries: Dict[str, dict], as_of: date, concurrency: int = DEFAULT_CONCURRENCY,
+                   force: bool = False, dry_run: bool = False) -> List[dict]:
+    """
+    Send one reminder per store with open installments to its owner's devices.
+
+    Returns one result per store: skipped (already reminded today or no device
+    token), or the number of its messages delivered and failed.
+    """
+    from firebase_admin import messaging
+
+    with connection.cursor() as cursor:
+        reminded = set() if force else _reminded_stores(cursor, as_of)
+        pending = [store_id for store_id in sorted(summaries) if store_id not in reminded]
+        tokens = _owner_tokens(cursor, pending)
+
+    results = {store_id: {"storeId": store_id, "skipped": "already reminded"} for store_id in summaries
+               if store_id in reminded}
+    messages = []
+    for store_id in pending:
+        store_tokens = tokens.get(store_id, [])
+        if not store_tokens:
+            results[store_id] = {"storeId": store_id, "skipped": "no device token"}
+            continue
+        summary = summaries[store_id]
+        data = {
+            "type": "khata_due", "storeId": store_id, "date": as_of.isoformat(),
+            "dueToday": str(summary["dueToday"]), "overdue": str(summary["overdue"]),
+        }
+        results[store_id] = {"storeId": store_id, "tokens": len(store_tokens), "success": 0, "failure": 0}
+        notification = messaging.Notification(**reminder_text(summary))
+        messages.extend(
+            (store_id, token, messaging.Message(notification=notification, data=data, token=token))
+            for token in store_tokens
+        )
+
+    if dry_run or not messages:
+        return [results[store_id] for store_id in sorted(results)]
+
+    from backend.integrations.firebase.firebase_service import firebase_service
+
+    batches = [messages[start:start + FCM_BATCH_LIMIT] for start in range(0, len(messages), FCM_BATCH_LIMIT)]
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+        outcomes = [entry for batch in pool.map(lambda batch: _send(firebase_service, batch), batches)
+                    for entry in batch]
+
+    unregistered = []
+    for store_id, token, delivered, gone in outcomes:
+        results[store_id]["success" if delivered else "failure"] += 1
+        if gone:
+            unregistered.append(token)
+    _record(results, summaries, as_of, unregistered)
+    return [results[store_id] for store_id in sorted(results)]
+
+
+def _record(results: Dict[str, dict], summaries: Dict[str, dict], as_of: date, unregistered: List[str]) -> None:
+    sent_at = timezone.now()
+    rows = [
+        [store_id, as_of, summaries[store_id]["dueToday"] + summaries[store_id]["overdue"],
+         round(summaries[store_id]["dueTodayAmount"] + summaries[store_id]["overdueAmount"], 2),
+         result["success"], result["failure"], sent_at]
+        for store_id, result in results.items() if result.get("success")
+    ]
+    with connection.cursor() as cursor:
+        if rows:
+            placeholders = f"({', '.join(['%s'] * 7)})"
+            cursor.execute(
+                "INSERT INTO khata_reminder (storeId, reminderDate, installments, amount, successCount, "
+                f"failureCount, sentAt) VALUES {', '.join([placeholders] * len(rows))} "
+                "ON CONFLICT (storeId, reminderDate) DO UPDATE SET installments = excluded.installments, "
+                "amount = excluded.amount, successCount = excluded.successCount, "
+                "failureCount = excluded.failureCount, sentAt = excluded.sentAt",
+                [value for row in rows for value in row],
+            )
+        for start in range(0, len(unregistered), FCM_BATCH_LIMIT):
+            chunk = unregistered[start:start + FCM_BATCH_LIMIT]
+            cursor.execute(
+                f"UPDATE users SET token = NULL WHERE token IN ({', '.join(['%s'] * len(chunk))})", chunk
+            )
@@ -0,0 +1,199 @@
+"""
+Customer and khata aggregates kept in step with every order and transaction write.
+
+`customer.totalItemBought` / `customer.totalAmount` move with each order, and
+`customer_khata_book.paidAmount` / `outstandingAmount` with each transaction
+booked against the khata, in the same database transaction as the write. The
+verify_customer_aggregates command recomputes them from history and repairs drift.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from backend.api.v1.dashboard import rollups
+from backend.core.db_router import mark_write
+from backend.shared.constants import MAX_ORDER_LINES
+from backend.shared.db import fetch_dicts, insert_rows, values_sql
+from backend.shared.exceptions import ConflictException, NotFoundException, ValidationException
+from backend.shared.utils import generate_unique_id
+from backend.shared.validators import parse_datetime_param, parse_number
+
+# Transactions of these types reverse a khata payment; every other type pays into it.
+DEBIT_TRANSACTION_TYPES = ("debit", "refund", "reversal")
+
+TRANSACTION_COLUMNS = [
+    "transactionId", "customerMobile", "transactionDate", "amount", "transactionType", "category",
+    "description", "referenceNumber", "paymentMethod", "khataBookId", "monthNumber", "notes",
+    "userId", "storeId",
+]
+KHATA_BALANCE_COLUMNS = [
+    "khataBookId", "customerMobile", "planName", "status", "totalAmount", "paidAmount", "outstandingAmount",
+]
+KHATA_BOOK_COLUMNS = [
+    "khataBookId", "customerMobile", "planName", "startDate", "endDate", "monthlyAmount", "totalMonths",
+    "totalAmount", "paidAmount", "outstandingAmount", "status", "notes", "userId", "storeId",
+]
+
+
+def signed_khata_amount(transaction_type: Optional[str], amount: float) -> float:
+    """How much a transaction adds to the paid amount of its khata book."""
+    return -amount if (transaction_type or "").lower() in DEBIT_TRANSACTION_TYPES else amount
+
+
+def khata_paid_sql() -> Tuple[str, List]:
+    """SQL expression (and params) for signed_khata_amount over a customer_transaction row."""
+    placeholders = ", ".join(["%s"] * len(DEBIT_TRANSACTION_TYPES))
+    return (
+        f"CASE WHEN LOWER(transactionType) IN ({placeholders}) THEN -amount ELSE amount END",
+        list(DEBIT_TRANSACTION_TYPES),
+    )
+
+
+def apply_order_to_customer(cursor, customer: dict, store_id: str, user_id: str, order_date, items_bought: int,
+                            amount: float) -> None:
+    """Create the customer if needed and add one order to its running totals."""
+    cursor.execute(
+        """
+        INSERT INTO customer (mobileNo, name, address, gstin_pan, addDate, lastModifiedDate,
+                              totalItemBought, totalAmount, userId, storeId)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (mobileNo) DO UPDATE SET
+            name = excluded.name,
+            address = COALESCE(excluded.address, customer.address),
+            gstin_pan = COALESCE(excluded.gstin_pan, customer.gstin_pan),
+            lastModifiedDate = excluded.lastModifiedDate,
+            totalItemBought = customer.totalItemBought + excluded.totalItemBought,
+            totalAmount = customer.totalAmount + excluded.totalAmount
+        """,
+        [customer["mobileNo"], customer["name"], customer.get("address"), customer.get("gstin_pan"),
+         order_date, order_date, items_bought, amount, user_id, store_id],
+    )
+
+
+def apply_khata_payments(cursor, deltas: Dict[str, float], include_zero: bool = False) -> None:
+    """
+    Add signed payment deltas (khataBookId -> amount) to paid/outstanding in one UPDATE.
+
+    `include_zero` also rewrites outstandingAmount for books whose delta is zero.
+    """
+    deltas = {khata_id: delta for khata_id, delta in deltas.items() if delta or include_zero}
+    if not deltas:
+        return
+    delta_sql, delta_params = values_sql(list(deltas.items()), [None, "DOUBLE PRECISION"])
+    cursor.execute(
+        f"""
+        UPDATE customer_khata_book SET
+            paidAmount = customer_khata_book.paidAmount + delta.column2,
+            outstandingAmount = customer_khata_book.totalAmount - (customer_khata_book.paidAmount + delta.column2)
+        FROM {delta_sql} AS delta
+        WHERE customer_khata_book.khataBookId = delta.column1
+        """,
+        delta_params,
+    )
+
+
+def khata_deltas(rows: Iterable[Tuple[Optional[str], str, float]], sign: int = 1) -> Dict[str, float]:
+    """Sum (khataBookId, transactionType, amount) rows into per-khata paid deltas."""
+    deltas: Dict[str, float] = defaultdict(float)
+    for khata_id, transaction_type, amount in rows:
+        if khata_id:
+            deltas[khata_id] += sign * signed_khata_amount(transaction_type, amount)
+    return dict(deltas)
+
+
+def khata_balances(cursor, khata_ids: Sequence[str]) -> List[dict]:
+    if not khata_ids:
+        return []
+    return fetch_dicts(
+        cursor,
+        KHATA_BALANCE_COLUMNS,
+        f"SELECT {', '.join(KHATA_BALANCE_COLUMNS)} FROM customer_khata_book "
+        f"WHERE khataBookId IN ({', '.join(['%s'] * len(khata_ids))}) ORDER BY khataBookId",
+        list(khata_ids),
+    )
+
+
+def _transaction_row(entry: dict, index: int, store_id: str, user_id: str) -> list:
+    if not isinstance(entry, dict):
+        raise ValidationException(f"transactions[{index}] must be an object")
+    for field in ("customerMobile", "transactionType", "category"):
+        if not entry.get(field):
+            raise ValidationException(f"transactions[{index}].{field} is required")
+    values = {
+        **entry,
+        "transactionId": entry.get("transactionId") or generate_unique_id(),
+        "transactionDate": parse_datetime_param(entry.get("transactionDate"), f"transactions[{index}].transactionDate")
+        or timezone.now(),
+        "amount": parse_number(entry, "amount", default=None, label=f"transactions[{index}].amount"),
+        "userId": user_id,
+        "storeId": store_id,
+    }
+    return [values.get(column) for column in TRANSACTION_COLUMNS]
+
+
+def record_transactions(store_id: str, user_id: str, entries: Sequence[dict]) -> dict:
+    """
+    Insert customer transactions and move the balances of the khata books they pay into.
+
+    One multi-row INSERT, one UPDATE of customer_khata_book and one daily_payments
+    upsert, whatever the batch size.
+    """
+    if not isinstance(entries, list) or not entries:
+        raise ValidationException("transactions must be a non-empty list")
+    if len(entries) > MAX_ORDER_LINES:
+        raise ValidationException(f"A request can contain at most {MAX_ORDER_LINES} transactions")
+    rows = [_transaction_row(entry, index, store_id, user_id) for index, entry in enumerate(entries)]
+    khata_index, type_index, amount_index = (
+        TRANSACTION_COLUMNS.index("khataBookId"),
+        TRANSACTION_COLUMNS.index("transactionType"),
+        TRANSACTION_COLUMNS.index("amount"),
+    )
+    deltas = khata_deltas((row[khata_index], row[type_index], row[amount_index]) for row in rows)
+
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            if deltas:
+                cursor.execute(
+                    f"SELECT khataBookId FROM customer_khata_book "
+                    f"WHERE storeId = %s AND khataBookId IN ({', '.join(['%s'] * len(deltas))})",
+                    [store_id, *deltas],
+                )
+                missing = sorted(set(deltas) - {row[0] for row in cursor.fetchall()})
+                if missing:
+                    raise NotFoundException(f"Khata books not found in store: {', '.join(missing)}")
+            insert_rows(cursor, "customer_transaction", TRANSACTION_COLUMNS, rows)
+            apply_khata_payments(cursor, deltas)
+            rollups.add_transactions(cursor, (
+                [row[TRANSACTION_COLUMNS.index(column)] for column in rollups.PAYMENT_ROW_COLUMNS] for row in rows
+            ))
+            balances = khata_balances(cursor, sorted(deltas))
+    except IntegrityError as exc:
+        raise ConflictException(f"Transactions could not be saved: {exc}")
+    mark_write()
+    return {"transactionIds": [row[0] for row in rows], "khataBooks": balances}
+
+
+def delete_transactions(store_id: str, transaction_ids: Sequence[str]) -> dict:
+    """Delete customer transactions and take them back out of their khata balances."""
+    if not isinstance(transaction_ids, list) or not transaction_ids:
+        raise ValidationException("transactionIds must be a non-empty list")
+    if len(transaction_ids) > MAX_ORDER_LINES:
+        raise ValidationException(f"A request can delete at most {MAX_ORDER_LINES} transactions")
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM customer_transaction "
+            f"WHERE storeId = %s AND transactionId IN ({', '.join(['%s'] * len(transaction_ids))}) "
+            f"RETURNING khataBookId, {', '.join(rollups.PAYMENT_ROW_COLUMNS)}",
+            [store_id, *transaction_ids],
+        )
+        deleted = cursor.fetchall()
+        deltas = khata_deltas(((row[0], row[4], row[5]) for row in deleted), sign=-1)
+        apply_khata_payments(cursor, deltas)
+        rollups.add_transactions(cursor, (row[1:] for row in deleted), sign=-1)
+        balances = khata_balances(cursor, sorted(deltas))
+    mark_write()
+    return {"deleted": len(deleted), "khataBooks": balances}
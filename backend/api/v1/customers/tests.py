@@ -0,0 +1,36 @@
+from datetime import date, timedelta
+
+from django.test import SimpleTestCase
+
+from backend.api.v1.customers.installments import shift_months, start_cutoff
+
+
+class StartCutoffTests(SimpleTestCase):
+    """start_cutoff must agree with the due dates shift_months gives each start day."""
+
+    def assert_matches_due_dates(self, starts, as_of_days, offsets):
+        for as_of in as_of_days:
+            for offset in offsets:
+                cutoff = start_cutoff(as_of, offset)
+                for start in starts:
+                    due = shift_months(start, offset) <= as_of
+                    self.assertEqual(
+                        start < cutoff, due, f"start {start}, installment {offset + 1}, as of {as_of}"
+                    )
+
+    def test_month_end_starts(self):
+        starts = [date(2026, 1, 28) + timedelta(days=day) for day in range(400)]
+        starts = [start for start in starts if start.day >= 28]
+        as_of_days = [date(2026, 2, 1) + timedelta(days=day) for day in range(450)]
+        self.assert_matches_due_dates(starts, as_of_days, range(14))
+
+    def test_second_installment_of_february_28_start(self):
+        # Due 03-28: counted from that day on, not from 03-31.
+        for as_of in (date(2026, 3, 28), date(2026, 3, 29), date(2026, 3, 30)):
+            self.assertLess(date(2026, 2, 28), start_cutoff(as_of, 1))
+        self.assertFalse(date(2026, 2, 28) < start_cutoff(date(2026, 3, 27), 1))
+
+    def test_every_start_day(self):
+        starts = [date(2025, 1, 1) + timedelta(days=day) for day in range(800)]
+        as_of_days = [date(2026, 1, 25) + timedelta(days=day) for day in range(0, 400, 3)]
+        self.assert_matches_due_dates(starts, as_of_days, range(14))
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('customers/transactions/', views.record_transactions, name='customers-record-transactions'),
+    path('customers/transactions/delete/', views.delete_transactions, name='customers-delete-transactions'),
+    path('customers/khata/', views.khata_books, name='customers-khata-books'),
+]
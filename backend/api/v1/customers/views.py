@@ -0,0 +1,69 @@
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from backend.api.v1.customers import services
+from backend.core.db_router import read_connection, replica_reads
+from backend.shared.db import fetch_dicts
+from backend.shared.exceptions import ValidationException
+from backend.shared.utils import handle_exceptions, parse_json_body, success_response
+from backend.shared.validators import validate_required_fields
+
+
+@csrf_exempt
+@require_POST
+@handle_exceptions
+def record_transactions(request):
+    """
+    Book customer transactions; khata payments update the stored khata balances.
+
+    Body: {"storeId", "userId", "transactions": [{"customerMobile", "amount", "transactionType",
+    "category", "khataBookId"?, "monthNumber"?, "transactionDate"?, ...}]}.
+    """
+    body = parse_json_body(request)
+    validate_required_fields(body, ["storeId", "userId", "transactions"])
+    data = services.record_transactions(body["storeId"], body["userId"], body["transactions"])
+    return success_response(data, message="Transactions recorded", status_code=201)
+
+
+@csrf_exempt
+@require_POST
+@handle_exceptions
+def delete_transactions(request):
+    """Body: {"storeId", "transactionIds": [...]}."""
+    body = parse_json_body(request)
+    validate_required_fields(body, ["storeId", "transactionIds"])
+    data = services.delete_transactions(body["storeId"], body["transactionIds"])
+    return success_response(data, message="Transactions deleted")
+
+
+@require_GET
+@handle_exceptions
+@replica_reads
+def khata_books(request):
+    """
+    List a store's khata books with their stored paid and outstanding amounts.
+
+    Query params: storeId (required), optional customerMobile and status.
+    """
+    store_id = request.GET.get("storeId")
+    if not store_id:
+        raise ValidationException("storeId is required")
+
+    filters, params = ["storeId = %s"], [store_id]
+    for field in ("customerMobile", "status"):
+        if request.GET.get(field):
+            filters.append(f"{field} = %s")
+            params.append(request.GET[field])
+
+    with read_connection().cursor() as cursor:
+        books = fetch_dicts(
+            cursor,
+            services.KHATA_BOOK_COLUMNS,
+            f"SELECT {', '.join(services.KHATA_BOOK_COLUMNS)} FROM customer_khata_book "
+            f"WHERE {' AND '.join(filters)} ORDER BY startDate DESC",
+            params,
+        )
+    return success_response({
+        "khataBooks": books,
+        "outstandingAmount": round(sum(book["outstandingAmount"] for book in books), 2),
+    })
@@ -0,0 +1,234 @@
+"""
+Daily sales rollups behind the store dashboards.
+
+daily_sales (per store, day and category), daily_order_totals (per store and
+day) and daily_payments (per store, day, payment method and transaction type)
+are upserted with deltas inside the same transaction as each order or customer
+transaction, so dashboards read a handful of rows per day instead of scanning
+order_item / customer_transaction. Days are calendar days in STORE_TIME_ZONE.
+`manage.py backfill_sales_rollups` rebuilds a date range from the raw tables.
+"""
+
+from datetime import date, datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from backend.master_db_opration.cold_archive import table_sources
+from backend.shared.constants import DB_BATCH_SIZE
+from backend.shared.db import iter_row_batches
+from backend.shared.pricing import metal_for_category
+
+SALES_FIELDS = [
+    "lines", "quantity", "gsWt", "ntWt", "fnWt", "price", "charge", "cgstAmount", "sgstAmount", "igstAmount",
+]
+ORDER_TOTAL_FIELDS = ["orders", "totalAmount", "totalCharge", "totalTax", "discount", "exchangeValue"]
+PAYMENT_FIELDS = ["transactions", "amount"]
+# customer_transaction columns, in order, that payment_deltas() reads.
+PAYMENT_ROW_COLUMNS = ["storeId", "transactionDate", "paymentMethod", "transactionType", "amount"]
+
+# (table, key columns = conflict target, additive fields)
+ROLLUP_TABLES = {
+    "daily_sales": (["storeId", "saleDate", "catId"], SALES_FIELDS),
+    "daily_order_totals": (["storeId", "saleDate"], ORDER_TOTAL_FIELDS),
+    "daily_payments": (["storeId", "saleDate", "paymentMethod", "transactionType"], PAYMENT_FIELDS),
+}
+# Descriptive columns carried with a key: the latest write wins, so a renamed category shows its new name.
+ROLLUP_LABELS = {"daily_sales": ["catName", "metal"]}
+
+
+@lru_cache(maxsize=1)
+def store_time_zone() -> ZoneInfo:
+    return ZoneInfo(settings.STORE_TIME_ZONE)
+
+
+def as_datetime(value) -> datetime:
+    """Raw SQLite cursors return timestamps as text; PostgreSQL returns datetimes."""
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def sale_date(moment) -> date:
+    """The store-local calendar day an order or transaction belongs to."""
+    return timezone.localtime(as_datetime(moment), store_time_zone()).date()
+
+
+def day_bounds(start: date, end: date) -> Tuple[datetime, datetime]:
+    """
+    Half-open [start 00:00, end + 1 day 00:00) range of store-local days, as UTC
+    datetimes: SQLite compares the stored UTC timestamps as text.
+    """
+    zone = store_time_zone()
+    return (
+        datetime.combine(start, time.min, tzinfo=zone).astimezone(dt_timezone.utc),
+        datetime.combine(end + timedelta(days=1), time.min, tzinfo=zone).astimezone(dt_timezone.utc),
+    )
+
+
+def line_sales(line: dict, amounts: dict) -> List[float]:
+    """SALES_FIELDS values contributed by one priced order line."""
+    base = amounts["price"] + amounts["charge"]
+    return [
+        1, line["quantity"], line.get("gsWt", 0), line.get("ntWt", 0), line.get("fnWt", 0),
+        amounts["price"], amounts["charge"],
+        round(base * line["cgst"] / 100, 2), round(base * line["sgst"] / 100, 2), round(base * line["igst"] / 100, 2),
+    ]
+
+
+def _accumulate(target: Dict[tuple, List[float]], key: tuple, values: Sequence[float], sign: int = 1) -> None:
+    totals = target.get(key)
+    if totals is None:
+        target[key] = [sign * value for value in values]
+        return
+    for position, value in enumerate(values):
+        totals[position] += sign * value
+
+
+def upsert_rollup(cursor, table: str, rows: Dict[tuple, List[float]],
+                  labels: Optional[Dict[tuple, tuple]] = None) -> None:
+    """
+    Add per-key deltas to a rollup table with one multi-row upsert per batch.
+    `labels` maps each key to its ROLLUP_LABELS values, for the tables that have them.
+    """
+    if not rows:
+        return
+    keys, fields = ROLLUP_TABLES[table]
+    label_columns = ROLLUP_LABELS.get(table, [])
+    columns = keys + label_columns + fields
+    assignments = ", ".join(
+        [f"{column} = excluded.{column}" for column in label_columns]
+        + [f"{field} = {table}.{field} + excluded.{field}" for field in fields]
+    )
+    placeholders = f"({', '.join(['%s'] * len(columns))})"
+    items = list(rows.items())
+    for start in range(0, len(items), DB_BATCH_SIZE):
+        batch = items[start:start + DB_BATCH_SIZE]
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([placeholders] * len(batch))} "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {assignments}",
+            [
+                value for key, values in batch
+                for value in (*key, *(labels[key] if label_columns else ()), *values)
+            ],
+        )
+
+
+def add_order(cursor, store_id: str, order_date, lines: Sequence[dict], priced: Sequence[dict],
+              totals: Dict[str, float], discount: float, exchange_value: float) -> None:
+    """Fold one new order into daily_sales and daily_order_totals (two statements)."""
+    day = sale_date(order_date)
+    sales: Dict[tuple, List[float]] = {}
+    labels: Dict[tuple, tuple] = {}
+    for line, amounts in zip(lines, priced):
+        key = (store_id, day, line["catId"])
+        labels[key] = (line["catName"], metal_for_category(line["catName"]))
+        _accumulate(sales, key, line_sales(line, amounts))
+    upsert_rollup(cursor, "daily_sales", sales, labels)
+    upsert_rollup(cursor, "daily_order_totals", {
+        (store_id, day): [1, totals["price"], totals["charge"], totals["tax"], discount, exchange_value],
+    })
+
+
+def payment_deltas(rows: Iterable[Tuple[str, object, Optional[str], str, float]], sign: int = 1) -> Dict[tuple, List[float]]:
+    """Group (storeId, transactionDate, paymentMethod, transactionType, amount) rows by rollup key."""
+    deltas: Dict[tuple, List[float]] = {}
+    for store_id, moment, method, transaction_type, amount in rows:
+        key = (store_id, sale_date(moment), method or "", transaction_type or "")
+        _accumulate(deltas, key, [1, amount], sign)
+    return deltas
+
+
+def add_transactions(cursor, rows: Iterable[Tuple[str, object, Optional[str], str, float]], sign: int = 1) -> None:
+    """Fold customer transactions into daily_payments; `sign=-1` takes deleted ones back out."""
+    upsert_rollup(cursor, "daily_payments", payment_deltas(rows, sign))
+
+
+def backfill(start: date, end: date, store_id: Optional[str] = None) -> Dict[str, int]:
+    """
+    Rebuild every rollup row for the days [start, end] from the raw tables,
+    archived rows included when the range reaches them.
+
+    The raw rows are streamed in batches and aggregated in Python so the day
+    boundaries follow STORE_TIME_ZONE identically on SQLite and PostgreSQL.
+    Returns the number of rollup rows written per table.
+
+    Reading and rewriting happen in one transaction that keeps writers out:
+    SQLite's BEGIN IMMEDIATE takes the write lock up front, and on PostgreSQL
+    the rollup tables are locked against the upserts every order and customer
+    transaction makes. An order committed mid-rebuild would otherwise be read
+    by neither the scan nor the rewrite; one still in flight now waits and adds
+    its delta on top of the rebuilt rows.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(f"LOCK TABLE {', '.join(ROLLUP_TABLES)} IN SHARE ROW EXCLUSIVE MODE")
+            sources = table_sources(
+                cursor, ["order", "order_item", "exchange_item", "customer_transaction"], store_id,
+                day_bounds(start, end)[0],
+            )
+        return _rebuild(start, end, store_id, sources)
+
+
+def _rebuild(start: date, end: date, store_id: Optional[str], sources: Dict[str, str]) -> Dict[str, int]:
+    """Aggregate the raw rows of the days [start, end] and replace their rollup rows; see backfill."""
+    start_at, end_at = day_bounds(start, end)
+    store_filter = " AND o.storeId = %s" if store_id else ""
+    store_params = [store_id] if store_id else []
+    sales: Dict[tuple, List[float]] = {}
+    labels: Dict[tuple, tuple] = {}
+    for batch in iter_row_batches(
+        "SELECT o.storeId, oi.orderDate, oi.catId, oi.catName, oi.quantity, oi.gsWt, oi.ntWt, oi.fnWt, "
+        "oi.price, oi.charge, oi.cgst, oi.sgst, oi.igst "
+        f"FROM {sources['order_item']} oi JOIN {sources['order']} o "
+        "ON o.orderId = oi.orderId AND o.orderDate = oi.orderDate "
+        f"WHERE oi.orderDate >= %s AND oi.orderDate < %s{store_filter}",
+        [start_at, end_at, *store_params],
+    ):
+        for row_store, moment, cat_id, cat_name, quantity, gs_wt, nt_wt, fn_wt, price, charge, cgst, sgst, igst in batch:
+            line = {"quantity": quantity, "gsWt": gs_wt, "ntWt": nt_wt, "fnWt": fn_wt,
+                    "cgst": cgst, "sgst": sgst, "igst": igst}
+            key = (row_store, sale_date(moment), cat_id)
+            labels[key] = (cat_name, metal_for_category(cat_name))
+            _accumulate(sales, key, line_sales(line, {"price": price, "charge": charge}))
+
+    order_totals: Dict[tuple, List[float]] = {}
+    for batch in iter_row_batches(
+        "SELECT o.storeId, o.orderDate, o.totalAmount, o.totalCharge, o.totalTax, o.discount, "
+        f"COALESCE((SELECT SUM(e.exchangeValue) FROM {sources['exchange_item']} e WHERE e.orderId = o.orderId), 0) "
+        f"FROM {sources['order']} o WHERE o.orderDate >= %s AND o.orderDate < %s{store_filter}",
+        [start_at, end_at, *store_params],
+    ):
+        for row_store, moment, amount, charge, tax, discount, exchange_value in batch:
+            _accumulate(order_totals, (row_store, sale_date(moment)), [1, amount, charge, tax, discount, exchange_value])
+
+    payments: Dict[tuple, List[float]] = {}
+    for batch in iter_row_batches(
+        f"SELECT {', '.join('o.' + column for column in PAYMENT_ROW_COLUMNS)} "
+        f"FROM {sources['customer_transaction']} o "
+        f"WHERE o.transactionDate >= %s AND o.transactionDate < %s{store_filter}",
+        [start_at, end_at, *store_params],
+    ):
+        for key, values in payment_deltas(batch).items():
+            _accumulate(payments, key, values)
+
+    # Only the days being rebuilt are deleted below; a row dated outside them must not be added on top.
+    sales, order_totals, payments = (
+        {key: values for key, values in rows.items() if start <= key[1] <= end}
+        for rows in (sales, order_totals, payments)
+    )
+    with connection.cursor() as cursor:
+        for table in ROLLUP_TABLES:
+            cursor.execute(
+                f"DELETE FROM {table} WHERE saleDate >= %s AND saleDate <= %s"
+                + (" AND storeId = %s" if store_id else ""),
+                [start, end, *store_params],
+            )
+        upsert_rollup(cursor, "daily_sales", sales, labels)
+        upsert_rollup(cursor, "daily_order_totals", order_totals)
+        upsert_rollup(cursor, "daily_payments", payments)
+    return {"daily_sales": len(sales), "daily_order_totals": len(order_totals), "daily_payments": len(payments)}
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('dashboard/sales/', views.sales_summary, name='dashboard-sales-summary'),
+]
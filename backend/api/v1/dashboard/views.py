@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from backend.api.v1.dashboard import rollups
+from backend.core.db_router import read_connection, replica_reads
+from backend.shared.exceptions import ValidationException
+from backend.shared.utils import handle_exceptions, success_response
+from backend.shared.validators import parse_date_param, validate_required_fields
+
+DEFAULT_RANGE_DAYS = 30
+MAX_RANGE_DAYS = 366
+
+DAY_COLUMNS = ["saleDate"] + rollups.ORDER_TOTAL_FIELDS
+
+
+def _sales_range(params):
+    today = timezone.localtime(timezone.now(), rollups.store_time_zone()).date()
+    end = parse_date_param(params.get("to"), "to") or today
+    start = parse_date_param(params.get("from"), "from") or end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if start > end:
+        raise ValidationException("from must not be after to")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise ValidationException(f"The range can span at most {MAX_RANGE_DAYS} days")
+    return start, end
+
+
+def _rounded(values):
+    return [round(value, 3) if isinstance(value, float) else value for value in values]
+
+
+@require_GET
+@handle_exceptions
+@replica_reads
+def sales_summary(request):
+    """
+    Sales dashboard for one store, read only from the daily rollup tables.
+
+    Query params: storeId (required), optional from/to (YYYY-MM-DD, store-local
+    days, default the last 30 days, at most 366). Returns overall totals, one row
+    per day, and sales by category, by metal, the GST split and payments for the range.
+    """
+    validate_required_fields(request.GET, ["storeId"])
+    store_id = request.GET["storeId"]
+    start, end = _sales_range(request.GET)
+    scope = [store_id, start, end]
+
+    with read_connection().cursor() as cursor:
+        cursor.execute(
+            f"SELECT {', '.join(DAY_COLUMNS)} FROM daily_order_totals "
+            "WHERE storeId = %s AND saleDate >= %s AND saleDate <= %s ORDER BY saleDate",
+            scope,
+        )
+        by_day = [dict(zip(DAY_COLUMNS, _rounded(row))) for row in cursor.fetchall()]
+
+        sums = ", ".join(f"SUM({field})" for field in rollups.SALES_FIELDS)
+        cursor.execute(
+            f"SELECT catId, catName, metal, {sums} FROM daily_sales "
+            "WHERE storeId = %s AND saleDate >= %s AND saleDate <= %s "
+            "GROUP BY catId, catName, metal ORDER BY catName",
+            scope,
+        )
+        by_category = [
+            dict(zip(["catId", "catName", "metal"] + rollups.SALES_FIELDS, _rounded(row)))
+            for row in cursor.fetchall()
+        ]
+
+        cursor.execute(
+            "SELECT paymentMethod, transactionType, SUM(transactions), SUM(amount) FROM daily_payments "
+            "WHERE storeId = %s AND saleDate >= %s AND saleDate <= %s "
+            "GROUP BY paymentMethod, transactionType ORDER BY paymentMethod, transactionType",
+            scope,
+        )
+        payments = [
+            dict(zip(["paymentMethod", "transactionType"] + rollups.PAYMENT_FIELDS, _rounded(row)))
+            for row in cursor.fetchall()
+        ]
+
+    totals = {field: round(sum(day[field] for day in by_day), 2) for field in rollups.ORDER_TOTAL_FIELDS}
+    by_metal = {}
+    for category in by_category:
+        metal = by_metal.setdefault(category["metal"], {field: 0 for field in rollups.SALES_FIELDS})
+        for field in rollups.SALES_FIELDS:
+            metal[field] += category[field]
+    gst = {
+        field: round(sum(category[f"{field}Amount"] for category in by_category), 2)
+        for field in ("cgst", "sgst", "igst")
+    }
+
+    return success_response({
+        "storeId": store_id,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "totals": totals,
+        "byDay": by_day,
+        "byCategory": by_category,
+        "byMetal": {name: dict(zip(values, _rounded(values.values()))) for name, values in by_metal.items()},
+        "gst": gst,
+        "payments": payments,
+    })
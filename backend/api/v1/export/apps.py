@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class ExportConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'backend.api.v1.export'
+    verbose_name = 'Export API'
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('export/items/', views.export_items, name='export-items'),
+    path('export/order-items/', views.export_order_items, name='export-order-items'),
+]
@@ -0,0 +1,153 @@
+"""
+Streaming exports of large master tables.
+
+Rows are read in fixed-size batches from a server-side cursor and written straight
+into a StreamingHttpResponse as NDJSON or CSV (optionally gzip-compressed), so memory
+use does not depend on how many rows a store has.
+"""
+
+import csv
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from backend.core.db_router import read_alias, read_connection, replica_reads
+from backend.master_db_opration.cold_archive import table_sources
+from backend.shared.db import iter_row_batches
+from backend.shared.exceptions import ValidationException
+from backend.shared.utils import handle_exceptions
+from backend.shared.validators import parse_date_range, validate_required_fields
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+ITEM_COLUMNS = [
+    "itemId", "itemAddName", "catId", "userId", "storeId", "catName", "subCatId", "subCatName",
+    "entryType", "quantity", "gsWt", "ntWt", "fnWt", "purity", "crgType", "crg", "othCrgDes",
+    "othCrg", "cgst", "sgst", "igst", "huid", "unit", "addDesKey", "addDesValue", "addDate",
+    "modifiedDate", "sellerFirmId", "purchaseOrderId", "purchaseItemId",
+]
+
+ORDER_ITEM_COLUMNS = [
+    "orderItemId", "orderId", "orderDate", "itemId", "customerMobile", "catId", "catName",
+    "itemAddName", "subCatId", "subCatName", "entryType", "quantity", "gsWt", "ntWt", "fnWt",
+    "fnMetalPrice", "purity", "crgType", "crg", "othCrgDes", "othCrg", "cgst", "sgst", "igst",
+    "huid", "addDesKey", "addDesValue", "price", "charge", "tax", "sellerFirmId",
+    "purchaseOrderId", "purchaseItemId",
+]
+
+
+class _Echo:
+    """File-like object whose write() hands the CSV line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def _ndjson_chunks(columns, batches):
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    for rows in batches:
+        yield "".join(encoder.encode(dict(zip(columns, row))) + "\n" for row in rows).encode("utf-8")
+
+
+def _csv_chunks(columns, batches):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns).encode("utf-8")
+    for rows in batches:
+        yield "".join(writer.writerow(row) for row in rows).encode("utf-8")
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_options(request):
+    """Return (format, gzip) requested through the `format` and `gzip` query params."""
+    export_format = request.GET.get("format", "ndjson").lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ValidationException(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    return export_format, request.GET.get("gzip", "").lower() in ("1", "true", "yes")
+
+
+def encode_batches(columns, batches, export_format, compress):
+    """Return (byte chunks, filename suffix, content type) for row batches."""
+    if export_format == "csv":
+        chunks = _csv_chunks(columns, batches)
+    else:
+        chunks = _ndjson_chunks(columns, batches)
+    suffix, content_type = export_format, EXPORT_FORMATS[export_format]
+    if compress:
+        chunks = _gzip_chunks(chunks)
+        suffix += ".gz"
+        content_type = "application/gzip"
+    return chunks, suffix, content_type
+
+
+def _export_response(request, name, columns, sql, params):
+    export_format, compress = export_options(request)
+    # Resolve the alias now: the generator runs after the view (and its replica scope) returns.
+    batches = iter_row_batches(sql, params, using=read_alias())
+    chunks, suffix, content_type = encode_batches(columns, batches, export_format, compress)
+    filename = f"{name}.{suffix}"
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@require_GET
+@handle_exceptions
+@replica_reads
+def export_items(request):
+    """
+    Stream a store's `item` inventory, optionally narrowed to a category/sub-category.
+    """
+    validate_required_fields(request.GET, ["storeId"])
+    filters = ["storeId = %s"]
+    params = [request.GET["storeId"]]
+    for field in ("catId", "subCatId"):
+        if request.GET.get(field):
+            filters.append(f"{field} = %s")
+            params.append(request.GET[field])
+
+    sql = f"SELECT {', '.join(ITEM_COLUMNS)} FROM item WHERE {' AND '.join(filters)}"
+    return _export_response(request, f"items-{request.GET['storeId']}", ITEM_COLUMNS, sql, params)
+
+
+@require_GET
+@handle_exceptions
+@replica_reads
+def export_order_items(request):
+    """
+    Stream a store's `order_item` rows for an optional from/to (YYYY-MM-DD) order date range.
+    Archived rows are included when the range starts before the store's archive cutoff.
+    """
+    validate_required_fields(request.GET, ["storeId"])
+    start, end = parse_date_range(request.GET)
+    with read_connection().cursor() as cursor:
+        sources = table_sources(cursor, ["order", "order_item"], request.GET["storeId"], start)
+    filters = ["o.storeId = %s"]
+    params = [request.GET["storeId"]]
+    if start:
+        filters.append("oi.orderDate >= %s")
+        params.append(start)
+    if end:
+        filters.append("oi.orderDate < %s")
+        params.append(end)
+
+    sql = (
+        f"SELECT {', '.join('oi.' + column for column in ORDER_ITEM_COLUMNS)} "
+        f"FROM {sources['order_item']} oi JOIN {sources['order']} o "
+        "ON o.orderId = oi.orderId AND o.orderDate = oi.orderDate "
+        f"WHERE {' AND '.join(filters)}"
+    )
+    return _export_response(request, f"order-items-{request.GET['storeId']}", ORDER_ITEM_COLUMNS, sql, params)
@@ -0,0 +1,253 @@
+"""
+Category / sub-category renames and the propagation of the new name to the
+tables that copy it (sub_category.catName, item, order_item and its archive
+twin, purchase_order_item, daily_sales.catName).
+
+A rename updates the source row and records a rename_job in one transaction.
+Propagation then walks the rows of each dependent table that carry the target,
+in key order, DB_BATCH_SIZE keys at a time; on item, sub_category and
+daily_sales the walk stays inside the target's (storeId, catId[, subCatId])
+index range, and on the line tables inside its (catId | subCatId, key)
+index range, so it reads only the rows the rename affects. Every chunk
+rewrites the stale names within one key range and advances the job's cursor
+(stage, lastKey) in the same short transaction, so locks are held for one
+chunk only and a crashed run resumes exactly where it committed last. A newer rename of the same target supersedes an unfinished one.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from backend.core.db_router import mark_write
+from backend.master_db_opration.cold_archive import archive_name
+from backend.shared.constants import DB_BATCH_SIZE
+from backend.shared.db import fetch_dicts
+from backend.shared.exceptions import NotFoundException, ValidationException
+from backend.shared.utils import generate_unique_id
+
+logger = logging.getLogger(__name__)
+
+# target type -> (table, key column, name column)
+RENAME_SOURCES = {
+    "category": ("category", "catId", "catName"),
+    "sub_category": ("sub_category", "subCatId", "subCatName"),
+}
+# target type -> [(table, key column, filter columns, name column)], walked in order. The filter
+# columns are matched against the target's storeId / catId / subCatId (see _rename_scope); key is
+# unique among the filtered rows.
+RENAME_STEPS = {
+    "category": [
+        ("sub_category", "subCatId", ("storeId", "catId"), "catName"),
+        ("item", "itemId", ("storeId", "catId"), "catName"),
+        ("order_item", "orderItemId", ("catId",), "catName"),
+        (archive_name("order_item"), "orderItemId", ("catId",), "catName"),
+        ("purchase_order_item", "purchaseItemId", ("catId",), "catName"),
+        ("daily_sales", "saleDate", ("storeId", "catId"), "catName"),
+    ],
+    "sub_category": [
+        ("item", "itemId", ("storeId", "catId", "subCatId"), "subCatName"),
+        ("order_item", "orderItemId", ("subCatId",), "subCatName"),
+        (archive_name("order_item"), "orderItemId", ("subCatId",), "subCatName"),
+        ("purchase_order_item", "purchaseItemId", ("subCatId",), "subCatName"),
+    ],
+}
+ACTIVE_STATUSES = ("pending", "running")
+
+RENAME_JOB_COLUMNS = [
+    "jobId", "storeId", "targetType", "targetId", "oldName", "newName", "status", "stage", "lastKey",
+    "rowsScanned", "rowsUpdated", "error", "createdAt", "updatedAt",
+]
+
+
+def describe(job: dict) -> dict:
+    """A job row plus the name of the table it is working through."""
+    steps = RENAME_STEPS[job["targetType"]]
+    return {
+        **job,
+        "stages": len(steps),
+        "table": steps[job["stage"]][0] if job["stage"] < len(steps) else None,
+    }
+
+
+def start_rename(store_id: str, target_type: str, target_id: str, new_name: str) -> dict:
+    """Rename the source row and record the propagation job; returns the job."""
+    if target_type not in RENAME_SOURCES:
+        raise ValidationException(f"targetType must be one of: {', '.join(RENAME_SOURCES)}")
+    new_name = (new_name or "").strip() if isinstance(new_name, str) else ""
+    if not new_name:
+        raise ValidationException("newName is required")
+    table, key, name_column = RENAME_SOURCES[target_type]
+    now = timezone.now()
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        lock = " FOR UPDATE" if connection.features.has_select_for_update else ""
+        cursor.execute(
+            f"SELECT {name_column} FROM {table} WHERE {key} = %s AND storeId = %s{lock}", [target_id, store_id]
+        )
+        row = cursor.fetchone()
+        if row is None:
+            raise NotFoundException(f"{target_type} {target_id} not found in store")
+        old_name = row[0]
+        cursor.execute(f"UPDATE {table} SET {name_column} = %s WHERE {key} = %s", [new_name, target_id])
+        cursor.execute(
+            "UPDATE rename_job SET status = 'superseded', updatedAt = %s "
+            f"WHERE targetType = %s AND targetId = %s AND status IN ({', '.join(['%s'] * len(ACTIVE_STATUSES))})",
+            [now, target_type, target_id, *ACTIVE_STATUSES],
+        )
+        job = {
+            "jobId": generate_unique_id(), "storeId": store_id, "targetType": target_type, "targetId": target_id,
+            "oldName": old_name, "newName": new_name, "status": "pending", "stage": 0, "lastKey": None,
+            "rowsScanned": 0, "rowsUpdated": 0, "error": None, "createdAt": now, "updatedAt": now,
+        }
+        cursor.execute(
+            f"INSERT INTO rename_job ({', '.join(RENAME_JOB_COLUMNS)}) "
+            f"VALUES ({', '.join(['%s'] * len(RENAME_JOB_COLUMNS))})",
+            [job[column] for column in RENAME_JOB_COLUMNS],
+        )
+    mark_write()
+    return describe(job)
+
+
+def get_jobs(cursor, store_id: str, job_id: Optional[str] = None, limit: int = 20) -> List[dict]:
+    filters, params = ["storeId = %s"], [store_id]
+    if job_id:
+        filters.append("jobId = %s")
+        params.append(job_id)
+    jobs = fetch_dicts(
+        cursor,
+        RENAME_JOB_COLUMNS,
+        f"SELECT {', '.join(RENAME_JOB_COLUMNS)} FROM rename_job WHERE {' AND '.join(filters)} "
+        f"ORDER BY createdAt DESC LIMIT %s",
+        [*params, limit],
+    )
+    return [describe(job) for job in jobs]
+
+
+def pending_job_ids(cursor) -> List[str]:
+    cursor.execute(
+        f"SELECT jobId FROM rename_job WHERE status IN ({', '.join(['%s'] * len(ACTIVE_STATUSES))}) "
+        "ORDER BY createdAt",
+        list(ACTIVE_STATUSES),
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def run_chunk(job_id: str, chunk_size: int = DB_BATCH_SIZE) -> Optional[dict]:
+    """
+    Propagate one chunk of a job in its own transaction and return the updated job,
+    or None once the job is no longer active (done, superseded or failed).
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        lock = " FOR UPDATE" if connection.features.has_select_for_update else ""
+        jobs = fetch_dicts(
+            cursor, RENAME_JOB_COLUMNS,
+            f"SELECT {', '.join(RENAME_JOB_COLUMNS)} FROM rename_job WHERE jobId = %s{lock}", [job_id],
+        )
+        if not jobs or jobs[0]["status"] not in ACTIVE_STATUSES:
+            return None
+        job = jobs[0]
+        steps = RENAME_STEPS[job["targetType"]]
+        scanned, updated, last_key = 0, 0, None
+        if job["stage"] < len(steps):
+            table, key, filter_columns, name_column = steps[job["stage"]]
+            scope = _rename_scope(cursor, job)
+            scanned, updated, last_key = _rename_range(
+                cursor, table, key, {column: scope[column] for column in filter_columns}, name_column,
+                job["newName"], job["lastKey"], chunk_size,
+            )
+        if scanned:
+            job["lastKey"] = last_key
+        else:
+            job["stage"], job["lastKey"] = job["stage"] + 1, None
+        job["status"] = "running" if job["stage"] < len(steps) else "done"
+        job["rowsScanned"] += scanned
+        job["rowsUpdated"] += updated
+        job["updatedAt"] = timezone.now()
+        cursor.execute(
+            "UPDATE rename_job SET status = %s, stage = %s, lastKey = %s, rowsScanned = %s, rowsUpdated = %s, "
+            "updatedAt = %s WHERE jobId = %s",
+            [job["status"], job["stage"], job["lastKey"], job["rowsScanned"], job["rowsUpdated"],
+             job["updatedAt"], job_id],
+        )
+    mark_write()
+    return describe(job)
+
+
+def _rename_scope(cursor, job: dict) -> Dict[str, Optional[str]]:
+    """The storeId / catId / subCatId values of the rows that carry the job's target name."""
+    if job["targetType"] == "category":
+        return {"storeId": job["storeId"], "catId": job["targetId"]}
+    cursor.execute("SELECT catId FROM sub_category WHERE subCatId = %s", [job["targetId"]])
+    row = cursor.fetchone()
+    return {"storeId": job["storeId"], "catId": row[0] if row else None, "subCatId": job["targetId"]}
+
+
+def _rename_range(cursor, table: str, key: str, filters: Dict[str, Optional[str]], name_column: str,
+                  new_name: str, after: Optional[str], chunk_size: int) -> Tuple[int, int, Optional[str]]:
+    """
+    Rewrite stale names among the next `chunk_size` keys of the rows matching
+    `filters`; returns (scanned, updated, last key).
+    """
+    conditions, params = [f"{column} = %s" for column in filters], list(filters.values())
+    if after is not None:
+        conditions.append(f"{key} > %s")
+        params.append(after)
+    where = " AND ".join(conditions)
+    cursor.execute(f"SELECT {key} FROM {table} WHERE {where} ORDER BY {key} LIMIT %s", [*params, chunk_size])
+    keys = [row[0] for row in cursor.fetchall()]
+    if not keys:
+        return 0, 0, after
+    cursor.execute(
+        f"UPDATE {table} SET {name_column} = %s WHERE {where} AND {key} <= %s AND {name_column} <> %s",
+        [new_name, *params, keys[-1], new_name],
+    )
+    # lastKey is stored as text; daily_sales keys are dates.
+    return len(keys), max(cursor.rowcount, 0), str(keys[-1])
+
+
+def propagate(job_id: str, chunk_size: int = DB_BATCH_SIZE, pause: float = 0.0,
+              progress: Optional[Callable[[dict], None]] = None) -> Optional[dict]:
+    """Run a job chunk by chunk until it finishes; `pause` seconds between chunks yield to other writers."""
+    job = None
+    while True:
+        try:
+            current = run_chunk(job_id, chunk_size)
+        except Exception as exc:
+            _fail(job_id, exc)
+            raise
+        if current is None:
+            return job
+        job = current
+        if progress:
+            progress(job)
+        if job["status"] == "done":
+            return job
+        if pause:
+            time.sleep(pause)
+
+
+def _fail(job_id: str, exc: Exception) -> None:
+    logger.exception("Rename job %s failed", job_id)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE rename_job SET status = 'failed', error = %s, updatedAt = %s WHERE jobId = %s",
+            [str(exc)[:500], timezone.now(), job_id],
+        )
+
+
+def propagate_in_background(job_id: str) -> None:
+    """Start propagating a job on a daemon thread; propagate_renames resumes it if the process dies."""
+
+    def run():
+        try:
+            propagate(job_id)
+        except Exception:
+            logger.exception("Background propagation of rename job %s stopped", job_id)
+        finally:
+            connection.close()
+
+    threading.Thread(target=run, name=f"rename-{job_id}", daemon=True).start()
@@ -0,0 +1,250 @@
+"""Set-based inventory computations over the `item` master table."""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from backend.shared.db import fetch_dicts
+from backend.shared.pricing import charge_sql, metal_for_category, metal_rate_sql
+
+VALUATION_FIELDS = ["items", "quantity", "gsWt", "ntWt", "fnWt", "metalValue", "charge", "tax"]
+
+
+def empty_totals() -> Dict[str, float]:
+    return {field: 0 for field in VALUATION_FIELDS}
+
+
+def add_totals(target: Dict[str, float], source: Dict[str, float]) -> None:
+    for field in VALUATION_FIELDS:
+        target[field] += source[field]
+
+
+def finish_totals(totals: Dict[str, float]) -> Dict[str, float]:
+    totals["total"] = totals["metalValue"] + totals["charge"] + totals["tax"]
+    return {key: round(value, 3) if isinstance(value, float) else value for key, value in totals.items()}
+
+
+def valuation_by_category(cursor, rates: Dict[str, float], store_ids: Optional[Sequence[str]] = None,
+                          user_id: Optional[str] = None) -> List[dict]:
+    """
+    Value every item of the given stores (or all stores of `user_id`) at `rates`.
+
+    The price/charge/tax arithmetic runs inside the database and only one row per
+    (store, category) comes back, so the cost is a single aggregate scan.
+    Returns [{"storeId", "totals", "categories": [...]}].
+    """
+    rate_expr, rate_params = metal_rate_sql(rates)
+    charge_expr, charge_params = charge_sql("price")
+    if store_ids:
+        scope = f"storeId IN ({', '.join(['%s'] * len(store_ids))})"
+        scope_params = list(store_ids)
+    else:
+        scope = "storeId IN (SELECT storeId FROM store WHERE userId = %s)"
+        scope_params = [user_id]
+
+    cursor.execute(
+        f"""
+        SELECT storeId, catId, catName, COUNT(*), SUM(quantity), SUM(gsWt), SUM(ntWt), SUM(fnWt),
+               SUM(price), SUM(charge), SUM((price + charge) * gstRate / 100)
+        FROM (
+            SELECT storeId, catId, catName, quantity, gsWt, ntWt, fnWt, price, gstRate,
+                   {charge_expr} AS charge
+            FROM (
+                SELECT storeId, catId, catName, quantity, gsWt, ntWt, fnWt, crgType, crg, othCrg,
+                       cgst + sgst + igst AS gstRate, fnWt * {rate_expr} AS price
+                FROM item
+                WHERE {scope}
+            ) priced
+        ) charged
+        GROUP BY storeId, catId, catName
+        ORDER BY storeId, catName
+        """,
+        charge_params + rate_params + scope_params,
+    )
+
+    stores: Dict[str, dict] = {}
+    for row in cursor.fetchall():
+        store_id, cat_id, cat_name = row[0], row[1], row[2]
+        category = dict(zip(VALUATION_FIELDS, (value or 0 for value in row[3:])))
+        store = stores.setdefault(store_id, {"storeId": store_id, "totals": empty_totals(), "categories": []})
+        add_totals(store["totals"], category)
+        store["categories"].append({
+            "catId": cat_id,
+            "catName": cat_name,
+            "metal": metal_for_category(cat_name),
+            **finish_totals(category),
+        })
+
+    for store in stores.values():
+        store["totals"] = finish_totals(store["totals"])
+    return list(stores.values())
+
+
+# Categorical facets, filterable with repeated query params (any of the given values).
+FACET_FIELDS = ["catId", "subCatId", "purity", "entryType"]
+# Lower edges (grams) of the weight buckets reported for gsWt and ntWt.
+WEIGHT_BUCKETS = [0, 2, 5, 10, 20, 50, 100]
+WEIGHT_FIELDS = ["gsWt", "ntWt"]
+FACET_ITEM_COLUMNS = [
+    "itemId", "itemAddName", "catId", "catName", "subCatId", "subCatName", "entryType", "purity", "huid",
+    "quantity", "gsWt", "ntWt", "fnWt", "modifiedDate",
+]
+
+
+def weight_bucket_sql(column: str) -> str:
+    """CASE expression numbering the WEIGHT_BUCKETS bucket `column` falls into."""
+    cases = " ".join(
+        f"WHEN {column} < {upper} THEN {index}" for index, upper in enumerate(WEIGHT_BUCKETS[1:])
+    )
+    return f"CASE {cases} ELSE {len(WEIGHT_BUCKETS) - 1} END"
+
+
+def weight_bucket_label(index: int) -> str:
+    lower = WEIGHT_BUCKETS[index]
+    if index + 1 < len(WEIGHT_BUCKETS):
+        return f"{lower}-{WEIGHT_BUCKETS[index + 1]}"
+    return f"{lower}+"
+
+
+def weight_filter_sql(filters: dict) -> Tuple[List[str], list]:
+    clauses, params = [], []
+    for field in WEIGHT_FIELDS:
+        for bound, operator in (("min", ">="), ("max", "<=")):
+            value = filters.get(f"{bound}{field[0].upper()}{field[1:]}")
+            if value is not None:
+                clauses.append(f"{field} {operator} %s")
+                params.append(value)
+    return clauses, params
+
+
+def facet_counts(cursor, store_id: str, filters: dict) -> dict:
+    """
+    Totals of the filtered items plus counts for every facet, from one aggregate scan.
+
+    The scan groups the store's items (within the weight ranges) by every facet
+    column and weight bucket at once; the handful of groups are then folded in
+    Python. Each categorical facet is counted with every filter except its own,
+    so the counts show what selecting another value would return.
+    """
+    weight_clauses, weight_params = weight_filter_sql(filters)
+    gs_bucket, nt_bucket = weight_bucket_sql("gsWt"), weight_bucket_sql("ntWt")
+    cursor.execute(
+        f"""
+        SELECT {', '.join(FACET_FIELDS)}, {gs_bucket}, {nt_bucket}, COUNT(*), SUM(quantity), SUM(gsWt), SUM(ntWt)
+        FROM item
+        WHERE {' AND '.join(['storeId = %s', *weight_clauses])}
+        GROUP BY {', '.join(FACET_FIELDS)}, {gs_bucket}, {nt_bucket}
+        """,
+        [store_id, *weight_params],
+    )
+    groups = cursor.fetchall()
+
+    wanted = {field: set(filters.get(field) or []) for field in FACET_FIELDS}
+    width = len(FACET_FIELDS)
+    facets = {field: {} for field in FACET_FIELDS + WEIGHT_FIELDS}
+    totals = {"items": 0, "quantity": 0, "gsWt": 0.0, "ntWt": 0.0}
+    for group in groups:
+        misses = [field for position, field in enumerate(FACET_FIELDS)
+                  if wanted[field] and group[position] not in wanted[field]]
+        count = group[width + 2]
+        for position, field in enumerate(FACET_FIELDS):
+            if not misses or misses == [field]:
+                facets[field][group[position]] = facets[field].get(group[position], 0) + count
+        if misses:
+            continue
+        for offset, field in enumerate(WEIGHT_FIELDS):
+            bucket = group[width + offset]
+            facets[field][bucket] = facets[field].get(bucket, 0) + count
+        for offset, field in enumerate(totals):
+            totals[field] += group[width + 2 + offset] or 0
+
+    names = _facet_names(cursor, store_id)
+    result = {
+        field: sorted(
+            ({"value": value, "name": names.get((field, value), value), "count": count}
+             for value, count in facets[field].items()),
+            key=lambda entry: (-entry["count"], str(entry["name"])),
+        )
+        for field in FACET_FIELDS
+    }
+    for field in WEIGHT_FIELDS:
+        result[field] = [
+            {"bucket": weight_bucket_label(index), "count": facets[field][index]}
+            for index in sorted(facets[field])
+        ]
+    totals.update({field: round(totals[field], 3) for field in WEIGHT_FIELDS})
+    return {"totals": totals, "facets": result}
+
+
+def _facet_names(cursor, store_id: str) -> Dict[tuple, str]:
+    cursor.execute(
+        "SELECT 'catId', catId, catName FROM category WHERE storeId = %s "
+        "UNION ALL SELECT 'subCatId', subCatId, subCatName FROM sub_category WHERE storeId = %s",
+        [store_id, store_id],
+    )
+    return {(field, value): name for field, value, name in cursor.fetchall()}
+
+
+def facet_items(cursor, store_id: str, filters: dict, limit: int, offset: int) -> List[dict]:
+    """One page of the filtered items, most recently modified first."""
+    clauses, params = weight_filter_sql(filters)
+    for field in FACET_FIELDS:
+        values = filters.get(field)
+        if values:
+            clauses.append(f"{field} IN ({', '.join(['%s'] * len(values))})")
+            params.extend(values)
+    return fetch_dicts(
+        cursor,
+        FACET_ITEM_COLUMNS,
+        f"SELECT {', '.join(FACET_ITEM_COLUMNS)} FROM item "
+        f"WHERE {' AND '.join(['storeId = %s', *clauses])} "
+        f"ORDER BY modifiedDate DESC, itemId LIMIT %s OFFSET %s",
+        [store_id, *params, limit, offset],
+    )
+
+
+def category_tree(cursor, store_id: str) -> List[dict]:
+    """
+    The store's category -> sub_category tree with item counts and stock totals.
+
+    One query: category joined to its sub-categories and to a per-sub-category
+    item count; quantity and weights come from the stored rollups on
+    sub_category / category.
+    """
+    cursor.execute(
+        """
+        SELECT c.catId, c.catName, c.gsWt, c.fnWt,
+               sc.subCatId, sc.subCatName, sc.quantity, sc.gsWt, sc.fnWt, COALESCE(i.items, 0)
+        FROM category c
+        LEFT JOIN sub_category sc ON sc.catId = c.catId
+        LEFT JOIN (
+            SELECT subCatId, COUNT(*) AS items FROM item WHERE storeId = %s GROUP BY subCatId
+        ) i ON i.subCatId = sc.subCatId
+        WHERE c.storeId = %s
+        ORDER BY c.catName, c.catId, sc.subCatName
+        """,
+        [store_id, store_id],
+    )
+    categories: Dict[str, dict] = {}
+    for cat_id, cat_name, cat_gs, cat_fn, sub_id, sub_name, quantity, gs_wt, fn_wt, items in cursor.fetchall():
+        category = categories.setdefault(cat_id, {
+            "catId": cat_id,
+            "catName": cat_name,
+            "metal": metal_for_category(cat_name),
+            "items": 0,
+            "quantity": 0,
+            "gsWt": round(cat_gs, 3),
+            "fnWt": round(cat_fn, 3),
+            "subCategories": [],
+        })
+        if sub_id is None:
+            continue
+        category["items"] += items
+        category["quantity"] += quantity
+        category["subCategories"].append({
+            "subCatId": sub_id,
+            "subCatName": sub_name,
+            "items": items,
+            "quantity": quantity,
+            "gsWt": round(gs_wt, 3),
+            "fnWt": round(fn_wt, 3),
+        })
+    return list(categories.values())
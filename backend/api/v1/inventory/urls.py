@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('inventory/valuation/', views.stock_valuation, name='inventory-valuation'),
+    path('inventory/items/', views.faceted_items, name='inventory-items'),
+    path('inventory/categories/tree/', views.category_tree, name='inventory-category-tree'),
+    path('inventory/categories/rename/', views.rename_category, name='inventory-category-rename'),
+    path('inventory/renames/', views.rename_jobs, name='inventory-rename-jobs'),
+]
@@ -0,0 +1,174 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db import connection
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from backend.api.v1.inventory import renames, services
+from backend.api.v1.metal_rate.views import get_rate_snapshot
+from backend.core.db_router import read_connection, replica_reads
+from backend.master_db_opration.versions import inventory_version
+from backend.shared.constants import CACHE_TIMEOUT_LONG, CACHE_TIMEOUT_MEDIUM
+from backend.shared.exceptions import NotFoundException, ValidationException
+from backend.shared.pricing import fine_rates_per_gram, parse_rate_overrides
+from backend.shared.utils import handle_exceptions, parse_json_body, success_response
+from backend.shared.validators import validate_required_fields
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+@require_GET
+@handle_exceptions
+@replica_reads
+def stock_valuation(request):
+    """
+    Value a store's whole inventory at the live metal rate.
+
+    Query params: storeId (repeatable) or userId (all stores of that owner), and
+    optional goldRate (per 10 gm) / silverRate (per kg) overrides.
+    """
+    store_ids = request.GET.getlist("storeId")
+    user_id = request.GET.get("userId")
+    if not store_ids and not user_id:
+        raise ValidationException("storeId or userId is required")
+
+    overrides = parse_rate_overrides(request.GET)
+    snapshot = {} if len(overrides) == 2 else get_rate_snapshot()
+    rates = fine_rates_per_gram(snapshot, overrides)
+
+    with read_connection().cursor() as cursor:
+        stores = services.valuation_by_category(cursor, rates, store_ids=store_ids, user_id=user_id)
+
+    totals = services.empty_totals()
+    for store in stores:
+        services.add_totals(totals, store["totals"])
+
+    return success_response({
+        "rates": {
+            "timestamp": snapshot.get("timestamp"),
+            "goldPerGram": round(rates["gold"], 4),
+            "silverPerGram": round(rates["silver"], 4),
+        },
+        "stores": stores,
+        "totals": services.finish_totals(totals),
+    })
+
+
+def _int_param(params, name, default, lowest, highest):
+    try:
+        value = int(params.get(name, default))
+    except ValueError:
+        raise ValidationException(f"{name} must be an integer")
+    if not lowest <= value <= highest:
+        raise ValidationException(f"{name} must be between {lowest} and {highest}")
+    return value
+
+
+def _facet_filters(params) -> dict:
+    filters = {field: sorted(set(params.getlist(field))) for field in services.FACET_FIELDS if params.getlist(field)}
+    for field in services.WEIGHT_FIELDS:
+        for bound in ("min", "max"):
+            name = f"{bound}{field[0].upper()}{field[1:]}"
+            if params.get(name) not in (None, ""):
+                try:
+                    filters[name] = float(params[name])
+                except ValueError:
+                    raise ValidationException(f"{name} must be a number")
+    return filters
+
+
+@require_GET
+@handle_exceptions
+@replica_reads
+def faceted_items(request):
+    """
+    Browse a store's stock with facet counts.
+
+    Query params: storeId, any of catId, subCatId, purity, entryType (repeatable;
+    an item matches any of the given values), minGsWt/maxGsWt/minNtWt/maxNtWt,
+    limit (default 50, at most 200) and offset. Returns the page of items, the
+    totals of everything matching and the facet counts. Responses are cached per
+    store under its inventory version, so any item change retires them.
+    """
+    validate_required_fields(request.GET, ["storeId"])
+    store_id = request.GET["storeId"]
+    filters = _facet_filters(request.GET)
+    limit = _int_param(request.GET, "limit", DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    offset = _int_param(request.GET, "offset", 0, 0, 10 ** 9)
+    digest = hashlib.md5(json.dumps([filters, limit, offset], sort_keys=True).encode("utf-8")).hexdigest()
+
+    with read_connection().cursor() as cursor:
+        key = f"inventory_facets:{store_id}:{inventory_version(cursor, store_id)}:{digest}"
+        data = cache.get(key)
+        if data is None:
+            data = {
+                "storeId": store_id,
+                "filters": filters,
+                **services.facet_counts(cursor, store_id, filters),
+                "items": services.facet_items(cursor, store_id, filters, limit, offset),
+                "limit": limit,
+                "offset": offset,
+            }
+            cache.set(key, data, CACHE_TIMEOUT_MEDIUM)
+    return success_response(data)
+
+
+@require_GET
+@handle_exceptions
+@replica_reads
+def category_tree(request):
+    """
+    The store's category -> sub-category tree with item counts, quantity and weights.
+
+    Query params: storeId. Cached per store under its inventory version, which
+    moves with every category, sub-category and item write.
+    """
+    validate_required_fields(request.GET, ["storeId"])
+    store_id = request.GET["storeId"]
+    with read_connection().cursor() as cursor:
+        version = inventory_version(cursor, store_id)
+        key = f"category_tree:{store_id}:{version}"
+        categories = cache.get(key)
+        if categories is None:
+            categories = services.category_tree(cursor, store_id)
+            cache.set(key, categories, CACHE_TIMEOUT_LONG)
+    return success_response({"storeId": store_id, "version": version, "categories": categories})
+
+
+@csrf_exempt
+@require_POST
+@handle_exceptions
+def rename_category(request):
+    """
+    Rename a category or sub-category.
+
+    Body: {"storeId", "targetType": "category" | "sub_category", "targetId", "newName"}.
+    The source row is renamed at once; the copies of the name in sub_category,
+    item, order_item and purchase_order_item are rewritten in the background in
+    short keyed chunks. Returns the propagation job; poll inventory/renames/ for
+    its progress.
+    """
+    body = parse_json_body(request)
+    validate_required_fields(body, ["storeId", "targetType", "targetId", "newName"])
+    job = renames.start_rename(body["storeId"], body["targetType"], body["targetId"], body["newName"])
+    renames.propagate_in_background(job["jobId"])
+    return success_response(job, message="Rename accepted", status_code=202)
+
+
+@require_GET
+@handle_exceptions
+def rename_jobs(request):
+    """
+    Progress of a store's rename jobs, newest first.
+
+    Query params: storeId, optional jobId. Read from the primary so progress is current.
+    """
+    validate_required_fields(request.GET, ["storeId"])
+    with connection.cursor() as cursor:
+        jobs = renames.get_jobs(cursor, request.GET["storeId"], request.GET.get("jobId"))
+    if request.GET.get("jobId") and not jobs:
+        raise NotFoundException("Rename job not found")
+    return success_response({"jobs": jobs})
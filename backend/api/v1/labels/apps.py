@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class LabelsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'backend.api.v1.labels'
+    verbose_name = 'Labels API'
@@ -0,0 +1,340 @@
+"""
+Label template compiler and renderer.
+
+A label_template with its label_element rows is compiled once into a program
+for one printer language (TSPL, ZPL or ESC/POS): a job header, a per-label
+body held as a str.format template whose static commands are already laid
+out, a list of slots naming the item field and the encoder that fills each
+placeholder, and the copies count. The program is plain data, so it can live in
+the Django cache. Rendering a label is then one format() call over the
+encoded field values; no JSON, geometry or command syntax is looked at per
+item.
+
+Geometry is in millimetres on the template and in printer dots in the output
+(203 dpi unless asked otherwise). Element types a language cannot draw
+(images anywhere, lines and boxes on ESC/POS) are left out and listed in
+the program's `skipped`.
+"""
+
+import json
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from backend.shared.exceptions import ValidationException
+
+DEFAULT_DPI = 203
+LANGUAGE_ALIASES = {
+    "TSPL": "TSPL", "TSPL2": "TSPL",
+    "ZPL": "ZPL", "ZPL2": "ZPL", "ZPLII": "ZPL",
+    "ESC_POS": "ESC_POS", "ESCPOS": "ESC_POS", "ESC/POS": "ESC_POS", "ESC-POS": "ESC_POS",
+}
+# language -> (file suffix, content type) of a rendered job
+LANGUAGE_FILES = {
+    "TSPL": ("tspl", "text/plain"),
+    "ZPL": ("zpl", "text/plain"),
+    "ESC_POS": ("bin", "application/octet-stream"),
+}
+
+ELEMENT_ALIASES = {
+    "TEXT": "text", "LABEL": "text",
+    "BARCODE": "barcode", "BARCODE_128": "barcode",
+    "QR": "qr", "QRCODE": "qr", "QR_CODE": "qr",
+    "LINE": "line", "DIVIDER": "line",
+    "RECTANGLE": "box", "RECT": "box", "BOX": "box", "BORDER": "box",
+}
+
+# Item fields a label can bind to, and the names the app may use for them.
+LABEL_ITEM_COLUMNS = [
+    "itemId", "itemAddName", "catName", "subCatName", "entryType", "quantity", "gsWt", "ntWt", "fnWt",
+    "purity", "crgType", "crg", "othCrgDes", "othCrg", "huid", "unit", "addDesKey", "addDesValue",
+]
+FIELD_ALIASES = {
+    **{column.lower(): column for column in LABEL_ITEM_COLUMNS},
+    "name": "itemAddName", "itemname": "itemAddName", "item_name": "itemAddName",
+    "category": "catName", "subcategory": "subCatName", "sub_category": "subCatName",
+    "grossweight": "gsWt", "gross_weight": "gsWt", "weight": "gsWt",
+    "netweight": "ntWt", "net_weight": "ntWt", "fineweight": "fnWt", "fine_weight": "fnWt",
+    "charge": "crg", "makingcharge": "crg", "making_charge": "crg",
+}
+WEIGHT_FIELDS = {"gsWt", "ntWt", "fnWt"}
+
+TSPL_BARCODES = {"CODE128": "128", "128": "128", "CODE39": "39", "39": "39", "EAN13": "EAN13"}
+ZPL_BARCODES = {"CODE128": "^BC", "128": "^BC", "CODE39": "^B3", "39": "^B3", "EAN13": "^BE"}
+ZPL_ROTATION = {0: "N", 90: "R", 180: "I", 270: "B"}
+
+
+def normalize_language(value: Optional[str]) -> str:
+    language = LANGUAGE_ALIASES.get((value or "").strip().upper())
+    if language is None:
+        raise ValidationException(f"Unsupported print language: {value}")
+    return language
+
+
+def _field(binding: Optional[str], element_id: str) -> Optional[str]:
+    if not binding:
+        return None
+    name = binding.strip().strip("{}").strip()
+    if name.lower().startswith("item."):
+        name = name[len("item."):]
+    field = FIELD_ALIASES.get(name.lower())
+    if field is None:
+        raise ValidationException(f"Element {element_id} is bound to unknown field '{binding}'")
+    return field
+
+
+def _properties(element: dict) -> dict:
+    try:
+        properties = json.loads(element["properties"] or "{}")
+    except (TypeError, ValueError):
+        raise ValidationException(f"Element {element['elementId']} has invalid properties JSON")
+    return properties if isinstance(properties, dict) else {}
+
+
+# Encoders: (raw item value, slot options) -> text placed into the label body.
+
+def _plain(value, options: dict) -> str:
+    if value is None:
+        text = ""
+    elif isinstance(value, float):
+        text = f"{value:.{options.get('decimals', 2)}f}"
+    else:
+        text = str(value)
+    text = f"{options.get('prefix', '')}{text}{options.get('suffix', '')}"
+    limit = options.get("maxLength")
+    return text[:limit] if limit else text
+
+
+def _tspl_text(value, options: dict) -> str:
+    return _plain(value, options).replace('"', '\\["]').replace("\r", " ").replace("\n", " ")
+
+
+def _zpl_text(value, options: dict) -> str:
+    # Fields are written under ^FH\, so the command prefixes go in as hex escapes.
+    return _plain(value, options).replace("\\", "\\5C").replace("^", "\\5E").replace("~", "\\7E")
+
+
+def _escpos_text(value, options: dict) -> str:
+    return "".join(char for char in _plain(value, options) if char >= " ")
+
+
+def _escpos_barcode(value, options: dict) -> str:
+    data = _escpos_text(value, options)[:253]
+    return f"\x1dk\x49{chr(len(data) + 2)}{{B{data}"
+
+
+def _escpos_qr(value, options: dict) -> str:
+    data = _escpos_text(value, options)[:7000]
+    size = len(data) + 3
+    return f"\x1d(k{chr(size % 256)}{chr(size // 256)}\x31\x50\x30{data}\x1d(k\x03\x00\x31\x51\x30"
+
+
+ENCODERS = {
+    "tspl_text": _tspl_text,
+    "zpl_text": _zpl_text,
+    "escpos_text": _escpos_text,
+    "escpos_barcode": _escpos_barcode,
+    "escpos_qr": _escpos_qr,
+}
+
+
+class _Body:
+    """Collects static command text and placeholders into a str.format template."""
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.slots: List[Tuple[str, Optional[str], dict]] = []
+
+    def static(self, text: str) -> None:
+        self.parts.append(text.replace("{", "{{").replace("}", "}}"))
+
+    def value(self, encoder: str, field: Optional[str], properties: dict, element_text: str = "") -> None:
+        options = {key: properties[key] for key in ("prefix", "suffix", "maxLength") if properties.get(key)}
+        if field is None:
+            # Unbound elements print their fixed text; it is encoded once, here.
+            self.static(ENCODERS[encoder](element_text, options))
+            return
+        options["decimals"] = int(properties.get("decimals", 3 if field in WEIGHT_FIELDS else 2))
+        self.parts.append(f"{{{len(self.slots)}}}")
+        self.slots.append((encoder, field, options))
+
+    def copies(self) -> None:
+        self.parts.append("{copies}")
+
+    def template(self) -> str:
+        return "".join(self.parts)
+
+
+def _rotation(element: dict) -> int:
+    return int(round((element["rotation"] or 0) / 90.0)) % 4 * 90
+
+
+def _tspl(template: dict, elements: List[tuple], dots, body: _Body, skipped: List[str]) -> str:
+    header = (
+        f"SIZE {template['labelWidth']} mm,{template['labelHeight']} mm\r\n"
+        f"GAP {template['gapHeight']} mm,0 mm\r\n"
+        f"DENSITY {template['printDensity']}\r\nSPEED {template['printSpeed']}\r\n"
+        f"DIRECTION {template['printDirection']}\r\n"
+        f"REFERENCE {dots(template['referenceX'])},{dots(template['referenceY'])}\r\nCODEPAGE UTF-8\r\n"
+    )
+    body.static("CLS\r\n")
+    for element, kind, field, properties in elements:
+        x, y, width, height = (dots(element[key]) for key in ("x", "y", "width", "height"))
+        rotation = _rotation(element)
+        if kind == "text":
+            size = int(properties.get("fontSize", 10))
+            body.static(f'TEXT {x},{y},"0",{rotation},{size},{size},"')
+            body.value("tspl_text", field, properties, properties.get("text", ""))
+            body.static('"\r\n')
+        elif kind == "barcode":
+            symbology = TSPL_BARCODES.get(str(properties.get("barcodeType", "CODE128")).upper(), "128")
+            narrow = int(properties.get("moduleWidth", 2))
+            human = 1 if properties.get("showText", True) else 0
+            body.static(f'BARCODE {x},{y},"{symbology}",{height},{human},{rotation},{narrow},{narrow * 2},"')
+            body.value("tspl_text", field, properties, properties.get("text", ""))
+            body.static('"\r\n')
+        elif kind == "qr":
+            cell = int(properties.get("cellSize", 4))
+            body.static(f'QRCODE {x},{y},M,{cell},A,{rotation},"')
+            body.value("tspl_text", field, properties, properties.get("text", ""))
+            body.static('"\r\n')
+        elif kind == "line":
+            body.static(f"BAR {x},{y},{max(width, 1)},{max(height, 1)}\r\n")
+        elif kind == "box":
+            thickness = int(properties.get("thickness", 2))
+            body.static(f"BOX {x},{y},{x + width},{y + height},{thickness}\r\n")
+        else:
+            skipped.append(element["elementId"])
+    body.static("PRINT 1,")
+    body.copies()
+    body.static("\r\n")
+    return header
+
+
+def _zpl(template: dict, elements: List[tuple], dots, body: _Body, skipped: List[str]) -> str:
+    darkness = max(0, min(30, int(template["printDensity"]) * 2))
+    body.static(
+        f"^XA^CI28~SD{darkness:02d}^PR{template['printSpeed']}"
+        f"^PO{'I' if template['printDirection'] else 'N'}"
+        f"^PW{dots(template['labelWidth'])}^LL{dots(template['labelHeight'])}"
+        f"^LH{dots(template['referenceX'])},{dots(template['referenceY'])}\n"
+    )
+    for element, kind, field, properties in elements:
+        x, y, width, height = (dots(element[key]) for key in ("x", "y", "width", "height"))
+        rotation = ZPL_ROTATION[_rotation(element)]
+        if kind == "text":
+            size = max(int(round(float(properties.get("fontSize", 10)) * dots.per_mm * 25.4 / 72)), 10)
+            body.static(f"^FO{x},{y}^A0{rotation},{size},{size}^FH\\^FD")
+            body.value("zpl_text", field, properties, properties.get("text", ""))
+            body.static("^FS\n")
+        elif kind == "barcode":
+            command = ZPL_BARCODES.get(str(properties.get("barcodeType", "CODE128")).upper(), "^BC")
+            human = "Y" if properties.get("showText", True) else "N"
+            module = int(properties.get("moduleWidth", 2))
+            body.static(f"^FO{x},{y}^BY{module}{command}{rotation},{height},{human},N^FH\\^FD")
+            body.value("zpl_text", field, properties, properties.get("text", ""))
+            body.static("^FS\n")
+        elif kind == "qr":
+            body.static(f"^FO{x},{y}^BQN,2,{int(properties.get('cellSize', 4))}^FH\\^FDMA,")
+            body.value("zpl_text", field, properties, properties.get("text", ""))
+            body.static("^FS\n")
+        elif kind in ("line", "box"):
+            thickness = max(min(width, height), 1) if kind == "line" else int(properties.get("thickness", 2))
+            body.static(f"^FO{x},{y}^GB{max(width, 1)},{max(height, 1)},{thickness}^FS\n")
+        else:
+            skipped.append(element["elementId"])
+    body.static("^PQ")
+    body.copies()
+    body.static("^XZ\n")
+    return ""
+
+
+def _escpos(template: dict, elements: List[tuple], dots, body: _Body, skipped: List[str]) -> str:
+    # Receipt printers have no absolute vertical position: elements print top to
+    # bottom, one per line, at their x offset (ESC $).
+    for element, kind, field, properties in sorted(elements, key=lambda entry: (entry[0]["y"], entry[0]["x"])):
+        x = dots(element["x"])
+        position = f"\x1b${chr(x % 256)}{chr(x // 256)}"
+        if kind == "text":
+            scale = max(1, min(8, int(round(float(properties.get("fontSize", 12)) / 12))))
+            bold = properties.get("fontWeight", "").lower() == "bold" or bool(properties.get("bold"))
+            body.static(f"\x1d!{chr((scale - 1) << 4 | (scale - 1))}\x1bE{chr(1 if bold else 0)}{position}")
+            body.value("escpos_text", field, properties, properties.get("text", ""))
+            body.static("\x1d!\x00\x1bE\x00\n")
+        elif kind == "barcode":
+            height = max(1, min(255, dots(element["height"])))
+            human = 2 if properties.get("showText", True) else 0
+            width = max(2, min(6, int(properties.get("moduleWidth", 2))))
+            body.static(f"{position}\x1dh{chr(height)}\x1dw{chr(width)}\x1dH{chr(human)}")
+            body.value("escpos_barcode", field, properties, properties.get("text", ""))
+            body.static("\n")
+        elif kind == "qr":
+            cell = max(1, min(16, int(properties.get("cellSize", 4))))
+            # Model 2, module size, error correction M; the data and print commands come from the encoder.
+            body.static(
+                f"{position}\x1d(k\x04\x00\x31\x41\x32\x00"
+                f"\x1d(k\x03\x00\x31\x43{chr(cell)}\x1d(k\x03\x00\x31\x45\x31"
+            )
+            body.value("escpos_qr", field, properties, properties.get("text", ""))
+            body.static("\n")
+        else:
+            skipped.append(element["elementId"])
+    body.static("\x1bd\x03")
+    return "\x1b@"
+
+
+COMPILERS = {"TSPL": _tspl, "ZPL": _zpl, "ESC_POS": _escpos}
+
+
+class _Dots:
+    def __init__(self, dpi: int):
+        self.per_mm = dpi / 25.4
+
+    def __call__(self, millimetres) -> int:
+        return int(round(float(millimetres or 0) * self.per_mm))
+
+
+def compile_template(template: dict, elements: Iterable[dict], language: Optional[str] = None,
+                     dpi: int = DEFAULT_DPI) -> dict:
+    """Compile a template and its elements into a render program for one printer language."""
+    language = normalize_language(language or template["printLanguage"])
+    prepared, skipped = [], []
+    for element in sorted(elements, key=lambda element: (element["zIndex"], element["elementId"])):
+        if not element.get("isVisible", True):
+            continue
+        kind = ELEMENT_ALIASES.get(str(element["elementType"]).strip().upper())
+        if kind is None:
+            skipped.append(element["elementId"])
+            continue
+        field = _field(element.get("dataBinding"), element["elementId"])
+        prepared.append((element, kind, field, _properties(element)))
+
+    body = _Body()
+    header = COMPILERS[language](template, prepared, _Dots(dpi), body, skipped)
+    return {
+        "templateId": template["templateId"],
+        "language": language,
+        "dpi": dpi,
+        "header": header,
+        "body": body.template(),
+        "slots": body.slots,
+        "encoding": "latin-1" if language == "ESC_POS" else "utf-8",
+        "fields": sorted({field for _, field, _ in body.slots}),
+        "skipped": skipped,
+    }
+
+
+def render(program: dict, batches: Iterable[List[dict]], copies: int = 1) -> Iterator[bytes]:
+    """Render item batches against a compiled program, one output chunk per batch."""
+    encoding = program["encoding"]
+    body = program["body"]
+    slots = [(ENCODERS[encoder], field, options) for encoder, field, options in program["slots"]]
+    repeat = copies if program["language"] == "ESC_POS" else 1
+    if program["header"]:
+        yield program["header"].encode(encoding, "replace")
+    for items in batches:
+        labels = [
+            body.format(*[encode(item.get(field), options) for encode, field, options in slots], copies=copies)
+            for item in items
+        ]
+        if repeat > 1:
+            labels = [label * repeat for label in labels]
+        yield "".join(labels).encode(encoding, "replace")
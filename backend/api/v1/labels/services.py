@@ -0,0 +1,99 @@
+"""
+Template loading, the compiled-program cache and the item feed for label jobs.
+
+A compiled program is cached under a fingerprint of the template row, its
+element rows, the language and the dpi, so editing a template (or any of its
+elements) simply stops matching the old entry. Items are read in DB_BATCH_SIZE
+batches, each of which becomes one rendered output chunk.
+"""
+
+import hashlib
+import json
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from django.core.cache import cache
+from django.db import connections
+
+from backend.api.v1.labels.compiler import DEFAULT_DPI, compile_template, normalize_language
+from backend.shared.constants import CACHE_TIMEOUT_DAY, DB_BATCH_SIZE
+from backend.shared.db import fetch_dicts, iter_row_batches, rows_to_dicts
+from backend.shared.exceptions import NotFoundException
+
+# Bump when the compiler's output changes, so cached programs are rebuilt.
+PROGRAM_VERSION = 1
+
+TEMPLATE_COLUMNS = [
+    "templateId", "templateName", "templateType", "labelWidth", "labelHeight", "gapWidth", "gapHeight",
+    "printDensity", "printSpeed", "printDirection", "referenceX", "referenceY", "orientation", "labelPadding",
+    "printLanguage", "modifiedAt",
+]
+ELEMENT_COLUMNS = [
+    "elementId", "templateId", "elementType", "x", "y", "width", "height", "rotation", "zIndex", "properties",
+    "dataBinding", "isVisible",
+]
+
+
+def load_template(cursor, template_id: str):
+    """Return (template, elements) rows, or raise NotFoundException."""
+    templates = fetch_dicts(
+        cursor, TEMPLATE_COLUMNS,
+        f"SELECT {', '.join(TEMPLATE_COLUMNS)} FROM label_template WHERE templateId = %s", [template_id],
+    )
+    if not templates:
+        raise NotFoundException(f"Label template {template_id} not found")
+    elements = fetch_dicts(
+        cursor, ELEMENT_COLUMNS,
+        f"SELECT {', '.join(ELEMENT_COLUMNS)} FROM label_element WHERE templateId = %s ORDER BY elementId",
+        [template_id],
+    )
+    return templates[0], elements
+
+
+def program_cache_key(template: dict, elements: List[dict], language: str, dpi: int) -> str:
+    source = json.dumps([PROGRAM_VERSION, template, elements, language, dpi], sort_keys=True, default=str)
+    return f"label_program:{template['templateId']}:{hashlib.md5(source.encode('utf-8')).hexdigest()}"
+
+
+def compiled_program(cursor, template_id: str, language: Optional[str] = None,
+                     dpi: int = DEFAULT_DPI) -> dict:
+    """The template's program for `language` (default: its printLanguage), compiled at most once."""
+    template, elements = load_template(cursor, template_id)
+    language = normalize_language(language or template["printLanguage"])
+    key = program_cache_key(template, elements, language, dpi)
+    program = cache.get(key)
+    if program is None:
+        program = compile_template(template, elements, language, dpi)
+        cache.set(key, program, CACHE_TIMEOUT_DAY)
+    return program
+
+
+def _item_select(fields: Sequence[str]) -> Tuple[str, List[str]]:
+    # itemId always comes first: batches of explicit ids are put back in request order by it.
+    columns = ["itemId", *[field for field in fields if field != "itemId"]]
+    return f"SELECT {', '.join(columns)} FROM item", columns
+
+
+def item_batches(store_id: str, fields: Sequence[str], item_ids: Optional[List[str]] = None,
+                 purchase_order_id: Optional[str] = None, using: str = "default") -> Iterator[List[dict]]:
+    """
+    Yield the store's items to label, `fields` only, in batches of at most DB_BATCH_SIZE.
+
+    Explicit item ids keep their request order (unknown ids are left out); a
+    purchase order's items come in itemId order.
+    """
+    select, columns = _item_select(fields)
+    if purchase_order_id:
+        sql = f"{select} WHERE storeId = %s AND purchaseOrderId = %s ORDER BY itemId"
+        for rows in iter_row_batches(sql, [store_id, purchase_order_id], using=using):
+            yield rows_to_dicts(columns, rows)
+        return
+    for start in range(0, len(item_ids or []), DB_BATCH_SIZE):
+        chunk = item_ids[start:start + DB_BATCH_SIZE]
+        with connections[using].cursor() as cursor:
+            rows = fetch_dicts(
+                cursor, columns,
+                f"{select} WHERE storeId = %s AND itemId IN ({', '.join(['%s'] * len(chunk))})",
+                [store_id, *chunk],
+            )
+        by_id = {row["itemId"]: row for row in rows}
+        yield [by_id[item_id] for item_id in chunk if item_id in by_id]
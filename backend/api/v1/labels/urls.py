@@ -0,0 +1,7 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('labels/render/', views.render_labels, name='labels-render'),
+]
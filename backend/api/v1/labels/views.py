@@ -0,0 +1,77 @@
+"""
+Batch label printing.
+
+A job compiles (or takes from cache) the template's program for the target
+printer language once, then streams the rendered labels of every requested
+item back as a single printer-ready file.
+"""
+
+from django.http import StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from backend.api.v1.labels import services
+from backend.api.v1.labels.compiler import DEFAULT_DPI, LANGUAGE_FILES, render
+from backend.core.db_router import read_alias, read_connection, replica_reads
+from backend.shared.exceptions import ValidationException
+from backend.shared.utils import handle_exceptions, parse_json_body
+from backend.shared.validators import validate_required_fields
+
+MAX_LABEL_ITEMS = 10000
+MAX_COPIES = 100
+SUPPORTED_DPI = (152, 203, 300, 600)
+
+
+def _int_field(data, name, default, lowest, highest):
+    try:
+        value = int(data.get(name, default))
+    except (TypeError, ValueError):
+        raise ValidationException(f"{name} must be an integer")
+    if not lowest <= value <= highest:
+        raise ValidationException(f"{name} must be between {lowest} and {highest}")
+    return value
+
+
+@csrf_exempt
+@require_POST
+@handle_exceptions
+@replica_reads
+def render_labels(request):
+    """
+    Render a template's labels for a batch of items as a printer command file.
+
+    Body: storeId, templateId, and either itemIds (at most 10,000, printed in
+    that order) or purchaseOrderId (every item of that stock intake); optional
+    copies per item (default 1), language (TSPL, ZPL or ESC_POS; default the
+    template's printLanguage) and dpi (default 203). Element ids the language
+    cannot draw are listed in the X-Label-Skipped-Elements header.
+    """
+    data = parse_json_body(request)
+    validate_required_fields(data, ["storeId", "templateId"])
+    item_ids, purchase_order_id = data.get("itemIds"), data.get("purchaseOrderId")
+    if bool(item_ids) == bool(purchase_order_id):
+        raise ValidationException("Exactly one of itemIds or purchaseOrderId is required")
+    if item_ids is not None and (
+        not isinstance(item_ids, list) or not all(isinstance(item_id, str) for item_id in item_ids)
+    ):
+        raise ValidationException("itemIds must be a list of item ids")
+    if item_ids and len(item_ids) > MAX_LABEL_ITEMS:
+        raise ValidationException(f"At most {MAX_LABEL_ITEMS} itemIds per job")
+    copies = _int_field(data, "copies", 1, 1, MAX_COPIES)
+    dpi = _int_field(data, "dpi", DEFAULT_DPI, SUPPORTED_DPI[0], SUPPORTED_DPI[-1])
+    if dpi not in SUPPORTED_DPI:
+        raise ValidationException(f"dpi must be one of: {', '.join(map(str, SUPPORTED_DPI))}")
+
+    with read_connection().cursor() as cursor:
+        program = services.compiled_program(cursor, data["templateId"], data.get("language"), dpi)
+    # Resolve the alias now: the generator runs after the view (and its replica scope) returns.
+    batches = services.item_batches(
+        data["storeId"], program["fields"], item_ids=item_ids, purchase_order_id=purchase_order_id,
+        using=read_alias(),
+    )
+    suffix, content_type = LANGUAGE_FILES[program["language"]]
+    response = StreamingHttpResponse(render(program, batches, copies), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="labels-{program["templateId"]}.{suffix}"'
+    response["X-Label-Language"] = program["language"]
+    response["X-Label-Skipped-Elements"] = ",".join(program["skipped"])
+    return response
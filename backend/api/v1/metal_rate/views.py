@@ -1,14 +1,19 @@
+from django.conf import settings
+from django.core.cache import cache
 from django.http import JsonResponse
 from django.views.decorators.http import require_GET
 from datetime import datetime
 import logging
 import requests
 from bs4 import BeautifulSoup
+from backend.shared.constants import CACHE_TIMEOUT_SHORT
 from backend.shared.utils import set as set_response
 import re
 
 logger = logging.getLogger(__name__)
 
+RATE_SNAPSHOT_CACHE_KEY = "metal_rate:snapshot"
+
 USER_AGENTS = [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
     'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -78,11 +83,11 @@ def fetch_gold_24k_angel_one() -> dict:
     Fetch gold 24K price from AngelOne website.
     Returns dict with keys: source, metal, caratOrPurity, price, updatedDate
     """
-    url = "https://www.angelone.in/gold-rates-today"
+    url = f"{settings.METAL_RATE_ANGELONE_URL}/gold-rates-today"
     today = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     try:
-        response = requests.get(url, headers=get_headers(), timeout=15)
+        response = requests.get(url, headers=get_headers(), timeout=settings.METAL_RATE_TIMEOUT)
         response.raise_for_status()
         
         doc = BeautifulSoup(response.content, 'html.parser')
@@ -133,11 +138,11 @@ def fetch_silver_1kg_angel_one() -> dict:
     Fetch silver 1kg price from AngelOne website.
     Returns dict with keys: source, metal, caratOrPurity, price, updatedDate
     """
-    url = "https://www.angelone.in/silver-rates-today"
+    url = f"{settings.METAL_RATE_ANGELONE_URL}/silver-rates-today"
     today = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     try:
-        response = requests.get(url, headers=get_headers(), timeout=15)
+        response = requests.get(url, headers=get_headers(), timeout=settings.METAL_RATE_TIMEOUT)
         response.raise_for_status()
 
         doc = BeautifulSoup(response.content, "html.parser")
@@ -186,7 +191,7 @@ def fetch_silver_1kg_angel_one() -> dict:
 
 def fetch_gold_24k_good_returns() -> dict:
     cities = ["mumbai", "delhi", "bangalore", "chennai"]
-    base_url = "https://www.goodreturns.in/gold-rates/"
+    base_url = f"{settings.METAL_RATE_GOODRETURNS_URL}/gold-rates/"
     today = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     for city in cities:
@@ -194,7 +199,7 @@ def fetch_gold_24k_good_returns() -> dict:
 
         try:
             logger.info(f"[GoodReturns Gold] Trying city: {city}")
-            response = requests.get(url, headers=get_headers(), timeout=15)
+            response = requests.get(url, headers=get_headers(), timeout=settings.METAL_RATE_TIMEOUT)
             if response.status_code != 200:
                 logger.warning(f"[GoodReturns Gold] {city} returned status {response.status_code}")
                 continue
@@ -246,7 +251,7 @@ def fetch_gold_24k_good_returns() -> dict:
 
 def fetch_silver_1kg_good_returns() -> dict:
     cities = ["mumbai", "delhi", "bangalore", "chennai"]
-    base_url = "https://www.goodreturns.in/silver-rates/"
+    base_url = f"{settings.METAL_RATE_GOODRETURNS_URL}/silver-rates/"
     today = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     for city in cities:
@@ -254,7 +259,7 @@ def fetch_silver_1kg_good_returns() -> dict:
 
         try:
             logger.info(f"[GoodReturns Silver] Trying city: {city}")
-            response = requests.get(url, headers=get_headers(), timeout=15)
+            response = requests.get(url, headers=get_headers(), timeout=settings.METAL_RATE_TIMEOUT)
             if response.status_code != 200:
                 logger.warning(f"[GoodReturns Silver] {city} returned status {response.status_code}")
                 continue
@@ -312,11 +317,11 @@ def fetch_gold_24k_bankbazaar() -> dict:
     Fetch gold 24K price from BankBazaar gold rate page.
     Prefers the per-gram price in the Parameters table (latest dated row), with a city table fallback.
     """
-    url = "https://www.bankbazaar.com/gold-rate-india.html"
+    url = f"{settings.METAL_RATE_BANKBAZAAR_URL}/gold-rate-india.html"
     today = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     try:
-        response = requests.get(url, headers=get_headers(), timeout=15)
+        response = requests.get(url, headers=get_headers(), timeout=settings.METAL_RATE_TIMEOUT)
         response.raise_for_status()
 
         doc = BeautifulSoup(response.content, "html.parser")
@@ -424,11 +429,11 @@ def fetch_silver_1kg_bankbazaar() -> dict:
     """
     Fetch silver 1kg price from BankBazaar silver rate page.
     """
-    url = "https://www.bankbazaar.com/silver-rate-india.html"
+    url = f"{settings.METAL_RATE_BANKBAZAAR_URL}/silver-rate-india.html"
     today = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     try:
-        response = requests.get(url, headers=get_headers(), timeout=15)
+        response = requests.get(url, headers=get_headers(), timeout=settings.METAL_RATE_TIMEOUT)
         response.raise_for_status()
 
         doc = BeautifulSoup(response.content, "html.parser")
@@ -521,75 +526,102 @@ def fetch_silver_1kg_bankbazaar() -> dict:
         }
 
 
-@require_GET
-def metal_rate(request):    
-    try:
-        # Fetch rates from all sources in parallel would be ideal, but doing sequentially for now
-        
-        gold_angel_one = fetch_gold_24k_angel_one()
-        silver_angel_one = fetch_silver_1kg_angel_one()
+def fetch_metal_rates() -> dict:
+    """
+    Scrape the configured sources and return the compact rates payload:
+    {"timestamp": ..., "rates": [{"metal", "unit_gm", "price"}, ...]}.
+    """
+    # Fetch rates from all sources in parallel would be ideal, but doing sequentially for now
+    
+    gold_angel_one = fetch_gold_24k_angel_one()
+    silver_angel_one = fetch_silver_1kg_angel_one()
 
-        # gold_good_returns = fetch_gold_24k_good_returns()
-        # silver_good_returns = fetch_silver_1kg_good_returns()
-        
-        gold_bankbazaar = fetch_gold_24k_bankbazaar()
-        silver_bankbazaar = fetch_silver_1kg_bankbazaar()
-        
-        # Select best available data (first valid non-zero price)
-        def get_best_rate(sources):
-            valid = [s for s in sources if s.get("price") not in (None, "", "0")]
-            return valid[0] if valid else None
+    # gold_good_returns = fetch_gold_24k_good_returns()
+    # silver_good_returns = fetch_silver_1kg_good_returns()
+    
+    gold_bankbazaar = fetch_gold_24k_bankbazaar()
+    silver_bankbazaar = fetch_silver_1kg_bankbazaar()
+    
+    # Select best available data (first valid non-zero price)
+    def get_best_rate(sources):
+        valid = [s for s in sources if s.get("price") not in (None, "", "0")]
+        return valid[0] if valid else None
 
-        # compute simplified response values using all sources
-        gold_best = get_best_rate([gold_bankbazaar, gold_angel_one])
-        silver_best = get_best_rate([silver_bankbazaar, silver_angel_one])
+    # compute simplified response values using all sources
+    gold_best = get_best_rate([gold_bankbazaar, gold_angel_one])
+    silver_best = get_best_rate([silver_bankbazaar, silver_angel_one])
 
-        # if not gold_best:
-        #     logger.error(f"No valid gold price from sources. GoodReturns: {gold_good_returns.get('error')}, AngelOne: {gold_angel_one.get('error')}")
+    # if not gold_best:
+    #     logger.error(f"No valid gold price from sources. GoodReturns: {gold_good_returns.get('error')}, AngelOne: {gold_angel_one.get('error')}")
 
-        # if not silver_best:
-        #     logger.error(f"No valid silver price from sources. GoodReturns: {silver_good_returns.get('error')}, AngelOne: {silver_angel_one.get('error')}")
+    # if not silver_best:
+    #     logger.error(f"No valid silver price from sources. GoodReturns: {silver_good_returns.get('error')}, AngelOne: {silver_angel_one.get('error')}")
 
-        def to_float_or_none(val):
-            try:
-                if val is None:
-                    return None
-                s = str(val)
-                m = re.search(r"[\d,]+(?:\.\d+)?", s)
-                if not m:
-                    logger.warning(f"Failed to find numeric part for float conversion: {val}")
-                    return None
-                v = float(m.group(0).replace(",", ""))
-                return v
-            except Exception:
-                logger.warning(f"Failed to convert price to float: {val}")
+    def to_float_or_none(val):
+        try:
+            if val is None:
                 return None
+            s = str(val)
+            m = re.search(r"[\d,]+(?:\.\d+)?", s)
+            if not m:
+                logger.warning(f"Failed to find numeric part for float conversion: {val}")
+                return None
+            v = float(m.group(0).replace(",", ""))
+            return v
+        except Exception:
+            logger.warning(f"Failed to convert price to float: {val}")
+            return None
+
+    # Gold: convert per gram price to 10gm total
+    gold_price_per_gram = gold_best.get("price") if gold_best else None
+    gold_val_num = to_float_or_none(gold_price_per_gram)
+    gold_10gm = round(gold_val_num * 10, 2) if gold_val_num is not None else None
+
+    # Silver: expecting 1kg price
+    silver_price = silver_best.get("price") if silver_best else None
+    silver_val_num = to_float_or_none(silver_price)
+    silver_1kg = round(silver_val_num, 2) if silver_val_num is not None else None
+
+    payload = {
+        "timestamp": datetime.now().isoformat(),
+        "rates": [
+            {
+                "metal": "gold",
+                "unit_gm": 10,
+                "price": gold_10gm,
+            },
+            {
+                "metal": "silver",
+                "unit_gm": 1000,
+                "price": silver_1kg,
+            },
+        ],
+    }
+    return payload
 
-        # Gold: convert per gram price to 10gm total
-        gold_price_per_gram = gold_best.get("price") if gold_best else None
-        gold_val_num = to_float_or_none(gold_price_per_gram)
-        gold_10gm = round(gold_val_num * 10, 2) if gold_val_num is not None else None
 
-        # Silver: expecting 1kg price
-        silver_price = silver_best.get("price") if silver_best else None
-        silver_val_num = to_float_or_none(silver_price)
-        silver_1kg = round(silver_val_num, 2) if silver_val_num is not None else None
+def _remember_rate_snapshot(payload: dict) -> None:
+    """Keep a complete payload as the rate snapshot used for valuations and quotes."""
+    if all(rate.get("price") is not None for rate in payload.get("rates", [])):
+        cache.set(RATE_SNAPSHOT_CACHE_KEY, payload, CACHE_TIMEOUT_SHORT)
 
-        payload = {
-            "timestamp": datetime.now().isoformat(),
-            "rates": [
-                {
-                    "metal": "gold",
-                    "unit_gm": 10,
-                    "price": gold_10gm,
-                },
-                {
-                    "metal": "silver",
-                    "unit_gm": 1000,
-                    "price": silver_1kg,
-                },
-            ],
-        }
+
+def get_rate_snapshot() -> dict:
+    """
+    Return the latest rates payload, scraping only when the cached snapshot has expired.
+    """
+    payload = cache.get(RATE_SNAPSHOT_CACHE_KEY)
+    if payload is None:
+        payload = fetch_metal_rates()
+        _remember_rate_snapshot(payload)
+    return payload
+
+
+@require_GET
+def metal_rate(request):    
+    try:
+        payload = fetch_metal_rates()
+        _remember_rate_snapshot(payload)
 
         logger.info(f"Computed rates payload: {payload}")
 
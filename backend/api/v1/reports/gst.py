@@ -0,0 +1,309 @@
+"""
+GST period reports: output tax on sales (order_item) and input tax on purchases
+(purchase_order / purchase_order_item) for a range of store-local days.
+
+The summary is a set-based GROUP BY per tax slab on each side. Invoice-level
+detail is streamed in DB_BATCH_SIZE batches, so memory does not depend on the
+length of the period. Reports of closed periods (ending before today) are
+cached: the summary in the Django cache, the rendered detail files on disk
+under REPORT_CACHE_DIR. Cache entries are keyed by a fingerprint of the period
+taken from daily_order_totals and purchase_order, so a back-dated order or bill
+produces a fresh report instead of a stale one; detail files cached
+under an older fingerprint are removed when the period is rendered again.
+"""
+
+import hashlib
+import os
+import re
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from backend.api.v1.dashboard.rollups import day_bounds, store_time_zone
+from backend.master_db_opration.cold_archive import table_sources
+from backend.shared.exceptions import ValidationException
+from backend.shared.validators import parse_date_param
+
+TAX_FIELDS = ("cgst", "sgst", "igst")
+MAX_PERIOD_DAYS = 366
+
+SALES_DETAIL_COLUMNS = [
+    "invoiceNo", "orderId", "orderDate", "customerMobile", "customerGstin", "orderItemId", "catName",
+    "subCatName", "huid", "quantity", "ntWt", "fnWt", "taxableValue", "cgst", "cgstAmount", "sgst",
+    "sgstAmount", "igst", "igstAmount", "lineTotal",
+]
+PURCHASE_DETAIL_COLUMNS = [
+    "purchaseOrderId", "billNo", "billDate", "sellerId", "sellerName", "firmName", "firmGstin", "taxableValue",
+    "cgst", "cgstAmount", "sgst", "sgstAmount", "igst", "igstAmount", "billTotal",
+]
+DETAIL_KINDS = {"sales": SALES_DETAIL_COLUMNS, "purchases": PURCHASE_DETAIL_COLUMNS}
+
+# Taxable value of a purchase bill: fine weight at the fine rate of each item plus the bill's extra charge.
+_PURCHASE_TAXABLE_SQL = (
+    "COALESCE((SELECT SUM(poi.fnWt * poi.fnRate) FROM purchase_order_item poi "
+    "WHERE poi.purchaseOrderId = po.purchaseOrderId), 0) + COALESCE(po.extraCharge, 0)"
+)
+_MONTH_PERIOD = re.compile(r"^(\d{4})-(\d{2})$")
+_QUARTER_PERIOD = re.compile(r"^(\d{4})-Q([1-4])$", re.IGNORECASE)
+
+
+def store_today() -> date:
+    return timezone.localtime(timezone.now(), store_time_zone()).date()
+
+
+def _month_end(year: int, month: int) -> date:
+    return date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+
+
+def resolve_period(params) -> Tuple[date, date]:
+    """
+    Read the report period: `period` as YYYY-MM or YYYY-Qn (calendar quarters),
+    or an inclusive from/to (YYYY-MM-DD) pair of store-local days.
+    """
+    period = (params.get("period") or "").strip()
+    if period:
+        month, quarter = _MONTH_PERIOD.match(period), _QUARTER_PERIOD.match(period)
+        if month and 1 <= int(month.group(2)) <= 12:
+            year, first = int(month.group(1)), int(month.group(2))
+            return date(year, first, 1), _month_end(year, first)
+        if quarter:
+            year, first = int(quarter.group(1)), 3 * int(quarter.group(2)) - 2
+            return date(year, first, 1), _month_end(year, first + 2)
+        raise ValidationException("period must be YYYY-MM or YYYY-Qn")
+
+    start = parse_date_param(params.get("from"), "from")
+    end = parse_date_param(params.get("to"), "to")
+    if not start or not end:
+        raise ValidationException("period or from and to are required")
+    if start > end:
+        raise ValidationException("from must not be after to")
+    if (end - start).days >= MAX_PERIOD_DAYS:
+        raise ValidationException(f"A report can span at most {MAX_PERIOD_DAYS} days")
+    return start, end
+
+
+def is_closed(end: date) -> bool:
+    """A period is closed once its last day is over in the store's time zone."""
+    return end < store_today()
+
+
+def _purchase_scope(store_id: str, start: date, end: date) -> Tuple[str, list]:
+    # billDate is stored as ISO text; comparing against the day after `end` also covers datetimes.
+    return (
+        "po.storeId = %s AND po.billDate >= %s AND po.billDate < %s",
+        [store_id, start.isoformat(), (end + timedelta(days=1)).isoformat()],
+    )
+
+
+def period_fingerprint(cursor, store_id: str, start: date, end: date) -> str:
+    """
+    Short digest of what a report for the period would contain.
+
+    Reads the (at most 366) daily_order_totals rows of the period and one
+    aggregate over the period's purchase bills; any order or bill added to the
+    period changes it.
+    """
+    cursor.execute(
+        "SELECT COUNT(*), SUM(orders), SUM(totalAmount), SUM(totalCharge), SUM(totalTax) FROM daily_order_totals "
+        "WHERE storeId = %s AND saleDate >= %s AND saleDate <= %s",
+        [store_id, start, end],
+    )
+    sales = cursor.fetchone()
+    scope, params = _purchase_scope(store_id, start, end)
+    cursor.execute(
+        f"SELECT COUNT(*), SUM(po.totalFinalAmount), MAX(po.purchaseOrderId) FROM purchase_order po WHERE {scope}",
+        params,
+    )
+    purchases = cursor.fetchone()
+    digest = repr([round(value, 2) if isinstance(value, float) else value for value in (*sales, *purchases)])
+    return hashlib.md5(digest.encode("utf-8")).hexdigest()[:16]
+
+
+def _slab_rows(rows, keys: List[str]) -> Dict[str, object]:
+    slabs, totals = [], {"documents": 0, "lines": 0, "taxableValue": 0.0}
+    totals.update({f"{field}Amount": 0.0 for field in TAX_FIELDS})
+    for row in rows:
+        slab = dict(zip(keys, row))
+        for field in ("taxableValue", *(f"{tax}Amount" for tax in TAX_FIELDS)):
+            slab[field] = round(slab[field] or 0, 2)
+        slabs.append(slab)
+        for field in totals:
+            totals[field] += slab[field]
+    totals = {field: round(value, 2) if isinstance(value, float) else value for field, value in totals.items()}
+    totals["totalTax"] = round(sum(totals[f"{tax}Amount"] for tax in TAX_FIELDS), 2)
+    return {"slabs": slabs, "totals": totals}
+
+
+def gst_summary(cursor, store_id: str, start: date, end: date) -> dict:
+    """Per-slab taxable value and CGST/SGST/IGST on sales and purchases, with the net payable."""
+    start_at, end_at = day_bounds(start, end)
+    keys = ["cgst", "sgst", "igst", "documents", "lines", "taxableValue", "cgstAmount", "sgstAmount", "igstAmount"]
+    sources = table_sources(cursor, ["order", "order_item"], store_id, start_at)
+
+    cursor.execute(
+        f"""
+        SELECT oi.cgst, oi.sgst, oi.igst, COUNT(DISTINCT oi.orderId), COUNT(*),
+               SUM(oi.price + oi.charge),
+               SUM((oi.price + oi.charge) * oi.cgst / 100),
+               SUM((oi.price + oi.charge) * oi.sgst / 100),
+               SUM((oi.price + oi.charge) * oi.igst / 100)
+        FROM {sources['order_item']} oi
+        JOIN {sources['order']} o ON o.orderId = oi.orderId AND o.orderDate = oi.orderDate
+        WHERE o.storeId = %s AND oi.orderDate >= %s AND oi.orderDate < %s
+        GROUP BY oi.cgst, oi.sgst, oi.igst
+        ORDER BY oi.cgst, oi.sgst, oi.igst
+        """,
+        [store_id, start_at, end_at],
+    )
+    sales = _slab_rows(cursor.fetchall(), keys)
+    cursor.execute(
+        f"SELECT COALESCE(SUM(o.discount), 0) FROM {sources['order']} o "
+        "WHERE o.storeId = %s AND o.orderDate >= %s AND o.orderDate < %s",
+        [store_id, start_at, end_at],
+    )
+    sales["totals"]["discount"] = round(float(cursor.fetchone()[0]), 2)
+
+    scope, params = _purchase_scope(store_id, start, end)
+    cursor.execute(
+        f"""
+        SELECT cgstPercent, sgstPercent, igstPercent, COUNT(*), COUNT(*), SUM(taxable),
+               SUM(taxable * cgstPercent / 100), SUM(taxable * sgstPercent / 100), SUM(taxable * igstPercent / 100)
+        FROM (
+            SELECT po.cgstPercent, po.sgstPercent, po.igstPercent, {_PURCHASE_TAXABLE_SQL} AS taxable
+            FROM purchase_order po WHERE {scope}
+        ) bills
+        GROUP BY cgstPercent, sgstPercent, igstPercent
+        ORDER BY cgstPercent, sgstPercent, igstPercent
+        """,
+        params,
+    )
+    purchases = _slab_rows(cursor.fetchall(), keys)
+
+    net = {
+        f"{tax}Amount": round(sales["totals"][f"{tax}Amount"] - purchases["totals"][f"{tax}Amount"], 2)
+        for tax in TAX_FIELDS
+    }
+    net["totalTax"] = round(sum(net.values()), 2)
+    return {"sales": sales, "purchases": purchases, "netPayable": net}
+
+
+def _sales_detail_rows(batches: Iterable[list]) -> Iterator[list]:
+    for rows in batches:
+        out = []
+        for row in rows:
+            *head, quantity, nt_wt, fn_wt, price, charge, cgst, sgst, igst = row
+            taxable = price + charge
+            amounts = [round(taxable * rate / 100, 2) for rate in (cgst, sgst, igst)]
+            out.append([
+                *head, quantity, nt_wt, fn_wt, round(taxable, 2), cgst, amounts[0], sgst, amounts[1], igst,
+                amounts[2], round(taxable + sum(amounts), 2),
+            ])
+        yield out
+
+
+def _purchase_detail_rows(batches: Iterable[list]) -> Iterator[list]:
+    for rows in batches:
+        out = []
+        for row in rows:
+            *head, taxable, cgst, sgst, igst = row
+            amounts = [round(taxable * rate / 100, 2) for rate in (cgst, sgst, igst)]
+            out.append([
+                *head, round(taxable, 2), cgst, amounts[0], sgst, amounts[1], igst, amounts[2],
+                round(taxable + sum(amounts), 2),
+            ])
+        yield out
+
+
+def detail_query(cursor, kind: str, store_id: str, start: date, end: date) -> Tuple[str, list]:
+    """SQL and params whose rows detail_rows() turns into DETAIL_KINDS[kind] rows."""
+    if kind == "sales":
+        start_at, end_at = day_bounds(start, end)
+        sources = table_sources(cursor, ["order", "order_item"], store_id, start_at)
+        return (
+            f"""
+            SELECT o.invoiceNo, o.orderId, o.orderDate, o.customerMobile, c.gstin_pan, oi.orderItemId,
+                   oi.catName, oi.subCatName, oi.huid, oi.quantity, oi.ntWt, oi.fnWt, oi.price, oi.charge,
+                   oi.cgst, oi.sgst, oi.igst
+            FROM {sources['order_item']} oi
+            JOIN {sources['order']} o ON o.orderId = oi.orderId AND o.orderDate = oi.orderDate
+            LEFT JOIN customer c ON c.mobileNo = o.customerMobile
+            WHERE o.storeId = %s AND oi.orderDate >= %s AND oi.orderDate < %s
+            ORDER BY o.orderDate, o.invoiceNo, oi.orderItemId
+            """,
+            [store_id, start_at, end_at],
+        )
+    scope, params = _purchase_scope(store_id, start, end)
+    return (
+        f"""
+        SELECT po.purchaseOrderId, po.billNo, po.billDate, po.sellerId, s.name, f.firmName, f.gstNumber,
+               {_PURCHASE_TAXABLE_SQL}, po.cgstPercent, po.sgstPercent, po.igstPercent
+        FROM purchase_order po
+        LEFT JOIN seller s ON s.sellerId = po.sellerId
+        LEFT JOIN firm f ON f.firmId = s.firmId
+        WHERE {scope}
+        ORDER BY po.billDate, po.billNo
+        """,
+        params,
+    )
+
+
+def detail_rows(kind: str, batches: Iterable[list]) -> Iterator[list]:
+    """Add per-line tax amounts to raw detail_query() batches, one batch at a time."""
+    return _sales_detail_rows(batches) if kind == "sales" else _purchase_detail_rows(batches)
+
+
+def _safe_file_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+
+def cached_report_path(name: str) -> Path:
+    return Path(settings.REPORT_CACHE_DIR) / _safe_file_name(name)
+
+
+def tee_to_file(chunks: Iterable[bytes], path: Path) -> Iterator[bytes]:
+    """
+    Yield `chunks` while writing them to `path`.
+
+    The file only appears under its final name once the whole report has been
+    written; an interrupted download leaves nothing behind.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f".{path.name}.{uuid.uuid4().hex}.part")
+    try:
+        with open(partial, "wb") as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+                yield chunk
+        os.replace(partial, path)
+    finally:
+        if partial.exists():
+            partial.unlink()
+
+
+def summary_cache_key(store_id: str, start: date, end: date, fingerprint: str) -> str:
+    return f"gst_summary:{store_id}:{start.isoformat()}:{end.isoformat()}:{fingerprint}"
+
+
+def _detail_stem(kind: str, store_id: str, start: date, end: date) -> str:
+    return f"gst-{kind}-{store_id}-{start.isoformat()}-{end.isoformat()}"
+
+
+def detail_file_name(kind: str, store_id: str, start: date, end: date, fingerprint: Optional[str], suffix: str) -> str:
+    stem = _detail_stem(kind, store_id, start, end)
+    return f"{stem}-{fingerprint}.{suffix}" if fingerprint else f"{stem}.{suffix}"
+
+
+def prune_detail_files(kind: str, store_id: str, start: date, end: date, fingerprint: str, suffix: str) -> None:
+    """Remove the cached detail files of the period written under an older fingerprint."""
+    directory = Path(settings.REPORT_CACHE_DIR)
+    if not directory.is_dir():
+        return
+    keep = _safe_file_name(detail_file_name(kind, store_id, start, end, fingerprint, suffix))
+    pattern = f"{_safe_file_name(_detail_stem(kind, store_id, start, end))}-{'?' * len(fingerprint)}.{suffix}"
+    for path in directory.glob(pattern):
+        if path.name != keep:
+            path.unlink(missing_ok=True)
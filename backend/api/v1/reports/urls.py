@@ -0,0 +1,8 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('reports/gst/', views.gst_report, name='reports-gst'),
+    path('reports/gst/detail/', views.gst_report_detail, name='reports-gst-detail'),
+]
@@ -0,0 +1,93 @@
+from django.core.cache import cache
+from django.http import FileResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from backend.api.v1.export.views import encode_batches, export_options
+from backend.api.v1.reports import gst
+from backend.core.db_router import read_alias, read_connection, replica_reads
+from backend.shared.constants import CACHE_TIMEOUT_DAY
+from backend.shared.db import iter_row_batches
+from backend.shared.exceptions import ValidationException
+from backend.shared.utils import handle_exceptions, success_response
+from backend.shared.validators import validate_required_fields
+
+
+@require_GET
+@handle_exceptions
+@replica_reads
+def gst_report(request):
+    """
+    GST summary of one filing period: taxable value and CGST/SGST/IGST per tax slab
+    on sales and on purchases, and the net tax payable.
+
+    Query params: storeId, and period (YYYY-MM or YYYY-Qn) or from/to (YYYY-MM-DD).
+    Closed periods are served from cache until an order or bill lands in them.
+    """
+    validate_required_fields(request.GET, ["storeId"])
+    store_id = request.GET["storeId"]
+    start, end = gst.resolve_period(request.GET)
+    closed = gst.is_closed(end)
+
+    with read_connection().cursor() as cursor:
+        key = None
+        if closed:
+            key = gst.summary_cache_key(store_id, start, end, gst.period_fingerprint(cursor, store_id, start, end))
+            summary = cache.get(key)
+            if summary is not None:
+                return success_response({**summary, "cached": True})
+        summary = {
+            "storeId": store_id,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "closed": closed,
+            **gst.gst_summary(cursor, store_id, start, end),
+        }
+    if key:
+        cache.set(key, summary, CACHE_TIMEOUT_DAY)
+    return success_response({**summary, "cached": False})
+
+
+@require_GET
+@handle_exceptions
+@replica_reads
+def gst_report_detail(request):
+    """
+    Stream the invoice-level detail of a GST period as NDJSON or CSV (optionally gzip).
+
+    Query params: storeId, kind (sales: one row per order_item with its invoice;
+    purchases: one row per purchase bill), period or from/to, format, gzip.
+    Detail files of closed periods are kept on disk and re-served as they are.
+    """
+    validate_required_fields(request.GET, ["storeId"])
+    store_id = request.GET["storeId"]
+    kind = request.GET.get("kind", "sales")
+    if kind not in gst.DETAIL_KINDS:
+        raise ValidationException(f"kind must be one of: {', '.join(gst.DETAIL_KINDS)}")
+    start, end = gst.resolve_period(request.GET)
+    export_format, compress = export_options(request)
+
+    fingerprint = None
+    if gst.is_closed(end):
+        with read_connection().cursor() as cursor:
+            fingerprint = gst.period_fingerprint(cursor, store_id, start, end)
+
+    suffix = f"{export_format}.gz" if compress else export_format
+    filename = gst.detail_file_name(kind, store_id, start, end, None, suffix)
+    cached_path = fingerprint and gst.cached_report_path(
+        gst.detail_file_name(kind, store_id, start, end, fingerprint, suffix)
+    )
+    if cached_path and cached_path.exists():
+        return FileResponse(open(cached_path, "rb"), as_attachment=True, filename=filename)
+
+    with read_connection().cursor() as cursor:
+        sql, params = gst.detail_query(cursor, kind, store_id, start, end)
+    # Resolve the alias now: the generator runs after the view (and its replica scope) returns.
+    batches = gst.detail_rows(kind, iter_row_batches(sql, params, using=read_alias()))
+    chunks, _, content_type = encode_batches(gst.DETAIL_KINDS[kind], batches, export_format, compress)
+    if cached_path:
+        gst.prune_detail_files(kind, store_id, start, end, fingerprint, suffix)
+        chunks = gst.tee_to_file(chunks, cached_path)
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
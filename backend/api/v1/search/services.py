@@ -0,0 +1,182 @@
+"""
+Counter search over a store's items (itemAddName, huid) and customers (name, mobileNo).
+
+Queries are answered from the search indexes created by apply_search_indexes:
+pg_trgm on PostgreSQL (substring LIKE plus `%` similarity for typos) and FTS5
+trigram tables on SQLite (the exact substring as a phrase first; if that
+finds too little, the rarest of the query's trigrams OR-ed together so near
+misses still match). Candidates are ranked by trigram similarity, the same
+measure pg_trgm uses, and the top `limit` scoring at least MIN_SCORE are
+returned. Queries shorter than three characters have no trigrams and fall back
+to a prefix range over the (storeId, prefix_key(column)) indexes.
+"""
+
+import re
+from typing import Dict, List, Sequence, Set
+
+from backend.master_db_opration.search_index import prefix_key
+from backend.shared.db import fetch_dicts
+from backend.shared.exceptions import ValidationException
+
+SEARCH_TYPES = ("items", "customers")
+MIN_QUERY_LENGTH = 2
+MAX_QUERY_LENGTH = 64
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+# Index candidates fetched per requested result before re-ranking by similarity.
+CANDIDATE_FACTOR = 5
+# Results scoring below this are dropped; a little under pg_trgm's 0.3 so multi-word typos survive.
+MIN_SCORE = 0.2
+# Trigrams OR-ed together by the SQLite typo pass, rarest first; common ones only add noise and cost.
+MAX_TYPO_TRIGRAMS = 4
+
+ITEM_RESULT_COLUMNS = ["itemId", "itemAddName", "huid", "catName", "subCatName", "quantity", "gsWt", "fnWt"]
+CUSTOMER_RESULT_COLUMNS = ["mobileNo", "name", "address", "totalAmount"]
+
+# entity -> (table, FTS5 table, searched columns, result columns, tie-break order);
+# the searched columns are always among the result columns.
+SEARCH_TARGETS = {
+    "items": ("item", "item_search", ["itemAddName", "huid"], ITEM_RESULT_COLUMNS, "itemAddName"),
+    "customers": ("customer", "customer_search", ["name", "mobileNo"], CUSTOMER_RESULT_COLUMNS, "name"),
+}
+
+
+def normalize_query(value) -> str:
+    query = re.sub(r"\s+", " ", (value or "").strip().lower())
+    if len(query) < MIN_QUERY_LENGTH:
+        raise ValidationException(f"q must be at least {MIN_QUERY_LENGTH} characters")
+    return query[:MAX_QUERY_LENGTH]
+
+
+def trigrams(text: str) -> Set[str]:
+    """pg_trgm's trigram set: each alphanumeric word padded with two leading and one trailing space."""
+    grams = set()
+    for word in re.findall(r"[a-z0-9]+", (text or "").lower()):
+        padded = f"  {word} "
+        grams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return grams
+
+
+def similarity(query_grams: Set[str], text: str) -> float:
+    grams = trigrams(text)
+    if not query_grams or not grams:
+        return 0.0
+    return len(query_grams & grams) / len(query_grams | grams)
+
+
+def _score(query: str, query_grams: Set[str], values: Sequence[str]) -> float:
+    """Best similarity over the searched columns; a substring hit scores at least 0.5 and a prefix hit 0.75."""
+    best = 0.0
+    for value in values:
+        lowered = (value or "").lower()
+        score = similarity(query_grams, lowered)
+        if lowered.startswith(query):
+            score = max(score, 0.75)
+        elif query in lowered:
+            score = max(score, 0.5)
+        best = max(best, score)
+    return best
+
+
+def _rank(rows: List[dict], query: str, columns: Sequence[str], order: str, limit: int) -> List[dict]:
+    query_grams = trigrams(query)
+    for row in rows:
+        row["score"] = round(_score(query, query_grams, [row.get(column) for column in columns]), 3)
+    rows = [row for row in rows if row["score"] >= MIN_SCORE]
+    rows.sort(key=lambda row: (-row["score"], row[order] or ""))
+    return rows[:limit]
+
+
+def _prefix_search(cursor, entity: str, store_id: str, query: str, limit: int) -> List[dict]:
+    table, _, searched, columns, order = SEARCH_TARGETS[entity]
+    # A range, unlike LIKE 'xx%', is served by the index on both vendors.
+    keys = [prefix_key(column, cursor.db.vendor, "t") for column in searched]
+    matches = " OR ".join(f"(t.storeId = %s AND {key} >= %s AND {key} < %s)" for key in keys)
+    upper = query[:-1] + chr(ord(query[-1]) + 1)
+    rows = fetch_dicts(
+        cursor,
+        columns,
+        f"SELECT {', '.join('t.' + column for column in columns)} FROM {table} t "
+        f"WHERE {matches} ORDER BY t.{order} LIMIT %s",
+        [*[store_id, query, upper] * len(keys), limit],
+    )
+    return _rank(rows, query, searched, order, limit)
+
+
+def _postgres_search(cursor, entity: str, store_id: str, query: str, limit: int) -> List[dict]:
+    table, _, searched, columns, order = SEARCH_TARGETS[entity]
+    # mobileNo is indexed as-is (digits only); the other columns are indexed lowercased.
+    expressions = [f"t.{column}" if column == "mobileNo" else f"LOWER(t.{column})" for column in searched]
+    like = f"%{query.replace('%', '').replace('_', '')}%"
+    matches = " OR ".join(f"{expression} LIKE %s OR {expression} %% %s" for expression in expressions)
+    score = f"GREATEST({', '.join(f'similarity({expression}, %s)' for expression in expressions)})"
+    rows = fetch_dicts(
+        cursor,
+        columns + ["similarity"],
+        f"SELECT {', '.join('t.' + column for column in columns)}, {score} AS similarity FROM {table} t "
+        f"WHERE t.storeId = %s AND ({matches}) ORDER BY similarity DESC, t.{order} LIMIT %s",
+        [*[query] * len(expressions), store_id, *[like, query] * len(expressions), limit * CANDIDATE_FACTOR],
+    )
+    for row in rows:
+        row.pop("similarity")
+    return _rank(rows, query, searched, order, limit)
+
+
+def _fts_quote(term: str) -> str:
+    return '"{}"'.format(term.replace('"', '""'))
+
+
+def _fts_candidates(cursor, entity: str, store_id: str, match: str, limit: int) -> List[dict]:
+    """The `limit` best-ranked rows of the store matching `match`."""
+    table, index, _, columns, _ = SEARCH_TARGETS[entity]
+    # CROSS JOIN keeps the FTS table as the outer loop; otherwise SQLite may walk
+    # every item of the store through a storeId index and probe the index per row.
+    return fetch_dicts(
+        cursor,
+        columns,
+        f"SELECT {', '.join('t.' + column for column in columns)} FROM {index} s "
+        f"CROSS JOIN {table} t ON t.rowid = s.rowid "
+        f"WHERE {index} MATCH %s AND t.storeId = %s ORDER BY s.rank LIMIT %s",
+        [match, store_id, limit],
+    )
+
+
+def _rare_trigrams(cursor, entity: str, query: str) -> List[str]:
+    """The query's trigrams that occur in the index, rarest first."""
+    index = SEARCH_TARGETS[entity][1]
+    grams = sorted({query[position:position + 3] for position in range(len(query) - 2)})
+    cursor.execute(
+        f"SELECT term FROM {index}_vocab WHERE term IN ({', '.join(['%s'] * len(grams))}) ORDER BY doc",
+        grams,
+    )
+    return [row[0] for row in cursor.fetchall()[:MAX_TYPO_TRIGRAMS]]
+
+
+def _sqlite_search(cursor, entity: str, store_id: str, query: str, limit: int) -> List[dict]:
+    _, _, searched, columns, order = SEARCH_TARGETS[entity]
+    wanted = limit * CANDIDATE_FACTOR
+    rows = _fts_candidates(cursor, entity, store_id, _fts_quote(query), wanted)
+    if len(rows) < limit:
+        grams = _rare_trigrams(cursor, entity, query)
+        if grams:
+            seen = {row[columns[0]] for row in rows}
+            match = " OR ".join(_fts_quote(gram) for gram in grams)
+            rows.extend(
+                row for row in _fts_candidates(cursor, entity, store_id, match, wanted)
+                if row[columns[0]] not in seen
+            )
+    return _rank(rows, query, searched, order, limit)
+
+
+def search(cursor, store_id: str, query: str, types: Sequence[str] = SEARCH_TYPES,
+           limit: int = DEFAULT_LIMIT) -> Dict[str, List[dict]]:
+    """Top `limit` matches of `query` per requested type, best first, each with a 0..1 score."""
+    results = {}
+    for entity in types:
+        if len(query) < 3:
+            results[entity] = _prefix_search(cursor, entity, store_id, query, limit)
+        elif cursor.db.vendor == "postgresql":
+            results[entity] = _postgres_search(cursor, entity, store_id, query, limit)
+        else:
+            results[entity] = _sqlite_search(cursor, entity, store_id, query, limit)
+    return results
@@ -0,0 +1,36 @@
+from django.views.decorators.http import require_GET
+
+from backend.api.v1.search import services
+from backend.core.db_router import read_connection, replica_reads
+from backend.shared.exceptions import ValidationException
+from backend.shared.utils import handle_exceptions, success_response
+from backend.shared.validators import validate_required_fields
+
+
+@require_GET
+@handle_exceptions
+@replica_reads
+def search(request):
+    """
+    Fuzzy counter search over a store's items (name, HUID) and customers (name, mobile).
+
+    Query params: storeId, q (at least 2 characters; prefix, substring and
+    typo-tolerant matches), optional types (comma-separated: items, customers)
+    and limit (default 10, at most 50) per type.
+    """
+    validate_required_fields(request.GET, ["storeId", "q"])
+    query = services.normalize_query(request.GET["q"])
+    types = [value.strip() for value in request.GET.get("types", ",".join(services.SEARCH_TYPES)).split(",")]
+    unknown = [value for value in types if value not in services.SEARCH_TYPES]
+    if unknown:
+        raise ValidationException(f"types must be among: {', '.join(services.SEARCH_TYPES)}")
+    try:
+        limit = int(request.GET.get("limit", services.DEFAULT_LIMIT))
+    except ValueError:
+        raise ValidationException("limit must be an integer")
+    if not 1 <= limit <= services.MAX_LIMIT:
+        raise ValidationException(f"limit must be between 1 and {services.MAX_LIMIT}")
+
+    with read_connection().cursor() as cursor:
+        results = services.search(cursor, request.GET["storeId"], query, types, limit)
+    return success_response({"q": query, **results})
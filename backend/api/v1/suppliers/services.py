@@ -0,0 +1,143 @@
+"""
+Supplier ledger and statement reads.
+
+Totals come from the seller_ledger / firm_ledger rows the purchase triggers keep
+current (see master_db_opration.supplier_ledger), so a ledger is a couple of
+primary-key lookups however many bills a supplier has. Statements page through
+purchase_order by (billDate, purchaseOrderId) and aggregate items and metal
+exchanges for the bills of that page only.
+"""
+
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from backend.master_db_opration.supplier_ledger import LEDGER_FIELDS
+from backend.shared.db import fetch_dicts
+from backend.shared.exceptions import NotFoundException
+
+WEIGHT_FIELDS = {"purchasedFnWt", "exchangedFnWt", "finalWeight", "outstandingFnWt"}
+
+STATEMENT_COLUMNS = [
+    "purchaseOrderId", "billNo", "billDate", "entryDate", "sellerId", "sellerName", "extraCharge",
+    "finalWeight", "finalAmount", "cgstPercent", "sgstPercent", "igstPercent", "notes",
+]
+
+
+def _summary(row: dict) -> dict:
+    """Round a ledger row and add the fine weight still owed to the supplier."""
+    row["outstandingFnWt"] = (row["purchasedFnWt"] or 0) - (row["exchangedFnWt"] or 0)
+    for field in [*LEDGER_FIELDS[1:], "outstandingFnWt"]:
+        row[field] = round(float(row[field] or 0), 3 if field in WEIGHT_FIELDS else 2)
+    return row
+
+
+def _firm(cursor, firm_id: str) -> dict:
+    columns = ["firmId", "firmName", "firmMobileNumber", "gstNumber", "address", *LEDGER_FIELDS]
+    rows = fetch_dicts(
+        cursor,
+        columns,
+        f"""
+        SELECT f.firmId, f.firmName, f.firmMobileNumber, f.gstNumber, f.address,
+               {', '.join(f'COALESCE(l.{field}, 0)' for field in LEDGER_FIELDS)}
+        FROM firm f LEFT JOIN firm_ledger l ON l.firmId = f.firmId
+        WHERE f.firmId = %s
+        """,
+        [firm_id],
+    )
+    if not rows:
+        raise NotFoundException("Firm not found")
+    return _summary(rows[0])
+
+
+def _sellers(cursor, where: str, params: list) -> List[dict]:
+    columns = ["sellerId", "firmId", "name", "mobileNumber", *LEDGER_FIELDS]
+    rows = fetch_dicts(
+        cursor,
+        columns,
+        f"""
+        SELECT s.sellerId, s.firmId, s.name, s.mobileNumber,
+               {', '.join(f'COALESCE(l.{field}, 0)' for field in LEDGER_FIELDS)}
+        FROM seller s LEFT JOIN seller_ledger l ON l.sellerId = s.sellerId
+        WHERE {where}
+        ORDER BY s.name, s.sellerId
+        """,
+        params,
+    )
+    return [_summary(row) for row in rows]
+
+
+def firm_ledger(cursor, firm_id: str) -> Dict[str, object]:
+    """A firm's running totals and those of each of its sellers."""
+    return {"firm": _firm(cursor, firm_id), "sellers": _sellers(cursor, "s.firmId = %s", [firm_id])}
+
+
+def seller_ledger(cursor, seller_id: str) -> Dict[str, object]:
+    """A seller's running totals and those of its firm."""
+    sellers = _sellers(cursor, "s.sellerId = %s", [seller_id])
+    if not sellers:
+        raise NotFoundException("Seller not found")
+    return {"seller": sellers[0], "firm": _firm(cursor, sellers[0]["firmId"])}
+
+
+def statement(cursor, firm_id: Optional[str], seller_id: Optional[str], start: Optional[date],
+              end: Optional[date], limit: int, offset: int) -> Dict[str, object]:
+    """
+    One page of a seller's or firm's bills, newest first, each with its bought and
+    exchanged fine weight; `hasMore` says whether another page follows.
+    """
+    filters, params = (["po.sellerId = %s"], [seller_id]) if seller_id else (["s.firmId = %s"], [firm_id])
+    # billDate is stored as ISO text; comparing against the day after `end` also covers datetimes.
+    if start:
+        filters.append("po.billDate >= %s")
+        params.append(start.isoformat())
+    if end:
+        filters.append("po.billDate < %s")
+        params.append((end + timedelta(days=1)).isoformat())
+    bills = fetch_dicts(
+        cursor,
+        STATEMENT_COLUMNS,
+        f"""
+        SELECT po.purchaseOrderId, po.billNo, po.billDate, po.entryDate, po.sellerId, s.name,
+               COALESCE(po.extraCharge, 0), COALESCE(po.totalFinalWeight, 0), COALESCE(po.totalFinalAmount, 0),
+               po.cgstPercent, po.sgstPercent, po.igstPercent, po.notes
+        FROM purchase_order po JOIN seller s ON s.sellerId = po.sellerId
+        WHERE {' AND '.join(filters)}
+        ORDER BY po.billDate DESC, po.purchaseOrderId DESC
+        LIMIT %s OFFSET %s
+        """,
+        [*params, limit + 1, offset],
+    )
+    has_more = len(bills) > limit
+    bills = bills[:limit]
+
+    contents = _bill_contents(cursor, [bill["purchaseOrderId"] for bill in bills])
+    for bill in bills:
+        purchased_fn_wt, purchased_value, exchanged_fn_wt = contents.get(bill["purchaseOrderId"], (0, 0, 0))
+        bill["purchasedFnWt"] = round(purchased_fn_wt, 3)
+        bill["purchasedValue"] = round(purchased_value, 2)
+        bill["exchangedFnWt"] = round(exchanged_fn_wt, 3)
+        bill["outstandingFnWt"] = round(purchased_fn_wt - exchanged_fn_wt, 3)
+    return {"bills": bills, "limit": limit, "offset": offset, "hasMore": has_more}
+
+
+def _bill_contents(cursor, purchase_order_ids: List[str]) -> Dict[str, List[float]]:
+    """purchaseOrderId -> [fine weight bought, value bought, fine weight exchanged]."""
+    if not purchase_order_ids:
+        return {}
+    placeholders = ", ".join(["%s"] * len(purchase_order_ids))
+    contents: Dict[str, List[float]] = {}
+    cursor.execute(
+        f"SELECT purchaseOrderId, SUM(fnWt), SUM(fnWt * fnRate) FROM purchase_order_item "
+        f"WHERE purchaseOrderId IN ({placeholders}) GROUP BY purchaseOrderId",
+        purchase_order_ids,
+    )
+    for purchase_order_id, fn_wt, value in cursor.fetchall():
+        contents[purchase_order_id] = [fn_wt or 0, value or 0, 0]
+    cursor.execute(
+        f"SELECT purchaseOrderId, SUM(fnWeight) FROM metal_exchange "
+        f"WHERE purchaseOrderId IN ({placeholders}) GROUP BY purchaseOrderId",
+        purchase_order_ids,
+    )
+    for purchase_order_id, fn_weight in cursor.fetchall():
+        contents.setdefault(purchase_order_id, [0, 0, 0])[2] = fn_weight or 0
+    return contents
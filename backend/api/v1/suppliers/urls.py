@@ -0,0 +1,8 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('suppliers/ledger/', views.supplier_ledger, name='suppliers-ledger'),
+    path('suppliers/statement/', views.supplier_statement, name='suppliers-statement'),
+]
@@ -0,0 +1,79 @@
+from django.views.decorators.http import require_GET
+
+from backend.api.v1.suppliers import services
+from backend.core.db_router import read_connection, replica_reads
+from backend.shared.exceptions import ValidationException
+from backend.shared.utils import handle_exceptions, success_response
+from backend.shared.validators import parse_date_param
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _supplier_params(params):
+    firm_id, seller_id = params.get("firmId"), params.get("sellerId")
+    if bool(firm_id) == bool(seller_id):
+        raise ValidationException("Exactly one of firmId or sellerId is required")
+    return firm_id, seller_id
+
+
+def _int_param(params, name, default, lowest, highest):
+    try:
+        value = int(params.get(name, default))
+    except ValueError:
+        raise ValidationException(f"{name} must be an integer")
+    if not lowest <= value <= highest:
+        raise ValidationException(f"{name} must be between {lowest} and {highest}")
+    return value
+
+
+@require_GET
+@handle_exceptions
+@replica_reads
+def supplier_ledger(request):
+    """
+    Running purchase totals of a firm (with each of its sellers) or of a seller (with its firm).
+
+    Query params: firmId or sellerId. Totals cover every bill: count, fine weight
+    and value bought, fine weight returned as metal exchange, extra charges,
+    final weight / amount, and outstandingFnWt (bought minus exchanged).
+    """
+    firm_id, seller_id = _supplier_params(request.GET)
+    with read_connection().cursor() as cursor:
+        if firm_id:
+            data = services.firm_ledger(cursor, firm_id)
+        else:
+            data = services.seller_ledger(cursor, seller_id)
+    return success_response(data)
+
+
+@require_GET
+@handle_exceptions
+@replica_reads
+def supplier_statement(request):
+    """
+    A firm's or seller's bills, newest first, with the ledger totals.
+
+    Query params: firmId or sellerId, optional from/to (YYYY-MM-DD, bill date),
+    limit (default 50, at most 200) and offset.
+    """
+    firm_id, seller_id = _supplier_params(request.GET)
+    start = parse_date_param(request.GET.get("from"), "from")
+    end = parse_date_param(request.GET.get("to"), "to")
+    if start and end and start > end:
+        raise ValidationException("from must not be after to")
+    limit = _int_param(request.GET, "limit", DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    offset = _int_param(request.GET, "offset", 0, 0, 10 ** 9)
+
+    with read_connection().cursor() as cursor:
+        if firm_id:
+            ledger = services.firm_ledger(cursor, firm_id)["firm"]
+        else:
+            ledger = services.seller_ledger(cursor, seller_id)["seller"]
+        page = services.statement(cursor, firm_id, seller_id, start, end, limit, offset)
+    return success_response({
+        "ledger": ledger,
+        "from": start.isoformat() if start else None,
+        "to": end.isoformat() if end else None,
+        **page,
+    })
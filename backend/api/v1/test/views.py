@@ -2,6 +2,7 @@ from django.db import connection
 from django.http import HttpResponse, JsonResponse
 from django.views.decorators.http import require_GET, require_http_methods
 
+from backend.core.db_router import read_connection, replica_reads
 from backend.integrations.firebase.firebase_service import firebase_service
 
 
@@ -81,13 +82,15 @@ def list_users(request):
 
 
 @require_GET
+@replica_reads
 def list_vault_samples(request):
     """
-    Fetch sample rows from PostgreSQL table `vault_samples`.
+    Fetch sample rows from PostgreSQL table `vault_samples` (served by a replica when configured).
     """
     try:
         with connection.cursor() as cursor:
             _ensure_vault_samples_table(cursor)
+        with read_connection().cursor() as cursor:
             cursor.execute(
                 """
                 SELECT id, name, note, created_at
@@ -0,0 +1,142 @@
+"""Read-replica routing.
+
+Reads issued inside a `replica_reads` scope go to a healthy replica from
+settings.DATABASE_REPLICA_ALIASES; everything else uses `default`. A replica is
+skipped while its replication lag exceeds DATABASE_REPLICA_MAX_LAG seconds, and a
+scope is pinned to the primary after a write (read-your-writes). The pin is
+carried across requests by ReplicaRoutingMiddleware.
+"""
+
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+_replica_scope = ContextVar('replica_scope', default=False)
+_pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+_wrote = ContextVar('wrote', default=False)
+
+# alias -> (checked_at, lag_seconds or None when the check failed)
+_lag_cache = {}
+
+_LAG_QUERY = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICA_ALIASES', []))
+
+
+def replica_lag(alias):
+    """Return the replication lag of `alias` in seconds (cached), or None if it cannot be measured."""
+    now = time.monotonic()
+    cached = _lag_cache.get(alias)
+    if cached and now - cached[0] < settings.DATABASE_REPLICA_LAG_CHECK_INTERVAL:
+        return cached[1]
+
+    lag = 0.0
+    connection = connections[alias]
+    if connection.vendor == 'postgresql':
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(_LAG_QUERY)
+                lag = float(cursor.fetchone()[0] or 0)
+        except Exception as exc:
+            logger.warning(f"Replica {alias} lag check failed: {exc}")
+            lag = None
+    _lag_cache[alias] = (now, lag)
+    return lag
+
+
+def healthy_replicas():
+    max_lag = settings.DATABASE_REPLICA_MAX_LAG
+    healthy = []
+    for alias in replica_aliases():
+        lag = replica_lag(alias)
+        if lag is not None and lag <= max_lag:
+            healthy.append(alias)
+    return healthy
+
+
+def read_alias():
+    """Return the alias reads should use in the current context."""
+    if not _replica_scope.get() or _pinned_to_primary.get():
+        return DEFAULT_DB_ALIAS
+    replicas = healthy_replicas()
+    if not replicas:
+        return DEFAULT_DB_ALIAS
+    return random.choice(replicas)
+
+
+def read_connection():
+    """Return the connection raw-SQL reads should use in the current context."""
+    return connections[read_alias()]
+
+
+def mark_write():
+    """Record that the current context wrote to the primary; later reads stay on the primary."""
+    _pinned_to_primary.set(True)
+    _wrote.set(True)
+
+
+def wrote():
+    return _wrote.get()
+
+
+@contextmanager
+def routing_scope(pinned=False):
+    """Fresh routing state for one request; `pinned` starts it on the primary."""
+    pinned_token = _pinned_to_primary.set(pinned)
+    wrote_token = _wrote.set(False)
+    try:
+        yield
+    finally:
+        _pinned_to_primary.reset(pinned_token)
+        _wrote.reset(wrote_token)
+
+
+@contextmanager
+def use_replicas():
+    """Allow reads in this block to be served by a replica (reports, management commands)."""
+    token = _replica_scope.set(True)
+    try:
+        yield
+    finally:
+        _replica_scope.reset(token)
+
+
+def replica_reads(func):
+    """Decorator for read-only views whose queries may be served by a replica."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with use_replicas():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Database router applying the same replica selection to ORM queries."""
+
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        mark_write()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -2,6 +2,7 @@
 
 import json
 import logging
+import time
 from django.http import JsonResponse
 
 logger = logging.getLogger(__name__)
@@ -53,3 +54,39 @@ class LoggingMiddleware:
         response = self.get_response(request)
         logger.info(f"Response status: {response.status_code}")
         return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Keep a client's reads on the primary for a short while after it writes.
+
+    Unsafe requests (and any request that called db_router.mark_write) set a cookie
+    that pins the client to the primary for DATABASE_REPLICA_STICKY_SECONDS.
+    """
+
+    COOKIE_NAME = 'jv_db_pinned_until'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from django.conf import settings
+        from backend.core import db_router
+
+        if not db_router.replica_aliases():
+            return self.get_response(request)
+
+        try:
+            pinned_until = float(request.COOKIES.get(self.COOKIE_NAME, 0))
+        except ValueError:
+            pinned_until = 0
+        is_write = request.method not in ('GET', 'HEAD', 'OPTIONS')
+
+        with db_router.routing_scope(pinned=is_write or pinned_until > time.time()):
+            response = self.get_response(request)
+            wrote = is_write or db_router.wrote()
+
+        if wrote:
+            sticky = settings.DATABASE_REPLICA_STICKY_SECONDS
+            response.set_cookie(self.COOKIE_NAME, str(time.time() + sticky), max_age=sticky, httponly=True)
+        return response
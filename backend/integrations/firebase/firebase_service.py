@@ -19,6 +19,10 @@ class FirebaseService:
     
     def _initialize(self):
         """Initialize Firebase app and clients."""
+        if os.environ.get("FIRESTORE_EMULATOR_HOST"):
+            self._initialize_emulator()
+            return
+
         cred_path = os.environ.get(
             "GOOGLE_APPLICATION_CREDENTIALS",
             "backend/integrations/firebase/serviceAccountKey.json",
@@ -54,7 +58,22 @@ class FirebaseService:
             self.storage = storage.bucket()
         except Exception:
             self.storage = None
-    
+
+    def _initialize_emulator(self):
+        """
+        Talk to the Firestore emulator (or the bench_http stub) at FIRESTORE_EMULATOR_HOST.
+        No Google credentials are needed; storage is unavailable.
+        """
+        project = os.environ.get("GOOGLE_CLOUD_PROJECT", "jewel-vault")
+        self.app = firebase_admin.initialize_app(
+            credentials.ApplicationDefault(),
+            {"projectId": project},
+        )
+        # Without explicit credentials the client picks the emulator's anonymous ones.
+        self.db = firestore.Client(project=project)
+        self.messaging = messaging
+        self.storage = None
+
     # Firestore operations
     def get_collection(self, collection_name: str) -> List[Dict[str, Any]]:
         """Fetch all documents from a collection."""
@@ -103,13 +122,18 @@ class FirebaseService:
         return self.messaging.send(message)
     
     def send_multicast(self, tokens: List[str], title: str, body: str, data: Optional[Dict] = None) -> Any:
-        """Send a message to multiple devices."""
+        """Send a message to multiple devices (at most 500 tokens); returns a BatchResponse."""
         message = messaging.MulticastMessage(
             notification=messaging.Notification(title=title, body=body),
             data=data or {},
             tokens=tokens,
         )
-        return self.messaging.send_multicast(message)
+        # send_multicast went away with the FCM batch API; send_each_for_multicast replaces it.
+        return self.messaging.send_each_for_multicast(message)
+
+    def send_each(self, messages: List[Any]) -> Any:
+        """Send prepared messages, each to its own token (at most 500); returns a BatchResponse."""
+        return self.messaging.send_each(messages)
 
 
 # Singleton instance
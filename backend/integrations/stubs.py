@@ -0,0 +1,277 @@
+"""
+Local stand-ins for the external services the API calls, for load tests and offline runs.
+
+RateSiteStub serves the AngelOne, BankBazaar and GoodReturns rate pages, each under its
+own path prefix (/angelone, /bankbazaar, /goodreturns), with the markup the scrapers in
+metal_rate.views parse; point METAL_RATE_*_URL at base_url(source). FirestoreStub speaks
+the Firestore gRPC API for the call the app makes (RunQuery, i.e. collection streams)
+over in-memory documents; the Firestore client reaches it through
+FIRESTORE_EMULATOR_HOST. Every source has a StubBehaviour: a latency (plus uniform
+jitter) added to each response and a rate at which requests fail instead, with a 503 or
+UNAVAILABLE. Behaviours count what they served.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+import grpc
+from google.cloud.firestore_v1.types import Document, RunQueryRequest, RunQueryResponse, Value
+
+from backend.shared.constants import FIREBASE_TEST_COLLECTION
+
+RATE_SOURCES = ("angelone", "bankbazaar", "goodreturns")
+FIRESTORE_SOURCE = "firestore"
+STUB_SOURCES = RATE_SOURCES + (FIRESTORE_SOURCE,)
+
+# Rates the stub pages quote.
+GOLD_24K_PER_GRAM = 7245.5
+SILVER_PER_KG = 92500.0
+
+FIRESTORE_SERVICE = "google.firestore.v1.Firestore"
+DEFAULT_DOCUMENTS = {
+    FIREBASE_TEST_COLLECTION: {
+        f"user-{index}": {"name": f"Bench user {index}", "mobileNo": f"90000000{index:02d}", "active": True}
+        for index in range(1, 6)
+    },
+}
+
+
+class StubBehaviour:
+    """Latency and failure injection for one stubbed source, with counters of what it served."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, failure_rate: float = 0.0, seed=None):
+        if latency_ms < 0 or jitter_ms < 0:
+            raise ValueError("latency and jitter must not be negative")
+        if not 0 <= failure_rate <= 1:
+            raise ValueError("failure rate must be between 0 and 1")
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str, jitter_ms: float = 0.0, seed=None) -> "StubBehaviour":
+        """Build a behaviour from "LATENCY_MS[:FAILURE_RATE]", e.g. "250:0.05"."""
+        latency, _, failure_rate = spec.partition(":")
+        try:
+            return cls(float(latency), jitter_ms, float(failure_rate or 0), seed)
+        except ValueError as exc:
+            raise ValueError(f"Invalid stub behaviour '{spec}': {exc}") from None
+
+    def respond(self) -> bool:
+        """Wait out the injected latency; True when this request should fail."""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+            failed = self._random.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+        if delay > 0:
+            time.sleep(delay / 1000)
+        return failed
+
+    def summary(self) -> dict:
+        return {
+            "latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "failure_rate": self.failure_rate,
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+def _angelone_gold_page() -> str:
+    cells = "".join(f'<td class="MuiTableCell-root">{text}</td>' for text in (
+        "1 gm",
+        f"<div>&#8377;{GOLD_24K_PER_GRAM:,.2f}</div>",
+        f"<div>&#8377;{GOLD_24K_PER_GRAM * 22 / 24:,.2f}</div>",
+        "<div>0.00%</div>",
+    ))
+    return f'<table><tr class="MuiTableRow-root">{cells}</tr></table>'
+
+
+def _angelone_silver_page() -> str:
+    return f"<div><div>Silver / 1 kg</div><div>&#8377;{SILVER_PER_KG:,.2f}</div></div>"
+
+
+def _bankbazaar_gold_page() -> str:
+    today = datetime.now().strftime("%d %B %Y")
+    return (
+        "<table><tr><th>Parameters</th><th>Gold Price (24 Karat)</th></tr>"
+        f"<tr><td>Rate on {today}</td><td>&#8377;{GOLD_24K_PER_GRAM:,.2f} per gram</td></tr></table>"
+    )
+
+
+def _bankbazaar_silver_page() -> str:
+    today = datetime.now().strftime("%d %B %Y")
+    return (
+        "<table><tr><th>Parameters</th><th>Silver Price (1 Kg)</th></tr>"
+        f"<tr><td>Rate of silver on {today}</td><td>&#8377;{SILVER_PER_KG:,.2f}</td></tr></table>"
+    )
+
+
+def _goodreturns_gold_page() -> str:
+    return f"<table><tr><td>24K</td><td>&#8377;{GOLD_24K_PER_GRAM:,.2f}</td></tr></table>"
+
+
+def _goodreturns_silver_page() -> str:
+    return f"<table><tr><td>1 Kg</td><td>&#8377;{SILVER_PER_KG:,.2f}</td></tr></table>"
+
+
+# path -> (source, page). GoodReturns pages are per city: matched by prefix below.
+_RATE_PAGES = {
+    "/angelone/gold-rates-today": ("angelone", _angelone_gold_page),
+    "/angelone/silver-rates-today": ("angelone", _angelone_silver_page),
+    "/bankbazaar/gold-rate-india.html": ("bankbazaar", _bankbazaar_gold_page),
+    "/bankbazaar/silver-rate-india.html": ("bankbazaar", _bankbazaar_silver_page),
+}
+_CITY_PAGES = {
+    "/goodreturns/gold-rates/": ("goodreturns", _goodreturns_gold_page),
+    "/goodreturns/silver-rates/": ("goodreturns", _goodreturns_silver_page),
+}
+
+
+def _rate_page(path: str):
+    if path in _RATE_PAGES:
+        return _RATE_PAGES[path]
+    for prefix, page in _CITY_PAGES.items():
+        if path.startswith(prefix) and path.endswith(".html"):
+            return page
+    return None
+
+
+class RateSiteStub:
+    """Threaded HTTP server standing in for the three rate sites."""
+
+    def __init__(self, behaviours: Dict[str, StubBehaviour], host: str = "127.0.0.1", port: int = 0):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.behaviours = behaviours
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"{host}:{port}"
+
+    def base_url(self, source: str) -> str:
+        return f"http://{self.address}/{source}"
+
+    def start(self) -> "RateSiteStub":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="rate-site-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handle(self, request: BaseHTTPRequestHandler) -> None:
+        page = _rate_page(request.path.split("?", 1)[0])
+        if page is None:
+            self._reply(request, 404, "Not found")
+            return
+        source, render = page
+        if self.behaviours[source].respond():
+            self._reply(request, 503, "Injected failure")
+            return
+        self._reply(request, 200, f"<html><body>{render()}</body></html>")
+
+    @staticmethod
+    def _reply(request: BaseHTTPRequestHandler, status: int, body: str) -> None:
+        payload = body.encode("utf-8")
+        request.send_response(status)
+        request.send_header("Content-Type", "text/html; charset=utf-8")
+        request.send_header("Content-Length", str(len(payload)))
+        request.end_headers()
+        request.wfile.write(payload)
+
+
+def _value(value) -> Value:
+    if isinstance(value, bool):
+        return Value(boolean_value=value)
+    if isinstance(value, int):
+        return Value(integer_value=value)
+    if isinstance(value, float):
+        return Value(double_value=value)
+    if value is None:
+        return Value(null_value=0)
+    return Value(string_value=str(value))
+
+
+class FirestoreStub:
+    """
+    gRPC server answering Firestore RunQuery over `documents` ({collection: {docId: fields}}).
+    Filters, ordering and limits in the query are ignored: a collection streams whole.
+    """
+
+    def __init__(
+        self,
+        behaviour: StubBehaviour,
+        documents: Optional[Dict[str, Dict[str, dict]]] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        max_workers: int = 32,
+    ):
+        self.behaviour = behaviour
+        self.documents = DEFAULT_DOCUMENTS if documents is None else documents
+        self.server = grpc.server(ThreadPoolExecutor(max_workers=max_workers))
+        self.server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(FIRESTORE_SERVICE, {
+            "RunQuery": grpc.unary_stream_rpc_method_handler(
+                self._run_query,
+                request_deserializer=RunQueryRequest.deserialize,
+                response_serializer=RunQueryResponse.serialize,
+            ),
+        }),))
+        self.host = host
+        self.port = self.server.add_insecure_port(f"{host}:{port}")
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def start(self) -> "FirestoreStub":
+        self.server.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.stop(grace=None)
+
+    def _run_query(self, request, context):
+        if self.behaviour.respond():
+            context.abort(grpc.StatusCode.UNAVAILABLE, "Injected failure")
+        now = datetime.now(dt_timezone.utc)
+        collections = [selector.collection_id for selector in request.structured_query.from_]
+        for collection in collections:
+            for doc_id, fields in self.documents.get(collection, {}).items():
+                yield RunQueryResponse(
+                    document=Document(
+                        name=f"{request.parent}/{collection}/{doc_id}",
+                        fields={key: _value(value) for key, value in fields.items()},
+                        create_time=now,
+                        update_time=now,
+                    ),
+                    read_time=now,
+                )
+        # Like Firestore, an empty result still carries a read time.
+        yield RunQueryResponse(read_time=now)
@@ -0,0 +1,273 @@
+import json
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from backend.master_db_opration.query_catalogue import QUERY_CATALOGUE
+from backend.master_db_opration.views import MASTER_TABLE_DDL, master_index_ddl
+
+_SQLITE_INDEX_RE = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+_SQLITE_SCAN_RE = re.compile(r"^SCAN (\w+)")
+
+
+def _walk_plan(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk_plan(child)
+
+
+def _prefix_redundant(indexes):
+    """
+    indexes: (table, name, unique, partial, key columns) of every btree index.
+    Report each plain index whose key columns lead another full index on the
+    same table: any lookup it serves, the longer index serves as well.
+    """
+    redundant = []
+    for table, name, unique, partial, columns in indexes:
+        if unique or partial:
+            continue
+        for other_table, other, other_unique, other_partial, other_columns in indexes:
+            if other_table != table or other == name or other_partial or other_columns[:len(columns)] != columns:
+                continue
+            # Of two identical plain indexes only one is reported.
+            if len(other_columns) == len(columns) and not other_unique and other > name:
+                continue
+            redundant.append({'table': table, 'index': name, 'covered_by': other})
+            break
+    return redundant
+
+
+class Command(BaseCommand):
+    help = (
+        'EXPLAIN the canonical master-table queries and report sequential scans, unused indexes, '
+        'indexes made redundant by a longer one with the same leading columns, and index bloat'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Emit the report as JSON')
+        parser.add_argument(
+            '--allow-seqscan',
+            action='store_true',
+            help='Postgres only: keep enable_seqscan on (by default it is disabled so tiny tables still show index usage)',
+        )
+        parser.add_argument(
+            '--bloat-threshold',
+            type=float,
+            default=60.0,
+            help='Postgres only: report btree indexes whose average leaf density (%%) is below this value',
+        )
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor == 'postgresql':
+            queries = self._explain_postgres(options['allow_seqscan'])
+            unused = self._unused_postgres()
+            redundant = _prefix_redundant(self._indexes_postgres())
+            bloat = self._bloat_postgres(options['bloat_threshold'])
+        elif vendor == 'sqlite':
+            queries = self._explain_sqlite()
+            unused = self._unused_from_plans(queries)
+            redundant = _prefix_redundant(self._indexes_sqlite())
+            bloat = self._bloat_sqlite()
+        else:
+            self.stderr.write(f'Unsupported database vendor: {vendor}')
+            return
+
+        report = {
+            'db_vendor': vendor,
+            'queries': queries,
+            'seq_scans': [q['name'] for q in queries if q['seq_scans']],
+            'unused_indexes': unused,
+            'redundant_indexes': redundant,
+            'bloat': bloat,
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2, default=str))
+            return
+        self._write_text(report)
+
+    # EXPLAIN
+    def _explain_postgres(self, allow_seqscan):
+        results = []
+        for name, sql, params in QUERY_CATALOGUE:
+            with transaction.atomic(), connection.cursor() as cursor:
+                if not allow_seqscan:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            nodes = list(_walk_plan(plan[0]['Plan']))
+            results.append({
+                'name': name,
+                'seq_scans': sorted({n['Relation Name'] for n in nodes if n['Node Type'] == 'Seq Scan'}),
+                'indexes': sorted({n['Index Name'] for n in nodes if 'Index Name' in n}),
+                'total_cost': plan[0]['Plan'].get('Total Cost'),
+            })
+        return results
+
+    def _explain_sqlite(self):
+        results = []
+        with connection.cursor() as cursor:
+            for name, sql, params in QUERY_CATALOGUE:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                details = [row[3] for row in cursor.fetchall()]
+                seq_scans, indexes = set(), set()
+                for detail in details:
+                    indexes.update(_SQLITE_INDEX_RE.findall(detail))
+                    scan = _SQLITE_SCAN_RE.match(detail)
+                    if scan and 'USING' not in detail:
+                        seq_scans.add(scan.group(1))
+                results.append({
+                    'name': name,
+                    'seq_scans': sorted(seq_scans),
+                    'indexes': sorted(indexes),
+                    'temp_sort': any('TEMP B-TREE' in d for d in details),
+                })
+        return results
+
+    # Unused indexes
+    def _unused_postgres(self):
+        tables = [name for name, _ in MASTER_TABLE_DDL]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT s.relname, s.indexrelname, s.idx_scan, pg_relation_size(s.indexrelid)
+                FROM pg_stat_user_indexes s
+                JOIN pg_index i ON i.indexrelid = s.indexrelid
+                WHERE s.relname = ANY(%s) AND NOT i.indisprimary AND NOT i.indisunique AND s.idx_scan = 0
+                ORDER BY pg_relation_size(s.indexrelid) DESC
+                """,
+                [tables],
+            )
+            return [
+                {'table': row[0], 'index': row[1], 'scans': row[2], 'size_bytes': row[3]}
+                for row in cursor.fetchall()
+            ]
+
+    def _unused_from_plans(self, queries):
+        # SQLite keeps no usage statistics: report indexes no catalogued query picks.
+        used = {index.lower() for q in queries for index in q['indexes']}
+        return [
+            {'index': name, 'scans': None, 'note': 'not used by any catalogued query'}
+            for name, _ in master_index_ddl(connection.vendor)
+            if name.lower() not in used
+        ]
+
+    # Redundant indexes
+    def _indexes_postgres(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT t.relname, c.relname, i.indisunique, i.indpred IS NOT NULL,
+                       ARRAY(
+                           SELECT pg_get_indexdef(i.indexrelid, k, true)
+                           FROM generate_series(1, i.indnkeyatts) k ORDER BY k
+                       )
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                JOIN pg_class t ON t.oid = i.indrelid
+                JOIN pg_am am ON am.oid = c.relam AND am.amname = 'btree'
+                WHERE t.relname = ANY(%s)
+                ORDER BY t.relname, c.relname
+                """,
+                [[name for name, _ in MASTER_TABLE_DDL]],
+            )
+            return [(row[0], row[1], row[2], row[3], list(row[4])) for row in cursor.fetchall()]
+
+    def _indexes_sqlite(self):
+        indexes = []
+        with connection.cursor() as cursor:
+            for table, _ in MASTER_TABLE_DDL:
+                cursor.execute(f'PRAGMA index_list({connection.ops.quote_name(table)})')
+                for _, name, unique, _, partial in sorted(cursor.fetchall(), key=lambda row: row[1]):
+                    cursor.execute(f'PRAGMA index_info({connection.ops.quote_name(name)})')
+                    # Expression keys have no column name; they only ever match themselves.
+                    columns = [column or f'{name}#{position}' for position, _, column in cursor.fetchall()]
+                    indexes.append((table, name, bool(unique), bool(partial), columns))
+        return indexes
+
+    # Bloat
+    def _bloat_postgres(self, threshold):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pgstattuple'")
+            if cursor.fetchone() is None:
+                return {'available': False, 'note': 'CREATE EXTENSION pgstattuple to enable index bloat estimates'}
+            cursor.execute(
+                """
+                SELECT s.indexrelname, p.avg_leaf_density, p.leaf_fragmentation, p.index_size
+                FROM pg_stat_user_indexes s
+                JOIN pg_class c ON c.oid = s.indexrelid
+                JOIN pg_am am ON am.oid = c.relam AND am.amname = 'btree'
+                CROSS JOIN LATERAL pgstatindex(s.indexrelid::regclass) p
+                WHERE s.relname = ANY(%s) AND p.avg_leaf_density < %s
+                ORDER BY p.index_size DESC
+                """,
+                [[name for name, _ in MASTER_TABLE_DDL], threshold],
+            )
+            rows = cursor.fetchall()
+        return {
+            'available': True,
+            'threshold': threshold,
+            'indexes': [
+                {'index': row[0], 'avg_leaf_density': row[1], 'leaf_fragmentation': row[2], 'size_bytes': row[3]}
+                for row in rows
+            ],
+        }
+
+    def _bloat_sqlite(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA page_count')
+            page_count = cursor.fetchone()[0]
+            cursor.execute('PRAGMA freelist_count')
+            freelist_count = cursor.fetchone()[0]
+        return {
+            'available': True,
+            'page_count': page_count,
+            'freelist_count': freelist_count,
+            'free_ratio': round(freelist_count / page_count, 4) if page_count else 0.0,
+            'note': 'SQLite reports free pages for the whole file; run VACUUM to reclaim them',
+        }
+
+    def _write_text(self, report):
+        self.stdout.write(f"Index audit ({report['db_vendor']})")
+        for query in report['queries']:
+            if query['seq_scans']:
+                status = self.style.ERROR(f"SEQ SCAN on {', '.join(query['seq_scans'])}")
+            else:
+                status = self.style.SUCCESS('indexed')
+            indexes = ', '.join(query['indexes']) or '-'
+            self.stdout.write(f"  {query['name']:<32} {status}  [{indexes}]")
+
+        self.stdout.write('Unused indexes:')
+        if not report['unused_indexes']:
+            self.stdout.write('  none')
+        for entry in report['unused_indexes']:
+            self.stdout.write(self.style.WARNING(f"  {entry['index']} ({entry.get('note') or 'idx_scan = 0'})"))
+
+        self.stdout.write('Redundant indexes:')
+        if not report['redundant_indexes']:
+            self.stdout.write('  none')
+        for entry in report['redundant_indexes']:
+            self.stdout.write(self.style.WARNING(f"  {entry['index']} (leads {entry['covered_by']})"))
+
+        bloat = report['bloat']
+        self.stdout.write('Index bloat:')
+        if not bloat.get('available'):
+            self.stdout.write(f"  {bloat['note']}")
+        elif 'indexes' in bloat:
+            if not bloat['indexes']:
+                self.stdout.write(f"  no btree index below {bloat['threshold']}% leaf density")
+            for entry in bloat['indexes']:
+                self.stdout.write(self.style.WARNING(
+                    f"  {entry['index']}: {entry['avg_leaf_density']}% leaf density, {entry['size_bytes']} bytes"
+                ))
+        else:
+            self.stdout.write(f"  {bloat['freelist_count']}/{bloat['page_count']} free pages ({bloat['note']})")
+
+        if report['seq_scans']:
+            self.stdout.write(self.style.ERROR(f"{len(report['seq_scans'])} catalogued queries need a sequential scan"))
+        else:
+            self.stdout.write(self.style.SUCCESS('All catalogued queries are served by an index'))
@@ -0,0 +1,69 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from backend.api.v1.dashboard import rollups
+from backend.master_db_opration.cold_archive import table_sources
+from backend.shared.exceptions import ValidationException
+from backend.shared.validators import parse_date_param
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the daily dashboard rollups (daily_sales, daily_order_totals, daily_payments) '
+        'for a range of store-local days from "order", order_item, exchange_item and '
+        'customer_transaction. Existing rollup rows in the range are replaced. Without --from '
+        'the range starts at the oldest order or transaction.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store-id', help='Only rebuild the rollups of this store')
+        parser.add_argument('--from', dest='start', help='First day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='end', help='Last day to rebuild (YYYY-MM-DD, default today)')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Days rebuilt per transaction')
+        parser.add_argument('--json', action='store_true', help='Emit the summary as JSON')
+
+    def handle(self, *args, **options):
+        try:
+            start = parse_date_param(options['start'], '--from')
+            end = parse_date_param(options['end'], '--to')
+        except ValidationException as exc:
+            raise CommandError(exc.message)
+        end = end or rollups.sale_date(timezone.now())
+        start = start or self._first_day(options['store_id']) or end
+        if start > end:
+            raise CommandError('--from must not be after --to')
+
+        written = {table: 0 for table in rollups.ROLLUP_TABLES}
+        chunk = timedelta(days=max(options['chunk_days'], 1))
+        day = start
+        while day <= end:
+            last = min(day + chunk - timedelta(days=1), end)
+            for table, count in rollups.backfill(day, last, options['store_id']).items():
+                written[table] += count
+            if not options['json']:
+                self.stdout.write(f'{day} .. {last}: done')
+            day = last + timedelta(days=1)
+
+        summary = {'storeId': options['store_id'], 'from': start.isoformat(), 'to': end.isoformat(), 'rows': written}
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {start} .. {end}: " + ', '.join(f'{table}={count}' for table, count in written.items())
+        ))
+
+    def _first_day(self, store_id):
+        scope, params = ('WHERE storeId = %s', [store_id]) if store_id else ('', [])
+        with connection.cursor() as cursor:
+            sources = table_sources(cursor, ['order', 'customer_transaction'], store_id)
+            cursor.execute(
+                f"SELECT MIN(orderDate) FROM {sources['order']} o {scope} "
+                f"UNION ALL SELECT MIN(transactionDate) FROM {sources['customer_transaction']} t {scope}",
+                params * 2,
+            )
+            moments = [row[0] for row in cursor.fetchall() if row[0] is not None]
+        return min(rollups.sale_date(moment) for moment in moments) if moments else None
@@ -0,0 +1,91 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure per-request database latency with fresh, persistent and pooled connections. '
+        'Each simulated request fires request_started/request_finished around one query, exactly '
+        'like a view, so connection setup (including TLS) is included whenever Django reconnects.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Simulated requests per mode')
+        parser.add_argument('--database', default='default', help='Database alias to copy connection settings from')
+        parser.add_argument('--query', default='SELECT 1', help='Query each simulated request runs')
+        parser.add_argument('--json', action='store_true', help='Emit the results as JSON')
+
+    def handle(self, *args, **options):
+        base = dict(connections.settings[options['database']])
+        modes = [('fresh', 0, None), ('persistent', None, None)]
+        if base['ENGINE'] == 'django.db.backends.postgresql':
+            try:
+                import psycopg_pool  # noqa: F401
+            except ImportError:
+                self.stderr.write('psycopg_pool is not installed; skipping the pooled mode')
+            else:
+                pool = base['OPTIONS'].get('pool')
+                modes.append(('pooled', 0, pool if isinstance(pool, dict) else {'min_size': 1, 'max_size': 2}))
+
+        results = []
+        for mode, conn_max_age, pool in modes:
+            alias = f'bench_{mode}'
+            options_dict = {key: value for key, value in base['OPTIONS'].items() if key != 'pool'}
+            if pool is not None:
+                options_dict['pool'] = pool
+            connections.settings[alias] = {**base, 'CONN_MAX_AGE': conn_max_age, 'OPTIONS': options_dict}
+            try:
+                samples = self._run(alias, options['requests'], options['query'])
+            finally:
+                connection = connections[alias]
+                connection.close()
+                if pool is not None:
+                    connection.close_pool()
+                del connections[alias]
+                del connections.settings[alias]
+            results.append({
+                'mode': mode,
+                'requests': len(samples),
+                'mean_ms': round(statistics.fmean(samples), 3),
+                'p50_ms': round(_percentile(samples, 50), 3),
+                'p95_ms': round(_percentile(samples, 95), 3),
+                'p99_ms': round(_percentile(samples, 99), 3),
+            })
+
+        if options['json']:
+            self.stdout.write(json.dumps({'engine': base['ENGINE'], 'results': results}, indent=2))
+            return
+
+        self.stdout.write(f"{base['ENGINE']} ({options['requests']} requests per mode)")
+        self.stdout.write(f"  {'mode':<12}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}  (ms)")
+        for row in results:
+            self.stdout.write(
+                f"  {row['mode']:<12}{row['mean_ms']:>10}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}"
+            )
+        fresh = results[0]['mean_ms']
+        for row in results[1:]:
+            if row['mean_ms']:
+                self.stdout.write(self.style.SUCCESS(f"  {row['mode']}: {fresh / row['mean_ms']:.1f}x faster than fresh"))
+
+    def _run(self, alias, count, query):
+        samples = []
+        for _ in range(count):
+            started = time.perf_counter()
+            request_started.send(sender=self.__class__)
+            with connections[alias].cursor() as cursor:
+                cursor.execute(query)
+                cursor.fetchall()
+            request_finished.send(sender=self.__class__)
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
@@ -0,0 +1,356 @@
+import http.client
+import importlib.util
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from backend.api.v1.reports.gst import store_today
+from backend.integrations.stubs import (
+    FIRESTORE_SOURCE,
+    RATE_SOURCES,
+    STUB_SOURCES,
+    FirestoreStub,
+    RateSiteStub,
+    StubBehaviour,
+)
+
+SERVERS = ("gunicorn", "uvicorn")
+READY_PATH = "/api/v1/ping/"
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _first(cursor, sql, params):
+    cursor.execute(sql, params)
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the HTTP API end to end. Boots the app under gunicorn (gthread) or uvicorn on a '
+        'local port, with the rate sites and Firestore replaced by local stubs whose latency and '
+        'failure rate are configurable, then drives a weighted mix of endpoints from concurrent '
+        'keep-alive clients for a fixed time. Reports RPS, p50/p95/p99 latency and the error rate per '
+        'endpoint; --output keeps the result as a JSON baseline. Needs a populated database '
+        '(see generate_master_data).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=SERVERS, default='gunicorn', help='Application server to boot')
+        parser.add_argument('--workers', type=int, default=2, help='Server worker processes')
+        parser.add_argument('--threads', type=int, default=4, help='Threads per gunicorn worker')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent client connections')
+        parser.add_argument('--duration', type=float, default=20, help='Measured seconds of load')
+        parser.add_argument('--warmup', type=float, default=3, help='Seconds of load before measuring starts')
+        parser.add_argument('--timeout', type=float, default=30, help='Client timeout per request in seconds')
+        parser.add_argument('--boot-timeout', type=float, default=30, help='Seconds to wait for the server')
+        parser.add_argument('--store-id', help='Store the endpoints query (default the one with most orders)')
+        parser.add_argument(
+            '--endpoints',
+            help='Comma-separated endpoint names to drive (default all); see the report for the names',
+        )
+        parser.add_argument(
+            '--stub-latency', default='50',
+            help='Latency of every stub as LATENCY_MS[:FAILURE_RATE], e.g. 50 or 200:0.05',
+        )
+        parser.add_argument('--stub-jitter', type=float, default=10, help='Uniform +/- jitter of stub latency in ms')
+        parser.add_argument(
+            '--stub', action='append', default=[], metavar='SOURCE=LATENCY_MS[:FAILURE_RATE]',
+            help=f"Override one stub ({', '.join(STUB_SOURCES)}); repeatable",
+        )
+        parser.add_argument('--seed', type=int, default=1, help='Seed of the endpoint mix and injected failures')
+        parser.add_argument('--output', help='Write the JSON result to this file')
+        parser.add_argument('--json', action='store_true', help='Emit the results as JSON')
+
+    def handle(self, *args, **options):
+        if options['server'] == 'uvicorn' and importlib.util.find_spec('uvicorn') is None:
+            raise CommandError('uvicorn is not installed')
+        if options['duration'] <= 0 or options['concurrency'] < 1:
+            raise CommandError('--duration and --concurrency must be positive')
+        behaviours = self._behaviours(options)
+        endpoints = self._endpoints(options['store_id'], options['endpoints'])
+
+        rate_sites = RateSiteStub({source: behaviours[source] for source in RATE_SOURCES}).start()
+        firestore = FirestoreStub(behaviours[FIRESTORE_SOURCE]).start()
+        try:
+            port = _free_port()
+            env = {
+                **os.environ,
+                **{f'METAL_RATE_{source.upper()}_URL': rate_sites.base_url(source) for source in RATE_SOURCES},
+                'FIRESTORE_EMULATOR_HOST': firestore.address,
+                'GOOGLE_CLOUD_PROJECT': os.environ.get('GOOGLE_CLOUD_PROJECT', 'jewel-vault-bench'),
+            }
+            with tempfile.TemporaryFile() as server_log:
+                server = subprocess.Popen(
+                    self._server_command(options, port), cwd=settings.BASE_DIR, env=env,
+                    stdout=server_log, stderr=subprocess.STDOUT,
+                )
+                try:
+                    self._wait_ready(server, server_log, port, options['boot_timeout'])
+                    samples, seconds = self._load(port, endpoints, options)
+                finally:
+                    server.terminate()
+                    try:
+                        server.wait(timeout=10)
+                    except subprocess.TimeoutExpired:
+                        server.kill()
+                        server.wait()
+        finally:
+            rate_sites.stop()
+            firestore.stop()
+
+        result = {
+            'server': {
+                'kind': options['server'],
+                'workers': options['workers'],
+                'threads': options['threads'] if options['server'] == 'gunicorn' else None,
+                'vendor': connection.vendor,
+            },
+            'load': {
+                'concurrency': options['concurrency'],
+                'duration': round(seconds, 2),
+                'warmup': options['warmup'],
+                'seed': options['seed'],
+            },
+            'stubs': {source: behaviour.summary() for source, behaviour in behaviours.items()},
+            'endpoints': [
+                self._summarise(endpoint['name'], endpoint, samples[endpoint['name']], seconds)
+                for endpoint in endpoints
+            ],
+        }
+        every = [sample for name in samples for sample in samples[name]]
+        result['total'] = self._summarise('total', None, every, seconds)
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(result, handle, indent=2)
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+        self._print(result, options)
+
+    def _behaviours(self, options):
+        jitter = options['stub_jitter']
+        try:
+            default = StubBehaviour.parse(options['stub_latency'], jitter)
+            behaviours = {
+                source: StubBehaviour(default.latency_ms, jitter, default.failure_rate, options['seed'] + index)
+                for index, source in enumerate(STUB_SOURCES)
+            }
+            for override in options['stub']:
+                source, _, spec = override.partition('=')
+                if source not in behaviours or not spec:
+                    raise ValueError(f"--stub must be SOURCE=LATENCY_MS[:FAILURE_RATE] with SOURCE one of "
+                                     f"{', '.join(STUB_SOURCES)}")
+                behaviours[source] = StubBehaviour.parse(
+                    spec, jitter, options['seed'] + STUB_SOURCES.index(source)
+                )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        return behaviours
+
+    def _endpoints(self, store_id, names):
+        """The endpoint mix, with ids taken from the store's data; endpoints without data are left out."""
+        with connection.cursor() as cursor:
+            store_id = store_id or _first(
+                cursor, 'SELECT storeId FROM "order" GROUP BY storeId ORDER BY COUNT(*) DESC LIMIT 1', []
+            ) or _first(cursor, 'SELECT storeId FROM store ORDER BY storeId LIMIT 1', [])
+            if not store_id:
+                raise CommandError('No store to benchmark; load data first (generate_master_data)')
+            order_id = _first(
+                cursor, 'SELECT orderId FROM "order" WHERE storeId = %s ORDER BY orderDate DESC LIMIT 1', [store_id]
+            )
+            firm_id = _first(
+                cursor, 'SELECT sellerFirmId FROM item WHERE storeId = %s AND sellerFirmId IS NOT NULL LIMIT 1',
+                [store_id],
+            )
+            cursor.execute(
+                'SELECT itemId, itemAddName FROM item WHERE storeId = %s ORDER BY itemId LIMIT 5', [store_id]
+            )
+            items = cursor.fetchall()
+
+        query = f'storeId={store_id}'
+        month = store_today().strftime('%Y-%m')
+        endpoints = [
+            ('ping', 'GET', '/api/v1/ping/', None, 1),
+            ('metal_rate', 'GET', '/api/v1/metal-rate', None, 1),
+            ('firestore_users', 'GET', '/api/v1/users/', None, 1),
+            ('stock_valuation', 'GET', f'/api/v1/inventory/valuation/?{query}', None, 2),
+            ('inventory_items', 'GET', f'/api/v1/inventory/items/?{query}&limit=50', None, 4),
+            ('category_tree', 'GET', f'/api/v1/inventory/categories/tree/?{query}', None, 2),
+            ('dashboard_sales', 'GET', f'/api/v1/dashboard/sales/?{query}', None, 3),
+            ('khata_books', 'GET', f'/api/v1/customers/khata/?{query}', None, 2),
+            ('gst_report', 'GET', f'/api/v1/reports/gst/?{query}&period={month}', None, 1),
+        ]
+        if items:
+            search_term = (items[0][1] or '').split(' ')[0][:6]
+            if len(search_term) >= 2:
+                endpoints.append(('search', 'GET', f'/api/v1/search/?{query}&q={search_term}', None, 4))
+            body = json.dumps({'storeId': store_id, 'itemIds': [item_id for item_id, _ in items]})
+            endpoints.append(('billing_quote', 'POST', '/api/v1/billing/quote/', body, 3))
+        if order_id:
+            endpoints.append(('invoice', 'GET', f'/api/v1/billing/invoice/?{query}&orderId={order_id}', None, 2))
+        if firm_id:
+            endpoints.append(('supplier_ledger', 'GET', f'/api/v1/suppliers/ledger/?firmId={firm_id}', None, 1))
+
+        endpoints = [
+            {'name': name, 'method': method, 'path': path, 'body': body, 'weight': weight}
+            for name, method, path, body, weight in endpoints
+        ]
+        if names:
+            wanted = [name.strip() for name in names.split(',') if name.strip()]
+            known = {endpoint['name'] for endpoint in endpoints}
+            unknown = [name for name in wanted if name not in known]
+            if unknown:
+                raise CommandError(
+                    f"Unknown or unavailable endpoint(s): {', '.join(unknown)} (available: {', '.join(sorted(known))})"
+                )
+            endpoints = [endpoint for endpoint in endpoints if endpoint['name'] in wanted]
+        return endpoints
+
+    def _server_command(self, options, port):
+        if options['server'] == 'uvicorn':
+            return [
+                sys.executable, '-m', 'uvicorn', 'backend.asgi:application', '--host', '127.0.0.1',
+                '--port', str(port), '--workers', str(options['workers']), '--log-level', 'warning',
+            ]
+        return [
+            sys.executable, '-m', 'gunicorn', 'backend.wsgi:application', '--bind', f'127.0.0.1:{port}',
+            '--workers', str(options['workers']), '--threads', str(options['threads']),
+            '--worker-class', 'gthread', '--timeout', '120', '--log-level', 'warning',
+        ]
+
+    def _wait_ready(self, server, server_log, port, boot_timeout):
+        deadline = time.monotonic() + boot_timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                server_log.seek(0)
+                output = server_log.read().decode('utf-8', errors='replace')[-2000:]
+                raise CommandError(f'The server exited with status {server.returncode}:\n{output}')
+            try:
+                client = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+                client.request('GET', READY_PATH)
+                if client.getresponse().status == 200:
+                    client.close()
+                    return
+                client.close()
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise CommandError(f'The server did not answer {READY_PATH} within {boot_timeout}s')
+
+    def _load(self, port, endpoints, options):
+        """Run the clients; returns ({endpoint: [(ms, status)]}, measured seconds)."""
+        weights = [endpoint['weight'] for endpoint in endpoints]
+        measure_from = time.monotonic() + options['warmup']
+        stop_at = measure_from + options['duration']
+        per_thread = []
+
+        def worker(index):
+            samples = {endpoint['name']: [] for endpoint in endpoints}
+            per_thread.append(samples)
+            rng = random.Random(options['seed'] * 1000 + index)
+            client = http.client.HTTPConnection('127.0.0.1', port, timeout=options['timeout'])
+            while True:
+                endpoint = rng.choices(endpoints, weights)[0]
+                headers = {'Content-Type': 'application/json'} if endpoint['body'] else {}
+                started = time.monotonic()
+                if started >= stop_at:
+                    break
+                try:
+                    client.request(endpoint['method'], endpoint['path'], body=endpoint['body'], headers=headers)
+                    response = client.getresponse()
+                    response.read()
+                    status = response.status
+                except (OSError, http.client.HTTPException):
+                    status = None
+                    client.close()
+                    client = http.client.HTTPConnection('127.0.0.1', port, timeout=options['timeout'])
+                if started >= measure_from:
+                    samples[endpoint['name']].append(((time.monotonic() - started) * 1000, status))
+            client.close()
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Requests still running at stop_at finish late; measure up to the last of them.
+        seconds = max(options['duration'], time.monotonic() - measure_from)
+
+        merged = {endpoint['name']: [] for endpoint in endpoints}
+        for samples in per_thread:
+            for name, values in samples.items():
+                merged[name].extend(values)
+        return merged, seconds
+
+    def _summarise(self, name, endpoint, samples, seconds):
+        latencies = [elapsed for elapsed, _ in samples]
+        statuses = {}
+        for _, status in samples:
+            key = str(status) if status is not None else 'connection_error'
+            statuses[key] = statuses.get(key, 0) + 1
+        errors = sum(1 for _, status in samples if status is None or status >= 400)
+        summary = {'name': name}
+        if endpoint is not None:
+            summary.update({'method': endpoint['method'], 'path': endpoint['path'], 'weight': endpoint['weight']})
+        summary.update({
+            'requests': len(samples),
+            'errors': errors,
+            'error_rate': round(errors / len(samples), 4) if samples else None,
+            'rps': round(len(samples) / seconds, 2),
+            'mean_ms': round(statistics.fmean(latencies), 3) if latencies else None,
+            'p50_ms': round(_percentile(latencies, 50), 3) if latencies else None,
+            'p95_ms': round(_percentile(latencies, 95), 3) if latencies else None,
+            'p99_ms': round(_percentile(latencies, 99), 3) if latencies else None,
+            'statuses': statuses,
+        })
+        return summary
+
+    def _print(self, result, options):
+        server, load = result['server'], result['load']
+        threads = f" x {server['threads']} threads" if server['threads'] else ''
+        self.stdout.write(
+            f"{server['kind']} ({server['workers']} workers{threads}, {server['vendor']}), "
+            f"{load['concurrency']} clients for {load['duration']} s"
+        )
+        self.stdout.write(
+            f"  {'endpoint':<18}{'requests':>9}{'rps':>9}{'errors':>8}{'p50':>10}{'p95':>10}{'p99':>10}  (ms)"
+        )
+        for row in result['endpoints'] + [result['total']]:
+            if not row['requests']:
+                self.stdout.write(f"  {row['name']:<18}{0:>9}")
+                continue
+            line = (
+                f"  {row['name']:<18}{row['requests']:>9}{row['rps']:>9}{row['error_rate']:>8.1%}"
+                f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+            )
+            self.stdout.write(self.style.ERROR(line) if row['errors'] else line)
+        self.stdout.write('  stubs: ' + ', '.join(
+            f"{source} {stub['requests']} req / {stub['failures']} failed"
+            for source, stub in result['stubs'].items()
+        ))
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['output']}"))
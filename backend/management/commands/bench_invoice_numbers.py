@@ -0,0 +1,152 @@
+import json
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from backend.api.v1.billing.numbering import STRATEGIES, build_allocator
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark invoice number allocation under concurrent checkouts. Every simulated order '
+        'takes a number and holds its transaction open for --hold-ms; the "locked" baseline '
+        'increments store.invoiceNo inside that transaction, the allocators take it before. '
+        'Runs against a throwaway store.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent workers')
+        parser.add_argument('--orders', type=int, default=400, help='Orders per strategy (split across threads)')
+        parser.add_argument('--hold-ms', type=float, default=2.0, help='Simulated order work inside the transaction')
+        parser.add_argument('--block-size', type=int, default=20, help='Block / sequence cache size')
+        parser.add_argument('--strategies', default='locked,' + ','.join(STRATEGIES),
+                            help='Comma separated strategies to run (locked, block, sequence)')
+        parser.add_argument('--json', action='store_true', help='Emit the results as JSON')
+
+    def handle(self, *args, **options):
+        strategies = [name.strip() for name in options['strategies'].split(',') if name.strip()]
+        unknown = set(strategies) - {'locked', *STRATEGIES}
+        if unknown:
+            raise CommandError(f"Unknown strategies: {', '.join(sorted(unknown))}")
+        if 'sequence' in strategies and connections[DEFAULT_DB_ALIAS].vendor != 'postgresql':
+            self.stderr.write('Skipping the sequence strategy: it requires PostgreSQL')
+            strategies.remove('sequence')
+
+        results = []
+        for strategy in strategies:
+            store_id, user_id = self._create_store()
+            try:
+                results.append(self._run(strategy, store_id, options))
+            finally:
+                self._drop_store(store_id, user_id)
+
+        if options['json']:
+            self.stdout.write(json.dumps({'vendor': connections[DEFAULT_DB_ALIAS].vendor, 'results': results}, indent=2))
+            return
+
+        self.stdout.write(
+            f"{connections[DEFAULT_DB_ALIAS].vendor}: {options['orders']} orders, {options['threads']} threads, "
+            f"{options['hold_ms']} ms held per order"
+        )
+        self.stdout.write(f"  {'strategy':<10}{'orders/s':>10}{'p50':>9}{'p99':>9}{'errors':>8}{'gaps':>6}  unique")
+        for row in results:
+            style = self.style.SUCCESS if row['unique'] else self.style.ERROR
+            self.stdout.write(style(
+                f"  {row['strategy']:<10}{row['orders_per_sec']:>10}{row['p50_ms']:>9}{row['p99_ms']:>9}"
+                f"{row['errors']:>8}{row['gaps']:>6}  {row['unique']}"
+            ))
+
+    def _create_store(self):
+        suffix = uuid.uuid4().hex[:12]
+        user_id, store_id = f'bench-user-{suffix}', f'bench-store-{suffix}'
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO users (userId, name, mobileNo, role) VALUES (%s, %s, %s, %s)",
+                [user_id, 'Invoice benchmark', '0000000000', 'bench'],
+            )
+            cursor.execute(
+                "INSERT INTO store (storeId, userId, proprietor, name, email, phone, address, registrationNo, "
+                "gstinNo, panNo, image, invoiceNo) VALUES (%s, %s, '', 'Invoice benchmark', '', '', '', '', '', '', '', 0)",
+                [store_id, user_id],
+            )
+        return store_id, user_id
+
+    def _drop_store(self, store_id, user_id):
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute("DELETE FROM store WHERE storeId = %s", [store_id])
+            cursor.execute("DELETE FROM users WHERE userId = %s", [user_id])
+
+    def _run(self, strategy, store_id, options):
+        threads_count = max(1, options['threads'])
+        per_thread = max(1, options['orders'] // threads_count)
+        hold = options['hold_ms'] / 1000
+        allocator = None if strategy == 'locked' else build_allocator(strategy, options['block_size'])
+        issued, latencies, errors = [], [], []
+        guard = threading.Lock()
+
+        def take_locked():
+            # The row lock taken here is held until the order transaction commits.
+            with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+                cursor.execute(
+                    "UPDATE store SET invoiceNo = invoiceNo + 1 WHERE storeId = %s RETURNING invoiceNo", [store_id]
+                )
+                return cursor.fetchone()[0]
+
+        def worker():
+            mine, times = [], []
+            try:
+                for _ in range(per_thread):
+                    started = time.perf_counter()
+                    try:
+                        # Allocators run before the order transaction opens, as billing.create_order does.
+                        number = None if allocator is None else allocator.allocate(store_id)[0]
+                        with transaction.atomic():
+                            if number is None:
+                                number = take_locked()
+                            time.sleep(hold)
+                    except Exception as exc:  # noqa: BLE001 - reported, not fatal
+                        with guard:
+                            errors.append(str(exc))
+                        continue
+                    times.append((time.perf_counter() - started) * 1000)
+                    mine.append(number)
+            finally:
+                if allocator is not None:
+                    allocator.close()
+                connections.close_all()
+            with guard:
+                issued.extend(mine)
+                latencies.extend(times)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads_count)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if strategy == 'sequence':
+            allocator.drop(store_id)
+            allocator.close()
+
+        return {
+            'strategy': strategy,
+            'orders': len(issued),
+            'seconds': round(elapsed, 3),
+            'orders_per_sec': round(len(issued) / elapsed, 1) if elapsed else 0,
+            'p50_ms': round(_percentile(latencies, 50), 2) if latencies else None,
+            'p99_ms': round(_percentile(latencies, 99), 2) if latencies else None,
+            'errors': len(errors),
+            'unique': len(issued) == len(set(issued)),
+            'gaps': (max(issued) - min(issued) + 1 - len(set(issued))) if issued else 0,
+        }
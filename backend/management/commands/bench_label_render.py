@@ -0,0 +1,82 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from backend.api.v1.labels import services
+from backend.api.v1.labels.compiler import (
+    DEFAULT_DPI, LABEL_ITEM_COLUMNS, LANGUAGE_FILES, compile_template, render,
+)
+from backend.shared.constants import DB_BATCH_SIZE
+from backend.shared.exceptions import ApplicationException
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark label rendering: compile a label template once per printer language and render '
+        'a store\'s items against it, reporting compile time and labels per second. Items are read '
+        'before timing starts, so the figures cover compiling and rendering only.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--template-id', required=True, help='label_template to render')
+        parser.add_argument('--store-id', required=True, help='Store whose items are labelled')
+        parser.add_argument('--items', type=int, default=10000,
+                            help='Labels to render (items repeat if the store has fewer)')
+        parser.add_argument('--languages', default=','.join(LANGUAGE_FILES),
+                            help='Comma separated printer languages (TSPL, ZPL, ESC_POS)')
+        parser.add_argument('--dpi', type=int, default=DEFAULT_DPI, help='Printer resolution')
+        parser.add_argument('--json', action='store_true', help='Emit the results as JSON')
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            try:
+                template, elements = services.load_template(cursor, options['template_id'])
+            except ApplicationException as exc:
+                raise CommandError(str(exc))
+        store_items = [
+            item for batch in services.item_batches(
+                options['store_id'], LABEL_ITEM_COLUMNS, item_ids=self._item_ids(options['store_id'], options['items'])
+            ) for item in batch
+        ]
+        if not store_items:
+            raise CommandError(f"Store {options['store_id']} has no items")
+        items = (store_items * (options['items'] // len(store_items) + 1))[:options['items']]
+        batches = [items[start:start + DB_BATCH_SIZE] for start in range(0, len(items), DB_BATCH_SIZE)]
+
+        results = []
+        for language in [name.strip() for name in options['languages'].split(',') if name.strip()]:
+            try:
+                started = time.perf_counter()
+                program = compile_template(template, elements, language, options['dpi'])
+                compiled = time.perf_counter()
+            except ApplicationException as exc:
+                raise CommandError(str(exc))
+            size = sum(len(chunk) for chunk in render(program, batches))
+            elapsed = time.perf_counter() - compiled
+            results.append({
+                'language': program['language'],
+                'labels': len(items),
+                'compile_ms': round((compiled - started) * 1000, 3),
+                'render_ms': round(elapsed * 1000, 1),
+                'labels_per_sec': round(len(items) / elapsed) if elapsed else None,
+                'bytes': size,
+                'skipped': program['skipped'],
+            })
+
+        if options['json']:
+            self.stdout.write(json.dumps({'templateId': template['templateId'], 'results': results}, indent=2))
+            return
+        self.stdout.write(f"template {template['templateId']}: {len(items)} labels at {options['dpi']} dpi")
+        self.stdout.write(f"  {'language':<10}{'compile ms':>12}{'render ms':>12}{'labels/s':>12}{'bytes':>12}")
+        for row in results:
+            self.stdout.write(
+                f"  {row['language']:<10}{row['compile_ms']:>12}{row['render_ms']:>12}"
+                f"{row['labels_per_sec']:>12}{row['bytes']:>12}"
+            )
+
+    def _item_ids(self, store_id, limit):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT itemId FROM item WHERE storeId = %s ORDER BY itemId LIMIT %s", [store_id, limit])
+            return [row[0] for row in cursor.fetchall()]
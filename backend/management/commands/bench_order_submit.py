@@ -0,0 +1,179 @@
+import json
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from backend.api.v1.billing import services
+from backend.api.v1.dashboard.rollups import ROLLUP_TABLES
+from backend.shared.db import insert_rows
+
+BENCH_ITEM_COLUMNS = [
+    "itemId", "itemAddName", "catId", "userId", "storeId", "catName", "subCatId", "subCatName", "entryType",
+    "quantity", "gsWt", "ntWt", "fnWt", "purity", "crgType", "crg", "othCrgDes", "othCrg", "cgst", "sgst",
+    "igst", "huid", "addDesKey", "addDesValue", "addDate", "modifiedDate", "sellerFirmId", "purchaseOrderId",
+    "purchaseItemId",
+]
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the transactional order-submit path under concurrent checkouts. Each worker sells '
+        'its own items from a throwaway store through billing.services.create_order and the command '
+        'reports throughput, latency and the number of statements each order ran.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Concurrent checkouts')
+        parser.add_argument('--orders', type=int, default=200, help='Orders in total (split across threads)')
+        parser.add_argument('--lines', type=int, default=5, help='Order lines per order')
+        parser.add_argument('--exchange-items', type=int, default=1, help='Exchange items per order')
+        parser.add_argument('--json', action='store_true', help='Emit the results as JSON')
+
+    def handle(self, *args, **options):
+        threads_count = max(1, options['threads'])
+        per_thread = max(1, options['orders'] // threads_count)
+        lines = max(1, options['lines'])
+        suffix = uuid.uuid4().hex[:12]
+        store_id, user_id = f'bench-store-{suffix}', f'bench-user-{suffix}'
+
+        self._create_fixture(suffix, store_id, user_id, threads_count * per_thread * lines)
+        try:
+            result = self._run(suffix, store_id, user_id, threads_count, per_thread, lines, options['exchange_items'])
+        finally:
+            self._drop_fixture(suffix, store_id, user_id)
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+        self.stdout.write(
+            f"{result['vendor']}: {result['orders']} orders x {lines} lines on {threads_count} threads "
+            f"in {result['seconds']} s"
+        )
+        self.stdout.write(f"  orders/s      {result['orders_per_sec']}")
+        self.stdout.write(f"  lines/s       {result['lines_per_sec']}")
+        self.stdout.write(f"  p50 / p99 ms  {result['p50_ms']} / {result['p99_ms']}")
+        self.stdout.write(f"  statements    {result['statements_per_order']} per order")
+        style = self.style.ERROR if result['errors'] else self.style.SUCCESS
+        self.stdout.write(style(f"  errors        {result['errors']}"))
+        for message in result['error_samples']:
+            self.stdout.write(f"    {message}")
+
+    def _create_fixture(self, suffix, store_id, user_id, item_count):
+        now = timezone.now()
+        cat_id, sub_cat_id = f'bench-cat-{suffix}', f'bench-subcat-{suffix}'
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO users (userId, name, mobileNo, role) VALUES (%s, 'Order benchmark', '0000000000', 'bench')",
+                [user_id],
+            )
+            cursor.execute(
+                "INSERT INTO store (storeId, userId, proprietor, name, email, phone, address, registrationNo, "
+                "gstinNo, panNo, image) VALUES (%s, %s, '', 'Order benchmark', '', '', '', '', '', '', '')",
+                [store_id, user_id],
+            )
+            cursor.execute(
+                "INSERT INTO category (catId, catName, userId, storeId) VALUES (%s, 'Gold', %s, %s)",
+                [cat_id, user_id, store_id],
+            )
+            cursor.execute(
+                "INSERT INTO sub_category (subCatId, catId, userId, storeId, catName, subCatName) "
+                "VALUES (%s, %s, %s, %s, 'Gold', 'Ring')",
+                [sub_cat_id, cat_id, user_id, store_id],
+            )
+            rows = [
+                [f'{suffix}-{index}', f'Bench ring {index}', cat_id, user_id, store_id, 'Gold', sub_cat_id, 'Ring',
+                 'Purchase', 1, 10.5, 10.0, 9.16, '916', 'Percentage', 12.0, '', 50.0, 1.5, 1.5, 0.0,
+                 f'HB{index:06d}', '', '', now, now, '', '', '']
+                for index in range(item_count)
+            ]
+            for start in range(0, len(rows), 500):
+                insert_rows(cursor, 'item', BENCH_ITEM_COLUMNS, rows[start:start + 500])
+
+    def _drop_fixture(self, suffix, store_id, user_id):
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM exchange_item WHERE orderId IN (SELECT orderId FROM "order" WHERE storeId = %s)', [store_id]
+            )
+            cursor.execute(
+                'DELETE FROM order_item WHERE orderId IN (SELECT orderId FROM "order" WHERE storeId = %s)', [store_id]
+            )
+            cursor.execute('DELETE FROM "order" WHERE storeId = %s', [store_id])
+            cursor.execute("DELETE FROM customer WHERE mobileNo LIKE %s", [f'bench-{suffix}-%'])
+            cursor.execute("DELETE FROM item WHERE storeId = %s", [store_id])
+            for table in ROLLUP_TABLES:
+                cursor.execute(f"DELETE FROM {table} WHERE storeId = %s", [store_id])
+            cursor.execute("DELETE FROM sub_category WHERE storeId = %s", [store_id])
+            cursor.execute("DELETE FROM category WHERE storeId = %s", [store_id])
+            cursor.execute("DELETE FROM store WHERE storeId = %s", [store_id])
+            cursor.execute("DELETE FROM users WHERE userId = %s", [user_id])
+
+    def _run(self, suffix, store_id, user_id, threads_count, per_thread, lines, exchange_count):
+        overrides = {'gold': 13000.0, 'silver': 150.0}
+        latencies, statements, errors = [], [], []
+        guard = threading.Lock()
+
+        def worker(worker_index):
+            times, counts, failures = [], [], []
+            try:
+                for order_index in range(per_thread):
+                    first = (worker_index * per_thread + order_index) * lines
+                    body = {
+                        'storeId': store_id,
+                        'userId': user_id,
+                        'customer': {'mobileNo': f'bench-{suffix}-{worker_index}', 'name': 'Bench customer'},
+                        'lines': [{'itemId': f'{suffix}-{index}'} for index in range(first, first + lines)],
+                        'exchangeItems': [
+                            {'metalType': 'gold', 'purity': '916', 'grossWeight': 2.0, 'fineWeight': 1.83,
+                             'price': 23790.0, 'exchangeValue': 23790.0}
+                            for _ in range(exchange_count)
+                        ],
+                    }
+                    started = time.perf_counter()
+                    try:
+                        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+                            services.create_order(body, overrides)
+                    except Exception as exc:  # noqa: BLE001 - reported, not fatal
+                        failures.append(str(exc))
+                        continue
+                    times.append((time.perf_counter() - started) * 1000)
+                    counts.append(sum(
+                        1 for query in queries.captured_queries if not query['sql'].startswith(('BEGIN', 'COMMIT'))
+                    ))
+            finally:
+                connections.close_all()
+            with guard:
+                latencies.extend(times)
+                statements.extend(counts)
+                errors.extend(failures)
+
+        workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads_count)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        return {
+            'vendor': connections[DEFAULT_DB_ALIAS].vendor,
+            'orders': len(latencies),
+            'seconds': round(elapsed, 3),
+            'orders_per_sec': round(len(latencies) / elapsed, 1) if elapsed else 0,
+            'lines_per_sec': round(len(latencies) * lines / elapsed, 1) if elapsed else 0,
+            'p50_ms': round(_percentile(latencies, 50), 2) if latencies else None,
+            'p99_ms': round(_percentile(latencies, 99), 2) if latencies else None,
+            'statements_per_order': sorted(set(statements)),
+            'errors': len(errors),
+            'error_samples': sorted(set(errors))[:3],
+        }
@@ -0,0 +1,74 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.api.v1.reports.gst import store_today
+from backend.master_db_opration import synthetic
+from backend.shared.exceptions import ApplicationException
+from backend.shared.validators import parse_date_param
+
+# command option -> synthetic.DEFAULT_SCALE key
+SCALE_OPTIONS = {
+    'items': 'items',
+    'customers': 'customers',
+    'orders': 'orders',
+    'lines': 'lines',
+    'khata_books': 'khataBooks',
+    'transactions': 'transactions',
+    'purchases': 'purchases',
+    'firms': 'firms',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate referentially consistent synthetic data in every master table for scale testing: '
+        '--stores stores, each with its owner, category tree, suppliers and purchase bills, stock items, '
+        'customers, orders (with lines and exchanged metal), khata books and payments over --days days '
+        'ending --end. The same --seed and scale always produce the same rows; stores are named '
+        'syn<seed>-s<n>. Rows are bulk loaded (COPY on PostgreSQL) one transaction per store, and the '
+        'daily sales rollups are rebuilt afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stores', type=int, default=1, help='Stores to generate')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed; also names the generated rows')
+        parser.add_argument('--days', type=int, default=synthetic.DEFAULT_DAYS, help='Days of order history')
+        parser.add_argument('--end', help='Last day of the history (YYYY-MM-DD, default today)')
+        for option, key in SCALE_OPTIONS.items():
+            parser.add_argument(
+                f"--{option.replace('_', '-')}", dest=option, type=int,
+                help=f'{key} per store (default {synthetic.DEFAULT_SCALE[key]})',
+            )
+        parser.add_argument('--json', action='store_true', help='Emit the summary as JSON')
+
+    def handle(self, *args, **options):
+        scale = {key: options[option] for option, key in SCALE_OPTIONS.items()}
+
+        def progress(store_id, counts):
+            if not options['json']:
+                self.stdout.write(f'{store_id}: {sum(counts.values())} rows')
+
+        try:
+            end = parse_date_param(options['end'], '--end') or store_today()
+            started = time.perf_counter()
+            result = synthetic.generate(
+                options['stores'], options['seed'], end, options['days'], scale, progress=progress,
+            )
+        except ApplicationException as exc:
+            raise CommandError(exc.message)
+        elapsed = time.perf_counter() - started
+        result['seconds'] = round(elapsed, 2)
+        result['rowsPerSec'] = round(result['totalRows'] / elapsed) if elapsed else None
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+        for table, count in result['rows'].items():
+            self.stdout.write(f'  {table}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {result['totalRows']} rows for {len(result['stores'])} store(s) "
+            f"({result['from']} .. {result['to']}) in {result['seconds']}s, {result['rowsPerSec']} rows/s; "
+            f"{result['salesRollupRows']} daily rollup rows rebuilt"
+        ))
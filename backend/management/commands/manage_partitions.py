@@ -0,0 +1,90 @@
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from backend.master_db_opration.partitioning import (
+    PARTITIONED_TABLES,
+    add_months,
+    convert_to_partitioned,
+    detach_partitions,
+    ensure_partitions,
+    list_partitions,
+    table_kind,
+)
+from backend.master_db_opration.views import MASTER_COLUMN_DDL, MASTER_TABLE_DDL, master_index_ddl
+
+
+def _parse_month(value):
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except ValueError as exc:
+        raise CommandError(f'Expected YYYY-MM, got {value!r}') from exc
+
+
+class Command(BaseCommand):
+    help = 'Manage monthly range partitions of the order/transaction master tables (PostgreSQL only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['status', 'ensure', 'convert', 'detach'])
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=settings.MASTER_PARTITION_MONTHS_AHEAD,
+            help='ensure/convert: create partitions up to this many months past the current one',
+        )
+        parser.add_argument('--from', dest='from_month', help='ensure: first month (YYYY-MM) to create, defaults to the current month')
+        parser.add_argument('--before', help='detach: detach partitions that end on or before this month (YYYY-MM)')
+        parser.add_argument('--drop', action='store_true', help='detach: drop the detached partitions instead of keeping them as plain tables')
+        parser.add_argument('--keep-unpartitioned', action='store_true', help='convert: keep the original tables as <table>_unpartitioned')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning is only supported on PostgreSQL')
+
+        action = options['action']
+        today = date.today()
+        if action == 'status':
+            self._status()
+        elif action == 'ensure':
+            start = _parse_month(options['from_month']) if options['from_month'] else today
+            with transaction.atomic(), connection.cursor() as cursor:
+                created = ensure_partitions(cursor, start, add_months(today, options['months_ahead']))
+            self.stdout.write(self.style.SUCCESS(f'Created {len(created)} partitions'))
+            for name in created:
+                self.stdout.write(f'  {name}')
+        elif action == 'convert':
+            base_ddl = dict(MASTER_TABLE_DDL)
+            with transaction.atomic(), connection.cursor() as cursor:
+                copied = convert_to_partitioned(
+                    cursor, base_ddl, options['months_ahead'], keep_unpartitioned=options['keep_unpartitioned'],
+                    column_ddl=MASTER_COLUMN_DDL,
+                )
+                for _, ddl in master_index_ddl(connection.vendor):
+                    cursor.execute(ddl)
+            if not copied:
+                self.stdout.write('All partitioned tables are already partitioned')
+            for table, rows in copied.items():
+                self.stdout.write(self.style.SUCCESS(f'Converted {table} ({rows} rows copied)'))
+        else:
+            if not options['before']:
+                raise CommandError('detach requires --before YYYY-MM')
+            with transaction.atomic(), connection.cursor() as cursor:
+                detached = detach_partitions(cursor, _parse_month(options['before']), drop=options['drop'])
+            verb = 'Dropped' if options['drop'] else 'Detached'
+            self.stdout.write(self.style.SUCCESS(f'{verb} {len(detached)} partitions'))
+            for name in detached:
+                self.stdout.write(f'  {name}')
+
+    def _status(self):
+        with connection.cursor() as cursor:
+            for table, _, column in PARTITIONED_TABLES:
+                kind = table_kind(cursor, table)
+                if kind != 'p':
+                    self.stdout.write(f'{table}: not partitioned' if kind else f'{table}: missing')
+                    continue
+                partitions = list_partitions(cursor, table)
+                self.stdout.write(f'{table}: partitioned by month on {column}, {len(partitions)} partitions')
+                for name, _, rows in partitions:
+                    self.stdout.write(f'  {name:<36} ~{rows} rows')
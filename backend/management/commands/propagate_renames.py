@@ -0,0 +1,55 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from backend.api.v1.inventory import renames
+from backend.shared.constants import DB_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        'Propagate category and sub-category renames to sub_category, item, order_item and '
+        'purchase_order_item. Runs every pending or interrupted rename job, oldest first, '
+        'resuming each from the last chunk it committed. Each chunk is one short transaction.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--job-id', help='Only run this rename job')
+        parser.add_argument('--chunk-size', type=int, default=DB_BATCH_SIZE, help='Keys scanned per transaction')
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between chunks')
+        parser.add_argument('--json', action='store_true', help='Emit the finished jobs as JSON')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+        if options['job_id']:
+            job_ids = [options['job_id']]
+        else:
+            with connection.cursor() as cursor:
+                job_ids = renames.pending_job_ids(cursor)
+
+        progress = None if options['json'] else self._progress
+        finished = []
+        for job_id in job_ids:
+            job = renames.propagate(job_id, options['chunk_size'], options['pause'], progress)
+            if job is None:
+                if not options['json']:
+                    self.stdout.write(f'{job_id}: not active, skipped')
+                continue
+            finished.append(job)
+
+        if options['json']:
+            self.stdout.write(json.dumps(finished, indent=2, default=str))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Ran {len(finished)} rename job(s): '
+            f"{sum(job['rowsUpdated'] for job in finished)} rows updated"
+        ))
+
+    def _progress(self, job):
+        where = f"{job['table']} after {job['lastKey'] or 'start'}" if job['table'] else 'all tables'
+        self.stdout.write(
+            f"{job['jobId']} [{job['status']}] stage {min(job['stage'] + 1, job['stages'])}/{job['stages']} "
+            f"{where}: scanned={job['rowsScanned']} updated={job['rowsUpdated']}"
+        )
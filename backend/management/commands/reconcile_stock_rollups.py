@@ -0,0 +1,40 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from backend.master_db_opration.rollups import repair_stock_rollups, stock_rollup_drift
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the sub_category/category stock rollups from item in bulk, report drift and, '
+        'with --repair, add the missing deltas. Run with --repair once after installing the rollup '
+        'triggers on an existing database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store-id', help='Only reconcile this store')
+        parser.add_argument('--repair', action='store_true', help='Apply the computed deltas')
+        parser.add_argument('--tolerance', type=float, default=0.001, help='Allowed weight difference')
+        parser.add_argument('--show', type=int, default=20, help='Drifted rows to print per table')
+        parser.add_argument('--json', action='store_true', help='Emit the report as JSON')
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), connection.cursor() as cursor:
+            drift = stock_rollup_drift(cursor, options['store_id'], options['tolerance'])
+            if options['repair']:
+                repair_stock_rollups(cursor, drift)
+
+        if options['json']:
+            self.stdout.write(json.dumps({'repaired': options['repair'], **drift}, indent=2))
+            return
+
+        for label, key in (('sub categories', 'subCategories'), ('categories', 'categories')):
+            rows = drift[key]
+            style = self.style.WARNING if rows else self.style.SUCCESS
+            self.stdout.write(style(f'{label}: {len(rows)} drifted'))
+            for row in rows[:options['show']]:
+                self.stdout.write(f'  {row}')
+        if options['repair'] and (drift['subCategories'] or drift['categories']):
+            self.stdout.write(self.style.SUCCESS('Repaired'))
@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from backend.master_db_opration.supplier_ledger import repair_supplier_ledger, supplier_ledger_drift
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the seller_ledger/firm_ledger totals from the purchase tables in bulk, report drift '
+        'and, with --repair, add the missing deltas. Run with --repair once after installing the ledger '
+        'triggers on an existing database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help='Apply the computed deltas')
+        parser.add_argument('--tolerance', type=float, default=0.001, help='Allowed weight/amount difference')
+        parser.add_argument('--show', type=int, default=20, help='Drifted rows to print per table')
+        parser.add_argument('--json', action='store_true', help='Emit the report as JSON')
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), connection.cursor() as cursor:
+            drift = supplier_ledger_drift(cursor, options['tolerance'])
+            if options['repair']:
+                repair_supplier_ledger(cursor, drift)
+
+        if options['json']:
+            self.stdout.write(json.dumps({'repaired': options['repair'], **drift}, indent=2))
+            return
+
+        for label, key in (('sellers', 'sellers'), ('firms', 'firms')):
+            rows = drift[key]
+            style = self.style.WARNING if rows else self.style.SUCCESS
+            self.stdout.write(style(f'{label}: {len(rows)} drifted'))
+            for row in rows[:options['show']]:
+                self.stdout.write(f'  {row}')
+        if options['repair'] and (drift['sellers'] or drift['firms']):
+            self.stdout.write(self.style.SUCCESS('Repaired'))
@@ -0,0 +1,50 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.api.v1.billing import invoices
+from backend.api.v1.reports.gst import store_today
+from backend.shared.exceptions import ApplicationException
+from backend.shared.validators import parse_date_param
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-render the invoice documents of a store\'s orders in a date range (store time) to '
+        'INVOICE_DIR/<storeId>/<YYYY-MM>/, a batch of orders per task on a pool of worker threads. '
+        'Run it after changing the store details printed on invoices; existing documents are replaced.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store-id', required=True, help='Store whose invoices are rendered')
+        parser.add_argument('--from', dest='start', required=True, help='First order day (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='end', help='Last order day (YYYY-MM-DD, default today)')
+        parser.add_argument('--workers', type=int, default=invoices.DEFAULT_RENDER_WORKERS,
+                            help='Rendering threads')
+        parser.add_argument('--output-dir', help='Directory to write to (default INVOICE_DIR)')
+        parser.add_argument('--json', action='store_true', help='Emit the result as JSON')
+
+    def handle(self, *args, **options):
+        try:
+            start = parse_date_param(options['start'], '--from')
+            end = parse_date_param(options['end'], '--to') or store_today()
+            if end < start:
+                raise CommandError('--to must not be before --from')
+            started = time.perf_counter()
+            result = invoices.rerender_invoices(
+                options['store_id'], start, end, options['workers'], options['output_dir'],
+            )
+        except ApplicationException as exc:
+            raise CommandError(exc.message)
+        elapsed = time.perf_counter() - started
+        result['seconds'] = round(elapsed, 2)
+        result['invoicesPerSec'] = round(result['invoices'] / elapsed) if elapsed else None
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['invoices']} invoices of {result['storeId']} ({result['from']} to {result['to']}) "
+            f"written to {result['directory']} in {result['seconds']}s"
+        ))
@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.api.v1.customers import installments
+from backend.api.v1.reports.gst import store_today
+from backend.shared.exceptions import ValidationException
+from backend.shared.validators import parse_date_param
+
+
+class Command(BaseCommand):
+    help = (
+        'Compute the due and overdue khata installments of every store with one set-based query and '
+        'send each store owner a reminder through batched Firebase sends. Meant to run once a day; stores '
+        'already reminded for the day are skipped unless --force is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='As-of day (YYYY-MM-DD, default today in the store time zone)')
+        parser.add_argument('--store-id', help='Only this store')
+        parser.add_argument(
+            '--concurrency', type=int, default=installments.DEFAULT_CONCURRENCY,
+            help='Firebase send batches in flight at once',
+        )
+        parser.add_argument('--force', action='store_true', help='Remind stores already reminded today')
+        parser.add_argument('--dry-run', action='store_true', help='Compute and report without sending')
+        parser.add_argument('--json', action='store_true', help='Emit the report as JSON')
+
+    def handle(self, *args, **options):
+        try:
+            as_of = parse_date_param(options['date'], '--date') or store_today()
+        except ValidationException as exc:
+            raise CommandError(exc.message)
+
+        summaries = installments.summarize_by_store(
+            installments.due_installment_batches(as_of, options['store_id']), as_of
+        )
+        results = installments.send_reminders(
+            summaries, as_of, options['concurrency'], force=options['force'], dry_run=options['dry_run']
+        )
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'date': as_of.isoformat(),
+                'dryRun': options['dry_run'],
+                'stores': [{**summaries[result['storeId']], **result} for result in results],
+            }, indent=2))
+            return
+
+        for result in results:
+            summary = summaries[result['storeId']]
+            if 'skipped' in result:
+                outcome = result['skipped']
+            elif options['dry_run']:
+                outcome = 'dry run'
+            else:
+                outcome = f"sent {result['success']}/{result['tokens']}"
+            self.stdout.write(
+                f"{result['storeId']}: {summary['dueToday']} due today, {summary['overdue']} overdue "
+                f"({summary['customers']} customers) - {outcome}"
+            )
+        self.stdout.write(self.style.SUCCESS(f'{len(summaries)} store(s) with open installments on {as_of}'))
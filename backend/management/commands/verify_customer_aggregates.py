@@ -0,0 +1,138 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from backend.api.v1.customers.services import apply_khata_payments, khata_paid_sql
+from backend.master_db_opration.cold_archive import table_sources
+from backend.shared.constants import DB_BATCH_SIZE
+from backend.shared.db import values_sql
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute customer totals (from "order"/order_item) and khata paid/outstanding amounts '
+        '(from customer_transaction) in bulk, report drift from the stored aggregates and, with '
+        '--repair, fix it. Repairs apply the difference rather than the recomputed value, so '
+        'writes that land while the command runs are not lost.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store-id', help='Only check customers and khata books of this store')
+        parser.add_argument('--repair', action='store_true', help='Write the recomputed aggregates back')
+        parser.add_argument('--tolerance', type=float, default=0.01, help='Allowed amount difference')
+        parser.add_argument('--show', type=int, default=20, help='Drifted rows to print per table')
+        parser.add_argument('--json', action='store_true', help='Emit the report as JSON')
+
+    def handle(self, *args, **options):
+        store_id, tolerance = options['store_id'], options['tolerance']
+        with transaction.atomic(), connection.cursor() as cursor:
+            customers = self._customer_drift(cursor, store_id, tolerance)
+            khata_books = self._khata_drift(cursor, store_id, tolerance)
+            if options['repair']:
+                self._repair_customers(cursor, customers)
+                for start in range(0, len(khata_books), DB_BATCH_SIZE):
+                    batch = khata_books[start:start + DB_BATCH_SIZE]
+                    apply_khata_payments(
+                        cursor, {row['khataBookId']: row['paidDelta'] for row in batch}, include_zero=True
+                    )
+
+        report = {
+            'repaired': options['repair'],
+            'customers': {'drifted': len(customers), 'rows': customers[:options['show']]},
+            'khataBooks': {'drifted': len(khata_books), 'rows': khata_books[:options['show']]},
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2, default=str))
+            return
+
+        for label, rows in (('customers', customers), ('khata books', khata_books)):
+            style = self.style.WARNING if rows else self.style.SUCCESS
+            self.stdout.write(style(f'{label}: {len(rows)} drifted'))
+            for row in rows[:options['show']]:
+                self.stdout.write(f'  {row}')
+        if options['repair'] and (customers or khata_books):
+            self.stdout.write(self.style.SUCCESS('Repaired'))
+
+    def _customer_drift(self, cursor, store_id, tolerance):
+        scope, params = ('AND c.storeId = %s', [store_id]) if store_id else ('', [])
+        sources = table_sources(cursor, ['order', 'order_item'], store_id)
+        cursor.execute(
+            f"""
+            SELECT c.mobileNo, c.totalItemBought, c.totalAmount,
+                   COALESCE(i.items, 0), COALESCE(o.amount, 0)
+            FROM customer c
+            LEFT JOIN (
+                SELECT customerMobile, SUM(quantity) AS items FROM {sources['order_item']} oi GROUP BY customerMobile
+            ) i ON i.customerMobile = c.mobileNo
+            LEFT JOIN (
+                SELECT customerMobile, SUM(totalAmount + totalCharge + totalTax - discount) AS amount
+                FROM {sources['order']} oo GROUP BY customerMobile
+            ) o ON o.customerMobile = c.mobileNo
+            WHERE (c.totalItemBought <> COALESCE(i.items, 0) OR ABS(c.totalAmount - COALESCE(o.amount, 0)) > %s)
+            {scope}
+            ORDER BY c.mobileNo
+            """,
+            [tolerance, *params],
+        )
+        return [
+            {
+                'mobileNo': mobile,
+                'totalItemBought': stored_items,
+                'expectedItemBought': int(items),
+                'totalAmount': stored_amount,
+                'expectedAmount': round(amount, 2),
+                'itemsDelta': int(items) - stored_items,
+                'amountDelta': amount - stored_amount,
+            }
+            for mobile, stored_items, stored_amount, items, amount in cursor.fetchall()
+        ]
+
+    def _khata_drift(self, cursor, store_id, tolerance):
+        paid_expr, paid_params = khata_paid_sql()
+        scope, params = ('AND k.storeId = %s', [store_id]) if store_id else ('', [])
+        source = table_sources(cursor, ['customer_transaction'], store_id)['customer_transaction']
+        cursor.execute(
+            f"""
+            SELECT k.khataBookId, k.totalAmount, k.paidAmount, k.outstandingAmount, COALESCE(t.paid, 0)
+            FROM customer_khata_book k
+            LEFT JOIN (
+                SELECT khataBookId, SUM({paid_expr}) AS paid
+                FROM {source} ct WHERE khataBookId IS NOT NULL GROUP BY khataBookId
+            ) t ON t.khataBookId = k.khataBookId
+            WHERE (ABS(k.paidAmount - COALESCE(t.paid, 0)) > %s
+                   OR ABS(k.outstandingAmount - (k.totalAmount - COALESCE(t.paid, 0))) > %s)
+            {scope}
+            ORDER BY k.khataBookId
+            """,
+            [*paid_params, tolerance, tolerance, *params],
+        )
+        return [
+            {
+                'khataBookId': khata_id,
+                'paidAmount': stored_paid,
+                'expectedPaid': round(paid, 2),
+                'outstandingAmount': stored_outstanding,
+                'expectedOutstanding': round(total - paid, 2),
+                'paidDelta': paid - stored_paid,
+            }
+            for khata_id, total, stored_paid, stored_outstanding, paid in cursor.fetchall()
+        ]
+
+    def _repair_customers(self, cursor, customers):
+        for start in range(0, len(customers), DB_BATCH_SIZE):
+            batch = customers[start:start + DB_BATCH_SIZE]
+            fix_sql, fix_params = values_sql(
+                [(row['mobileNo'], row['itemsDelta'], row['amountDelta']) for row in batch],
+                [None, 'INTEGER', 'DOUBLE PRECISION'],
+            )
+            cursor.execute(
+                f"""
+                UPDATE customer SET
+                    totalItemBought = customer.totalItemBought + fix.column2,
+                    totalAmount = customer.totalAmount + fix.column3
+                FROM {fix_sql} AS fix
+                WHERE customer.mobileNo = fix.column1
+                """,
+                fix_params,
+            )
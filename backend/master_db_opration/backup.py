@@ -0,0 +1,512 @@
+"""
+Streaming backup and restore of the MASTER_TABLE_DDL tables and their cold archive
+(ARCHIVE_TABLE_DDL).
+
+An archive is a directory holding one subdirectory per table. Each table is read
+in primary-key order and cut into chunk files of at most `chunk_rows` rows:
+gzip-compressed NDJSON, one JSON array per row. manifest.json lists every
+table's columns, key, row count and chunks, with each chunk's rows, first and
+last key and the SHA-256 of its compressed bytes. Readers and writers only ever
+hold one DB_BATCH_SIZE batch, so memory use does not depend on table size.
+
+Tables are processed in parallel, one table per worker thread with its own
+connection. On PostgreSQL every worker reads the snapshot exported by the
+coordinating transaction, so the archive is consistent across tables, as with
+pg_dump -j.
+
+Restore loads tables in foreign-key waves: a table starts once every table it
+references has been loaded, and the tables of one wave load in parallel. Rows go
+in with COPY on PostgreSQL and executemany on SQLite, one transaction per chunk.
+A chunk's checksum is checked as it is read, and a mismatch rolls that chunk
+back. The stock rollup columns of category and sub_category load as zero and the
+item triggers add the restored items back, as the supplier ledger triggers do for
+purchases; the daily sales rollups are rebuilt from the restored orders afterwards,
+along with a repair of any stock or ledger drift.
+
+--replace empties the target tables first, without CASCADE, so it is refused
+unless every table referencing them is restored as well.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import zlib
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from backend.api.v1.dashboard import rollups as sales_rollups
+from backend.master_db_opration.cold_archive import ARCHIVED_TABLES, archive_name
+from backend.master_db_opration.partitioning import PARTITIONED_TABLES, ensure_partitions, table_kind
+from backend.master_db_opration.rollups import (
+    CATEGORY_ROLLUP_FIELDS,
+    SUB_CATEGORY_ROLLUP_FIELDS,
+    repair_stock_rollups,
+    stock_rollup_drift,
+)
+from backend.master_db_opration.supplier_ledger import repair_supplier_ledger, supplier_ledger_drift
+from backend.master_db_opration.views import ARCHIVE_TABLE_DDL, MASTER_TABLE_DDL
+from backend.shared.constants import DB_BATCH_SIZE
+from backend.shared.db import bulk_insert
+from backend.shared.exceptions import ConflictException, ValidationException
+
+ARCHIVE_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+DEFAULT_CHUNK_ROWS = 100000
+DEFAULT_WORKERS = 4
+DEFAULT_COMPRESS_LEVEL = 6
+# Days of daily sales rollups rebuilt per transaction after a restore.
+ROLLUP_REBUILD_DAYS = 31
+
+_PRIMARY_KEY_RE = re.compile(r"^\s*(\w+) \w+ PRIMARY KEY", re.MULTILINE)
+_REFERENCES_RE = re.compile(r'REFERENCES "?(\w+)"?\s*\(')
+# table -> column the table is partitioned (or archived) by; archives record its span.
+_PARTITION_COLUMNS = {table: column for table, _, column in PARTITIONED_TABLES}
+_PARTITION_COLUMNS.update({archive_name(table): column for table, _, column in ARCHIVED_TABLES})
+# Columns the item triggers maintain: restored as zero, the restored items add their stock back.
+_TRIGGER_ROLLUP_COLUMNS = {"sub_category": SUB_CATEGORY_ROLLUP_FIELDS, "category": CATEGORY_ROLLUP_FIELDS}
+
+
+def master_tables() -> Dict[str, dict]:
+    """table -> {"key": primary key column, "references": parent tables}, MASTER_TABLE_DDL tables first."""
+    tables = {}
+    for name, ddl in MASTER_TABLE_DDL + ARCHIVE_TABLE_DDL:
+        tables[name] = {
+            "key": _PRIMARY_KEY_RE.search(ddl).group(1),
+            "references": sorted({parent for parent in _REFERENCES_RE.findall(ddl) if parent != name}),
+        }
+    return tables
+
+
+def load_waves(tables: Sequence[str]) -> List[List[str]]:
+    """Group `tables` so every table comes after the tables it references."""
+    references = {name: set(info["references"]) & set(tables) for name, info in master_tables().items()
+                  if name in tables}
+    waves, loaded = [], set()
+    while len(loaded) < len(references):
+        wave = [name for name in references if name not in loaded and references[name] <= loaded]
+        if not wave:
+            raise ValidationException(f"Circular references between: {', '.join(sorted(set(references) - loaded))}")
+        waves.append(wave)
+        loaded.update(wave)
+    return waves
+
+
+def _select_tables(names: Optional[Sequence[str]]) -> List[str]:
+    tables = master_tables()
+    if not names:
+        return list(tables)
+    unknown = sorted(set(names) - set(tables))
+    if unknown:
+        raise ValidationException(f"Not master tables: {', '.join(unknown)}")
+    return [name for name in tables if name in names]
+
+
+def _quote(table: str) -> str:
+    return f'"{table}"'
+
+
+def table_columns(cursor, table: str) -> List[str]:
+    cursor.execute(f"SELECT * FROM {_quote(table)} WHERE 1 = 0")
+    return [column[0] for column in cursor.description]
+
+
+class _HashingWriter:
+    """File wrapper that hashes the bytes written through it."""
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data) -> int:
+        self.sha256.update(data)
+        return self.handle.write(data)
+
+    def flush(self) -> None:
+        self.handle.flush()
+
+
+class _HashingReader:
+    """File wrapper that hashes the bytes read through it."""
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.handle.read(size)
+        self.sha256.update(data)
+        return data
+
+    def hexdigest(self) -> str:
+        # Hash whatever the decompressor left unread, so the digest covers the whole file.
+        while self.read(1 << 16):
+            pass
+        return self.sha256.hexdigest()
+
+
+def _read_chunk(path: Path) -> Iterator[list]:
+    """
+    Yield the rows of a chunk file; the generator's return value is the SHA-256
+    of the compressed bytes, taken once every row has been read.
+    """
+    with open(path, "rb") as handle:
+        reader = _HashingReader(handle)
+        try:
+            with gzip.GzipFile(fileobj=reader, mode="rb") as archive:
+                for line in io.TextIOWrapper(archive, encoding="utf-8"):
+                    yield json.loads(line)
+        except (OSError, EOFError, zlib.error, ValueError) as exc:
+            raise ValidationException(f"Chunk {path.parent.name}/{path.name} is corrupt: {exc}")
+        return reader.hexdigest()
+
+
+def _snapshot_rows(using: str, sql: str, snapshot: Optional[str]) -> Iterator[list]:
+    """Stream `sql` in DB_BATCH_SIZE batches, inside the exported snapshot when one is given."""
+    connection = connections[using]
+    # A named cursor needs a transaction on PostgreSQL; on SQLite one would start with
+    # BEGIN IMMEDIATE and lock out the other workers.
+    in_transaction = transaction.atomic(using=using) if connection.vendor == "postgresql" else nullcontext()
+    with in_transaction:
+        if snapshot:
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                cursor.execute(f"SET TRANSACTION SNAPSHOT '{snapshot}'")
+        cursor = connection.chunked_cursor()
+        try:
+            cursor.execute(sql)
+            while True:
+                rows = cursor.fetchmany(DB_BATCH_SIZE)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+
+def _json_default(value):
+    # Full precision, with the space separator SQLite stores and PostgreSQL accepts.
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Cannot archive {type(value).__name__} values")
+
+
+_encoder = json.JSONEncoder(separators=(",", ":"), default=_json_default)
+
+
+class _ChunkWriter:
+    """One chunk file being written: gzip through a hashing wrapper into a .part file."""
+
+    def __init__(self, path: Path, level: int):
+        self.path = path
+        self.partial = path.with_name(f".{path.name}.part")
+        self.handle = open(self.partial, "wb")
+        self.hasher = _HashingWriter(self.handle)
+        self.archive = gzip.GzipFile(fileobj=self.hasher, mode="wb", compresslevel=level, mtime=0)
+        self.rows = 0
+        self.first_key = self.last_key = None
+
+    def write(self, rows: List[list], key_index: int) -> None:
+        self.archive.write("".join(_encoder.encode(list(row)) + "\n" for row in rows).encode("utf-8"))
+        if self.first_key is None:
+            self.first_key = rows[0][key_index]
+        self.last_key = rows[-1][key_index]
+        self.rows += len(rows)
+
+    def close(self, table: str) -> dict:
+        self.archive.close()
+        self.handle.close()
+        os.replace(self.partial, self.path)
+        return {
+            "file": f"{table}/{self.path.name}", "rows": self.rows, "firstKey": self.first_key,
+            "lastKey": self.last_key, "sha256": self.hasher.sha256.hexdigest(),
+        }
+
+
+def _column_index(columns: Sequence[str], name: str) -> int:
+    # PostgreSQL reports the unquoted camelCase columns in lower case.
+    return [column.lower() for column in columns].index(name.lower())
+
+
+def backup_table(table: str, directory: Path, chunk_rows: int, level: int, snapshot: Optional[str],
+                 using: str = "default") -> dict:
+    """Write one table's chunks under `directory`/<table>/ and return its manifest entry."""
+    key = master_tables()[table]["key"]
+    try:
+        with connections[using].cursor() as cursor:
+            columns = table_columns(cursor, table)
+        key_index = _column_index(columns, key)
+        span_column = _PARTITION_COLUMNS.get(table)
+        span_index = _column_index(columns, span_column) if span_column else None
+        table_dir = directory / table
+        table_dir.mkdir(parents=True, exist_ok=True)
+        entry = {"columns": columns, "key": key, "rows": 0, "chunks": [], "span": None}
+        low = high = None
+        writer = None
+        sql = f"SELECT {', '.join(columns)} FROM {_quote(table)} ORDER BY {key}"
+        for rows in _snapshot_rows(using, sql, snapshot):
+            if span_index is not None:
+                values = [row[span_index] for row in rows if row[span_index] is not None]
+                if values:
+                    low = min(values) if low is None else min(low, *values)
+                    high = max(values) if high is None else max(high, *values)
+            while rows:
+                if writer is None:
+                    writer = _ChunkWriter(table_dir / f"{len(entry['chunks']) + 1:06d}.ndjson.gz", level)
+                room = chunk_rows - writer.rows
+                writer.write(rows[:room], key_index)
+                rows = rows[room:]
+                if writer.rows >= chunk_rows:
+                    entry["chunks"].append(writer.close(table))
+                    writer = None
+        if writer is not None:
+            entry["chunks"].append(writer.close(table))
+        entry["rows"] = sum(chunk["rows"] for chunk in entry["chunks"])
+        if low is not None:
+            entry["span"] = [_json_default(low) if isinstance(low, date) else low,
+                             _json_default(high) if isinstance(high, date) else high]
+        return entry
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connections[using].close()
+
+
+def backup(directory: Path, tables: Optional[Sequence[str]] = None, workers: int = DEFAULT_WORKERS,
+           chunk_rows: int = DEFAULT_CHUNK_ROWS, level: int = DEFAULT_COMPRESS_LEVEL, using: str = "default",
+           progress: Optional[Callable[[str, dict], None]] = None) -> dict:
+    """Back up the master tables (all, or `tables`) into `directory`; returns the manifest."""
+    directory = Path(directory)
+    if (directory / MANIFEST_NAME).exists():
+        raise ConflictException(f"{directory} already holds an archive")
+    names = _select_tables(tables)
+    connection = connections[using]
+    manifest = {
+        "format": ARCHIVE_FORMAT, "vendor": connection.vendor, "createdAt": timezone.now().isoformat(),
+        "chunkRows": chunk_rows, "tables": {},
+    }
+    with transaction.atomic(using=using) if connection.vendor == "postgresql" else nullcontext():
+        snapshot = None
+        if connection.vendor == "postgresql":
+            # Held open until every worker has read its table, so the snapshot stays importable.
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                cursor.execute("SELECT pg_export_snapshot()")
+                snapshot = cursor.fetchone()[0]
+
+        def run(table):
+            entry = backup_table(table, directory, chunk_rows, level, snapshot, using)
+            if progress:
+                progress(table, entry)
+            return table, entry
+
+        directory.mkdir(parents=True, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            for table, entry in pool.map(run, names):
+                manifest["tables"][table] = entry
+
+    partial = directory / f".{MANIFEST_NAME}.part"
+    partial.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(partial, directory / MANIFEST_NAME)
+    return manifest
+
+
+def read_manifest(directory: Path) -> dict:
+    path = Path(directory) / MANIFEST_NAME
+    if not path.exists():
+        raise ValidationException(f"No {MANIFEST_NAME} in {directory}")
+    manifest = json.loads(path.read_text(encoding="utf-8"))
+    if manifest.get("format") != ARCHIVE_FORMAT:
+        raise ValidationException(f"Unsupported archive format: {manifest.get('format')}")
+    return manifest
+
+
+def verify_archive(directory: Path, tables: Optional[Sequence[str]] = None) -> List[dict]:
+    """Check every chunk's checksum and row count without touching the database; returns the bad chunks."""
+    manifest = read_manifest(directory)
+    bad = []
+    for table in _select_tables(tables or list(manifest["tables"])):
+        for chunk in manifest["tables"].get(table, {}).get("chunks", []):
+            rows = _read_chunk(Path(directory) / chunk["file"])
+            count = 0
+            try:
+                while True:
+                    next(rows)
+                    count += 1
+            except StopIteration as done:
+                sha256 = done.value
+            except ValidationException as exc:
+                bad.append({"file": chunk["file"], "error": exc.message})
+                continue
+            if sha256 != chunk["sha256"] or count != chunk["rows"]:
+                bad.append({"file": chunk["file"], "error": "checksum or row count mismatch"})
+    return bad
+
+
+def _aware(value: str) -> datetime:
+    moment = datetime.fromisoformat(value)
+    return timezone.make_aware(moment, dt_timezone.utc) if timezone.is_naive(moment) else moment
+
+
+def _partition_span(span: Sequence[str]) -> List[date]:
+    return [_aware(value).astimezone(dt_timezone.utc).date() for value in span]
+
+
+def restore_table(directory: Path, table: str, entry: dict, using: str = "default") -> int:
+    """Load one table's chunks, one transaction per chunk; returns the rows loaded."""
+    connection = connections[using]
+    try:
+        with connection.cursor() as cursor:
+            target = {column.lower() for column in table_columns(cursor, table)}
+            missing = [column for column in entry["columns"] if column.lower() not in target]
+            if missing:
+                raise ValidationException(f"{table} has no column(s) {', '.join(missing)} to restore into")
+            if entry.get("span") and connection.vendor == "postgresql" and table_kind(cursor, table) == "p":
+                ensure_partitions(cursor, *_partition_span(entry["span"]))
+        rollup_fields = {field.lower() for field in _TRIGGER_ROLLUP_COLUMNS.get(table, [])}
+        zeroed = [index for index, column in enumerate(entry["columns"]) if column.lower() in rollup_fields]
+        loaded = 0
+        for chunk in entry["chunks"]:
+            rows = _read_chunk(Path(directory) / chunk["file"])
+            with transaction.atomic(using=using), connection.cursor() as cursor:
+                batch, count = [], 0
+                try:
+                    while True:
+                        row = next(rows)
+                        for index in zeroed:
+                            row[index] = 0
+                        batch.append(row)
+                        if len(batch) >= DB_BATCH_SIZE:
+                            bulk_insert(cursor, connection.vendor, table, entry["columns"], batch)
+                            count, batch = count + len(batch), []
+                except StopIteration as done:
+                    sha256 = done.value
+                bulk_insert(cursor, connection.vendor, table, entry["columns"], batch)
+                count += len(batch)
+                if sha256 != chunk["sha256"] or count != chunk["rows"]:
+                    raise ValidationException(f"Chunk {chunk['file']} is corrupt (checksum or row count mismatch)")
+            loaded += count
+        return loaded
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connection.close()
+
+
+def referencing_tables(names: Sequence[str]) -> List[str]:
+    """Master tables outside `names` that reference one of them, directly or through other tables."""
+    tables = master_tables()
+    found, frontier = set(), set(names)
+    while frontier:
+        frontier = {
+            name for name, info in tables.items()
+            if frontier & set(info["references"]) and name not in found and name not in names
+        }
+        found |= frontier
+    return [name for name in tables if name in found]
+
+
+def _clear_tables(cursor, vendor: str, waves: List[List[str]]) -> None:
+    """Empty the tables, children first. No CASCADE: a row still referenced from elsewhere stops the restore."""
+    tables = [table for wave in reversed(waves) for table in wave]
+    if vendor == "postgresql":
+        cursor.execute(f"TRUNCATE {', '.join(_quote(table) for table in tables)}")
+        return
+    for table in tables:
+        cursor.execute(f"DELETE FROM {_quote(table)}")
+
+
+def rebuild_derived(manifest: dict, using: str = "default") -> dict:
+    """Recompute what triggers and order writes maintain outside the archived tables."""
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        stock = stock_rollup_drift(cursor)
+        repair_stock_rollups(cursor, stock)
+        ledger = supplier_ledger_drift(cursor)
+        repair_supplier_ledger(cursor, ledger)
+    days = []
+    for table in ("order", "customer_transaction", archive_name("order"), archive_name("customer_transaction")):
+        span = manifest["tables"].get(table, {}).get("span")
+        if span:
+            days.extend(sales_rollups.sale_date(_aware(value)) for value in span)
+    rollup_rows = 0
+    if days:
+        day, end = min(days), max(days)
+        while day <= end:
+            last = min(day + timedelta(days=ROLLUP_REBUILD_DAYS - 1), end)
+            rollup_rows += sum(sales_rollups.backfill(day, last).values())
+            day = last + timedelta(days=1)
+    return {
+        "stockRollupsRepaired": sum(len(rows) for rows in stock.values()),
+        "ledgerRowsRepaired": sum(len(rows) for rows in ledger.values()),
+        "salesRollupRows": rollup_rows,
+    }
+
+
+def restore(directory: Path, tables: Optional[Sequence[str]] = None, workers: int = DEFAULT_WORKERS,
+            replace: bool = False, rebuild: bool = True, using: str = "default",
+            progress: Optional[Callable[[str, int], None]] = None) -> dict:
+    """
+    Restore an archive into the master tables (all archived, or `tables`).
+
+    The tables must be empty unless `replace` is set, which empties them first.
+    SQLite has a single writer, so there tables load one at a time.
+    """
+    directory = Path(directory)
+    manifest = read_manifest(directory)
+    names = _select_tables(tables or list(manifest["tables"]))
+    absent = [name for name in names if name not in manifest["tables"]]
+    if absent:
+        raise ValidationException(f"Not in the archive: {', '.join(absent)}")
+    waves = load_waves(names)
+    connection = connections[using]
+
+    if replace:
+        # Emptying a table would cascade to (or be blocked by) the rows referencing it.
+        dependents = referencing_tables(names)
+        if dependents:
+            raise ValidationException(
+                f"Replacing {', '.join(names)} would delete rows of {', '.join(dependents)}; "
+                "restore those tables too"
+            )
+
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        if replace:
+            _clear_tables(cursor, connection.vendor, waves)
+        else:
+            occupied = []
+            for name in names:
+                cursor.execute(f"SELECT 1 FROM {_quote(name)} LIMIT 1")
+                if cursor.fetchone():
+                    occupied.append(name)
+            if occupied:
+                raise ConflictException(f"Tables are not empty (use replace): {', '.join(occupied)}")
+
+    workers = max(workers, 1) if connection.vendor == "postgresql" else 1
+    loaded = {}
+
+    def run(table):
+        count = restore_table(directory, table, manifest["tables"][table], using)
+        if progress:
+            progress(table, count)
+        return table, count
+
+    for wave in waves:
+        if workers == 1:
+            loaded.update(run(table) for table in wave)
+            continue
+        with ThreadPoolExecutor(max_workers=min(workers, len(wave))) as pool:
+            loaded.update(pool.map(run, wave))
+    result = {"tables": loaded, "rows": sum(loaded.values())}
+    if rebuild:
+        result["derived"] = rebuild_derived(manifest, using)
+    return result
@@ -0,0 +1,185 @@
+"""
+Cold tier for old orders and customer transactions.
+
+`<table>_archive` twins of "order", order_item, exchange_item and customer_transaction
+hold a store's rows dated before a cutoff. They are derived from MASTER_TABLE_DDL
+(same columns and primary key) but carry no foreign keys and only the indexes the
+date-range reads need, and are never partitioned. archive_store() moves rows over in
+batches of DB_BATCH_SIZE orders, each batch with its items and exchanged metal in one
+transaction. Transactions of khata books that are still active stay hot: installment
+dues and khata totals read them. archive_state keeps, per store, the cutoff below
+which rows may be cold; it only moves forward.
+
+Readers name their tables through table_sources(): the hot tables alone when the
+query's range starts on or after the store's cutoff, otherwise a UNION ALL of hot
+and archived rows under the hot table's columns, so the surrounding SQL does not
+change. The daily rollups are never archived, so dashboards do not touch this tier.
+"""
+
+import re
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from typing import Dict, List, Optional, Sequence
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from backend.shared.constants import DB_BATCH_SIZE
+
+# (table, primary key column, date column). Parents come before children.
+ARCHIVED_TABLES = [
+    ("order", "orderId", "orderDate"),
+    ("order_item", "orderItemId", "orderDate"),
+    ("exchange_item", "exchangeItemId", "orderDate"),
+    ("customer_transaction", "transactionId", "transactionDate"),
+]
+
+ARCHIVED_TABLE_NAMES = {table for table, _, _ in ARCHIVED_TABLES}
+ARCHIVE_STATE_TABLE = "archive_state"
+ACTIVE_KHATA_STATUS = "active"
+# Tables whose rows move together, keyed by orderId.
+_ORDER_TABLES = ["order", "order_item", "exchange_item"]
+
+_FOREIGN_KEY_RE = re.compile(r"^\s*FOREIGN KEY .*\n", re.MULTILINE)
+_TRAILING_COMMA_RE = re.compile(r",(\s*\)\s*)$")
+
+
+def archive_name(table: str) -> str:
+    return f"{table}_archive"
+
+
+def _quote(table: str) -> str:
+    return f'"{table}"'
+
+
+def archive_table_ddl(table: str, base_ddl: str) -> str:
+    """Turn a master CREATE TABLE statement into the one for its archive twin, minus foreign keys."""
+    header = f"CREATE TABLE IF NOT EXISTS {_quote(table) if table == 'order' else table} ("
+    if header not in base_ddl:
+        raise ValueError(f"Unexpected DDL shape for {table}")
+    ddl = base_ddl.replace(header, f"CREATE TABLE IF NOT EXISTS {archive_name(table)} (")
+    return _TRAILING_COMMA_RE.sub(r"\1", _FOREIGN_KEY_RE.sub("", ddl))
+
+
+def _table_columns(cursor, table: str) -> List[str]:
+    cursor.execute(f"SELECT * FROM {_quote(table)} WHERE 1 = 0")
+    return [column[0] for column in cursor.description]
+
+
+def hot_sources(tables: Sequence[str]) -> Dict[str, str]:
+    return {table: _quote(table) for table in tables}
+
+
+def archived_sources(tables: Sequence[str]) -> Dict[str, str]:
+    return {table: archive_name(table) for table in tables}
+
+
+def archive_reached(cursor, store_id: Optional[str] = None, start=None) -> bool:
+    """
+    True when rows dated from `start` on may include archived ones: the store (any
+    store without `store_id`) has archived rows before `start`, or at all without it.
+    """
+    filters, params = [], []
+    if store_id:
+        filters.append("storeId = %s")
+        params.append(store_id)
+    if start is not None:
+        filters.append("archivedBefore > %s")
+        params.append(start)
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+    cursor.execute(f"SELECT 1 FROM {ARCHIVE_STATE_TABLE} {where} LIMIT 1", params)
+    return cursor.fetchone() is not None
+
+
+def table_sources(cursor, tables: Sequence[str], store_id: Optional[str] = None, start=None) -> Dict[str, str]:
+    """
+    table -> FROM-clause source for a read of rows dated from `start` on (the whole
+    history without it): the quoted hot table, or a parenthesised UNION ALL of hot
+    and archived rows when the range reaches the archive. Sources need an alias.
+    """
+    if not archive_reached(cursor, store_id, start):
+        return hot_sources(tables)
+    sources = {}
+    for table in tables:
+        select = ", ".join(_table_columns(cursor, table))
+        sources[table] = (
+            f"(SELECT {select} FROM {_quote(table)} UNION ALL SELECT {select} FROM {archive_name(table)})"
+        )
+    return sources
+
+
+def _advance_state(cursor, store_id: str, before: datetime) -> datetime:
+    """Record `before` as the store's cutoff unless a later one is already recorded; returns the cutoff."""
+    cursor.execute(f"SELECT archivedBefore FROM {ARCHIVE_STATE_TABLE} WHERE storeId = %s", [store_id])
+    row = cursor.fetchone()
+    if row is None:
+        cursor.execute(
+            f"INSERT INTO {ARCHIVE_STATE_TABLE} (storeId, archivedBefore, updatedAt) VALUES (%s, %s, %s)",
+            [store_id, before, timezone.now()],
+        )
+        return before
+    cursor.execute(
+        f"UPDATE {ARCHIVE_STATE_TABLE} SET archivedBefore = %s, updatedAt = %s "
+        "WHERE storeId = %s AND archivedBefore < %s",
+        [before, timezone.now(), store_id, before],
+    )
+    return before if cursor.rowcount else row[0]
+
+
+def _move(cursor, table: str, key: str, ids: Sequence[str], columns: Sequence[str]) -> int:
+    placeholders = ", ".join(["%s"] * len(ids))
+    select = ", ".join(columns)
+    cursor.execute(
+        f"INSERT INTO {archive_name(table)} ({select}) "
+        f"SELECT {select} FROM {_quote(table)} WHERE {key} IN ({placeholders})",
+        list(ids),
+    )
+    cursor.execute(f"DELETE FROM {_quote(table)} WHERE {key} IN ({placeholders})", list(ids))
+    return cursor.rowcount
+
+
+def archive_store(store_id: str, before: datetime, using: str = "default") -> dict:
+    """
+    Move a store's orders (with their items and exchanged metal) and customer
+    transactions dated before `before` into the archive tables, one transaction
+    per batch. The cutoff is recorded first, so readers look in the archive
+    while rows are moving. Returns the number of rows moved per table.
+    """
+    # Stored dates are UTC; SQLite compares them as text, so the cutoff has to be UTC too.
+    before = before.astimezone(dt_timezone.utc)
+    connection = connections[using]
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cutoff = _advance_state(cursor, store_id, before)
+        columns = {table: _table_columns(cursor, table) for table in ARCHIVED_TABLE_NAMES}
+
+    moved = {table: 0 for table, _, _ in ARCHIVED_TABLES}
+    while True:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT orderId FROM "order" WHERE storeId = %s AND orderDate < %s ORDER BY orderDate LIMIT %s',
+                [store_id, before, DB_BATCH_SIZE],
+            )
+            order_ids = [row[0] for row in cursor.fetchall()]
+            if not order_ids:
+                break
+            # The order goes last: deleting it first would cascade to the rows not yet copied.
+            for table in reversed(_ORDER_TABLES):
+                moved[table] += _move(cursor, table, "orderId", order_ids, columns[table])
+
+    while True:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT t.transactionId FROM customer_transaction t "
+                "WHERE t.storeId = %s AND t.transactionDate < %s AND NOT EXISTS ("
+                "SELECT 1 FROM customer_khata_book kb WHERE kb.khataBookId = t.khataBookId AND kb.status = %s"
+                ") ORDER BY t.transactionDate LIMIT %s",
+                [store_id, before, ACTIVE_KHATA_STATUS, DB_BATCH_SIZE],
+            )
+            transaction_ids = [row[0] for row in cursor.fetchall()]
+            if not transaction_ids:
+                break
+            moved["customer_transaction"] += _move(
+                cursor, "customer_transaction", "transactionId", transaction_ids, columns["customer_transaction"]
+            )
+
+    return {"storeId": store_id, "archivedBefore": cutoff, "moved": moved}
@@ -0,0 +1,273 @@
+"""
+Optional monthly range partitioning for the append-only order and transaction tables.
+
+PostgreSQL only. Enabled with MASTER_TABLE_PARTITIONING=true; the table DDL is derived
+from MASTER_TABLE_DDL so the column lists stay single-sourced. Partitions are named
+`<table>_pYYYYMM` and cover [first of month, first of next month) in UTC. A DEFAULT
+partition, `<table>_pdefault`, takes rows dated outside every monthly partition (a
+back-dated order, say); when the month's partition is created later, those rows are
+moved into it.
+"""
+
+import re
+from datetime import date, datetime, time
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+
+# (table, primary key column, partition column). Parents come before children.
+PARTITIONED_TABLES = [
+    ("order", "orderId", "orderDate"),
+    ("order_item", "orderItemId", "orderDate"),
+    ("exchange_item", "exchangeItemId", "orderDate"),
+    ("customer_transaction", "transactionId", "transactionDate"),
+]
+
+PARTITIONED_TABLE_NAMES = {table for table, _, _ in PARTITIONED_TABLES}
+
+_PARTITION_SUFFIX_RE = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+def partitioning_enabled():
+    """Return True when the current connection should use partitioned master tables."""
+    return connection.vendor == "postgresql" and getattr(settings, "MASTER_TABLE_PARTITIONING", False)
+
+
+def partitioned_table_ddl(table, base_ddl):
+    """
+    Turn a plain CREATE TABLE statement into its PARTITION BY RANGE equivalent.
+
+    The partition column has to be part of every unique constraint, so the primary key
+    becomes (pk, partition column) and foreign keys into "order" become composite.
+    """
+    _, pk, column = next(entry for entry in PARTITIONED_TABLES if entry[0] == table)
+    ddl = base_ddl.replace(f"{pk} TEXT PRIMARY KEY,", f"{pk} TEXT NOT NULL,")
+    ddl = ddl.replace(
+        'FOREIGN KEY (orderId) REFERENCES "order"(orderId)',
+        'FOREIGN KEY (orderId, orderDate) REFERENCES "order"(orderId, orderDate)',
+    )
+    body = ddl.rstrip()
+    if not body.endswith(")"):
+        raise ValueError(f"Unexpected DDL shape for {table}")
+    return f"{body[:-1].rstrip()},\n            PRIMARY KEY ({pk}, {column})\n        ) PARTITION BY RANGE ({column})"
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def iter_months(start, end):
+    """Yield the first day of every month from start to end inclusive."""
+    current = month_start(start)
+    last = month_start(end)
+    while current <= last:
+        yield current
+        current = add_months(current, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y%m}"
+
+
+def default_partition_name(table):
+    return f"{table}_pdefault"
+
+
+def partition_month(name):
+    """Return the month a `<table>_pYYYYMM` partition covers, or None for foreign names."""
+    match = _PARTITION_SUFFIX_RE.search(name)
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def table_kind(cursor, table):
+    """Return 'p' (partitioned), 'r' (plain) or None when the table does not exist."""
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [connection.ops.quote_name(table)])
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def list_partitions(cursor, table):
+    """Return [(name, month, estimated_rows)] for the partitions attached to `table`."""
+    cursor.execute(
+        """
+        SELECT c.relname, c.reltuples
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        ORDER BY c.relname
+        """,
+        [connection.ops.quote_name(table)],
+    )
+    return [(name, partition_month(name), max(int(rows), 0)) for name, rows in cursor.fetchall()]
+
+
+def _month_bounds(month):
+    return f"{month.isoformat()} 00:00:00+00", f"{add_months(month, 1).isoformat()} 00:00:00+00"
+
+
+def _stash_default_rows(cursor, tables, month):
+    """
+    Move the rows of `month` out of the DEFAULT partitions into temporary tables, children
+    first, so the month's partitions can be created. Returns the stashes, parents first.
+    """
+    quote = connection.ops.quote_name
+    lower = datetime.combine(month, time.min, tzinfo=dt_timezone.utc)
+    upper = datetime.combine(add_months(month, 1), time.min, tzinfo=dt_timezone.utc)
+    stashes = []
+    for table, _, column in reversed(tables):
+        default = quote(default_partition_name(table))
+        cursor.execute(f"SELECT 1 FROM {default} WHERE {column} >= %s AND {column} < %s LIMIT 1", [lower, upper])
+        if cursor.fetchone() is None:
+            continue
+        stash = f"{table}_stash_{month:%Y%m}"
+        cursor.execute(
+            f"CREATE TEMP TABLE {quote(stash)} AS SELECT * FROM {default} WHERE {column} >= %s AND {column} < %s",
+            [lower, upper],
+        )
+        cursor.execute(f"DELETE FROM {default} WHERE {column} >= %s AND {column} < %s", [lower, upper])
+        stashes.insert(0, (table, stash))
+    return stashes
+
+
+def ensure_partitions(cursor, start, end):
+    """
+    Create the DEFAULT partitions and the monthly partitions for every partitioned table
+    between start and end (inclusive), moving rows the DEFAULT partition holds for a new
+    month into it. Returns the names of the partitions that were created.
+    """
+    quote = connection.ops.quote_name
+    tables = [entry for entry in PARTITIONED_TABLES if table_kind(cursor, entry[0]) == "p"]
+    existing = {}
+    for table, _, _ in tables:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {quote(default_partition_name(table))} PARTITION OF {quote(table)} DEFAULT"
+        )
+        existing[table] = {name for name, _, _ in list_partitions(cursor, table)}
+
+    created = []
+    for month in iter_months(start, end):
+        missing = [entry for entry in tables if partition_name(entry[0], month) not in existing[entry[0]]]
+        if not missing:
+            continue
+        stashes = _stash_default_rows(cursor, missing, month)
+        lower, upper = _month_bounds(month)
+        for table, _, _ in missing:
+            name = partition_name(table, month)
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {quote(name)} PARTITION OF {quote(table)} "
+                f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+            )
+            created.append(name)
+        # The stash has the parent's column order: it was copied from one of its partitions.
+        for table, stash in stashes:
+            cursor.execute(f"INSERT INTO {quote(table)} SELECT * FROM {quote(stash)}")
+            cursor.execute(f"DROP TABLE {quote(stash)}")
+    return created
+
+
+def detach_partitions(cursor, before, drop=False):
+    """
+    Detach (and optionally drop) every partition whose month ends on or before `before`.
+
+    Children are detached first and lose their foreign key into "order", so the matching
+    "order" partition can then be detached without a referential check against live rows.
+    """
+    quote = connection.ops.quote_name
+    cutoff = month_start(before)
+    detached = []
+    for table, _, _ in reversed(PARTITIONED_TABLES):
+        if table_kind(cursor, table) != "p":
+            continue
+        for name, month, _ in list_partitions(cursor, table):
+            if month is None or add_months(month, 1) > cutoff:
+                continue
+            cursor.execute(f"ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}")
+            cursor.execute(
+                """
+                SELECT conname FROM pg_constraint
+                WHERE conrelid = to_regclass(%s) AND contype = 'f' AND confrelid = to_regclass('"order"')
+                """,
+                [quote(name)],
+            )
+            for (constraint,) in cursor.fetchall():
+                cursor.execute(f"ALTER TABLE {quote(name)} DROP CONSTRAINT {quote(constraint)}")
+            if drop:
+                cursor.execute(f"DROP TABLE {quote(name)}")
+            detached.append(name)
+    return detached
+
+
+def _add_columns(cursor, table, column_ddl):
+    quote = connection.ops.quote_name
+    for base, column, definition in column_ddl:
+        if base == table:
+            cursor.execute(f"ALTER TABLE {quote(table)} ADD COLUMN IF NOT EXISTS {column} {definition}")
+
+
+def convert_to_partitioned(cursor, base_ddl, months_ahead, keep_unpartitioned=False, column_ddl=()):
+    """
+    Rebuild the plain order/transaction tables as partitioned tables and copy their rows.
+
+    `column_ddl` (MASTER_COLUMN_DDL) lists the columns added after the base DDL; both
+    the old and the new tables get them first, and rows are copied by column name.
+    Runs inside the caller's transaction. Indexes are not recreated here; apply the
+    master index DDL afterwards. Returns {table: copied_rows}.
+    """
+    quote = connection.ops.quote_name
+    plain = [entry for entry in PARTITIONED_TABLES if table_kind(cursor, entry[0]) == "r"]
+    if not plain:
+        return {}
+    for table, _, _ in plain:
+        _add_columns(cursor, table, column_ddl)
+
+    # Move the old tables out of the way, children first, freeing their index names.
+    for table, _, _ in reversed(plain):
+        old = f"{table}_unpartitioned"
+        cursor.execute(f"ALTER TABLE {quote(table)} RENAME TO {quote(old)}")
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'",
+            [quote(old)],
+        )
+        for (constraint,) in cursor.fetchall():
+            cursor.execute(f"ALTER TABLE {quote(old)} RENAME CONSTRAINT {quote(constraint)} TO {quote(old + '_pkey')}")
+        cursor.execute(
+            """
+            SELECT i.relname FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            WHERE x.indrelid = to_regclass(%s) AND NOT x.indisprimary
+            """,
+            [quote(old)],
+        )
+        for (index,) in cursor.fetchall():
+            cursor.execute(f"DROP INDEX {quote(index)}")
+
+    first_month = date.today()
+    for table, _, column in plain:
+        cursor.execute(partitioned_table_ddl(table, base_ddl[table]))
+        _add_columns(cursor, table, column_ddl)
+        cursor.execute(f"SELECT MIN({column}) FROM {quote(table + '_unpartitioned')}")
+        oldest = cursor.fetchone()[0]
+        if oldest is not None:
+            first_month = min(first_month, oldest.date())
+    ensure_partitions(cursor, first_month, add_months(date.today(), months_ahead))
+
+    copied = {}
+    for table, _, _ in plain:
+        cursor.execute(f"SELECT * FROM {quote(table)} WHERE 1 = 0")
+        columns = ", ".join(quote(column[0]) for column in cursor.description)
+        cursor.execute(
+            f"INSERT INTO {quote(table)} ({columns}) SELECT {columns} FROM {quote(table + '_unpartitioned')}"
+        )
+        copied[table] = cursor.rowcount
+    if not keep_unpartitioned:
+        for table, _, _ in reversed(plain):
+            cursor.execute(f"DROP TABLE {quote(table + '_unpartitioned')}")
+    return copied
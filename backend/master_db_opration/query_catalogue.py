@@ -0,0 +1,138 @@
+"""
+Catalogue of the canonical master-table queries.
+
+Each entry is (name, sql, params) and describes an access pattern the app relies on.
+`manage.py audit_indexes` EXPLAINs every entry to check it is served by an index.
+"""
+
+from datetime import datetime, timezone
+
+_STORE = "audit-store"
+_CUSTOMER = "9999999999"
+_RANGE_START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+_RANGE_END = datetime(2025, 2, 1, tzinfo=timezone.utc)
+
+QUERY_CATALOGUE = [
+    (
+        "sub_categories_for_category",
+        "SELECT subCatId, subCatName, quantity, gsWt, fnWt FROM sub_category WHERE storeId = %s AND catId = %s",
+        [_STORE, "audit-cat"],
+    ),
+    (
+        "items_for_sub_category",
+        "SELECT itemId, itemAddName, quantity, gsWt, ntWt, fnWt FROM item "
+        "WHERE storeId = %s AND catId = %s AND subCatId = %s",
+        [_STORE, "audit-cat", "audit-sub-cat"],
+    ),
+    (
+        "items_recently_modified",
+        "SELECT itemId, itemAddName, modifiedDate FROM item WHERE storeId = %s ORDER BY modifiedDate DESC LIMIT 50",
+        [_STORE],
+    ),
+    (
+        "item_stock_totals",
+        "SELECT catId, subCatId, SUM(quantity), SUM(gsWt), SUM(fnWt) FROM item WHERE storeId = %s GROUP BY catId, subCatId",
+        [_STORE],
+    ),
+    (
+        "item_by_huid",
+        "SELECT itemId, itemAddName FROM item WHERE storeId = %s AND huid = %s",
+        [_STORE, "AB1234"],
+    ),
+    (
+        "customers_recently_modified",
+        "SELECT mobileNo, name, totalAmount FROM customer WHERE storeId = %s ORDER BY lastModifiedDate DESC LIMIT 50",
+        [_STORE],
+    ),
+    (
+        "khata_books_by_status",
+        "SELECT khataBookId, customerMobile, monthlyAmount FROM customer_khata_book WHERE storeId = %s AND status = %s",
+        [_STORE, "active"],
+    ),
+    (
+        "transactions_for_period",
+        "SELECT transactionId, customerMobile, amount, transactionType, paymentMethod FROM customer_transaction "
+        "WHERE storeId = %s AND transactionDate >= %s AND transactionDate < %s ORDER BY transactionDate",
+        [_STORE, _RANGE_START, _RANGE_END],
+    ),
+    (
+        "transactions_for_customer",
+        "SELECT transactionId, amount, transactionType FROM customer_transaction "
+        "WHERE customerMobile = %s ORDER BY transactionDate DESC LIMIT 50",
+        [_CUSTOMER],
+    ),
+    (
+        "orders_for_period",
+        'SELECT orderId, customerMobile, orderDate, totalAmount, totalTax FROM "order" '
+        "WHERE storeId = %s AND orderDate >= %s AND orderDate < %s ORDER BY orderDate DESC",
+        [_STORE, _RANGE_START, _RANGE_END],
+    ),
+    (
+        "orders_for_customer",
+        'SELECT orderId, orderDate, totalAmount FROM "order" WHERE customerMobile = %s ORDER BY orderDate DESC LIMIT 50',
+        [_CUSTOMER],
+    ),
+    (
+        "order_items_for_order",
+        "SELECT orderItemId, itemId, price, charge, tax FROM order_item WHERE orderId = %s",
+        ["audit-order"],
+    ),
+    (
+        "order_items_for_period",
+        "SELECT orderItemId, orderId, cgst, sgst, igst FROM order_item WHERE orderDate >= %s AND orderDate < %s",
+        [_RANGE_START, _RANGE_END],
+    ),
+    (
+        "exchange_items_for_period",
+        "SELECT exchangeItemId, orderId, fineWeight, exchangeValue FROM exchange_item "
+        "WHERE orderDate >= %s AND orderDate < %s",
+        [_RANGE_START, _RANGE_END],
+    ),
+    (
+        "dashboard_daily_totals",
+        "SELECT saleDate, orders, totalAmount FROM daily_order_totals "
+        "WHERE storeId = %s AND saleDate >= %s AND saleDate <= %s",
+        [_STORE, _RANGE_START.date(), _RANGE_END.date()],
+    ),
+    (
+        "dashboard_category_sales",
+        "SELECT catId, SUM(price), SUM(charge) FROM daily_sales "
+        "WHERE storeId = %s AND saleDate >= %s AND saleDate <= %s GROUP BY catId",
+        [_STORE, _RANGE_START.date(), _RANGE_END.date()],
+    ),
+    (
+        "dashboard_payments",
+        "SELECT paymentMethod, SUM(amount) FROM daily_payments "
+        "WHERE storeId = %s AND saleDate >= %s AND saleDate <= %s GROUP BY paymentMethod",
+        [_STORE, _RANGE_START.date(), _RANGE_END.date()],
+    ),
+    (
+        "supplier_sellers_of_firm",
+        "SELECT s.sellerId, l.bills, l.purchasedFnWt, l.exchangedFnWt FROM seller s "
+        "LEFT JOIN seller_ledger l ON l.sellerId = s.sellerId WHERE s.firmId = %s",
+        ["audit-firm"],
+    ),
+    (
+        "supplier_statement_bills",
+        "SELECT purchaseOrderId, billNo, billDate, totalFinalAmount FROM purchase_order "
+        "WHERE sellerId = %s ORDER BY billDate DESC, purchaseOrderId DESC LIMIT 50",
+        ["audit-seller"],
+    ),
+    (
+        "rename_order_lines_of_category",
+        "SELECT orderItemId FROM order_item WHERE catId = %s AND orderItemId > %s ORDER BY orderItemId LIMIT %s",
+        ["audit-cat", "", 500],
+    ),
+    (
+        "rename_archived_lines_of_sub_category",
+        "SELECT orderItemId FROM order_item_archive WHERE subCatId = %s AND orderItemId > %s "
+        "ORDER BY orderItemId LIMIT %s",
+        ["audit-sub-cat", "", 500],
+    ),
+    (
+        "rename_purchase_lines_of_category",
+        "SELECT purchaseItemId FROM purchase_order_item WHERE catId = %s AND purchaseItemId > %s "
+        "ORDER BY purchaseItemId LIMIT %s",
+        ["audit-cat", "", 500],
+    ),
+]
@@ -0,0 +1,196 @@
+"""
+Stock rollups on sub_category (quantity, gsWt, fnWt) and category (gsWt, fnWt).
+
+Triggers on `item` apply the delta of every insert, update and delete to the
+owning sub_category and category rows inside the writing transaction, so the
+totals never need a GROUP BY over item and concurrent writers cannot lose an
+update. On PostgreSQL the triggers are statement-level with transition tables:
+one UPDATE per statement, and the rollup rows are locked in key order first so
+two multi-item writes cannot deadlock. reconcile_stock_rollups recomputes the
+totals in bulk and repairs drift.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from backend.shared.constants import DB_BATCH_SIZE
+from backend.shared.db import values_sql
+
+SUB_CATEGORY_ROLLUP_FIELDS = ["quantity", "gsWt", "fnWt"]
+CATEGORY_ROLLUP_FIELDS = ["gsWt", "fnWt"]
+
+ROLLUP_TRIGGER_COLUMNS = "quantity, gsWt, fnWt, subCatId, catId"
+
+
+def _sqlite_apply(row: str, sign: str) -> str:
+    return (
+        f"UPDATE sub_category SET quantity = quantity {sign} {row}.quantity, gsWt = gsWt {sign} {row}.gsWt, "
+        f"fnWt = fnWt {sign} {row}.fnWt WHERE subCatId = {row}.subCatId; "
+        f"UPDATE category SET gsWt = gsWt {sign} {row}.gsWt, fnWt = fnWt {sign} {row}.fnWt "
+        f"WHERE catId = {row}.catId;"
+    )
+
+
+SQLITE_ROLLUP_TRIGGER_DDL = [
+    (
+        "trg_item_rollup_insert",
+        "CREATE TRIGGER IF NOT EXISTS trg_item_rollup_insert AFTER INSERT ON item "
+        f"BEGIN {_sqlite_apply('NEW', '+')} END",
+    ),
+    (
+        "trg_item_rollup_delete",
+        "CREATE TRIGGER IF NOT EXISTS trg_item_rollup_delete AFTER DELETE ON item "
+        f"BEGIN {_sqlite_apply('OLD', '-')} END",
+    ),
+    (
+        "trg_item_rollup_update",
+        f"CREATE TRIGGER IF NOT EXISTS trg_item_rollup_update AFTER UPDATE OF {ROLLUP_TRIGGER_COLUMNS} ON item "
+        f"BEGIN {_sqlite_apply('OLD', '-')} {_sqlite_apply('NEW', '+')} END",
+    ),
+]
+
+# Signed item rows each PostgreSQL trigger function reads from its transition tables.
+_POSTGRES_DELTA_SOURCES = {
+    "insert": "SELECT subCatId, catId, quantity, gsWt, fnWt FROM new_rows",
+    "delete": "SELECT subCatId, catId, -quantity, -gsWt, -fnWt FROM old_rows",
+    "update": (
+        "SELECT subCatId, catId, quantity, gsWt, fnWt FROM new_rows "
+        "UNION ALL SELECT subCatId, catId, -quantity, -gsWt, -fnWt FROM old_rows"
+    ),
+}
+_POSTGRES_REFERENCING = {
+    "insert": "REFERENCING NEW TABLE AS new_rows",
+    "delete": "REFERENCING OLD TABLE AS old_rows",
+    "update": "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows",
+}
+
+
+def _postgres_function(op: str) -> str:
+    source = f"SELECT * FROM ({_POSTGRES_DELTA_SOURCES[op]}) AS delta (subCatId, catId, quantity, gsWt, fnWt)"
+    return f"""
+        CREATE OR REPLACE FUNCTION item_rollup_{op}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM 1 FROM sub_category
+                WHERE subCatId IN (SELECT subCatId FROM ({source}) s) ORDER BY subCatId FOR UPDATE;
+            UPDATE sub_category sc SET
+                quantity = sc.quantity + d.quantity, gsWt = sc.gsWt + d.gsWt, fnWt = sc.fnWt + d.fnWt
+            FROM (
+                SELECT subCatId, SUM(quantity) AS quantity, SUM(gsWt) AS gsWt, SUM(fnWt) AS fnWt
+                FROM ({source}) s GROUP BY subCatId
+            ) d
+            WHERE sc.subCatId = d.subCatId;
+            PERFORM 1 FROM category
+                WHERE catId IN (SELECT catId FROM ({source}) s) ORDER BY catId FOR UPDATE;
+            UPDATE category c SET gsWt = c.gsWt + d.gsWt, fnWt = c.fnWt + d.fnWt
+            FROM (SELECT catId, SUM(gsWt) AS gsWt, SUM(fnWt) AS fnWt FROM ({source}) s GROUP BY catId) d
+            WHERE c.catId = d.catId;
+            RETURN NULL;
+        END
+        $$
+    """
+
+
+def _postgres_trigger_ddl() -> List[Tuple[str, str]]:
+    ddl = []
+    for op in ("insert", "update", "delete"):
+        name = f"trg_item_rollup_{op}"
+        ddl.append((f"item_rollup_{op}", _postgres_function(op)))
+        ddl.append((name, f"DROP TRIGGER IF EXISTS {name} ON item"))
+        ddl.append((
+            name,
+            f"CREATE TRIGGER {name} AFTER {op.upper()} ON item {_POSTGRES_REFERENCING[op]} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION item_rollup_{op}()",
+        ))
+    return ddl
+
+
+def rollup_trigger_ddl(vendor: str) -> List[Tuple[str, str]]:
+    """Return the (name, ddl) statements that install the item rollup triggers."""
+    if vendor == "postgresql":
+        return _postgres_trigger_ddl()
+    return list(SQLITE_ROLLUP_TRIGGER_DDL)
+
+
+def _scope(alias: str, store_id: Optional[str]) -> Tuple[str, list]:
+    return (f"WHERE {alias}.storeId = %s", [store_id]) if store_id else ("", [])
+
+
+def stock_rollup_drift(cursor, store_id: Optional[str] = None, tolerance: float = 0.001) -> Dict[str, List[dict]]:
+    """
+    Compare the stored rollups with a bulk GROUP BY over item.
+
+    Returns {"subCategories": [...], "categories": [...]}, each row carrying the
+    stored value, the expected value and the delta per field.
+    """
+    where, params = _scope("sc", store_id)
+    cursor.execute(
+        f"""
+        SELECT sc.subCatId, sc.quantity, sc.gsWt, sc.fnWt,
+               COALESCE(i.quantity, 0), COALESCE(i.gsWt, 0), COALESCE(i.fnWt, 0)
+        FROM sub_category sc
+        LEFT JOIN (
+            SELECT subCatId, SUM(quantity) AS quantity, SUM(gsWt) AS gsWt, SUM(fnWt) AS fnWt
+            FROM item GROUP BY subCatId
+        ) i ON i.subCatId = sc.subCatId
+        {where}
+        ORDER BY sc.subCatId
+        """,
+        params,
+    )
+    sub_categories = _drifted(cursor.fetchall(), "subCatId", SUB_CATEGORY_ROLLUP_FIELDS, tolerance)
+
+    where, params = _scope("c", store_id)
+    cursor.execute(
+        f"""
+        SELECT c.catId, c.gsWt, c.fnWt, COALESCE(i.gsWt, 0), COALESCE(i.fnWt, 0)
+        FROM category c
+        LEFT JOIN (SELECT catId, SUM(gsWt) AS gsWt, SUM(fnWt) AS fnWt FROM item GROUP BY catId) i
+            ON i.catId = c.catId
+        {where}
+        ORDER BY c.catId
+        """,
+        params,
+    )
+    categories = _drifted(cursor.fetchall(), "catId", CATEGORY_ROLLUP_FIELDS, tolerance)
+    return {"subCategories": sub_categories, "categories": categories}
+
+
+def _drifted(rows, key: str, fields: List[str], tolerance: float) -> List[dict]:
+    drifted = []
+    width = len(fields)
+    for row in rows:
+        stored, expected = row[1:1 + width], row[1 + width:]
+        deltas = [expected_value - stored_value for stored_value, expected_value in zip(stored, expected)]
+        if any(abs(delta) > tolerance for delta in deltas):
+            entry = {key: row[0]}
+            for field, stored_value, expected_value, delta in zip(fields, stored, expected, deltas):
+                entry[field] = stored_value
+                entry[f"expected_{field}"] = expected_value
+                entry[f"delta_{field}"] = delta
+            drifted.append(entry)
+    return drifted
+
+
+def repair_stock_rollups(cursor, drift: Dict[str, List[dict]]) -> None:
+    """
+    Add the computed deltas to the stored rollups.
+
+    Applying deltas instead of the recomputed totals keeps the changes that item
+    writes make (through the triggers) while the reconcile job runs.
+    """
+    for table, key, fields, rows in (
+        ("sub_category", "subCatId", SUB_CATEGORY_ROLLUP_FIELDS, drift["subCategories"]),
+        ("category", "catId", CATEGORY_ROLLUP_FIELDS, drift["categories"]),
+    ):
+        types = [None] + ["INTEGER" if field == "quantity" else "DOUBLE PRECISION" for field in fields]
+        assignments = ", ".join(
+            f"{field} = {table}.{field} + fix.column{position}" for position, field in enumerate(fields, start=2)
+        )
+        for start in range(0, len(rows), DB_BATCH_SIZE):
+            batch = rows[start:start + DB_BATCH_SIZE]
+            fix_sql, fix_params = values_sql(
+                [[row[key], *(row[f"delta_{field}"] for field in fields)] for row in batch], types
+            )
+            cursor.execute(
+                f"UPDATE {table} SET {assignments} FROM {fix_sql} AS fix WHERE {table}.{key} = fix.column1",
+                fix_params,
+            )
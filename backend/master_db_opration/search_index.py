@@ -0,0 +1,121 @@
+"""
+Fuzzy-search indexes over item (itemAddName, huid) and customer (name, mobileNo).
+
+PostgreSQL gets pg_trgm GIN indexes on the lowercased columns, which serve
+`LIKE '%...%'` as well as the `%` similarity operator. SQLite gets FTS5 tables
+with the trigram tokenizer as external-content indexes of item and customer,
+kept in step by triggers, plus fts5vocab tables exposing how many rows hold
+each trigram; a newly created index is filled with 'rebuild'.
+
+Queries too short for trigrams are prefix ranges over (storeId, prefix_key(column))
+B-tree indexes on both vendors.
+"""
+
+from typing import List, Tuple
+
+# FTS5 table -> (content table, indexed columns)
+SQLITE_SEARCH_TABLES = {
+    "item_search": ("item", ["itemAddName", "huid"]),
+    "customer_search": ("customer", ["name", "mobileNo"]),
+}
+
+POSTGRES_SEARCH_DDL = [
+    ("pg_trgm", "CREATE EXTENSION IF NOT EXISTS pg_trgm"),
+    (
+        "idx_item_name_trgm",
+        "CREATE INDEX IF NOT EXISTS idx_item_name_trgm ON item USING gin (lower(itemAddName) gin_trgm_ops)",
+    ),
+    (
+        "idx_item_huid_trgm",
+        "CREATE INDEX IF NOT EXISTS idx_item_huid_trgm ON item USING gin (lower(huid) gin_trgm_ops)",
+    ),
+    (
+        "idx_customer_name_trgm",
+        "CREATE INDEX IF NOT EXISTS idx_customer_name_trgm ON customer USING gin (lower(name) gin_trgm_ops)",
+    ),
+    (
+        "idx_customer_mobile_trgm",
+        "CREATE INDEX IF NOT EXISTS idx_customer_mobile_trgm ON customer USING gin (mobileNo gin_trgm_ops)",
+    ),
+]
+
+# (index, table, column) of the prefix indexes; see prefix_key.
+PREFIX_SEARCH_INDEXES = [
+    ("idx_item_store_name_prefix", "item", "itemAddName"),
+    ("idx_item_store_huid_prefix", "item", "huid"),
+    ("idx_customer_store_name_prefix", "customer", "name"),
+    ("idx_customer_store_mobile_prefix", "customer", "mobileNo"),
+]
+
+
+def prefix_key(column: str, vendor: str, alias: str = "") -> str:
+    """
+    The expression prefix searches range over: the lowercased column (mobileNo
+    is digits only and kept as-is), compared bytewise on PostgreSQL as SQLite
+    does, so [prefix, next prefix) holds exactly the values starting with it.
+    """
+    reference = f"{alias}.{column}" if alias else column
+    expression = reference if column == "mobileNo" else f"lower({reference})"
+    return f'({expression} COLLATE "C")' if vendor == "postgresql" else expression
+
+
+def _prefix_search_ddl(vendor: str) -> List[Tuple[str, str]]:
+    return [
+        (index, f"CREATE INDEX IF NOT EXISTS {index} ON {table} (storeId, {prefix_key(column, vendor)})")
+        for index, table, column in PREFIX_SEARCH_INDEXES
+    ]
+
+
+def _sqlite_search_ddl(index: str, table: str, columns: List[str]) -> List[Tuple[str, str]]:
+    names = ", ".join(columns)
+    new_values = ", ".join(f"NEW.{column}" for column in columns)
+    old_values = ", ".join(f"OLD.{column}" for column in columns)
+    remove = f"INSERT INTO {index} ({index}, rowid, {names}) VALUES ('delete', OLD.rowid, {old_values});"
+    add = f"INSERT INTO {index} (rowid, {names}) VALUES (NEW.rowid, {new_values});"
+    return [
+        (
+            index,
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5({names}, content='{table}', "
+            f"content_rowid='rowid', tokenize='trigram')",
+        ),
+        (f"{index}_vocab", f"CREATE VIRTUAL TABLE IF NOT EXISTS {index}_vocab USING fts5vocab({index}, 'row')"),
+        (
+            f"trg_{index}_insert",
+            f"CREATE TRIGGER IF NOT EXISTS trg_{index}_insert AFTER INSERT ON {table} BEGIN {add} END",
+        ),
+        (
+            f"trg_{index}_delete",
+            f"CREATE TRIGGER IF NOT EXISTS trg_{index}_delete AFTER DELETE ON {table} BEGIN {remove} END",
+        ),
+        (
+            f"trg_{index}_update",
+            f"CREATE TRIGGER IF NOT EXISTS trg_{index}_update AFTER UPDATE OF {names} ON {table} "
+            f"BEGIN {remove} {add} END",
+        ),
+    ]
+
+
+def search_index_ddl(vendor: str) -> List[Tuple[str, str]]:
+    """Return the (name, ddl) statements that create the search indexes."""
+    if vendor == "postgresql":
+        return [*POSTGRES_SEARCH_DDL, *_prefix_search_ddl(vendor)]
+    ddl = _prefix_search_ddl(vendor)
+    for index, (table, columns) in SQLITE_SEARCH_TABLES.items():
+        ddl.extend(_sqlite_search_ddl(index, table, columns))
+    return ddl
+
+
+def apply_search_indexes(cursor, vendor: str) -> None:
+    """Create the search indexes; FTS5 tables created by this call are filled from their content table."""
+    created = []
+    if vendor == "sqlite":
+        cursor.execute(
+            f"SELECT name FROM sqlite_master WHERE name IN ({', '.join(['%s'] * len(SQLITE_SEARCH_TABLES))})",
+            list(SQLITE_SEARCH_TABLES),
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        created = [index for index in SQLITE_SEARCH_TABLES if index not in existing]
+    for _, ddl in search_index_ddl(vendor):
+        cursor.execute(ddl)
+    for index in created:
+        cursor.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
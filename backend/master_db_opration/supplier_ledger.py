@@ -0,0 +1,314 @@
+"""
+Supplier ledger: running purchase totals per seller (seller_ledger) and per firm
+(firm_ledger).
+
+Row-level triggers on purchase_order, purchase_order_item, metal_exchange and
+seller add the delta of every write to the seller's row and to the row of the
+firm recorded on it, inside the writing transaction, whichever client wrote
+it. Purchase writes are infrequent, so plain row-level triggers are used on
+both SQLite and PostgreSQL, with the same statements.
+
+A purchase_order delete is taken off in a BEFORE trigger, bill and items and
+exchanges together, while the children still exist; the delete triggers of the
+rows removed by the cascade then no longer find their bill and do nothing.
+reconcile_supplier_ledger recomputes the totals in bulk and repairs drift.
+
+The app does not send purchase_order.storeId: the first item written on a bill
+fills it from the item's category, and backfill_purchase_stores fills bills
+written before that trigger existed.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from backend.shared.constants import DB_BATCH_SIZE
+
+# Summed per seller and per firm: bills, fine weight and value bought, fine weight
+# given back as metal exchange, and the bills' extra charges and final weight / amount.
+LEDGER_FIELDS = [
+    "bills", "purchasedFnWt", "purchasedValue", "exchangedFnWt", "extraCharge", "finalWeight", "finalAmount",
+]
+LEDGER_TABLES = {"seller_ledger": "sellerId", "firm_ledger": "firmId"}
+
+
+def _bill_delta(row: str) -> Dict[str, str]:
+    return {
+        "bills": "1",
+        "extraCharge": f"COALESCE({row}.extraCharge, 0)",
+        "finalWeight": f"COALESCE({row}.totalFinalWeight, 0)",
+        "finalAmount": f"COALESCE({row}.totalFinalAmount, 0)",
+    }
+
+
+def _contents_delta(purchase_order_id: str) -> Dict[str, str]:
+    items = f"FROM purchase_order_item WHERE purchaseOrderId = {purchase_order_id}"
+    return {
+        "purchasedFnWt": f"(SELECT COALESCE(SUM(fnWt), 0) {items})",
+        "purchasedValue": f"(SELECT COALESCE(SUM(fnWt * fnRate), 0) {items})",
+        "exchangedFnWt": (
+            f"(SELECT COALESCE(SUM(fnWeight), 0) FROM metal_exchange WHERE purchaseOrderId = {purchase_order_id})"
+        ),
+    }
+
+
+def _item_delta(row: str) -> Dict[str, str]:
+    return {"purchasedFnWt": f"{row}.fnWt", "purchasedValue": f"{row}.fnWt * {row}.fnRate"}
+
+
+def _exchange_delta(row: str) -> Dict[str, str]:
+    return {"exchangedFnWt": f"{row}.fnWeight"}
+
+
+def _seller_of(row: str) -> str:
+    return f"(SELECT sellerId FROM purchase_order WHERE purchaseOrderId = {row}.purchaseOrderId)"
+
+
+# Store of a purchase bill: the store of the category of one of its items.
+_PURCHASE_STORE_SQL = (
+    "(SELECT c.storeId FROM purchase_order_item poi JOIN category c ON c.catId = poi.catId "
+    "WHERE poi.purchaseOrderId = purchase_order.purchaseOrderId LIMIT 1)"
+)
+
+
+def _apply(seller: str, delta: Dict[str, str], sign: str) -> List[str]:
+    """Add (sign '+') or take off (sign '-') `delta` on a seller's ledger row and its firm's."""
+    assignments = ", ".join(f"{field} = {field} {sign} ({expression})" for field, expression in delta.items())
+    return [
+        f"UPDATE seller_ledger SET {assignments} WHERE sellerId = {seller};",
+        f"UPDATE firm_ledger SET {assignments} "
+        f"WHERE firmId = (SELECT firmId FROM seller_ledger WHERE sellerId = {seller});",
+    ]
+
+
+def _move_seller(sign: str, firm: str) -> str:
+    assignments = ", ".join(
+        f"{field} = {field} {sign} (SELECT {field} FROM seller_ledger WHERE sellerId = NEW.sellerId)"
+        for field in LEDGER_FIELDS
+    )
+    return f"UPDATE firm_ledger SET {assignments} WHERE firmId = {firm};"
+
+
+_ENSURE_ROWS = [
+    "INSERT INTO firm_ledger (firmId) VALUES (NEW.firmId) ON CONFLICT (firmId) DO NOTHING;",
+    "INSERT INTO seller_ledger (sellerId, firmId) VALUES (NEW.sellerId, NEW.firmId) "
+    "ON CONFLICT (sellerId) DO NOTHING;",
+]
+
+# (trigger, timing, table, WHEN condition or None, statements)
+RowTrigger = Tuple[str, str, str, Optional[str], List[str]]
+
+LEDGER_TRIGGERS: List[RowTrigger] = [
+    ("trg_firm_ledger_insert", "AFTER INSERT", "firm", None, [_ENSURE_ROWS[0]]),
+    ("trg_seller_ledger_insert", "AFTER INSERT", "seller", None, _ENSURE_ROWS),
+    (
+        "trg_seller_ledger_move",
+        "AFTER UPDATE OF firmId",
+        "seller",
+        "OLD.firmId <> NEW.firmId",
+        [
+            _ENSURE_ROWS[0],
+            _move_seller("-", "OLD.firmId"),
+            _move_seller("+", "NEW.firmId"),
+            "UPDATE seller_ledger SET firmId = NEW.firmId WHERE sellerId = NEW.sellerId;",
+        ],
+    ),
+    (
+        "trg_purchase_order_ledger_insert", "AFTER INSERT", "purchase_order", None,
+        _apply("NEW.sellerId", _bill_delta("NEW"), "+"),
+    ),
+    (
+        "trg_purchase_order_ledger_delete",
+        "BEFORE DELETE",
+        "purchase_order",
+        None,
+        _apply("OLD.sellerId", {**_bill_delta("OLD"), **_contents_delta("OLD.purchaseOrderId")}, "-"),
+    ),
+    (
+        "trg_purchase_order_ledger_update",
+        "AFTER UPDATE OF sellerId, extraCharge, totalFinalWeight, totalFinalAmount",
+        "purchase_order",
+        None,
+        _apply("OLD.sellerId", _bill_delta("OLD"), "-") + _apply("NEW.sellerId", _bill_delta("NEW"), "+"),
+    ),
+    (
+        "trg_purchase_order_ledger_move",
+        "AFTER UPDATE OF sellerId",
+        "purchase_order",
+        "OLD.sellerId <> NEW.sellerId",
+        _apply("OLD.sellerId", _contents_delta("NEW.purchaseOrderId"), "-")
+        + _apply("NEW.sellerId", _contents_delta("NEW.purchaseOrderId"), "+"),
+    ),
+    (
+        "trg_purchase_order_item_ledger_insert", "AFTER INSERT", "purchase_order_item", None,
+        _apply(_seller_of("NEW"), _item_delta("NEW"), "+"),
+    ),
+    (
+        "trg_purchase_order_item_ledger_delete", "AFTER DELETE", "purchase_order_item", None,
+        _apply(_seller_of("OLD"), _item_delta("OLD"), "-"),
+    ),
+    (
+        "trg_purchase_order_item_ledger_update",
+        "AFTER UPDATE OF fnWt, fnRate, purchaseOrderId",
+        "purchase_order_item",
+        None,
+        _apply(_seller_of("OLD"), _item_delta("OLD"), "-") + _apply(_seller_of("NEW"), _item_delta("NEW"), "+"),
+    ),
+    (
+        "trg_purchase_order_item_store", "AFTER INSERT", "purchase_order_item", None,
+        [
+            "UPDATE purchase_order SET storeId = (SELECT storeId FROM category WHERE catId = NEW.catId) "
+            "WHERE purchaseOrderId = NEW.purchaseOrderId AND storeId IS NULL;",
+        ],
+    ),
+    (
+        "trg_metal_exchange_ledger_insert", "AFTER INSERT", "metal_exchange", None,
+        _apply(_seller_of("NEW"), _exchange_delta("NEW"), "+"),
+    ),
+    (
+        "trg_metal_exchange_ledger_delete", "AFTER DELETE", "metal_exchange", None,
+        _apply(_seller_of("OLD"), _exchange_delta("OLD"), "-"),
+    ),
+    (
+        "trg_metal_exchange_ledger_update",
+        "AFTER UPDATE OF fnWeight, purchaseOrderId",
+        "metal_exchange",
+        None,
+        _apply(_seller_of("OLD"), _exchange_delta("OLD"), "-")
+        + _apply(_seller_of("NEW"), _exchange_delta("NEW"), "+"),
+    ),
+]
+
+
+def row_trigger_ddl(vendor: str, triggers: List[RowTrigger]) -> List[Tuple[str, str]]:
+    """Return the (name, ddl) statements that install row-level triggers on SQLite or PostgreSQL."""
+    ddl = []
+    for name, timing, table, condition, statements in triggers:
+        body = " ".join(statements)
+        when = f" WHEN ({condition})" if condition else ""
+        if vendor != "postgresql":
+            ddl.append((name, f"CREATE TRIGGER IF NOT EXISTS {name} {timing} ON {table}{when} BEGIN {body} END"))
+            continue
+        function = name[len("trg_"):]
+        result = "OLD" if timing.startswith("BEFORE") else "NULL"
+        ddl.append((
+            function,
+            f"""
+            CREATE OR REPLACE FUNCTION {function}() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                {body}
+                RETURN {result};
+            END
+            $$
+            """,
+        ))
+        ddl.append((name, f"DROP TRIGGER IF EXISTS {name} ON {table}"))
+        ddl.append((
+            name,
+            f"CREATE TRIGGER {name} {timing} ON {table} FOR EACH ROW{when} EXECUTE FUNCTION {function}()",
+        ))
+    return ddl
+
+
+def ledger_trigger_ddl(vendor: str) -> List[Tuple[str, str]]:
+    """Return the (name, ddl) statements that install the supplier ledger triggers."""
+    return row_trigger_ddl(vendor, LEDGER_TRIGGERS)
+
+
+def backfill_purchase_stores(cursor) -> int:
+    """Fill purchase_order.storeId where it is missing; returns the number of bills updated."""
+    cursor.execute(f"UPDATE purchase_order SET storeId = {_PURCHASE_STORE_SQL} WHERE storeId IS NULL")
+    return cursor.rowcount
+
+
+def supplier_ledger_drift(cursor, tolerance: float = 0.001) -> Dict[str, List[dict]]:
+    """
+    Compare the stored ledgers with a bulk recomputation from the purchase tables.
+
+    Returns {"sellers": [...], "firms": [...]}; each row carries the stored value,
+    the expected value and the delta per field (sellers also their expected firmId).
+    """
+    cursor.execute(
+        """
+        SELECT s.sellerId, s.firmId, COUNT(po.purchaseOrderId),
+               COALESCE(SUM(i.fnWt), 0), COALESCE(SUM(i.value), 0), COALESCE(SUM(e.fnWeight), 0),
+               COALESCE(SUM(po.extraCharge), 0), COALESCE(SUM(po.totalFinalWeight), 0),
+               COALESCE(SUM(po.totalFinalAmount), 0)
+        FROM seller s
+        LEFT JOIN purchase_order po ON po.sellerId = s.sellerId
+        LEFT JOIN (
+            SELECT purchaseOrderId, SUM(fnWt) AS fnWt, SUM(fnWt * fnRate) AS value
+            FROM purchase_order_item GROUP BY purchaseOrderId
+        ) i ON i.purchaseOrderId = po.purchaseOrderId
+        LEFT JOIN (
+            SELECT purchaseOrderId, SUM(fnWeight) AS fnWeight FROM metal_exchange GROUP BY purchaseOrderId
+        ) e ON e.purchaseOrderId = po.purchaseOrderId
+        GROUP BY s.sellerId, s.firmId
+        """
+    )
+    expected_sellers = {row[0]: (row[1], list(row[2:])) for row in cursor.fetchall()}
+    cursor.execute("SELECT firmId FROM firm")
+    expected_firms = {row[0]: [0] * len(LEDGER_FIELDS) for row in cursor.fetchall()}
+    for firm_id, values in expected_sellers.values():
+        totals = expected_firms.setdefault(firm_id, [0] * len(LEDGER_FIELDS))
+        for position, value in enumerate(values):
+            totals[position] += value
+
+    fields = ", ".join(LEDGER_FIELDS)
+    cursor.execute(f"SELECT sellerId, firmId, {fields} FROM seller_ledger")
+    stored_sellers = {row[0]: (row[1], list(row[2:])) for row in cursor.fetchall()}
+    cursor.execute(f"SELECT firmId, {fields} FROM firm_ledger")
+    stored_firms = {row[0]: list(row[1:]) for row in cursor.fetchall()}
+
+    sellers = []
+    for seller_id, (firm_id, values) in sorted(expected_sellers.items()):
+        stored_firm, stored = stored_sellers.get(seller_id, (None, None))
+        entry = _drifted("sellerId", seller_id, stored, values, tolerance, force=stored_firm != firm_id)
+        if entry is not None:
+            entry["firmId"] = firm_id
+            sellers.append(entry)
+    firms = []
+    for firm_id, values in sorted(expected_firms.items()):
+        entry = _drifted("firmId", firm_id, stored_firms.get(firm_id), values, tolerance)
+        if entry is not None:
+            firms.append(entry)
+    return {"sellers": sellers, "firms": firms}
+
+
+def _drifted(key: str, key_value: str, stored, expected: List[float], tolerance: float, force: bool = False):
+    stored = stored or [0] * len(LEDGER_FIELDS)
+    deltas = [expected_value - (stored_value or 0) for stored_value, expected_value in zip(stored, expected)]
+    if not force and not any(abs(delta) > tolerance for delta in deltas):
+        return None
+    entry = {key: key_value}
+    for field, stored_value, expected_value, delta in zip(LEDGER_FIELDS, stored, expected, deltas):
+        entry[field] = stored_value
+        entry[f"expected_{field}"] = expected_value
+        entry[f"delta_{field}"] = delta
+    return entry
+
+
+def repair_supplier_ledger(cursor, drift: Dict[str, List[dict]]) -> None:
+    """
+    Add the computed deltas to the stored ledgers, creating missing rows.
+
+    As with the stock rollups, deltas rather than recomputed totals keep the
+    changes purchase writes make through the triggers while the job runs.
+    """
+    for table, rows in (("seller_ledger", drift["sellers"]), ("firm_ledger", drift["firms"])):
+        key = LEDGER_TABLES[table]
+        columns = [key, *(["firmId"] if table == "seller_ledger" else []), *LEDGER_FIELDS]
+        assignments = ", ".join(
+            [f"{field} = {table}.{field} + excluded.{field}" for field in LEDGER_FIELDS]
+            + (["firmId = excluded.firmId"] if table == "seller_ledger" else [])
+        )
+        placeholders = f"({', '.join(['%s'] * len(columns))})"
+        for start in range(0, len(rows), DB_BATCH_SIZE):
+            batch = rows[start:start + DB_BATCH_SIZE]
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([placeholders] * len(batch))} "
+                f"ON CONFLICT ({key}) DO UPDATE SET {assignments}",
+                [
+                    value for row in batch
+                    for value in (row[key], *([row["firmId"]] if table == "seller_ledger" else []),
+                                  *(row[f"delta_{field}"] for field in LEDGER_FIELDS))
+                ],
+            )
@@ -0,0 +1,519 @@
+"""
+Synthetic master data for scale testing.
+
+generate() fills every MASTER_TABLE_DDL table with referentially consistent rows
+for a number of stores: an owner per store, a fixed category tree, firms and
+sellers with purchase bills (bought lots and metal exchanged), the stock items
+taken in on those bills, customers, orders with their lines and exchanged metal
+spread over a span of days, khata books with their monthly installments, other
+customer payments, plus a printer and a label template. All values come from one
+random.Random per store seeded from `seed`, so a seed, scale and end day always
+produce the same rows.
+
+Rows are buffered per table and loaded DB_BATCH_SIZE at a time with bulk_insert
+(COPY on PostgreSQL, executemany on SQLite), parents before children, one
+transaction per store. The triggers keep the stock rollups, inventory versions
+and supplier ledger as usual; customer totals and khata paid/outstanding amounts
+are summed while generating, and the daily sales rollups are rebuilt for the
+span afterwards, so every aggregate agrees with its raw rows.
+"""
+
+import json
+import random
+from datetime import date, datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from typing import Dict, List, Optional
+
+from django.db import connections, transaction
+
+from backend.api.v1.billing.services import EXCHANGE_ITEM_COLUMNS, ORDER_COLUMNS
+from backend.api.v1.customers.installments import shift_months
+from backend.api.v1.customers.services import signed_khata_amount
+from backend.api.v1.dashboard import rollups as sales_rollups
+from backend.master_db_opration.partitioning import ensure_partitions, table_kind
+from backend.shared.constants import DB_BATCH_SIZE, ROLE_STORE_OWNER
+from backend.shared.db import bulk_insert
+from backend.shared.exceptions import ConflictException, ValidationException
+from backend.shared.pricing import price_lines
+
+# Rows per store unless overridden; one of each is the minimum.
+DEFAULT_SCALE = {
+    "items": 5000,
+    "customers": 2000,
+    "orders": 20000,
+    "lines": 3,
+    "khataBooks": 200,
+    "transactions": 2000,
+    "purchases": 500,
+    "firms": 10,
+}
+DEFAULT_DAYS = 365
+# Days of daily sales rollups rebuilt per transaction afterwards.
+ROLLUP_REBUILD_DAYS = 31
+KHATA_MONTHS = 11
+# Distinct designs per store that order lines are drawn from.
+DESIGNS_PER_STORE = 200
+
+# (catName, subCatNames, [(purity, fineness)], gross weight range in grams)
+CATEGORY_TREE = [
+    ("Gold", ["Ring", "Chain", "Bangle", "Necklace", "Earring", "Pendant"],
+     [("916", 0.916), ("750", 0.75), ("999", 0.999)], (1.5, 40.0)),
+    ("Silver", ["Anklet", "Coin", "Bracelet", "Utensil"], [("925", 0.925), ("999", 0.999)], (5.0, 250.0)),
+]
+# Per-gram fine rates at the start of the span; they drift up by RATE_DRIFT over it.
+BASE_RATES = {"gold": 6200.0, "silver": 78.0}
+RATE_DRIFT = 0.2
+CHARGE_TYPES = [("Percentage", 8.0, 16.0), ("Piece", 150.0, 900.0), ("Gm", 250.0, 700.0)]
+PAYMENT_METHODS = ["cash", "upi", "card", "bank"]
+FIRST_NAMES = ["Aarav", "Priya", "Rohan", "Meera", "Vikram", "Ananya", "Kabir", "Isha", "Arjun", "Sneha"]
+LAST_NAMES = ["Sharma", "Patel", "Iyer", "Reddy", "Gupta", "Nair", "Joshi", "Khan", "Das", "Mehta"]
+CITIES = ["Mumbai", "Pune", "Jaipur", "Surat", "Chennai", "Kolkata", "Lucknow", "Kochi"]
+
+USER_COLUMNS = ["userId", "name", "email", "mobileNo", "token", "pin", "role"]
+USER_INFO_COLUMNS = ["userId", "address", "isActive", "createdAt", "updatedAt"]
+STORE_COLUMNS = [
+    "storeId", "userId", "proprietor", "name", "email", "phone", "address", "registrationNo", "gstinNo", "panNo",
+    "image", "invoiceNo", "upiId",
+]
+CATEGORY_COLUMNS = ["catId", "catName", "userId", "storeId"]
+SUB_CATEGORY_COLUMNS = ["subCatId", "catId", "userId", "storeId", "catName", "subCatName"]
+FIRM_COLUMNS = ["firmId", "firmName", "firmMobileNumber", "gstNumber", "address"]
+SELLER_COLUMNS = ["sellerId", "firmId", "name", "mobileNumber"]
+PURCHASE_ORDER_COLUMNS = [
+    "purchaseOrderId", "sellerId", "billNo", "billDate", "entryDate", "extraChargeDescription", "extraCharge",
+    "totalFinalWeight", "totalFinalAmount", "notes", "cgstPercent", "sgstPercent", "igstPercent", "storeId",
+]
+PURCHASE_ITEM_COLUMNS = [
+    "purchaseItemId", "purchaseOrderId", "catId", "catName", "subCatId", "subCatName", "gsWt", "purity", "ntWt",
+    "fnWt", "fnRate", "wastagePercent",
+]
+METAL_EXCHANGE_COLUMNS = ["exchangeId", "purchaseOrderId", "catId", "catName", "subCatId", "subCatName", "fnWeight"]
+# The fields a stock item and the order lines selling it share.
+DESIGN_FIELDS = [
+    "itemAddName", "catId", "catName", "subCatId", "subCatName", "entryType", "purity", "crgType", "crg", "othCrgDes",
+    "othCrg", "cgst", "sgst", "igst", "addDesKey", "addDesValue", "sellerFirmId", "purchaseOrderId",
+    "purchaseItemId",
+]
+ITEM_COLUMNS = [
+    "itemId", "userId", "storeId", "quantity", "gsWt", "ntWt", "fnWt", "huid", "unit", "addDate", "modifiedDate",
+    *DESIGN_FIELDS,
+]
+ORDER_ITEM_COLUMNS = [
+    "orderItemId", "orderId", "orderDate", "itemId", "customerMobile", "quantity", "gsWt", "ntWt", "fnWt", "huid",
+    "fnMetalPrice", "price", "charge", "tax", *DESIGN_FIELDS,
+]
+CUSTOMER_COLUMNS = [
+    "mobileNo", "name", "address", "gstin_pan", "addDate", "lastModifiedDate", "totalItemBought", "totalAmount",
+    "notes", "userId", "storeId",
+]
+KHATA_BOOK_COLUMNS = [
+    "khataBookId", "customerMobile", "planName", "startDate", "endDate", "monthlyAmount", "totalMonths",
+    "totalAmount", "status", "notes", "userId", "storeId", "paidAmount", "outstandingAmount",
+]
+TRANSACTION_COLUMNS = [
+    "transactionId", "customerMobile", "transactionDate", "amount", "transactionType", "category", "description",
+    "referenceNumber", "paymentMethod", "khataBookId", "monthNumber", "notes", "userId", "storeId",
+]
+PRINTER_COLUMNS = ["address", "name", "method", "isDefault", "lastConnectedAt", "supportedLanguages", "currentLanguage"]
+LABEL_TEMPLATE_COLUMNS = [
+    "templateId", "templateName", "templateType", "labelWidth", "labelHeight", "gapWidth", "gapHeight",
+    "printDensity", "printSpeed", "printDirection", "referenceX", "referenceY", "orientation", "printLanguage",
+    "createdAt", "modifiedAt", "isDefault",
+]
+LABEL_ELEMENT_COLUMNS = [
+    "elementId", "templateId", "elementType", "x", "y", "width", "height", "rotation", "zIndex", "properties",
+    "dataBinding",
+]
+
+# Load order: every table after the tables it references.
+TABLE_COLUMNS = {
+    "users": USER_COLUMNS,
+    "user_additional_info": USER_INFO_COLUMNS,
+    "store": STORE_COLUMNS,
+    "category": CATEGORY_COLUMNS,
+    "sub_category": SUB_CATEGORY_COLUMNS,
+    "firm": FIRM_COLUMNS,
+    "seller": SELLER_COLUMNS,
+    "purchase_order": PURCHASE_ORDER_COLUMNS,
+    "purchase_order_item": PURCHASE_ITEM_COLUMNS,
+    "metal_exchange": METAL_EXCHANGE_COLUMNS,
+    "item": ITEM_COLUMNS,
+    "order": ORDER_COLUMNS,
+    "order_item": ORDER_ITEM_COLUMNS,
+    "exchange_item": [*EXCHANGE_ITEM_COLUMNS, "addDate"],
+    "customer": CUSTOMER_COLUMNS,
+    "customer_khata_book": KHATA_BOOK_COLUMNS,
+    "customer_transaction": TRANSACTION_COLUMNS,
+    "printer": PRINTER_COLUMNS,
+    "label_template": LABEL_TEMPLATE_COLUMNS,
+    "label_element": LABEL_ELEMENT_COLUMNS,
+}
+
+
+class _Loader:
+    """Per-table row buffers, flushed together in load order whenever one fills up."""
+
+    def __init__(self, cursor, vendor: str):
+        self.cursor = cursor
+        self.vendor = vendor
+        self.buffers: Dict[str, List[list]] = {table: [] for table in TABLE_COLUMNS}
+        self.counts = {table: 0 for table in TABLE_COLUMNS}
+
+    def add(self, table: str, row: list) -> None:
+        buffer = self.buffers[table]
+        buffer.append(row)
+        if len(buffer) >= DB_BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        for table, rows in self.buffers.items():
+            if rows:
+                bulk_insert(self.cursor, self.vendor, table, TABLE_COLUMNS[table], rows)
+                self.counts[table] += len(rows)
+                rows.clear()
+
+
+def resolve_scale(overrides: Optional[Dict[str, Optional[int]]] = None) -> Dict[str, int]:
+    scale = dict(DEFAULT_SCALE)
+    for key, value in (overrides or {}).items():
+        if value is None:
+            continue
+        if key not in scale:
+            raise ValidationException(f"Unknown scale setting {key}")
+        if value < 1:
+            raise ValidationException(f"{key} must be at least 1")
+        scale[key] = value
+    return scale
+
+
+def store_ids(seed: int, stores: int) -> List[str]:
+    return [f"syn{seed}-s{index}" for index in range(1, stores + 1)]
+
+
+def _rates(day_index: int, days: int) -> Dict[str, float]:
+    factor = 1 + RATE_DRIFT * day_index / max(days, 1)
+    return {metal: round(rate * factor, 2) for metal, rate in BASE_RATES.items()}
+
+
+def _name(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _moment(start: date, day_index: int, rng: random.Random) -> datetime:
+    """A UTC time between 04:30 and 14:30 (Indian shop hours) on day `day_index` of the span."""
+    seconds = rng.randrange(4 * 3600 + 1800, 14 * 3600 + 1800)
+    return datetime.combine(start + timedelta(days=day_index), time.min, tzinfo=dt_timezone.utc) + timedelta(
+        seconds=seconds, microseconds=rng.randrange(1000000)
+    )
+
+
+class _StoreGenerator:
+    """Generates one store's rows into a _Loader; see the module docstring for what is produced."""
+
+    def __init__(self, loader: _Loader, seed: int, index: int, scale: Dict[str, int], start: date, days: int):
+        self.load = loader.add
+        self.rng = random.Random(f"{seed}:{index}")
+        self.scale = scale
+        self.start = start
+        self.days = days
+        self.store_id = f"syn{seed}-s{index}"
+        self.user_id = f"{self.store_id}-owner"
+        self.mobile_prefix = f"{seed % 90 + 10:02d}{index:03d}"
+        self.sub_categories = []
+        self.lots = []
+        self.designs = []
+        self.design_lots = []
+
+    def run(self) -> None:
+        self._store()
+        self._categories()
+        self._purchases()
+        self._items()
+        customers = self._orders()
+        self._customers(customers)
+        self._khata_books(customers)
+        self._transactions(customers)
+
+    def _store(self) -> None:
+        rng, store_id = self.rng, self.store_id
+        owner = _name(rng)
+        created = int(datetime.combine(self.start, time.min, tzinfo=dt_timezone.utc).timestamp() * 1000)
+        self.load("users", [self.user_id, owner, f"{self.user_id}@example.com", f"{self.mobile_prefix}00000",
+                            None, None, ROLE_STORE_OWNER])
+        self.load("user_additional_info", [self.user_id, rng.choice(CITIES), True, created, created])
+        self.load("store", [
+            store_id, self.user_id, owner, f"{owner.split()[1]} Jewellers {store_id}", f"{store_id}@example.com",
+            f"{self.mobile_prefix}00000", f"{rng.randrange(1, 400)} Main Road, {rng.choice(CITIES)}",
+            f"REG{rng.randrange(10 ** 8):08d}", f"27ABCDE{rng.randrange(10 ** 4):04d}F1Z5",
+            f"ABCDE{rng.randrange(10 ** 4):04d}F", "", self.scale["orders"], f"{store_id}@okaxis",
+        ])
+
+    def _categories(self) -> None:
+        for cat_index, (cat_name, sub_names, purities, weights) in enumerate(CATEGORY_TREE, 1):
+            cat_id = f"{self.store_id}-c{cat_index}"
+            self.load("category", [cat_id, cat_name, self.user_id, self.store_id])
+            for sub_index, sub_name in enumerate(sub_names, 1):
+                sub_id = f"{cat_id}-{sub_index}"
+                self.load("sub_category", [sub_id, cat_id, self.user_id, self.store_id, cat_name, sub_name])
+                self.sub_categories.append((cat_id, cat_name, sub_id, sub_name, purities, weights))
+
+    def _purchases(self) -> None:
+        rng, store_id = self.rng, self.store_id
+        sellers = []
+        for firm_index in range(1, self.scale["firms"] + 1):
+            firm_id, seller_id = f"{store_id}-f{firm_index}", f"{store_id}-sl{firm_index}"
+            self.load("firm", [
+                firm_id, f"{rng.choice(LAST_NAMES)} Bullion {firm_index}", f"98{rng.randrange(10 ** 8):08d}",
+                f"27FIRM{rng.randrange(10 ** 5):05d}Z{firm_index % 10}", rng.choice(CITIES),
+            ])
+            self.load("seller", [seller_id, firm_id, _name(rng), f"97{rng.randrange(10 ** 8):08d}"])
+            sellers.append((seller_id, firm_id))
+
+        purchases = self.scale["purchases"]
+        for bill_index in range(1, purchases + 1):
+            bill_id = f"{store_id}-p{bill_index}"
+            seller_id, firm_id = rng.choice(sellers)
+            day_index = (bill_index - 1) * self.days // purchases
+            bill_day = (self.start + timedelta(days=day_index)).isoformat()
+            rates = _rates(day_index, self.days)
+            weight = amount = 0.0
+            items = []
+            for line in range(1, rng.randint(1, 5) + 1):
+                cat_id, cat_name, sub_id, sub_name, purities, (low, high) = rng.choice(self.sub_categories)
+                purity, fineness = rng.choice(purities)
+                gross = round(rng.uniform(low, high) * rng.randint(5, 40), 3)
+                net = round(gross * rng.uniform(0.92, 1.0), 3)
+                fine = round(net * fineness, 3)
+                fine_rate = rates["silver" if cat_name == "Silver" else "gold"]
+                items.append([f"{bill_id}-{line}", bill_id, cat_id, cat_name, sub_id, sub_name, gross, purity, net,
+                              fine, fine_rate, round(rng.uniform(0, 3), 2)])
+                self.lots.append((firm_id, bill_id, f"{bill_id}-{line}", cat_id, cat_name, sub_id, sub_name, purity,
+                                  fineness, low, high))
+                weight += fine
+                amount += fine * fine_rate
+            exchanges = []
+            if rng.random() < 0.3:
+                cat_id, cat_name, sub_id, sub_name = items[0][2:6]
+                exchanged = round(weight * rng.uniform(0.05, 0.3), 3)
+                exchanges.append([f"{bill_id}-x1", bill_id, cat_id, cat_name, sub_id, sub_name, exchanged])
+                weight -= exchanged
+                amount -= exchanged * items[0][10]
+            extra = float(rng.choice([0, 0, 250, 500, 1000]))
+            self.load("purchase_order", [
+                bill_id, seller_id, f"B{bill_index:06d}", bill_day, bill_day, "Hallmarking" if extra else None, extra,
+                round(weight, 3), round(amount + extra, 2), None, 1.5, 1.5, 0.0, store_id,
+            ])
+            for row in items:
+                self.load("purchase_order_item", row)
+            for row in exchanges:
+                self.load("metal_exchange", row)
+
+        for design_index in range(1, DESIGNS_PER_STORE + 1):
+            firm_id, bill_id, lot_id, cat_id, cat_name, sub_id, sub_name, purity, _, _, _ = rng.choice(self.lots)
+            crg_type, crg_low, crg_high = rng.choice(CHARGE_TYPES)
+            self.designs.append([
+                f"{sub_name} {design_index}", cat_id, cat_name, sub_id, sub_name, "Purchase", purity, crg_type,
+                round(rng.uniform(crg_low, crg_high), 2), "Stone" if rng.random() < 0.2 else "",
+                float(rng.choice([0, 0, 0, 200, 450])), 1.5, 1.5, 0.0, "", "", firm_id, bill_id, lot_id,
+            ])
+        lots = {lot[2]: lot for lot in self.lots}
+        self.design_lots = [lots[design[-1]] for design in self.designs]
+
+    def _piece(self, design_index: int) -> tuple:
+        rng = self.rng
+        _, _, _, _, _, _, _, _, fineness, low, high = self.design_lots[design_index]
+        gross = round(rng.uniform(low, high), 3)
+        net = round(gross * rng.uniform(0.9, 1.0), 3)
+        return gross, net, round(net * fineness, 3)
+
+    def _items(self) -> None:
+        added = datetime.combine(self.start, time.min, tzinfo=dt_timezone.utc)
+        for item_index in range(1, self.scale["items"] + 1):
+            design_index = self.rng.randrange(len(self.designs))
+            gross, net, fine = self._piece(design_index)
+            self.load("item", [
+                f"{self.store_id}-i{item_index}", self.user_id, self.store_id, 1, gross, net, fine,
+                f"H{self.rng.randrange(36 ** 5):06X}", "gm", added, added, *self.designs[design_index],
+            ])
+
+    def _orders(self) -> Dict[str, list]:
+        """Orders with their lines and exchanged metal; returns mobileNo -> [items bought, amount, first order]."""
+        rng, store_id, orders = self.rng, self.store_id, self.scale["orders"]
+        customers: Dict[str, list] = {
+            f"{self.mobile_prefix}{number:05d}": [0, 0.0, None] for number in range(1, self.scale["customers"] + 1)
+        }
+        mobiles = list(customers)
+        for order_index in range(1, orders + 1):
+            order_id = f"{store_id}-o{order_index}"
+            day_index = (order_index - 1) * self.days // orders
+            moment = _moment(self.start, day_index, rng)
+            rates = _rates(day_index, self.days)
+            mobile = rng.choice(mobiles)
+            lines = []
+            for _ in range(rng.randint(1, self.scale["lines"])):
+                design_index = rng.randrange(len(self.designs))
+                gross, net, fine = self._piece(design_index)
+                design = self.designs[design_index]
+                lines.append((design, {
+                    "catName": design[2], "fnWt": fine, "ntWt": net, "quantity": 1, "crgType": design[7],
+                    "crg": design[8], "othCrg": design[10], "cgst": design[11], "sgst": design[12], "igst": design[13],
+                    "gsWt": gross,
+                }))
+            priced = price_lines([line for _, line in lines], rates)
+            total_amount = round(sum(amounts["price"] for amounts in priced), 2)
+            total_charge = round(sum(amounts["charge"] for amounts in priced), 2)
+            total_tax = round(sum(amounts["tax"] for amounts in priced), 2)
+            discount = float(rng.choice([100, 250, 500, 1000])) if rng.random() < 0.1 else 0.0
+            self.load("order", [
+                order_id, mobile, store_id, self.user_id, moment, total_amount, total_tax, total_charge, discount,
+                None, order_index,
+            ])
+            for line_index, ((design, line), amounts) in enumerate(zip(lines, priced), 1):
+                self.load("order_item", [
+                    f"{order_id}-{line_index}", order_id, moment, f"{order_id}-sold{line_index}", mobile, 1,
+                    line["gsWt"], line["ntWt"], line["fnWt"], f"H{rng.randrange(36 ** 5):06X}",
+                    amounts["fnMetalPrice"], amounts["price"], amounts["charge"], amounts["tax"], *design,
+                ])
+            if rng.random() < 0.15:
+                metal = "silver" if rng.random() < 0.2 else "gold"
+                purity, fineness = ("925", 0.925) if metal == "silver" else ("916", 0.916)
+                gross = round(rng.uniform(2, 30), 3)
+                self.load("exchange_item", [
+                    f"{order_id}-x1", order_id, moment, mobile, metal, purity, gross, round(gross * fineness, 3),
+                    rates[metal], True, round(gross * fineness * rates[metal], 2), moment,
+                ])
+            totals = customers[mobile]
+            totals[0] += len(lines)
+            totals[1] += total_amount + total_charge + total_tax - discount
+            totals[2] = totals[2] or moment
+        return customers
+
+    def _customers(self, customers: Dict[str, list]) -> None:
+        rng = self.rng
+        first = datetime.combine(self.start, time.min, tzinfo=dt_timezone.utc)
+        for mobile, (items, amount, first_order) in customers.items():
+            self.load("customer", [
+                mobile, _name(rng), rng.choice(CITIES), None, first_order or first, first_order or first, items,
+                round(amount, 2), None, self.user_id, self.store_id,
+            ])
+
+    def _khata_books(self, customers: Dict[str, list]) -> None:
+        rng, store_id = self.rng, self.store_id
+        end = self.start + timedelta(days=self.days - 1)
+        mobiles = list(customers)
+        for book_index in range(1, self.scale["khataBooks"] + 1):
+            book_id = f"{store_id}-k{book_index}"
+            mobile = rng.choice(mobiles)
+            monthly = float(rng.choice([1000, 2000, 2500, 5000, 10000]))
+            start_day = self.start + timedelta(days=rng.randrange(self.days))
+            started = datetime.combine(start_day, time(5, 30), tzinfo=dt_timezone.utc)
+            payments = []
+            month = 1
+            while month <= KHATA_MONTHS and shift_months(start_day, month - 1) <= end:
+                if rng.random() < 0.9:
+                    day = shift_months(start_day, month - 1) + timedelta(days=rng.randrange(5))
+                    payments.append((month, datetime.combine(day, time(6, 0), tzinfo=dt_timezone.utc)))
+                month += 1
+            total = monthly * KHATA_MONTHS
+            paid = sum(signed_khata_amount("credit", monthly) for _ in payments)
+            self.load("customer_khata_book", [
+                book_id, mobile, f"Gold {KHATA_MONTHS}", started,
+                datetime.combine(shift_months(start_day, KHATA_MONTHS), time(5, 30), tzinfo=dt_timezone.utc),
+                monthly, KHATA_MONTHS, total, "completed" if paid >= total else "active", None, self.user_id,
+                store_id, paid, total - paid,
+            ])
+            for month, moment in payments:
+                self.load("customer_transaction", [
+                    f"{book_id}-m{month}", mobile, moment, monthly, "credit", "khata", f"Installment {month}", None,
+                    rng.choice(PAYMENT_METHODS), book_id, month, None, self.user_id, store_id,
+                ])
+
+    def _transactions(self, customers: Dict[str, list]) -> None:
+        rng, store_id = self.rng, self.store_id
+        mobiles = list(customers)
+        for index in range(1, self.scale["transactions"] + 1):
+            day_index = (index - 1) * self.days // self.scale["transactions"]
+            refund = rng.random() < 0.05
+            self.load("customer_transaction", [
+                f"{store_id}-t{index}", rng.choice(mobiles), _moment(self.start, day_index, rng),
+                float(rng.randrange(500, 50000, 50)), "debit" if refund else "credit",
+                "refund" if refund else rng.choice(["sale", "advance", "regular"]), None, None,
+                rng.choice(PAYMENT_METHODS), None, None, None, self.user_id, store_id,
+            ])
+
+
+def _shared_rows(loader: _Loader, seed: int) -> None:
+    """A printer and a price-tag label template, shared by the generated stores."""
+    template_id = f"syn{seed}-label"
+    loader.add("printer", [f"00:11:22:33:{seed % 256:02X}:01", f"Synthetic printer {seed}", "bluetooth", True, None,
+                           json.dumps(["TSPL", "ZPL"]), "TSPL"])
+    loader.add("label_template", [template_id, "Synthetic tag", "TAG", 50.0, 25.0, 2.0, 2.0, 8, 4, 0, 0.0, 0.0,
+                                  "PORTRAIT", "TSPL", 0, 0, False])
+    elements = [
+        ("TEXT", 2, 2, 30, 5, {"fontSize": 10}, "itemAddName"),
+        ("TEXT", 2, 8, 30, 4, {"prefix": "GW ", "suffix": " g"}, "gsWt"),
+        ("TEXT", 2, 13, 30, 4, {"prefix": "NW ", "suffix": " g"}, "ntWt"),
+        ("BARCODE", 2, 18, 30, 6, {}, "itemId"),
+        ("QR", 36, 4, 12, 12, {}, "huid"),
+    ]
+    for index, (kind, x, y, width, height, properties, binding) in enumerate(elements, 1):
+        loader.add("label_element", [f"{template_id}-{index}", template_id, kind, float(x), float(y), float(width),
+                                     float(height), 0.0, index, json.dumps(properties), binding])
+
+
+def generate(stores: int, seed: int, end: date, days: int = DEFAULT_DAYS,
+             scale: Optional[Dict[str, int]] = None, using: str = "default",
+             progress=None) -> dict:
+    """
+    Generate `stores` synthetic stores with orders dated over the `days` days
+    ending on `end`. Refuses to run if the seed's stores already exist.
+    Returns the rows written per table and the daily rollup rows rebuilt.
+    """
+    scale = resolve_scale(scale)
+    if stores < 1 or days < 1:
+        raise ValidationException("stores and days must be at least 1")
+    start = end - timedelta(days=days - 1)
+    ids = store_ids(seed, stores)
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT storeId FROM store WHERE storeId IN ({', '.join(['%s'] * len(ids))})", ids)
+        existing = [row[0] for row in cursor.fetchall()]
+    if existing:
+        raise ConflictException(f"Synthetic stores of seed {seed} already exist ({existing[0]}); use another seed")
+
+    counts = {table: 0 for table in TABLE_COLUMNS}
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            for table in ("order", "customer_transaction"):
+                if table_kind(cursor, table) == "p":
+                    ensure_partitions(cursor, start, end + timedelta(days=1))
+                    break
+        loader = _Loader(cursor, connection.vendor)
+        _shared_rows(loader, seed)
+        loader.flush()
+        _add_counts(counts, loader.counts)
+    for index, store_id in enumerate(ids, 1):
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            loader = _Loader(cursor, connection.vendor)
+            _StoreGenerator(loader, seed, index, scale, start, days).run()
+            loader.flush()
+        _add_counts(counts, loader.counts)
+        if progress:
+            progress(store_id, loader.counts)
+
+    rollup_rows = 0
+    for store_id in ids:
+        day = start
+        while day <= end:
+            last = min(day + timedelta(days=ROLLUP_REBUILD_DAYS - 1), end)
+            rollup_rows += sum(sales_rollups.backfill(day, last, store_id).values())
+            day = last + timedelta(days=1)
+    return {
+        "seed": seed, "stores": ids, "from": start.isoformat(), "to": end.isoformat(), "scale": scale,
+        "rows": counts, "totalRows": sum(counts.values()), "salesRollupRows": rollup_rows,
+    }
+
+
+def _add_counts(totals: Dict[str, int], counts: Dict[str, int]) -> None:
+    for table, count in counts.items():
+        totals[table] += count
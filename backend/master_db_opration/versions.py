@@ -0,0 +1,110 @@
+"""
+Per-store inventory version: store_inventory_version.version is bumped by
+triggers on every write to the tables in VERSIONED_TABLES, in the writing
+transaction. Read-side caches put the version in their keys, so any change to a
+store's stock or catalogue, by this API or any other writer, retires its cached
+entries without explicit invalidation calls. On PostgreSQL the insert/delete
+triggers are statement-level and bump each touched store once per statement;
+on SQLite they fire per row.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+# table -> columns whose UPDATE bumps the version (None: any column). category and
+# sub_category leave out their stock rollup columns: the item write that moves
+# them has already bumped the version.
+VERSIONED_TABLES: Dict[str, Optional[List[str]]] = {
+    "item": None,
+    "category": ["catName", "storeId"],
+    "sub_category": ["catId", "catName", "subCatName", "storeId"],
+}
+
+_BUMP_SQLITE = (
+    "INSERT INTO store_inventory_version (storeId, version) SELECT {row}.storeId, 1 WHERE {condition} "
+    "ON CONFLICT (storeId) DO UPDATE SET version = version + 1;"
+)
+
+
+def _sqlite_bump(row: str, condition: str = "1") -> str:
+    return _BUMP_SQLITE.format(row=row, condition=condition)
+
+
+def _sqlite_version_ddl(table: str, columns: Optional[List[str]]) -> List[Tuple[str, str]]:
+    update_of = f" OF {', '.join(columns)}" if columns else ""
+    return [
+        (
+            f"trg_{table}_version_insert",
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_version_insert AFTER INSERT ON {table} "
+            f"BEGIN {_sqlite_bump('NEW')} END",
+        ),
+        (
+            f"trg_{table}_version_delete",
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_version_delete AFTER DELETE ON {table} "
+            f"BEGIN {_sqlite_bump('OLD')} END",
+        ),
+        (
+            f"trg_{table}_version_update",
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_version_update AFTER UPDATE{update_of} ON {table} "
+            f"BEGIN {_sqlite_bump('NEW')} {_sqlite_bump('OLD', 'OLD.storeId <> NEW.storeId')} END",
+        ),
+    ]
+
+
+_POSTGRES_VERSION_SOURCES = {
+    "insert": ("REFERENCING NEW TABLE AS new_rows", "SELECT storeId FROM new_rows"),
+    "delete": ("REFERENCING OLD TABLE AS old_rows", "SELECT storeId FROM old_rows"),
+    "update": (
+        "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        "SELECT storeId FROM new_rows UNION SELECT storeId FROM old_rows",
+    ),
+}
+
+
+_POSTGRES_BUMP = """
+    INSERT INTO store_inventory_version (storeId, version)
+    SELECT DISTINCT storeId, 1 FROM ({source}) touched ORDER BY storeId
+    ON CONFLICT (storeId) DO UPDATE SET version = store_inventory_version.version + 1;
+"""
+
+
+def _postgres_version_ddl(table: str, columns: Optional[List[str]]) -> List[Tuple[str, str]]:
+    ddl = []
+    for op, (referencing, source) in _POSTGRES_VERSION_SOURCES.items():
+        function, trigger = f"{table}_version_{op}", f"trg_{table}_version_{op}"
+        timing = f"AFTER {op.upper()} ON {table} {referencing} FOR EACH STATEMENT"
+        if op == "update" and columns:
+            # Transition tables cannot be combined with a column list, so this one is row-level.
+            source = "SELECT NEW.storeId UNION SELECT OLD.storeId"
+            timing = f"AFTER UPDATE OF {', '.join(columns)} ON {table} FOR EACH ROW"
+        ddl.append((
+            function,
+            f"""
+            CREATE OR REPLACE FUNCTION {function}() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                {_POSTGRES_BUMP.format(source=source)}
+                RETURN NULL;
+            END
+            $$
+            """,
+        ))
+        ddl.append((trigger, f"DROP TRIGGER IF EXISTS {trigger} ON {table}"))
+        ddl.append((trigger, f"CREATE TRIGGER {trigger} {timing} EXECUTE FUNCTION {function}()"))
+    return ddl
+
+
+def version_trigger_ddl(vendor: str) -> List[Tuple[str, str]]:
+    """Return the (name, ddl) statements that install the inventory version triggers."""
+    ddl = []
+    for table, columns in VERSIONED_TABLES.items():
+        if vendor == "postgresql":
+            ddl.extend(_postgres_version_ddl(table, columns))
+        else:
+            ddl.extend(_sqlite_version_ddl(table, columns))
+    return ddl
+
+
+def inventory_version(cursor, store_id: str) -> int:
+    """Current inventory version of a store (0 before its first change)."""
+    cursor.execute("SELECT version FROM store_inventory_version WHERE storeId = %s", [store_id])
+    row = cursor.fetchone()
+    return row[0] if row else 0
@@ -1,7 +1,28 @@
+from datetime import date
+
+from django.conf import settings
 from django.db import connection, transaction
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 
+from backend.master_db_opration.cold_archive import (
+    ARCHIVE_STATE_TABLE,
+    ARCHIVED_TABLE_NAMES,
+    archive_name,
+    archive_table_ddl,
+)
+from backend.master_db_opration.partitioning import (
+    PARTITIONED_TABLE_NAMES,
+    add_months,
+    ensure_partitions,
+    partitioned_table_ddl,
+    partitioning_enabled,
+)
+from backend.master_db_opration.rollups import rollup_trigger_ddl
+from backend.master_db_opration.search_index import apply_search_indexes
+from backend.master_db_opration.supplier_ledger import backfill_purchase_stores, ledger_trigger_ddl, row_trigger_ddl
+from backend.master_db_opration.versions import version_trigger_ddl
+
 # Table definitions mirror the Room @Entity classes and DAOs in the mobile app.
 MASTER_TABLE_DDL = [
     (
@@ -267,7 +288,7 @@ MASTER_TABLE_DDL = [
             price DOUBLE PRECISION NOT NULL,
             isExchangedByMetal BOOLEAN NOT NULL,
             exchangeValue DOUBLE PRECISION NOT NULL,
-            addDate TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            addDate TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (orderId) REFERENCES "order"(orderId) ON DELETE CASCADE
         )
         """,
@@ -414,29 +435,368 @@ MASTER_TABLE_DDL = [
     ),
 ]
 
+# Server-side tables with no Room counterpart: daily sales rollups read by the dashboard API and
+# the per-store inventory version that read caches key on.
+SERVER_TABLE_DDL = [
+    (
+        "daily_sales",
+        """
+        CREATE TABLE IF NOT EXISTS daily_sales (
+            storeId TEXT NOT NULL,
+            saleDate DATE NOT NULL,
+            catId TEXT NOT NULL,
+            catName TEXT NOT NULL,
+            metal TEXT NOT NULL,
+            lines INTEGER NOT NULL DEFAULT 0,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            gsWt DOUBLE PRECISION NOT NULL DEFAULT 0,
+            ntWt DOUBLE PRECISION NOT NULL DEFAULT 0,
+            fnWt DOUBLE PRECISION NOT NULL DEFAULT 0,
+            price DOUBLE PRECISION NOT NULL DEFAULT 0,
+            charge DOUBLE PRECISION NOT NULL DEFAULT 0,
+            cgstAmount DOUBLE PRECISION NOT NULL DEFAULT 0,
+            sgstAmount DOUBLE PRECISION NOT NULL DEFAULT 0,
+            igstAmount DOUBLE PRECISION NOT NULL DEFAULT 0,
+            PRIMARY KEY (storeId, saleDate, catId)
+        )
+        """,
+    ),
+    (
+        "daily_order_totals",
+        """
+        CREATE TABLE IF NOT EXISTS daily_order_totals (
+            storeId TEXT NOT NULL,
+            saleDate DATE NOT NULL,
+            orders INTEGER NOT NULL DEFAULT 0,
+            totalAmount DOUBLE PRECISION NOT NULL DEFAULT 0,
+            totalCharge DOUBLE PRECISION NOT NULL DEFAULT 0,
+            totalTax DOUBLE PRECISION NOT NULL DEFAULT 0,
+            discount DOUBLE PRECISION NOT NULL DEFAULT 0,
+            exchangeValue DOUBLE PRECISION NOT NULL DEFAULT 0,
+            PRIMARY KEY (storeId, saleDate)
+        )
+        """,
+    ),
+    (
+        "daily_payments",
+        """
+        CREATE TABLE IF NOT EXISTS daily_payments (
+            storeId TEXT NOT NULL,
+            saleDate DATE NOT NULL,
+            paymentMethod TEXT NOT NULL,
+            transactionType TEXT NOT NULL,
+            transactions INTEGER NOT NULL DEFAULT 0,
+            amount DOUBLE PRECISION NOT NULL DEFAULT 0,
+            PRIMARY KEY (storeId, saleDate, paymentMethod, transactionType)
+        )
+        """,
+    ),
+    (
+        "store_inventory_version",
+        """
+        CREATE TABLE IF NOT EXISTS store_inventory_version (
+            storeId TEXT PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+    ),
+    (
+        "rename_job",
+        """
+        CREATE TABLE IF NOT EXISTS rename_job (
+            jobId TEXT PRIMARY KEY,
+            storeId TEXT NOT NULL,
+            targetType TEXT NOT NULL,
+            targetId TEXT NOT NULL,
+            oldName TEXT NOT NULL,
+            newName TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            stage INTEGER NOT NULL DEFAULT 0,
+            lastKey TEXT,
+            rowsScanned BIGINT NOT NULL DEFAULT 0,
+            rowsUpdated BIGINT NOT NULL DEFAULT 0,
+            error TEXT,
+            createdAt TIMESTAMPTZ NOT NULL,
+            updatedAt TIMESTAMPTZ NOT NULL
+        )
+        """,
+    ),
+    (
+        "khata_reminder",
+        """
+        CREATE TABLE IF NOT EXISTS khata_reminder (
+            storeId TEXT NOT NULL,
+            reminderDate DATE NOT NULL,
+            installments INTEGER NOT NULL DEFAULT 0,
+            amount DOUBLE PRECISION NOT NULL DEFAULT 0,
+            successCount INTEGER NOT NULL DEFAULT 0,
+            failureCount INTEGER NOT NULL DEFAULT 0,
+            sentAt TIMESTAMPTZ NOT NULL,
+            PRIMARY KEY (storeId, reminderDate)
+        )
+        """,
+    ),
+    (
+        "seller_ledger",
+        """
+        CREATE TABLE IF NOT EXISTS seller_ledger (
+            sellerId TEXT PRIMARY KEY,
+            firmId TEXT NOT NULL,
+            bills INTEGER NOT NULL DEFAULT 0,
+            purchasedFnWt DOUBLE PRECISION NOT NULL DEFAULT 0,
+            purchasedValue DOUBLE PRECISION NOT NULL DEFAULT 0,
+            exchangedFnWt DOUBLE PRECISION NOT NULL DEFAULT 0,
+            extraCharge DOUBLE PRECISION NOT NULL DEFAULT 0,
+            finalWeight DOUBLE PRECISION NOT NULL DEFAULT 0,
+            finalAmount DOUBLE PRECISION NOT NULL DEFAULT 0
+        )
+        """,
+    ),
+    (
+        "firm_ledger",
+        """
+        CREATE TABLE IF NOT EXISTS firm_ledger (
+            firmId TEXT PRIMARY KEY,
+            bills INTEGER NOT NULL DEFAULT 0,
+            purchasedFnWt DOUBLE PRECISION NOT NULL DEFAULT 0,
+            purchasedValue DOUBLE PRECISION NOT NULL DEFAULT 0,
+            exchangedFnWt DOUBLE PRECISION NOT NULL DEFAULT 0,
+            extraCharge DOUBLE PRECISION NOT NULL DEFAULT 0,
+            finalWeight DOUBLE PRECISION NOT NULL DEFAULT 0,
+            finalAmount DOUBLE PRECISION NOT NULL DEFAULT 0
+        )
+        """,
+    ),
+]
+
+# Cold twins of the append-only tables (see cold_archive), plus the per-store cutoff they hold rows below.
+ARCHIVE_TABLE_DDL = [
+    (archive_name(name), archive_table_ddl(name, ddl)) for name, ddl in MASTER_TABLE_DDL if name in ARCHIVED_TABLE_NAMES
+] + [
+    (
+        ARCHIVE_STATE_TABLE,
+        f"""
+        CREATE TABLE IF NOT EXISTS {ARCHIVE_STATE_TABLE} (
+            storeId TEXT PRIMARY KEY,
+            archivedBefore TIMESTAMPTZ NOT NULL,
+            updatedAt TIMESTAMPTZ NOT NULL
+        )
+        """,
+    ),
+]
+
+# Columns added after the Room mirror was first deployed; applied with ALTER TABLE when missing
+# so existing databases pick them up (CREATE TABLE IF NOT EXISTS leaves old tables untouched).
+MASTER_COLUMN_DDL = [
+    ("order", "invoiceNo", "INTEGER"),
+    ("customer_khata_book", "paidAmount", "DOUBLE PRECISION NOT NULL DEFAULT 0"),
+    ("customer_khata_book", "outstandingAmount", "DOUBLE PRECISION NOT NULL DEFAULT 0"),
+    ("purchase_order", "storeId", "TEXT"),
+]
+
+# outstandingAmount is totalAmount - paidAmount. The API writes both with every transaction it
+# books; khata books inserted or edited by any other writer (app sync, restores) get it from these
+# triggers instead of the column default.
+_KHATA_OUTSTANDING = "NEW.totalAmount - NEW.paidAmount"
+KHATA_TRIGGERS = [
+    (
+        f"trg_customer_khata_book_outstanding_{op}",
+        timing,
+        "customer_khata_book",
+        f"NEW.outstandingAmount <> {_KHATA_OUTSTANDING}",
+        [
+            f"UPDATE customer_khata_book SET outstandingAmount = {_KHATA_OUTSTANDING} "
+            "WHERE khataBookId = NEW.khataBookId;",
+        ],
+    )
+    for op, timing in (("insert", "AFTER INSERT"), ("update", "AFTER UPDATE OF totalAmount, paidAmount"))
+]
+
 MASTER_INDEX_DDL = [
     ("idx_store_userId", "CREATE INDEX IF NOT EXISTS idx_store_userId ON store (userId)"),
     ("idx_category_user_store", "CREATE INDEX IF NOT EXISTS idx_category_user_store ON category (userId, storeId)"),
     ("idx_sub_category_cat", "CREATE INDEX IF NOT EXISTS idx_sub_category_cat ON sub_category (catId)"),
-    ("idx_sub_category_store", "CREATE INDEX IF NOT EXISTS idx_sub_category_store ON sub_category (storeId)"),
     ("idx_item_cat", "CREATE INDEX IF NOT EXISTS idx_item_cat ON item (catId)"),
     ("idx_item_sub_cat", "CREATE INDEX IF NOT EXISTS idx_item_sub_cat ON item (subCatId)"),
-    ("idx_item_store", "CREATE INDEX IF NOT EXISTS idx_item_store ON item (storeId)"),
     ("idx_item_user", "CREATE INDEX IF NOT EXISTS idx_item_user ON item (userId)"),
-    ("idx_user_additional_info_user", "CREATE INDEX IF NOT EXISTS idx_user_additional_info_user ON user_additional_info (userId)"),
     ("idx_customer_khata_book_customer", "CREATE INDEX IF NOT EXISTS idx_customer_khata_book_customer ON customer_khata_book (customerMobile)"),
-    ("idx_customer_transaction_customer", "CREATE INDEX IF NOT EXISTS idx_customer_transaction_customer ON customer_transaction (customerMobile)"),
     ("idx_customer_transaction_khata", "CREATE INDEX IF NOT EXISTS idx_customer_transaction_khata ON customer_transaction (khataBookId)"),
-    ("idx_order_customer", 'CREATE INDEX IF NOT EXISTS idx_order_customer ON "order" (customerMobile)'),
     ("idx_order_item_order", "CREATE INDEX IF NOT EXISTS idx_order_item_order ON order_item (orderId)"),
     ("idx_exchange_item_order", "CREATE INDEX IF NOT EXISTS idx_exchange_item_order ON exchange_item (orderId)"),
     ("idx_seller_firm", "CREATE INDEX IF NOT EXISTS idx_seller_firm ON seller (firmId)"),
-    ("idx_purchase_order_seller", "CREATE INDEX IF NOT EXISTS idx_purchase_order_seller ON purchase_order (sellerId)"),
     ("idx_purchase_order_item_po", "CREATE INDEX IF NOT EXISTS idx_purchase_order_item_po ON purchase_order_item (purchaseOrderId)"),
     ("idx_metal_exchange_po", "CREATE INDEX IF NOT EXISTS idx_metal_exchange_po ON metal_exchange (purchaseOrderId)"),
     ("idx_label_element_template", "CREATE INDEX IF NOT EXISTS idx_label_element_template ON label_element (templateId)"),
+    # Store-scoped composites for the canonical "filter by store, sort by date" access patterns.
+    ("idx_sub_category_store_cat", "CREATE INDEX IF NOT EXISTS idx_sub_category_store_cat ON sub_category (storeId, catId)"),
+    ("idx_item_store_modified", "CREATE INDEX IF NOT EXISTS idx_item_store_modified ON item (storeId, modifiedDate)"),
+    ("idx_item_store_huid", "CREATE INDEX IF NOT EXISTS idx_item_store_huid ON item (storeId, huid)"),
+    # Label jobs print every item of one stock intake.
+    ("idx_item_store_purchase", "CREATE INDEX IF NOT EXISTS idx_item_store_purchase ON item (storeId, purchaseOrderId, itemId)"),
+    # Facet filters; its (storeId, catId, subCatId) prefix also serves the per-subcategory lookups.
+    (
+        "idx_item_store_facets",
+        "CREATE INDEX IF NOT EXISTS idx_item_store_facets ON item (storeId, catId, subCatId, purity, entryType, gsWt, ntWt)",
+    ),
+    ("idx_customer_store_modified", "CREATE INDEX IF NOT EXISTS idx_customer_store_modified ON customer (storeId, lastModifiedDate)"),
+    ("idx_customer_khata_book_store_status", "CREATE INDEX IF NOT EXISTS idx_customer_khata_book_store_status ON customer_khata_book (storeId, status)"),
+    ("idx_customer_transaction_store_date", "CREATE INDEX IF NOT EXISTS idx_customer_transaction_store_date ON customer_transaction (storeId, transactionDate)"),
+    ("idx_customer_transaction_customer_date", "CREATE INDEX IF NOT EXISTS idx_customer_transaction_customer_date ON customer_transaction (customerMobile, transactionDate)"),
+    ("idx_order_store_date", 'CREATE INDEX IF NOT EXISTS idx_order_store_date ON "order" (storeId, orderDate)'),
+    ("idx_order_customer_date", 'CREATE INDEX IF NOT EXISTS idx_order_customer_date ON "order" (customerMobile, orderDate)'),
+    ("idx_order_item_date", "CREATE INDEX IF NOT EXISTS idx_order_item_date ON order_item (orderDate)"),
+    ("idx_exchange_item_date", "CREATE INDEX IF NOT EXISTS idx_exchange_item_date ON exchange_item (orderDate)"),
+    ("idx_order_store_invoice", 'CREATE INDEX IF NOT EXISTS idx_order_store_invoice ON "order" (storeId, invoiceNo)'),
+    ("idx_purchase_order_store_bill", "CREATE INDEX IF NOT EXISTS idx_purchase_order_store_bill ON purchase_order (storeId, billDate)"),
+    ("idx_purchase_order_seller_bill", "CREATE INDEX IF NOT EXISTS idx_purchase_order_seller_bill ON purchase_order (sellerId, billDate)"),
+    ("idx_seller_ledger_firm", "CREATE INDEX IF NOT EXISTS idx_seller_ledger_firm ON seller_ledger (firmId)"),
+    # Rename propagation walks the lines of one category / sub-category in key order.
+    ("idx_order_item_cat_key", "CREATE INDEX IF NOT EXISTS idx_order_item_cat_key ON order_item (catId, orderItemId)"),
+    ("idx_order_item_sub_cat_key", "CREATE INDEX IF NOT EXISTS idx_order_item_sub_cat_key ON order_item (subCatId, orderItemId)"),
+    (
+        "idx_purchase_order_item_cat_key",
+        "CREATE INDEX IF NOT EXISTS idx_purchase_order_item_cat_key ON purchase_order_item (catId, purchaseItemId)",
+    ),
+    (
+        "idx_purchase_order_item_sub_cat_key",
+        "CREATE INDEX IF NOT EXISTS idx_purchase_order_item_sub_cat_key ON purchase_order_item (subCatId, purchaseItemId)",
+    ),
+    ("idx_rename_job_store_created", "CREATE INDEX IF NOT EXISTS idx_rename_job_store_created ON rename_job (storeId, createdAt)"),
+    ("idx_rename_job_status", "CREATE INDEX IF NOT EXISTS idx_rename_job_status ON rename_job (status, createdAt)"),
+    # Archive tables are read by date range, by order, or walked by a rename.
+    ("idx_order_archive_store_date", "CREATE INDEX IF NOT EXISTS idx_order_archive_store_date ON order_archive (storeId, orderDate)"),
+    ("idx_order_item_archive_order", "CREATE INDEX IF NOT EXISTS idx_order_item_archive_order ON order_item_archive (orderId)"),
+    ("idx_order_item_archive_date", "CREATE INDEX IF NOT EXISTS idx_order_item_archive_date ON order_item_archive (orderDate)"),
+    (
+        "idx_order_item_archive_cat_key",
+        "CREATE INDEX IF NOT EXISTS idx_order_item_archive_cat_key ON order_item_archive (catId, orderItemId)",
+    ),
+    (
+        "idx_order_item_archive_sub_cat_key",
+        "CREATE INDEX IF NOT EXISTS idx_order_item_archive_sub_cat_key ON order_item_archive (subCatId, orderItemId)",
+    ),
+    ("idx_exchange_item_archive_order", "CREATE INDEX IF NOT EXISTS idx_exchange_item_archive_order ON exchange_item_archive (orderId)"),
+    (
+        "idx_customer_transaction_archive_store_date",
+        "CREATE INDEX IF NOT EXISTS idx_customer_transaction_archive_store_date "
+        "ON customer_transaction_archive (storeId, transactionDate)",
+    ),
+    (
+        "idx_customer_transaction_archive_khata",
+        "CREATE INDEX IF NOT EXISTS idx_customer_transaction_archive_khata ON customer_transaction_archive (khataBookId)",
+    ),
 ]
 
+# Covering variants of the hottest store-scoped indexes. INCLUDE is PostgreSQL-only, so on
+# Postgres these take the place of the plain composites named in POSTGRES_REPLACED_INDEXES.
+POSTGRES_INDEX_DDL = [
+    (
+        "idx_order_store_date_cover",
+        'CREATE INDEX IF NOT EXISTS idx_order_store_date_cover ON "order" (storeId, orderDate) '
+        "INCLUDE (orderId, customerMobile, totalAmount, totalTax, totalCharge, discount)",
+    ),
+    (
+        "idx_customer_transaction_store_date_cover",
+        "CREATE INDEX IF NOT EXISTS idx_customer_transaction_store_date_cover ON customer_transaction (storeId, transactionDate) "
+        "INCLUDE (customerMobile, amount, transactionType, paymentMethod)",
+    ),
+    (
+        "idx_item_store_facets_cover",
+        "CREATE INDEX IF NOT EXISTS idx_item_store_facets_cover ON item "
+        "(storeId, catId, subCatId, purity, entryType, gsWt, ntWt) INCLUDE (quantity, fnWt)",
+    ),
+]
+
+# Plain composite -> the covering index that replaces it on Postgres.
+POSTGRES_REPLACED_INDEXES = {
+    "idx_order_store_date": "idx_order_store_date_cover",
+    "idx_customer_transaction_store_date": "idx_customer_transaction_store_date_cover",
+    "idx_item_store_facets": "idx_item_store_facets_cover",
+}
+
+# Indexes made redundant by a wider one (or the primary key) with the same leading columns; dropped
+# from existing databases. audit_indexes reports any index that ends up in that position again.
+DROPPED_INDEX_NAMES = [
+    "idx_item_store_cat_sub",
+    "idx_item_store_cat_sub_cover",
+    "idx_item_store",
+    "idx_sub_category_store",
+    "idx_order_customer",
+    "idx_customer_transaction_customer",
+    "idx_purchase_order_seller",
+    "idx_user_additional_info_user",
+]
+
+
+def master_index_ddl(vendor):
+    """
+    Return the (name, ddl) index list that applies to the given DB vendor.
+    """
+    if vendor == "postgresql":
+        plain = [(name, ddl) for name, ddl in MASTER_INDEX_DDL if name not in POSTGRES_REPLACED_INDEXES]
+        return plain + POSTGRES_INDEX_DDL
+    return list(MASTER_INDEX_DDL)
+
+
+def dropped_index_names(vendor):
+    """
+    Return the indexes to drop from an existing database on the given DB vendor.
+    """
+    if vendor == "postgresql":
+        return DROPPED_INDEX_NAMES + list(POSTGRES_REPLACED_INDEXES)
+    return list(DROPPED_INDEX_NAMES)
+
+
+def ensure_master_columns(cursor):
+    """
+    Add any MASTER_COLUMN_DDL column the existing tables (and their archive twins) are missing,
+    then fill the derived ones on rows written before they existed.
+    """
+    for base, column, definition in MASTER_COLUMN_DDL:
+        for table in [base, archive_name(base)] if base in ARCHIVED_TABLE_NAMES else [base]:
+            existing = {
+                col.name.lower() for col in connection.introspection.get_table_description(cursor, table)
+            }
+            if column.lower() not in existing:
+                cursor.execute(f"ALTER TABLE {connection.ops.quote_name(table)} ADD COLUMN {column} {definition}")
+    backfill_purchase_stores(cursor)
+    cursor.execute(
+        "UPDATE customer_khata_book SET outstandingAmount = totalAmount - paidAmount "
+        "WHERE outstandingAmount <> totalAmount - paidAmount"
+    )
+
+
+def apply_master_schema(cursor):
+    """
+    Create/ensure every master table and index on the current connection.
+    """
+    if connection.vendor == "sqlite":
+        cursor.execute("PRAGMA foreign_keys = ON")
+    partitioned = partitioning_enabled()
+    for name, ddl in MASTER_TABLE_DDL:
+        if partitioned and name in PARTITIONED_TABLE_NAMES:
+            ddl = partitioned_table_ddl(name, ddl)
+        cursor.execute(ddl)
+    for _, ddl in SERVER_TABLE_DDL + ARCHIVE_TABLE_DDL:
+        cursor.execute(ddl)
+    ensure_master_columns(cursor)
+    if partitioned:
+        today = date.today()
+        ensure_partitions(cursor, today, add_months(today, settings.MASTER_PARTITION_MONTHS_AHEAD))
+    for name in dropped_index_names(connection.vendor):
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
+    for _, ddl in master_index_ddl(connection.vendor):
+        cursor.execute(ddl)
+    for _, ddl in rollup_trigger_ddl(connection.vendor):
+        cursor.execute(ddl)
+    for _, ddl in version_trigger_ddl(connection.vendor):
+        cursor.execute(ddl)
+    for _, ddl in ledger_trigger_ddl(connection.vendor):
+        cursor.execute(ddl)
+    for _, ddl in row_trigger_ddl(connection.vendor, KHATA_TRIGGERS):
+        cursor.execute(ddl)
+    apply_search_indexes(cursor, connection.vendor)
+
 
 @require_POST
 def create_master_tables(request):
@@ -446,18 +806,13 @@ def create_master_tables(request):
     try:
         with transaction.atomic():
             with connection.cursor() as cursor:
-                if connection.vendor == "sqlite":
-                    cursor.execute("PRAGMA foreign_keys = ON")
-                for _, ddl in MASTER_TABLE_DDL:
-                    cursor.execute(ddl)
-                for _, ddl in MASTER_INDEX_DDL:
-                    cursor.execute(ddl)
+                apply_master_schema(cursor)
         return JsonResponse(
             {
                 "status": "ok",
                 "db_vendor": connection.vendor,
-                "tables": [name for name, _ in MASTER_TABLE_DDL],
-                "indexes": [name for name, _ in MASTER_INDEX_DDL],
+                "tables": [name for name, _ in MASTER_TABLE_DDL + SERVER_TABLE_DDL + ARCHIVE_TABLE_DDL],
+                "indexes": [name for name, _ in master_index_ddl(connection.vendor)],
             }
         )
     except Exception as exc:  # pragma: no cover - defensive logging surface
@@ -33,7 +33,15 @@ TABLE_CATEGORY = "category"
 TABLE_SUB_CATEGORY = "sub_category"
 TABLE_ITEM = "item"
 
+# Rows fetched per round trip by server-side cursors and bulk jobs
+DB_BATCH_SIZE = 2000
+
+# Upper bound on lines in one quote/order request; keeps a multi-row order_item
+# INSERT under SQLite's 32766 bound-parameter limit
+MAX_ORDER_LINES = 500
+
 # Cache timeout (seconds)
 CACHE_TIMEOUT_SHORT = 300  # 5 minutes
 CACHE_TIMEOUT_MEDIUM = 1800  # 30 minutes
 CACHE_TIMEOUT_LONG = 3600  # 1 hour
+CACHE_TIMEOUT_DAY = 86400  # 24 hours
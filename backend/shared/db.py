@@ -0,0 +1,87 @@
+"""Raw-SQL helpers shared by the master-table features."""
+
+from contextlib import nullcontext
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from django.db import connections, transaction
+
+from .constants import DB_BATCH_SIZE
+
+
+def rows_to_dicts(columns: Sequence[str], rows) -> List[dict]:
+    """
+    Zip rows with an explicit column list.
+
+    PostgreSQL folds unquoted identifiers to lower case, so cursor.description
+    cannot be trusted for the camelCase keys the mobile app expects.
+    """
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def fetch_dicts(cursor, columns: Sequence[str], sql: str, params: Optional[Sequence] = None) -> List[dict]:
+    """Execute `sql` and return its rows as dicts keyed by `columns`."""
+    cursor.execute(sql, params or [])
+    return rows_to_dicts(columns, cursor.fetchall())
+
+
+def iter_row_batches(sql: str, params: Optional[Sequence] = None, using: str = "default",
+                     batch_size: int = DB_BATCH_SIZE) -> Iterator[list]:
+    """
+    Yield the rows of `sql` in lists of at most `batch_size`.
+
+    On PostgreSQL this uses a named (server-side) cursor inside a transaction, so
+    only one batch is ever held in memory; on SQLite the cursor already steps
+    through the result lazily, and no transaction is opened: it would start with
+    BEGIN IMMEDIATE and hold the write lock for as long as the stream is read.
+    """
+    connection = connections[using]
+    in_transaction = transaction.atomic(using=using) if connection.vendor == "postgresql" else nullcontext()
+    with in_transaction:
+        cursor = connection.chunked_cursor()
+        try:
+            cursor.execute(sql, params or [])
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+
+def insert_rows(cursor, table: str, columns: Sequence[str], rows: Sequence[Sequence]) -> None:
+    """Insert `rows` with a single multi-row INSERT (no-op when there are none)."""
+    if not rows:
+        return
+    placeholders = f"({', '.join(['%s'] * len(columns))})"
+    cursor.execute(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([placeholders] * len(rows))}",
+        [value for row in rows for value in row],
+    )
+
+
+def bulk_insert(cursor, vendor: str, table: str, columns: Sequence[str], rows: Sequence[Sequence]) -> None:
+    """Load `rows` into `table` with COPY on PostgreSQL and executemany elsewhere."""
+    quoted = f'"{table}"'
+    if vendor == "postgresql":
+        with cursor.copy(f"COPY {quoted} ({', '.join(columns)}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+    else:
+        cursor.executemany(
+            f"INSERT INTO {quoted} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})",
+            rows,
+        )
+
+
+def values_sql(rows: Sequence[Sequence], types: Sequence[Optional[str]]) -> Tuple[str, list]:
+    """
+    Build a `(VALUES ...)` row source (and params) for UPDATE ... FROM joins.
+
+    Columns are addressed as column1, column2, ... on both SQLite and PostgreSQL;
+    `types` casts each column (None leaves it untyped) so PostgreSQL does not
+    read the parameters as text.
+    """
+    cells = ", ".join(f"CAST(%s AS {type_})" if type_ else "%s" for type_ in types)
+    row_sql = f"({cells})"
+    return f"(VALUES {', '.join([row_sql] * len(rows))})", [value for row in rows for value in row]
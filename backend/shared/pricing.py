@@ -0,0 +1,146 @@
+"""
+Jewellery pricing rules shared by stock valuation, quotes and invoices.
+
+An item's metal price is its fine weight (fnWt) at the per-gram fine rate of its
+metal. The making charge depends on crgType, `othCrg` is added on top, and GST
+(cgst + sgst + igst, in percent) applies to price plus charge.
+"""
+
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .exceptions import ApplicationException, ValidationException
+
+METALS = ("gold", "silver")
+
+PERCENT_CHARGE_TYPES = ("%", "percent", "percentage")
+PIECE_CHARGE_TYPES = ("piece", "pc", "pcs", "per piece")
+GRAM_CHARGE_TYPES = ("gm", "/gm", "gram", "per gm", "per gram")
+
+# Request parameters that override the live rate, in the units of the metal-rate endpoint.
+RATE_OVERRIDE_PARAMS = {
+    "goldRate": ("gold", 10),
+    "silverRate": ("silver", 1000),
+}
+
+
+@lru_cache(maxsize=1024)
+def metal_for_category(cat_name: Optional[str]) -> str:
+    """Categories are named after their metal; anything that is not silver is priced as gold."""
+    return "silver" if "silver" in (cat_name or "").lower() else "gold"
+
+
+def fine_rates_per_gram(snapshot: dict, overrides: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """
+    Convert a metal-rate payload (gold per 10 gm, silver per 1000 gm) into per-gram fine rates.
+
+    `overrides` maps metal -> per-gram rate and wins over the snapshot.
+    """
+    rates = {}
+    for rate in snapshot.get("rates", []):
+        if rate.get("price") is not None and rate.get("unit_gm"):
+            rates[rate["metal"]] = float(rate["price"]) / float(rate["unit_gm"])
+    for metal, value in (overrides or {}).items():
+        if value is not None:
+            rates[metal] = float(value)
+
+    missing = [metal for metal in METALS if not rates.get(metal)]
+    if missing:
+        raise ApplicationException(f"Metal rate unavailable for: {', '.join(missing)}", status_code=503)
+    return rates
+
+
+def parse_rate_overrides(params) -> Dict[str, float]:
+    """Read goldRate (per 10 gm) / silverRate (per kg) overrides into per-gram rates."""
+    overrides = {}
+    for param, (metal, unit_gm) in RATE_OVERRIDE_PARAMS.items():
+        value = params.get(param)
+        if value in (None, ""):
+            continue
+        try:
+            overrides[metal] = float(value) / unit_gm
+        except (TypeError, ValueError):
+            raise ValidationException(f"{param} must be a number")
+        if overrides[metal] <= 0:
+            raise ValidationException(f"{param} must be positive")
+    return overrides
+
+
+def _placeholders(values) -> str:
+    return ", ".join(["%s"] * len(values))
+
+
+def metal_rate_sql(rates: Dict[str, float], cat_name_column: str = "catName") -> Tuple[str, List]:
+    """SQL expression (and params) for the per-gram rate of a row's metal."""
+    return (
+        f"CASE WHEN LOWER({cat_name_column}) LIKE %s THEN %s ELSE %s END",
+        ["%silver%", rates["silver"], rates["gold"]],
+    )
+
+
+def charge_sql(price_expr: str) -> Tuple[str, List]:
+    """
+    SQL expression (and params) for making charge + other charge.
+
+    Expects crgType, crg, quantity, ntWt and othCrg columns in scope. crgType is
+    matched like charge_kind does (trimmed, any case); unknown charge types are
+    treated as a flat amount.
+    """
+    sql = (
+        "(CASE"
+        f" WHEN LOWER(TRIM(crgType)) IN ({_placeholders(PERCENT_CHARGE_TYPES)}) THEN {price_expr} * crg / 100"
+        f" WHEN LOWER(TRIM(crgType)) IN ({_placeholders(PIECE_CHARGE_TYPES)}) THEN crg * quantity"
+        f" WHEN LOWER(TRIM(crgType)) IN ({_placeholders(GRAM_CHARGE_TYPES)}) THEN crg * ntWt"
+        " ELSE crg END + othCrg)"
+    )
+    return sql, [*PERCENT_CHARGE_TYPES, *PIECE_CHARGE_TYPES, *GRAM_CHARGE_TYPES]
+
+
+@lru_cache(maxsize=256)
+def charge_kind(crg_type: Optional[str]) -> str:
+    """Classify a crgType value as percent, piece, gram or flat."""
+    value = (crg_type or "").strip().lower()
+    if value in PERCENT_CHARGE_TYPES:
+        return "percent"
+    if value in PIECE_CHARGE_TYPES:
+        return "piece"
+    if value in GRAM_CHARGE_TYPES:
+        return "gram"
+    return "flat"
+
+
+def price_lines(lines: Iterable[dict], rates: Dict[str, float]) -> List[dict]:
+    """
+    Price many lines in one pass against a single rate snapshot.
+
+    Each line needs catName, fnWt, ntWt, quantity, crgType, crg, othCrg, cgst, sgst
+    and igst. Returns one dict per line with fnMetalPrice, price, charge, tax and
+    total rounded to paise, mirroring the order_item columns.
+    """
+    priced = []
+    append = priced.append
+    for line in lines:
+        metal = metal_for_category(line["catName"])
+        rate = rates[metal]
+        price = line["fnWt"] * rate
+        kind = charge_kind(line["crgType"])
+        if kind == "percent":
+            charge = price * line["crg"] / 100
+        elif kind == "piece":
+            charge = line["crg"] * line["quantity"]
+        elif kind == "gram":
+            charge = line["crg"] * line["ntWt"]
+        else:
+            charge = line["crg"]
+        charge += line["othCrg"]
+        tax = (price + charge) * (line["cgst"] + line["sgst"] + line["igst"]) / 100
+        price, charge, tax = round(price, 2), round(charge, 2), round(tax, 2)
+        append({
+            "metal": metal,
+            "fnMetalPrice": round(rate, 4),
+            "price": price,
+            "charge": charge,
+            "tax": tax,
+            "total": round(price + charge + tax, 2),
+        })
+    return priced
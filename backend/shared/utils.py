@@ -1,5 +1,6 @@
 """Utility functions."""
 
+import json
 import uuid
 from datetime import datetime
 from functools import wraps
@@ -117,3 +118,21 @@ def handle_exceptions(func: Callable) -> Callable:
             return error_response(str(e), status_code=500)
     
     return wrapper
+
+
+def parse_json_body(request) -> Dict[str, Any]:
+    """
+    Decode a JSON object request body.
+
+    Raises:
+        ValidationException: If the body is not a JSON object
+    """
+    from .exceptions import ValidationException
+
+    try:
+        body = json.loads(request.body or b"{}")
+    except (TypeError, ValueError):
+        raise ValidationException("Request body must be valid JSON")
+    if not isinstance(body, dict):
+        raise ValidationException("Request body must be a JSON object")
+    return body
@@ -1,7 +1,8 @@
 """Input validators."""
 
 import re
-from typing import Optional
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Optional, Tuple
 
 from .exceptions import ValidationException
 
@@ -65,3 +66,49 @@ def validate_pagination_params(page: Optional[int] = None, page_size: Optional[i
     
     if page_size is not None and page_size < 1:
         raise ValidationException("Page size must be >= 1")
+
+
+def parse_date_param(value: Optional[str], field: str) -> Optional[date]:
+    """Parse an optional YYYY-MM-DD query parameter."""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValidationException(f"{field} must be a date in YYYY-MM-DD format")
+
+
+def parse_date_range(params, start_field: str = 'from', end_field: str = 'to') -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Parse an inclusive from/to date pair into a half-open UTC datetime range.
+
+    Returns (start, end) where end is midnight after the `to` date; either may be None.
+    """
+    start = parse_date_param(params.get(start_field), start_field)
+    end = parse_date_param(params.get(end_field), end_field)
+    if start and end and start > end:
+        raise ValidationException(f"{start_field} must not be after {end_field}")
+    start_at = datetime.combine(start, time.min, tzinfo=timezone.utc) if start else None
+    end_at = datetime.combine(end + timedelta(days=1), time.min, tzinfo=timezone.utc) if end else None
+    return start_at, end_at
+
+
+def parse_datetime_param(value, field: str) -> Optional[datetime]:
+    """Parse an optional ISO 8601 datetime; naive values are taken as UTC."""
+    if value in (None, ""):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value) if isinstance(value, str) else None
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationException(f"{field} must be an ISO 8601 datetime")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def parse_number(data: dict, field: str, default: float = 0.0, label: Optional[str] = None) -> float:
+    """Read a numeric JSON field, rejecting strings and booleans."""
+    value = data.get(field, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValidationException(f"{label or field} must be a number")
+    return value
@@ -19,6 +19,15 @@ urlpatterns = [
     
     # API Routes
     path(f'{v1}/', include('backend.api.v1.metal_rate.urls')),
+    path(f'{v1}/', include('backend.api.v1.export.urls')),
+    path(f'{v1}/', include('backend.api.v1.inventory.urls')),
+    path(f'{v1}/', include('backend.api.v1.billing.urls')),
+    path(f'{v1}/', include('backend.api.v1.customers.urls')),
+    path(f'{v1}/', include('backend.api.v1.dashboard.urls')),
+    path(f'{v1}/', include('backend.api.v1.reports.urls')),
+    path(f'{v1}/', include('backend.api.v1.search.urls')),
+    path(f'{v1}/', include('backend.api.v1.suppliers.urls')),
+    path(f'{v1}/', include('backend.api.v1.labels.urls')),
 
 
     path(f'{v1}/', include('backend.api.v1.test.urls')),  # Root endpoints (ping, /users/, etc.)